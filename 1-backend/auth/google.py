@@ -5,7 +5,7 @@ Handles Google OAuth 2.0 flow with family context awareness
 
 import os
 import secrets
-from jose import jwt
+from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
 from google.auth.transport import requests as google_requests
@@ -189,7 +189,7 @@ class GoogleAuthService:
         except jwt.ExpiredSignatureError:
             logger.warning("JWT token expired")
             return None
-        except jwt.InvalidTokenError as e:
+        except JWTError as e:
             logger.warning(f"Invalid JWT token: {str(e)}")
             return None
     
@@ -244,7 +244,7 @@ class GoogleAuthService:
         except jwt.ExpiredSignatureError:
             logger.warning("Verification token expired")
             return None
-        except jwt.InvalidTokenError as e:
+        except JWTError as e:
             logger.warning(f"Invalid verification token: {str(e)}")
             return None
 
@@ -0,0 +1,109 @@
+"""
+Family access verdicts for Family Genealogy Platform
+A gallery view can request hundreds of site files with the same cookie, so
+the membership decision is made once per (token digest, family) and kept
+until the token expires instead of verifying the JWT on every request
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Tuple
+
+from auth.google import GoogleAuthService, get_google_auth
+from db.models import is_valid_family
+
+MAX_VERDICTS = 100_000  # Least recently used verdicts are dropped beyond this
+INVALID_TOKEN_SECONDS = 60  # Rejections of unverifiable tokens are remembered this long
+
+ALLOWED, NOT_AUTHENTICATED, NO_ACCESS = 200, 401, 403
+
+
+def token_digest(token: str) -> bytes:
+    """Cache key for a token, so raw tokens are not kept in memory"""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """The token in an authorization cookie or header value, with or without 'Bearer '"""
+    if not authorization:
+        return None
+    return authorization[7:] if authorization.startswith("Bearer ") else authorization
+
+
+def family_from_uri(uri: Optional[str]) -> Optional[str]:
+    """The family a site URI belongs to: /families/bull/annie.html or /bull/annie.html -> bull"""
+    parts = [part for part in (uri or "").split("?", 1)[0].split("/") if part]
+    if parts and parts[0] == "families":
+        parts = parts[1:]
+    return parts[0] if parts else None
+
+
+class FamilyAccessVerdicts:
+    """LRU of (token digest, family) -> (status, expires at)"""
+
+    def __init__(self, auth: Optional[GoogleAuthService] = None, max_verdicts: int = MAX_VERDICTS):
+        self._auth = auth
+        self.max_verdicts = max_verdicts
+        self._verdicts: "OrderedDict[Tuple[bytes, str], Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def auth(self) -> GoogleAuthService:
+        return self._auth or get_google_auth()
+
+    def _decide(self, token: str, family: str) -> Tuple[int, float]:
+        """Verify the token and check the family claim: (status, epoch seconds the verdict holds until)"""
+        payload = self.auth.verify_jwt_token(token)
+        if not payload or "exp" not in payload:
+            return NOT_AUTHENTICATED, time.time() + INVALID_TOKEN_SECONDS
+        allowed = is_valid_family(family) and family in payload.get("families", [])
+        return (ALLOWED if allowed else NO_ACCESS), float(payload["exp"])
+
+    def check(self, token: Optional[str], family: str) -> int:
+        """
+        Decide whether a token grants access to a family's site
+
+        Returns:
+            200 (member), 401 (no token, or invalid or expired) or 403 (not a member)
+        """
+        if not token:
+            return NOT_AUTHENTICATED
+        key = (token_digest(token), family)
+        now = time.time()
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is not None and verdict[1] > now:
+                self._verdicts.move_to_end(key)
+                self.hits += 1
+                return verdict[0]
+        status, expires = self._decide(token, family)
+        with self._lock:
+            self.misses += 1
+            if expires > now:
+                self._verdicts[key] = (status, expires)
+                self._verdicts.move_to_end(key)
+                while len(self._verdicts) > self.max_verdicts:
+                    self._verdicts.popitem(last=False)
+        return status
+
+    def clear(self):
+        """Forget every verdict (after rotating JWT_SECRET or changing FAMILY_NAMES)"""
+        with self._lock:
+            self._verdicts.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"verdicts": len(self._verdicts), "hits": self.hits, "misses": self.misses}
+
+
+# Global instance
+family_access = FamilyAccessVerdicts()
+
+
+def get_family_access() -> FamilyAccessVerdicts:
+    """Get family access verdict cache instance"""
+    return family_access
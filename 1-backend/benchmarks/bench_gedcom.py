@@ -0,0 +1,114 @@
+"""
+GEDCOM import/export benchmark
+Writes a synthetic GEDCOM file, imports it into a scratch SQLite database and
+streams it back out, each step in its own process to report peak memory.
+First checks that a replace re-import with one renamed person changes the
+tree version the export ETag is built from.
+"""
+
+import argparse
+import multiprocessing
+import os
+import re
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import SQLModel, create_engine
+
+from benchmarks.synthetic import synthetic_tree, write_gedcom
+from families.gedcom import GedcomImporter, export_gedcom, print_progress
+from families.tree import FamilyTreeService
+
+
+def generate(people: int, gedcom_path: str):
+    """Child process: write the synthetic file"""
+    write_gedcom(synthetic_tree(people), gedcom_path)
+
+
+def run_import(gedcom_path: str, db_path: str, batch_size: int):
+    """Child process: import and report stats with peak RSS"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    stats = GedcomImporter("bench", engine=engine, batch_size=batch_size, progress=print_progress).run(
+        Path(gedcom_path))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return stats, baseline, peak
+
+
+def check_replace_changes_version(workdir: str):
+    """Re-import a small tree with one name changed and make sure its version (the export ETag) moves"""
+    gedcom_path = Path(workdir) / "small.ged"
+    write_gedcom(synthetic_tree(50), gedcom_path)
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'check.db')}")
+    SQLModel.metadata.create_all(engine)
+    service = FamilyTreeService(engine)
+
+    GedcomImporter("check", engine=engine).run(gedcom_path)
+    before = service.tree_version("check")
+    exported = "".join(export_gedcom("check", engine=engine))
+    original = gedcom_path.read_text(encoding="utf-8")
+    gedcom_path.write_text(re.sub(r"^1 NAME (\S+)", r"1 NAME \1x", original, count=1, flags=re.M),
+                           encoding="utf-8")
+    GedcomImporter("check", engine=engine).run(gedcom_path, replace=True)
+    after = service.tree_version("check")
+    assert "".join(export_gedcom("check", engine=engine)) != exported, "re-import did not change the export"
+    assert after != before, f"replace re-import kept tree version {before}"
+    print(f"✓ Replace re-import changed the tree version ({before} -> {after})")
+
+
+def run_export(db_path: str):
+    """Child process: stream the tree out, discarding the text"""
+    engine = create_engine(f"sqlite:///{db_path}")
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    chunks = size = 0
+    for chunk in export_gedcom("bench", engine=engine):
+        chunks += 1
+        size += len(chunk.encode("utf-8"))
+    elapsed = time.perf_counter() - start
+    return size, chunks, elapsed, baseline, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming GEDCOM import")
+    parser.add_argument("--people", type=int, default=500_000, help="Synthetic individuals")
+    parser.add_argument("--file", type=Path, help="Import this GEDCOM instead of generating one")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    check_replace_changes_version(workdir)
+    gedcom_path = args.file
+    # Generator and importer each get a fresh process so peak RSS reflects only the importer
+    context = multiprocessing.get_context("spawn")
+    if gedcom_path is None:
+        gedcom_path = Path(workdir) / "synthetic.ged"
+        start = time.perf_counter()
+        with context.Pool(1) as pool:
+            pool.apply(generate, (args.people, str(gedcom_path)))
+        print(f"Wrote {gedcom_path} ({gedcom_path.stat().st_size / 1024 / 1024:.1f} MB) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    with context.Pool(1) as pool:
+        stats, baseline, peak = pool.apply(
+            run_import, (str(gedcom_path), os.path.join(workdir, "import.db"), args.batch_size))
+
+    print()
+    print(f"Imported {stats.individuals:,} individuals, {stats.families:,} families, {stats.events:,} events, "
+          f"{stats.relationships:,} relationships, {stats.closure_rows:,} closure rows")
+    print(f"  {stats.elapsed:.1f}s total, {stats.rows_per_second:,.0f} rows/s, {stats.lines / stats.elapsed:,.0f} "
+          f"lines/s (both passes)")
+    print(f"  importer peak RSS {peak / 1024:.0f} MB (process baseline {baseline / 1024:.0f} MB)")
+
+    with context.Pool(1) as pool:
+        size, chunks, elapsed, baseline, peak = pool.apply(run_export, (os.path.join(workdir, "import.db"),))
+    print(f"Exported {size / 1024 / 1024:.1f} MB in {chunks:,} chunks, {elapsed:.1f}s "
+          f"({size / 1024 / 1024 / elapsed:.1f} MB/s)")
+    print(f"  exporter peak RSS {peak / 1024:.0f} MB (process baseline {baseline / 1024:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Image catalog benchmark
+Catalogs a family site's images into a scratch SQLite database (full scan
+and no-change rescan), times gallery queries against filtering the same
+images by opening their headers, then loads synthetic rows to compare deep
+keyset pages with OFFSET paging
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel, Session
+
+from db.models import SiteImage  # noqa: F401 - registers the tables
+from families.images import ImageCatalogService, orientation_of, page_cursor
+from families.sites import sites_root
+
+
+def timed(function, runs: int = 50) -> float:
+    """Median milliseconds of a call"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the image catalog")
+    parser.add_argument("--family", default="bull")
+    parser.add_argument("--workers", type=int, help="Scan worker processes (default: CPU count)")
+    parser.add_argument("--rows", type=int, default=200_000, help="Synthetic rows for the paging comparison")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix="bench_images_"))
+    engine = create_engine(f"sqlite:///{directory / 'images.db'}")
+    SQLModel.metadata.create_all(engine)
+    catalog = ImageCatalogService(engine, workers=args.workers)
+    start = time.perf_counter()
+    counts = catalog.scan(args.family)
+    print(f"Scan of {counts['added']} images: {time.perf_counter() - start:.1f}s, {counts['links']} page links")
+    start = time.perf_counter()
+    catalog.scan(args.family)
+    print(f"  rescan, nothing changed: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    images = sorted((sites_root() / args.family / "images").glob("*.png"))
+
+    def header_scan():
+        """What a gallery filter costs without the catalog: open every header"""
+        found = []
+        for path in images:
+            with Image.open(path) as im:
+                if orientation_of(*im.size) == "landscape":
+                    found.append((path.stat().st_size, path.name))
+        return sorted(found, reverse=True)[:48]
+
+    print("Gallery queries (48 per page, median):")
+    cases = [
+        ("memoir order, first page", lambda: catalog.query(args.family)),
+        ("landscape, largest first", lambda: catalog.query(args.family, "bytes", "landscape")),
+        ("min 1000x1000 px", lambda: catalog.query(args.family, "pixels", min_width=1000, min_height=1000)),
+        ("embedded in one page", lambda: catalog.query(args.family, embedded_in="page_101_img_1.html")),
+    ]
+    for label, query in cases:
+        print(f"  {label:<28} {timed(query):7.2f} ms")
+    print(f"  {'header scan, landscape':<28} {timed(header_scan, runs=3):7.2f} ms (no catalog)")
+
+    rng = random.Random(args.seed)
+    rows = []
+    for number in range(args.rows):
+        width, height = rng.randint(100, 3000), rng.randint(100, 3000)
+        rows.append({"family": "synthetic", "path": f"images/page_{number // 4 + 1}_img_{number % 4 + 1}.png",
+                     "page": number // 4 + 1, "image_index": number % 4 + 1, "width": width, "height": height,
+                     "pixels": width * height, "orientation": orientation_of(width, height),
+                     "bytes": rng.randint(10_000, 3_000_000), "sha256": f"{number:064x}", "color": "#808080"})
+    with Session(engine) as session:
+        session.execute(text("""
+            INSERT INTO site_images (family_name, path, page, image_index, width, height, pixels, orientation,
+                bytes, mtime_ns, sha256, color, scanned_at)
+            VALUES (:family, :path, :page, :image_index, :width, :height, :pixels, :orientation,
+                :bytes, 0, :sha256, :color, CURRENT_TIMESTAMP)
+        """), rows)
+        session.commit()
+    catalog._scanned.add("synthetic")
+
+    depth = args.rows * 3 // 4
+    with Session(engine) as session:
+        cursor_row = session.execute(text(
+            "SELECT bytes, id FROM site_images WHERE family_name = 'synthetic' "
+            "ORDER BY bytes DESC, id DESC LIMIT 1 OFFSET :depth"), {"depth": depth}).first()
+        after = page_cursor("bytes", {"bytes": cursor_row.bytes, "id": cursor_row.id})
+
+        def offset_page():
+            return session.execute(text(
+                "SELECT id FROM site_images WHERE family_name = 'synthetic' "
+                "ORDER BY bytes DESC, id DESC LIMIT 48 OFFSET :depth"), {"depth": depth}).all()
+
+        print(f"Paging {args.rows:,} rows by size, {depth:,} rows deep (median):")
+        print(f"  keyset cursor {timed(lambda: catalog.query('synthetic', 'bytes', after=after)):8.2f} ms")
+        print(f"  OFFSET        {timed(offset_page, runs=10):8.2f} ms")
+
+    engine.dispose()
+    for leftover in directory.iterdir():
+        leftover.unlink()
+    directory.rmdir()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Kinship index benchmark
+Builds the in-memory LCA index for a synthetic tree, then times relationship
+queries, incremental link updates and a per-query ancestor search for contrast,
+and how the service picks up a tree write (incremental) against a reload
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Dict, List
+
+from sqlmodel import SQLModel, Session, create_engine
+
+from benchmarks.synthetic import synthetic_tree
+from db.models import Person
+from families.kinship import KinshipIndex, KinshipService
+from families.tree import FamilyTreeService, bump_tree_version, insert_person, link_parent, link_spouses
+
+FAMILY = "bench"
+
+
+def bfs_ancestors(parents: Dict[int, List[int]], person: int) -> Dict[int, int]:
+    """Baseline: walk a person's pedigree at query time"""
+    found, queue = {}, deque([(person, 0)])
+    while queue:
+        current, depth = queue.popleft()
+        for parent in parents.get(current, ()):
+            if parent not in found:
+                found[parent] = depth + 1
+                queue.append((parent, depth + 1))
+    return found
+
+
+def related_pairs(index: KinshipIndex, people: int, count: int, rng: random.Random):
+    """Random pairs that share an ancestor: climb from one person, descend to another"""
+    pairs = []
+    while len(pairs) < count:
+        a = rng.randrange(people)
+        ancestors = list(index.ancestors.get(a, {}))
+        if not ancestors:
+            continue
+        current = rng.choice(ancestors)
+        for _ in range(rng.randint(1, 6)):
+            children = list(index.children.get(current, ()))
+            if not children:
+                break
+            current = rng.choice(children)
+        if current != a:
+            pairs.append((a, current))
+    return pairs
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def service_refresh(people: int, writes: int, seed: int):
+    """Time KinshipService catching up after tree writes, against a reload after a clear"""
+    tree = synthetic_tree(people, seed=seed)
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_kinship.db')}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        ids = [insert_person(session, Person(family_name=FAMILY, **fields)).id for fields in tree.people]
+        for parent, child in tree.parent_links:
+            link_parent(session, FAMILY, ids[parent], ids[child])
+        for first, second in tree.couples:
+            link_spouses(session, FAMILY, ids[first], ids[second])
+        bump_tree_version(session, FAMILY)
+        session.commit()
+
+    service, tree_service = KinshipService(engine), FamilyTreeService(engine)
+    start = time.perf_counter()
+    index = service.index(FAMILY)
+    load = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(seed)
+    refresh, wrong = [], 0
+    for _ in range(writes):
+        first, second = rng.choice(tree.couples)
+        child = tree_service.add_person(FAMILY, given_name="New", surname="Child", sex="F").id
+        tree_service.add_relationship(FAMILY, ids[first], child)
+        tree_service.add_relationship(FAMILY, ids[second], child)
+        sibling = next(iter(index.children[ids[first]] - {child}), None)
+        start = time.perf_counter()
+        kinship = service.kinship(FAMILY, sibling or ids[first], child)
+        refresh.append((time.perf_counter() - start) * 1000)
+        wrong += kinship.relationship != ("sister" if sibling else "daughter")
+    incremental = service.index(FAMILY) is index
+
+    with Session(engine) as session:
+        bump_tree_version(session, FAMILY, cleared=True)  # As a replace import would
+        session.commit()
+    start = time.perf_counter()
+    service.index(FAMILY)
+    reload = (time.perf_counter() - start) * 1000
+
+    print(f"Service ({people:,} people in SQLite, {writes} writes of a child and two parent links):")
+    print(f"  first load {load:.0f} ms; query after a write p50 {statistics.median(refresh):.2f} ms, "
+          f"p95 {percentile(refresh, 0.95):.2f} ms ({'incremental' if incremental else 'REBUILT'}, "
+          f"{'all answers right' if not wrong else f'{wrong} WRONG'}); reload after a clear {reload:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark kinship queries on a synthetic tree")
+    parser.add_argument("--people", type=int, default=100_000, help="Synthetic tree size")
+    parser.add_argument("--queries", type=int, default=20_000, help="Relationship queries to time")
+    parser.add_argument("--service-people", type=int, default=20_000, help="Tree size for the service refresh check")
+    parser.add_argument("--writes", type=int, default=200, help="Tree writes the service catches up with")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    tree = synthetic_tree(args.people, seed=args.seed)
+    links = tree.parent_links
+    held_back = links[-2000:]  # Applied incrementally after the bulk build
+
+    start = time.perf_counter()
+    index = KinshipIndex()
+    index.build(links[:-len(held_back)])
+    for first, second in tree.couples:
+        index.add_spouses(first, second)
+    index.sex = {i: p["sex"] for i, p in enumerate(tree.people)}
+    build = time.perf_counter() - start
+
+    update_times = []
+    for parent, child in held_back:
+        start = time.perf_counter()
+        index.add_parent(parent, child)
+        update_times.append((time.perf_counter() - start) * 1e6)
+
+    entries = sum(len(a) for a in index.ancestors.values())
+    print(f"Synthetic tree: {len(tree.people):,} people, {len(links):,} parent links")
+    print(f"  index build: {build:.2f}s, {entries:,} ancestor entries ({entries / len(tree.people):.1f} per person)")
+    print(f"  incremental link: p50 {statistics.median(update_times):.1f} µs, "
+          f"p95 {percentile(update_times, 0.95):.1f} µs")
+
+    pairs = related_pairs(index, len(tree.people), args.queries, rng)
+    pairs += [(rng.randrange(len(tree.people)), rng.randrange(len(tree.people))) for _ in range(args.queries // 4)]
+    names = defaultdict(int)
+    timings = []
+    for a, b in pairs:
+        start = time.perf_counter()
+        kinship = index.kinship(a, b)
+        timings.append((time.perf_counter() - start) * 1e6)
+        names[kinship.relationship or "unrelated"] += 1
+    print(f"Kinship queries ({len(pairs):,}, 80% related pairs):")
+    print(f"  index:     p50 {statistics.median(timings):7.1f} µs   p95 {percentile(timings, 0.95):7.1f} µs   "
+          f"p99 {percentile(timings, 0.99):7.1f} µs")
+
+    parents: Dict[int, List[int]] = defaultdict(list)
+    for parent, child in links:
+        parents[child].append(parent)
+    baseline = []
+    for a, b in pairs[:2000]:
+        start = time.perf_counter()
+        ancestors_a, ancestors_b = bfs_ancestors(parents, a), bfs_ancestors(parents, b)
+        [c for c in ancestors_a if c in ancestors_b]
+        baseline.append((time.perf_counter() - start) * 1e6)
+    print(f"  BFS walk:  p50 {statistics.median(baseline):7.1f} µs   p95 {percentile(baseline, 0.95):7.1f} µs "
+          f"(common ancestors only, no naming)")
+
+    print("Most frequent answers:")
+    for name, count in sorted(names.items(), key=lambda item: -item[1])[:8]:
+        print(f"  {count:>6}  {name}")
+
+    service_refresh(args.service_people, args.writes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
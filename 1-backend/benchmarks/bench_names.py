@@ -0,0 +1,123 @@
+"""
+Name search benchmark
+Builds the in-memory phonetic/trigram name index over synthetic people with
+a long-tailed surname distribution and spelling drift, then times exact,
+misspelled and as-you-type queries, plus how fast the service catches up
+with a tree write
+"""
+
+import argparse
+import os
+import random
+import resource
+import statistics
+import tempfile
+import time
+from typing import List
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel, Session, create_engine
+
+from benchmarks.synthetic import synthetic_names, drift
+from db.models import Person
+from families.names import NameIndex, NameSearchService
+from families.tree import FamilyTreeService, bump_tree_version
+
+FAMILY = "bench"
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def timed(label: str, index: NameIndex, sessions: List[List[str]], prefix: bool = True):
+    """Time queries with the word match cache cleared before each session (one query, or one name typed out)"""
+    timings, hits = [], 0
+    for session in sessions:
+        index.clear_caches()
+        for query in session:
+            start = time.perf_counter()
+            found = index.search(query, limit=20, prefix=prefix)
+            timings.append((time.perf_counter() - start) * 1000)
+            hits += bool(found)
+    print(f"  {label:<34} p50 {statistics.median(timings):6.2f} ms   p95 {percentile(timings, 0.95):6.2f} ms   "
+          f"p99 {percentile(timings, 0.99):6.2f} ms   ({hits}/{len(timings)} with results)")
+
+
+def service_refresh(names, writes: int, rng: random.Random):
+    """Time the service catching up with each tree write (through NameIndex.add), then look the person up"""
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_names.db')}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.execute(insert(Person.__table__), [{"family_name": FAMILY, "given_name": given, "surname": surname}
+                                                   for given, surname in names])
+        bump_tree_version(session, FAMILY)
+        session.commit()
+
+    service, tree_service = NameSearchService(engine), FamilyTreeService(engine)
+    start = time.perf_counter()
+    index = service.index(FAMILY)
+    load = time.perf_counter() - start
+    timings, found = [], 0
+    for i in range(writes):
+        given, surname = names[rng.randrange(len(names))]
+        person = tree_service.add_person(FAMILY, given_name=given, surname=f"{surname}ova{i}")
+        start = time.perf_counter()
+        service.index(FAMILY)
+        timings.append((time.perf_counter() - start) * 1000)
+        results = service.search(FAMILY, f"{given} {surname}ova{i}", limit=5)
+        found += any(result["id"] == person.id for result in results)
+    print(f"Service ({len(names):,} people in SQLite, load {load:.1f}s): catching up with a write "
+          f"p50 {statistics.median(timings):.2f} ms, p95 {percentile(timings, 0.95):.2f} ms, "
+          f"{found}/{writes} new people found, "
+          f"{'incremental' if service.index(FAMILY) is index else 'REBUILT'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark name search on synthetic people")
+    parser.add_argument("--people", type=int, default=1_000_000, help="Synthetic people to index")
+    parser.add_argument("--surnames", type=int, default=10_000, help="Distinct base surnames")
+    parser.add_argument("--queries", type=int, default=1000, help="Queries per kind")
+    parser.add_argument("--service-people", type=int, default=100_000, help="People for the service write check")
+    parser.add_argument("--writes", type=int, default=200, help="Tree writes in the service check")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    names = synthetic_names(args.people, seed=args.seed, surnames=args.surnames)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    index = NameIndex()
+    index.build((i + 1, given, surname) for i, (given, surname) in enumerate(names))
+    build = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"Indexed {len(index):,} people: {len(index.surnames):,} distinct surnames, "
+          f"{len(index.given):,} given names")
+    print(f"  build {build:.2f}s, peak RSS +{(peak - baseline) / 1024:.0f} MB, "
+          f"{sum(map(len, index.surnames.codes.values())):,} surname code postings, "
+          f"{len(index.surnames.grams):,} surname trigrams")
+
+    sample = [names[rng.randrange(len(names))] for _ in range(args.queries)]
+    print(f"Queries ({args.queries:,} each, top 20):")
+    timed("surname", index, [[surname] for _, surname in sample], prefix=False)
+    timed("given + surname", index, [[f"{given} {surname}"] for given, surname in sample], prefix=False)
+    timed("misspelled surname", index, [[drift(surname, rng)] for _, surname in sample], prefix=False)
+    timed("given + misspelled surname", index,
+          [[f"{given} {drift(surname, rng)}"] for given, surname in sample], prefix=False)
+    timed("as-you-type surname", index,
+          [[surname[:length] for length in range(1, len(surname) + 1)] for _, surname in sample])
+    timed("as-you-type given + surname", index,
+          [[f"{given} {surname[:length]}" for length in range(1, len(surname) + 1)] for given, surname in sample])
+
+    for query in ("Klingenburg", "Mary Herman", "Marry Klingenberg", "Schmit", "Hoffman", "kli"):
+        found = index.search(query, limit=3)
+        shown = ", ".join(f"{names[m.person_id - 1][0]} {names[m.person_id - 1][1]} "
+                          f"({m.score:.2f} {'/'.join(m.matched)})" for m in found)
+        print(f"  {query!r}: {shown}")
+
+    service_refresh(names[:args.service_people], args.writes, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Place and timeline index benchmark
+Loads synthetic events (exact, partial, approximate and FROM/TO dates at
+places clustered around real towns) into a scratch SQLite database, indexes
+them, then times map (bounding box) and timeline (time window) queries
+against the same queries run as full scans
+"""
+
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date
+from typing import Callable, List
+
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel, Session
+
+from db.models import Place  # noqa: F401 - registers the tables
+from families.places import PlaceIndexService
+
+FAMILY = "bull"
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+TOWNS = [("Minneapolis, Hennepin, Minnesota, USA", 44.98, -93.27), ("St Paul, Ramsey, Minnesota, USA", 44.95, -93.09),
+         ("Chicago, Cook, Illinois, USA", 41.88, -87.63), ("Milwaukee, Wisconsin, USA", 43.04, -87.91),
+         ("Fargo, North Dakota, USA", 46.88, -96.79), ("Hamburg, Germany", 53.55, 9.99),
+         ("Oslo, Norway", 59.91, 10.75), ("Bergen, Norway", 60.39, 5.32), ("Posen, Prussia", 52.41, 16.93)]
+
+
+def synthetic_places(count: int, rng: random.Random):
+    """(name, latitude, longitude) for townships scattered around the towns"""
+    places = []
+    for i in range(count):
+        town, latitude, longitude = TOWNS[i % len(TOWNS)]
+        places.append((f"Township {i}, {town}", latitude + rng.uniform(-1.5, 1.5), longitude + rng.uniform(-1.5, 1.5)))
+    return places
+
+
+def synthetic_events(count: int, places: int, rng: random.Random):
+    """(person_id, event_type, date, place) rows, about six per person, with Zipf-like place popularity"""
+    weights = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(places)))
+    events = []
+    person = 0
+    while len(events) < count:
+        person += 1
+        birth = rng.randint(1700, 1990)
+        lived = rng.randint(1, 95)
+        dated = [("birth", f"{rng.randint(1, 28)} {rng.choice(MONTHS)} {birth}"),
+                 ("baptism", f"{rng.choice(MONTHS)} {birth}"),
+                 ("census", f"{birth + rng.randint(0, lived)}")]
+        moved = birth + rng.randint(0, max(0, lived - 1))
+        for _ in range(rng.randint(1, 3)):
+            until = moved + rng.randint(1, 40)
+            dated.append(("residence", f"FROM {moved} TO {until}" if rng.random() < 0.7
+                          else f"BET {moved} AND {until}"))
+            moved = until
+        dated.append(("death", f"ABT {birth + lived}" if rng.random() < 0.4 else f"{birth + lived}"))
+        if rng.random() < 0.05:
+            dated.append(("event", None))
+        for event_type, when in dated:
+            events.append((person, event_type, when, rng.choices(range(places), cum_weights=weights)[0]))
+    return person, events[:count]
+
+
+def percentile(values: List[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def timed(label: str, run: Callable, cases: list, scan: Callable = None, scans: int = 5):
+    """Time a query over cases; optionally time the first few as full scans for comparison"""
+    timings, found = [], 0
+    for case in cases:
+        start = time.perf_counter()
+        found += len(run(*case))
+        timings.append((time.perf_counter() - start) * 1000)
+    line = (f"  {label:<36} p50 {statistics.median(timings):7.2f} ms   p95 {percentile(timings, 0.95):7.2f} ms"
+            f"   avg {found / len(cases):6.1f} rows")
+    if scan:
+        scanned = []
+        for case in cases[:scans]:
+            start = time.perf_counter()
+            scan(*case)
+            scanned.append((time.perf_counter() - start) * 1000)
+        line += f"   scan p50 {statistics.median(scanned):8.1f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the place R*Tree and event interval index")
+    parser.add_argument("--events", type=int, default=1_000_000, help="Synthetic events to index")
+    parser.add_argument("--places", type=int, default=5000, help="Distinct places")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per kind")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    directory = tempfile.mkdtemp(prefix="bench_places_")
+    path = os.path.join(directory, "places.db")
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    places = synthetic_places(args.places, rng)
+    people, events = synthetic_events(args.events, args.places, rng)
+    with sqlite3.connect(path) as connection:
+        connection.executemany("INSERT INTO people (id, family_name, given_name, surname, sex, created_at) "
+                               "VALUES (?, ?, 'Person', ?, 'U', '2024-01-01')",
+                               ((i, FAMILY, f"No{i}") for i in range(1, people + 1)))
+        connection.executemany("INSERT INTO events (family_name, person_id, event_type, date, place) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               ((FAMILY, person, kind, date, places[place][0])
+                                for person, kind, date, place in events))
+    print(f"{len(events):,} events for {people:,} people at {len(places):,} places, "
+          f"loaded in {time.perf_counter() - start:.1f}s")
+
+    index = PlaceIndexService(engine)
+    start = time.perf_counter()
+    indexed = index.sync(FAMILY)
+    elapsed = time.perf_counter() - start
+    print(f"  indexed {indexed:,} events in {elapsed:.1f}s ({indexed / elapsed:,.0f} events/s)")
+    start = time.perf_counter()
+    index.record_coordinates(FAMILY, {name: (latitude, longitude) for name, latitude, longitude in places})
+    print(f"  geocoded {len(places):,} places into the R*Tree in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    index.sync(FAMILY)
+    print(f"  up-to-date check {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    def box(size: float):
+        _, latitude, longitude = rng.choice(TOWNS)
+        return latitude - size, longitude - size, latitude + size, longitude + size
+
+    def window(years: int):
+        first = rng.randint(1720, 1990 - years)
+        return first, first + years - 1
+
+    session = Session(engine)
+
+    def days(first, last):
+        return {"start_day": date(first, 1, 1).toordinal(), "end_day": date(last, 12, 31).toordinal()}
+
+    def scan_map(south, west, north, east, first=None, last=None):
+        """Same answer as PlaceIndexService.map, without the R*Tree or interval index"""
+        window_sql = "" if first is None else "AND s.start_day <= :end_day AND s.end_day >= :start_day"
+        return session.execute(text(f"""
+            SELECT p.id, COUNT(*), COUNT(DISTINCT s.person_id) FROM event_spans s NOT INDEXED
+            JOIN places p NOT INDEXED ON p.id = s.place_id
+            WHERE s.family_name = :family AND p.latitude BETWEEN :south AND :north
+              AND p.longitude BETWEEN :west AND :east {window_sql}
+            GROUP BY p.id
+        """), {"family": FAMILY, "south": south, "north": north, "west": west, "east": east,
+               **(days(first, last) if first else {})}).all()
+
+    def scan_timeline(first, last, bbox=None):
+        params = {"family": FAMILY, **days(first, last)}
+        places_sql = ""
+        if bbox:
+            places_sql = ("AND s.place_id IN (SELECT id FROM places NOT INDEXED WHERE latitude BETWEEN :south "
+                          "AND :north AND longitude BETWEEN :west AND :east)")
+            params.update(dict(zip(("south", "west", "north", "east"), bbox)))
+        return session.execute(text(f"""
+            SELECT s.event_id FROM event_spans s NOT INDEXED
+            WHERE s.family_name = :family AND s.start_day <= :end_day AND s.end_day >= :start_day {places_sql}
+            ORDER BY s.start_day, s.event_id LIMIT 100
+        """), params).all()
+
+    n = args.queries
+    print(f"Queries ({n} each; scan = same query without the indexes):")
+    timed("map: town (0.5°), all years", lambda *b: index.map(FAMILY, *b),
+          [box(0.25) for _ in range(n)], scan_map)
+    timed("map: town (0.5°), 30 years", lambda *c: index.map(FAMILY, *c[:4], *c[4:]),
+          [box(0.25) + window(30) for _ in range(n)], scan_map)
+    timed("map: region (6°), 30 years", lambda *c: index.map(FAMILY, *c[:4], *c[4:]),
+          [box(3) + window(30) for _ in range(n)], scan_map)
+    timed("timeline: 1 year, first 100", lambda *w: index.timeline(FAMILY, *w),
+          [window(1) for _ in range(n)], scan_timeline)
+    timed("timeline: 30 years, first 100", lambda *w: index.timeline(FAMILY, *w),
+          [window(30) for _ in range(n)], scan_timeline)
+    timed("timeline: town (0.5°) + 30 years", lambda first, last, bbox: index.timeline(FAMILY, first, last, bbox),
+          [window(30) + (box(0.25),) for _ in range(n)], scan_timeline)
+
+    cases = [window(30) for _ in range(n)]
+    pages = []
+    for first, last in cases:
+        page = index.timeline(FAMILY, first, last)
+        start = time.perf_counter()
+        index.timeline(FAMILY, first, last, after_day=page[-1]["start_day"], after_id=page[-1]["event_id"])
+        pages.append((time.perf_counter() - start) * 1000)
+    print(f"  {'timeline: 30 years, second page':<36} p50 {statistics.median(pages):7.2f} ms   "
+          f"p95 {percentile(pages, 0.95):7.2f} ms")
+    session.close()
+    engine.dispose()
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
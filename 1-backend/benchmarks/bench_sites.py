@@ -0,0 +1,157 @@
+"""
+Family site serving benchmark
+Starts the API under uvicorn with a scratch database, then drives
+/families/{family}/{path} over keep-alive connections and reports requests
+per second for full (uncached) responses, conditional revalidations that end
+in 304 (cached), precompressed pages, byte ranges of a large scan, requests
+rejected at the cookie check and the nginx auth_request endpoint
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+FAMILY = "bull"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def fetch(reader, writer, request: bytes) -> Tuple[int, Dict[str, str], int]:
+    """Send one request on an open connection and read the whole response"""
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length:
+        await reader.readexactly(length)
+    return status, headers, length
+
+
+async def drive(port: int, request: bytes, connections: int, seconds: float) -> Tuple[float, int, int]:
+    """Send the same request on every connection for a while; returns (req/s, status, body bytes)"""
+    done = 0
+    last = (0, 0)
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal done, last
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while time.perf_counter() < deadline:
+            status, _, length = await fetch(reader, writer, request)
+            last = (status, length)
+            done += 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    return done / (time.perf_counter() - start), *last
+
+
+def build_request(path: str, headers: Dict[str, str]) -> bytes:
+    lines = [f"GET {path} HTTP/1.1", "Host: localhost"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def run(port: int, token: str, connections: int, seconds: float, paths: List[str]):
+    cookie = {"Cookie": f"authorization={token}"}
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    etags = {}
+    for path in paths:
+        for encoding in ("identity", "br, gzip"):
+            _, headers, _ = await fetch(reader, writer, build_request(path, {**cookie, "Accept-Encoding": encoding}))
+            etags[path, encoding] = headers.get("etag")
+    writer.close()
+
+    page, scan = paths
+    cases = [
+        ("page, identity (200)", page, {"Accept-Encoding": "identity"}),
+        ("page, brotli (200)", page, {"Accept-Encoding": "br, gzip"}),
+        ("page, revalidated (304)", page, {"Accept-Encoding": "br, gzip", "If-None-Match": etags[page, "br, gzip"]}),
+        ("scan (200)", scan, {"Accept-Encoding": "identity"}),
+        ("scan, 64 KB range (206)", scan, {"Range": "bytes=65536-131071"}),
+        ("scan, revalidated (304)", scan, {"If-None-Match": etags[scan, "identity"]}),
+    ]
+    print(f"{connections} keep-alive connections, {seconds:.0f}s per case:")
+    for label, path, headers in cases:
+        rate, status, length = await drive(port, build_request(path, {**cookie, **headers}), connections, seconds)
+        print(f"  {label:<28} {rate:8,.0f} req/s   status {status}   {length:>7,} bytes/response")
+    rate, status, _ = await drive(port, build_request(page, {}), connections, seconds)
+    print(f"  {'no cookie (401)':<28} {rate:8,.0f} req/s   status {status}")
+    rate, status, _ = await drive(port, build_request("/auth/site", {**cookie, "X-Original-URI": scan}),
+                                  connections, seconds)
+    print(f"  {'nginx auth_request (204)':<28} {rate:8,.0f} req/s   status {status}")
+
+
+def time_verdicts(token: str, rounds: int = 20000):
+    """In-process cost of the membership decision, cached and uncached"""
+    from auth.google import get_google_auth
+    from auth.verdicts import FamilyAccessVerdicts
+    verdicts = FamilyAccessVerdicts()
+    start = time.perf_counter()
+    for _ in range(rounds // 10):
+        get_google_auth().verify_jwt_token(token)
+    verify = (time.perf_counter() - start) / (rounds // 10) * 1e6
+    verdicts.check(token, FAMILY)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        verdicts.check(token, FAMILY)
+    cached = (time.perf_counter() - start) / rounds * 1e6
+    print(f"Membership decision in-process: JWT verify {verify:.1f} us, cached verdict {cached:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark auth-gated family site serving")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--page", default=f"/families/{FAMILY}/annie.html")
+    parser.add_argument("--scan", default=f"/families/{FAMILY}/images/page_101_img_1.png")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_sites_")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{Path(directory) / 'sites.db'}",
+           "JWT_SECRET": os.getenv("JWT_SECRET", "bench-secret"),
+           "GOOGLE_CLIENT_ID": os.getenv("GOOGLE_CLIENT_ID", "bench"),
+           "GOOGLE_CLIENT_SECRET": os.getenv("GOOGLE_CLIENT_SECRET", "bench")}
+    os.environ.update(env)
+    from auth.google import GoogleAuthService
+    token = GoogleAuthService().create_jwt_token(1, "bench@example.com", [FAMILY])
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                               "--log-level", "warning", "--no-access-log"], env=env)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        asyncio.run(run(port, token, args.connections, args.seconds, [args.page, args.scan]))
+        time_verdicts(token)
+    finally:
+        server.terminate()
+        server.wait()
+        for leftover in Path(directory).iterdir():
+            leftover.unlink()
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Story search benchmark
+Writes a synthetic family site (pages built from a Zipf-like vocabulary plus
+family names and places) to a scratch directory, indexes it into a scratch
+SQLite database, then times a no-change resync, a resync with 1% of pages
+edited, and searches against the same searches run as LIKE scans
+"""
+
+import argparse
+import itertools
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel, Session
+
+from db.models import Story  # noqa: F401 - registers the tables
+from families.stories import StorySearchService
+
+FAMILY = "bull"
+NAMES = ["Gladys", "Klingenberg", "Herrman", "Bertha", "Annie", "Elmira", "Bryant", "Ole", "Ingrid", "Johanna"]
+PLACES = ["Minneapolis", "Chicago", "Bergen", "Hamburg", "Fargo", "Milwaukee", "Oslo", "Posen"]
+PAGE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="UTF-8"><title>{title} - Life Story Wiki</title></head>
+<body><div class="header"><h1>Life Story Wiki</h1></div>
+<div class="content"><h1>{title}</h1>
+{paragraphs}
+</div></body></html>
+"""
+
+
+def synthetic_words(count: int, rng: random.Random):
+    """A vocabulary of made-up words with Zipf-like cumulative weights"""
+    vocabulary = set()
+    while len(vocabulary) < count:
+        vocabulary.add("".join(rng.choice("bcdfghklmnprstvw") + rng.choice("aeiou")
+                               for _ in range(rng.randint(2, 4))))
+    vocabulary = sorted(vocabulary)
+    return vocabulary, list(itertools.accumulate(1 / (rank + 1) for rank in range(count)))
+
+
+def synthetic_page(number: int, rng: random.Random, vocabulary, weights) -> str:
+    title = f"{rng.choice(NAMES)} {rng.choice(NAMES)} in {rng.choice(PLACES)} ({number})"
+    paragraphs = []
+    for _ in range(rng.randint(2, 8)):
+        words = rng.choices(vocabulary, cum_weights=weights, k=rng.randint(30, 120))
+        for _ in range(rng.randint(0, 3)):
+            words[rng.randrange(len(words))] = rng.choice(NAMES + PLACES)
+        paragraphs.append("<p>" + " ".join(words).capitalize() + ".</p>")
+    return PAGE.format(title=title, paragraphs="\n".join(paragraphs))
+
+
+def percentile(values, share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FTS5 story search")
+    parser.add_argument("--pages", type=int, default=20_000, help="Synthetic site pages")
+    parser.add_argument("--vocabulary", type=int, default=30_000, help="Distinct words")
+    parser.add_argument("--queries", type=int, default=200, help="Searches per kind")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    directory = Path(tempfile.mkdtemp(prefix="bench_stories_"))
+    site_dir = directory / FAMILY
+    site_dir.mkdir()
+    start = time.perf_counter()
+    vocabulary, weights = synthetic_words(args.vocabulary, rng)
+    for number in range(args.pages):
+        (site_dir / f"page_{number}.html").write_text(synthetic_page(number, rng, vocabulary, weights),
+                                                      encoding="utf-8")
+    size = sum(p.stat().st_size for p in site_dir.iterdir())
+    print(f"{args.pages:,} pages ({size / 1e6:.0f} MB) written in {time.perf_counter() - start:.1f}s")
+
+    engine = create_engine(f"sqlite:///{directory / 'stories.db'}")
+    SQLModel.metadata.create_all(engine)
+    search = StorySearchService(engine, root=directory)
+    start = time.perf_counter()
+    search.sync_site(FAMILY)
+    elapsed = time.perf_counter() - start
+    print(f"  indexed in {elapsed:.1f}s ({args.pages / elapsed:,.0f} pages/s)")
+    start = time.perf_counter()
+    search.sync_site(FAMILY)
+    print(f"  resync, nothing changed: {time.perf_counter() - start:.2f}s (hashing only)")
+    for number in rng.sample(range(args.pages), args.pages // 100):
+        (site_dir / f"page_{number}.html").write_text(synthetic_page(number, rng, vocabulary, weights),
+                                                      encoding="utf-8")
+    start = time.perf_counter()
+    counts = search.sync_site(FAMILY)
+    print(f"  resync, {counts['updated']:,} pages edited: {time.perf_counter() - start:.2f}s")
+
+    session = Session(engine)
+
+    def scan(query: str):
+        """Substring scan for the same words; ranking needs every match, so nothing stops it early"""
+        clauses = " AND ".join(f"(title || ' ' || body) LIKE :w{i}" for i in range(len(query.split())))
+        return session.execute(text(f"SELECT id FROM stories WHERE family_name = :family AND {clauses}"),
+                               {"family": FAMILY, **{f"w{i}": f"%{w.rstrip('*')}%"
+                                                     for i, w in enumerate(query.split())}}).all()
+
+    rare = vocabulary[len(vocabulary) // 2:]
+    kinds = [
+        ("common word", lambda: rng.choice(vocabulary[:50])),
+        ("rare word", lambda: rng.choice(rare)),
+        ("name + place", lambda: f"{rng.choice(NAMES)} {rng.choice(PLACES)}"),
+        ("two words + prefix", lambda: f"{rng.choice(vocabulary[:500])} {rng.choice(NAMES)} "
+                                       f"{rng.choice(vocabulary[:2000])[:3]}*"),
+    ]
+    print(f"Searches ({args.queries} each, top 20 with snippets; scan = LIKE over every title and body):")
+    for label, make in kinds:
+        queries = [make() for _ in range(args.queries)]
+        timings, found = [], 0
+        for query in queries:
+            start = time.perf_counter()
+            found += len(search.search([FAMILY], query))
+            timings.append((time.perf_counter() - start) * 1000)
+        scanned = []
+        for query in queries[:5]:
+            start = time.perf_counter()
+            scan(query)
+            scanned.append((time.perf_counter() - start) * 1000)
+        print(f"  {label:<20} p50 {statistics.median(timings):7.2f} ms   p95 {percentile(timings, 0.95):7.2f} ms"
+              f"   avg {found / len(queries):5.1f} hits   scan p50 {statistics.median(scanned):8.1f} ms")
+    session.close()
+    engine.dispose()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
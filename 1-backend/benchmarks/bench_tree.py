@@ -0,0 +1,129 @@
+"""
+Family tree closure benchmark
+Loads a synthetic tree with per-link closure maintenance, then times N-generation
+pedigree and descendant lookups against a generation-by-generation recursive walk
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, create_engine
+
+from benchmarks.synthetic import synthetic_tree
+from db.models import Person
+from families.tree import (FamilyTreeService, insert_person, link_parent, link_spouses,
+                           _PEDIGREE_SQL, _DESCENDANTS_SQL)
+
+FAMILY = "bench"
+BATCH_SIZE = 5000
+
+
+def walk(session: Session, person_id: int, generations: int, up: bool) -> Dict[int, int]:
+    """Baseline: one relationships query per generation"""
+    known, depth, frontier = {}, 0, [person_id]
+    source, target = ("related_id", "person_id") if up else ("person_id", "related_id")
+    while frontier and depth < generations:
+        depth += 1
+        rows = session.execute(text(
+            f"SELECT {target} FROM relationships WHERE kind = 'parent' AND {source} IN "
+            f"({','.join(str(i) for i in frontier)})"
+        )).all()
+        frontier = [row[0] for row in rows if row[0] not in known]
+        for pid in frontier:
+            known[pid] = depth
+    return known
+
+
+def timed(samples: List[int], call: Callable[[int], object]) -> List[float]:
+    """Per-call latency in milliseconds"""
+    timings = []
+    for pid in samples:
+        start = time.perf_counter()
+        call(pid)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: List[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"  {label:<38} p50 {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark closure-table pedigree/descendant queries")
+    parser.add_argument("--people", type=int, default=100_000, help="Synthetic tree size")
+    parser.add_argument("--samples", type=int, default=300, help="Queries per measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    tree = synthetic_tree(args.people, seed=args.seed)
+    db_path = os.path.join(tempfile.mkdtemp(), "bench_tree.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    service = FamilyTreeService(engine)
+
+    start = time.perf_counter()
+    ids = []
+    with Session(engine) as session:
+        for i, fields in enumerate(tree.people, 1):
+            ids.append(insert_person(session, Person(family_name=FAMILY, **fields)).id)
+            if i % BATCH_SIZE == 0:
+                session.commit()
+        session.commit()
+        load_people = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i, (parent, child) in enumerate(tree.parent_links, 1):
+            link_parent(session, FAMILY, ids[parent], ids[child])
+            if i % BATCH_SIZE == 0:
+                session.commit()
+        for first, second in tree.couples:
+            link_spouses(session, FAMILY, ids[first], ids[second])
+        session.commit()
+        load_links = time.perf_counter() - start
+        closure_rows = session.execute(text("SELECT COUNT(*) FROM ancestor_closure")).scalar()
+
+    start = time.perf_counter()
+    rebuilt_rows = service.rebuild_closure(FAMILY)
+    rebuild = time.perf_counter() - start
+
+    print(f"Synthetic tree: {len(tree.people):,} people, {len(tree.parent_links):,} parent links, "
+          f"{max(tree.generation) + 1} generations")
+    print(f"  people insert: {load_people:.1f}s, parent links with closure upkeep: {load_links:.1f}s "
+          f"({len(tree.parent_links) / load_links:,.0f} links/s)")
+    print(f"  closure rows: {closure_rows:,} ({closure_rows / len(tree.people):.1f} per person); "
+          f"full rebuild {rebuild:.1f}s, {'matches' if rebuilt_rows == closure_rows else 'MISMATCH'}")
+
+    rng = random.Random(args.seed)
+    last = max(tree.generation)
+    deep = [ids[i] for i, g in enumerate(tree.generation) if g >= last - 1]
+    early = [ids[i] for i, g in enumerate(tree.generation) if 2 <= g <= 4]
+    deep_sample = [rng.choice(deep) for _ in range(args.samples)]
+    early_sample = [rng.choice(early) for _ in range(args.samples)]
+
+    with Session(engine) as session:
+        for generations in (4, 8):
+            print(f"Pedigree, {generations} generations:")
+            report("closure lookup", timed(deep_sample, lambda pid: session.execute(
+                _PEDIGREE_SQL, {"person": pid, "generations": generations}).all()))
+            report("recursive walk", timed(deep_sample, lambda pid: walk(session, pid, generations, up=True)))
+        for generations in (3, 6):
+            print(f"Descendants, {generations} generations:")
+            report("closure lookup", timed(early_sample, lambda pid: session.execute(
+                _DESCENDANTS_SQL, {"person": pid, "generations": generations}).all()))
+            report("recursive walk", timed(early_sample, lambda pid: walk(session, pid, generations, up=False)))
+
+    print("End to end (service, people loaded):")
+    report("pedigree, 4 generations", timed(deep_sample, lambda pid: service.pedigree(FAMILY, pid, 4)))
+    report("descendants, 3 generations", timed(early_sample, lambda pid: service.descendants(FAMILY, pid, 3)))
+
+
+if __name__ == "__main__":
+    main()
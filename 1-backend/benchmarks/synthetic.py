@@ -0,0 +1,188 @@
+"""
+Synthetic family trees for backend benchmarks
+Descendancy trees grown from one founding couple, with married-in spouses
+and a configurable share of cousin marriages (pedigree collapse)
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+GIVEN_NAMES = {
+    "M": ["William", "John", "James", "George", "Charles", "Frank", "Joseph", "Henry", "Robert", "Edward",
+          "Thomas", "Walter", "Harry", "Willie", "Albert", "Arthur", "Fred", "Clarence", "Roy", "Louis"],
+    "F": ["Mary", "Anna", "Emma", "Elizabeth", "Minnie", "Margaret", "Ida", "Alice", "Bertha", "Sarah",
+          "Annie", "Clara", "Ella", "Florence", "Cora", "Martha", "Laura", "Nellie", "Grace", "Myrtle"],
+}
+SURNAMES = ["Bull", "North", "Klingenberg", "Herrman", "Smith", "Johnson", "Miller", "Schmidt", "Meyer",
+            "Wagner", "Becker", "Schulz", "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Schroeder",
+            "Neumann", "Schwarz", "Zimmermann", "Braun", "Krueger", "Hartmann", "Lange", "Werner"]
+
+SURNAME_STEMS = ["Kling", "Herr", "Schm", "Hoff", "Zimmer", "Hart", "Krue", "Neu", "Schwar", "Wag", "Beck",
+                 "Lind", "Berg", "Ols", "Niel", "Hans", "Pet", "Johan", "Ander", "Nord", "Sand", "Holm", "Rich",
+                 "Wolf", "Brau", "Lang", "Wern", "Koh", "Stein", "Fisch", "Web", "Schul", "Mey", "Bau", "Kraus",
+                 "Vogel", "Fried", "Gold", "Rosen", "Wein", "Eich", "Lieb", "Mos", "Kow", "Nowak", "Dvor", "Horv"]
+SURNAME_LINKS = ["", "en", "er", "el", "in", "a", "o", "ing", "s", "e"]
+SURNAME_ENDINGS = ["berg", "mann", "sen", "son", "stein", "feld", "baum", "thal", "witz", "ski", "ek", "ner",
+                   "er", "dorf", "hof", "rich", "ke", "el", "strom", "quist", "gren", "by", "ton", "ley", ""]
+# Spelling drift seen across records and transcriptions: (pattern, replacement)
+DRIFT = [("berg", "burg"), ("mann", "man"), ("sen", "son"), ("ck", "k"), ("ph", "f"), ("ie", "y"),
+         ("ei", "ie"), ("z", "s"), ("w", "v"), ("rr", "r"), ("ll", "l"), ("tt", "t"), ("sch", "sh"),
+         ("c", "k"), ("ae", "e"), ("oe", "o"), ("ue", "u"), ("th", "t"), ("i", "y"), ("ss", "s")]
+
+
+def drift(name: str, rng: random.Random) -> str:
+    """A plausible misspelling of a name (one drift rule, or a dropped/doubled letter)"""
+    lower = name.lower()
+    rules = [(a, b) for a, b in DRIFT if a in lower] + [(b, a) for a, b in DRIFT if b in lower and len(b) > 1]
+    if rules and rng.random() < 0.8:
+        old, new = rng.choice(rules)
+        at = lower.find(old)
+        changed = lower[:at] + new + lower[at + len(old):]
+    else:
+        at = rng.randrange(1, len(lower)) if len(lower) > 1 else 0
+        changed = lower[:at] + lower[at:at + 1] * rng.choice((0, 2)) + lower[at + 1:]
+    return changed.capitalize() if changed else name
+
+
+def synthetic_names(count: int, seed: int = 7, surnames: int = 10_000,
+                    drift_rate: float = 0.15) -> List[Tuple[str, str]]:
+    """
+    (given name, surname) pairs with a long-tailed surname distribution
+
+    Surnames are built from stems and endings, their frequencies Zipf-like;
+    drift_rate of people carry a misspelled variant of their given name or surname.
+    """
+    rng = random.Random(seed)
+    pool = sorted({stem + link + ending for stem in SURNAME_STEMS
+                   for link in SURNAME_LINKS for ending in SURNAME_ENDINGS} - set(SURNAMES))
+    rng.shuffle(pool)
+    pool = SURNAMES + pool[:surnames - len(SURNAMES)]
+    weights = [1 / (rank + 1) ** 0.9 for rank in range(len(pool))]
+    given = GIVEN_NAMES["M"] + GIVEN_NAMES["F"]
+    names = []
+    for surname in rng.choices(pool, weights, k=count):
+        first = rng.choice(given)
+        if rng.random() < drift_rate:
+            if rng.random() < 0.7:
+                surname = drift(surname, rng)
+            else:
+                first = drift(first, rng)
+        names.append((first, surname))
+    return names
+
+
+@dataclass
+class SyntheticTree:
+    """People as dicts in insertion order, parent links (parent, child) and couples, by list index"""
+    people: List[Dict] = field(default_factory=list)
+    parent_links: List[Tuple[int, int]] = field(default_factory=list)
+    couples: List[Tuple[int, int]] = field(default_factory=list)
+    generation: List[int] = field(default_factory=list)
+
+
+def synthetic_tree(count: int, seed: int = 7, cousin_rate: float = 0.02,
+                   first_year: int = 1700) -> SyntheticTree:
+    """
+    Grow a tree breadth-first until it holds `count` people
+
+    Args:
+        count: Number of people to generate
+        seed: Random seed (trees are reproducible)
+        cousin_rate: Share of marriages between two people already in the tree
+        first_year: Birth year of the founding couple
+    """
+    rng = random.Random(seed)
+    tree = SyntheticTree()
+
+    def add(sex: str, surname: str, generation: int) -> int:
+        birth = first_year + generation * 28 + rng.randint(-6, 6)
+        tree.people.append({
+            "given_name": rng.choice(GIVEN_NAMES[sex]),
+            "surname": surname,
+            "sex": sex,
+            "birth_year": birth,
+            "death_year": birth + rng.randint(1, 90),
+        })
+        tree.generation.append(generation)
+        return len(tree.people) - 1
+
+    founder = add("M", rng.choice(SURNAMES), 0)
+    couples = [(founder, add("F", rng.choice(SURNAMES), 0))]
+    tree.couples.extend(couples)
+    unmarried: Dict[int, List[int]] = {}  # generation -> in-tree people waiting to marry a cousin
+    father_of: Dict[int, int] = {}
+
+    while couples and len(tree.people) < count:
+        next_couples = []
+        for father, mother in couples:
+            generation = tree.generation[father] + 1
+            for _ in range(rng.choice((1, 2, 2, 3, 3, 4, 5))):
+                if len(tree.people) >= count:
+                    break
+                sex = rng.choice("MF")
+                child = add(sex, tree.people[father]["surname"], generation)
+                tree.parent_links.append((father, child))
+                tree.parent_links.append((mother, child))
+                father_of[child] = father
+                if rng.random() > 0.85:
+                    continue  # Never married
+
+                singles = unmarried.setdefault(generation, [])
+                cousins = [p for p in singles if tree.people[p]["sex"] != sex and father_of[p] != father]
+                if cousins:
+                    spouse = cousins[0]
+                    singles.remove(spouse)
+                elif rng.random() < cousin_rate:
+                    singles.append(child)  # Waits for a cousin of the same generation
+                    continue
+                elif len(tree.people) < count:
+                    spouse = add("F" if sex == "M" else "M", rng.choice(SURNAMES), generation)
+                else:
+                    continue
+                couple = (child, spouse) if sex == "M" else (spouse, child)
+                tree.couples.append(couple)
+                next_couples.append(couple)
+        couples = next_couples
+        rng.shuffle(couples)
+    return tree
+
+
+def write_gedcom(tree: SyntheticTree, path, version: str = "5.5.1"):
+    """Write a tree as a GEDCOM file, one INDI per person and one FAM per couple"""
+    months = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+    places = ["Minneapolis, Hennepin, Minnesota, USA", "St. Paul, Ramsey, Minnesota, USA",
+              "Hamburg, Germany", "Oslo, Norway", "Milwaukee, Wisconsin, USA", "Fargo, North Dakota, USA"]
+    family_of: Dict[Tuple[int, int], int] = {couple: i for i, couple in enumerate(tree.couples)}
+    children: Dict[int, List[int]] = {}
+    for i in range(0, len(tree.parent_links), 2):
+        (father, child), (mother, _) = tree.parent_links[i], tree.parent_links[i + 1]
+        children.setdefault(family_of.get((father, mother), -1), []).append(child)
+    spouse_in: Dict[int, List[int]] = {}
+    for i, couple in enumerate(tree.couples):
+        for person in couple:
+            spouse_in.setdefault(person, []).append(i)
+    child_in = {child: f for f, kids in children.items() for child in kids if f >= 0}
+
+    with open(path, "w", encoding="utf-8", newline="\n") as out:
+        out.write(f"0 HEAD\n1 GEDC\n2 VERS {version}\n")
+        if version.startswith("5"):
+            out.write("2 FORM LINEAGE-LINKED\n1 CHAR UTF-8\n")
+        for i, person in enumerate(tree.people):
+            rng = random.Random(i)
+            out.write(f"0 @I{i}@ INDI\n1 NAME {person['given_name']} /{person['surname']}/\n"
+                      f"1 SEX {person['sex']}\n"
+                      f"1 BIRT\n2 DATE {rng.randint(1, 28)} {rng.choice(months)} {person['birth_year']}\n"
+                      f"2 PLAC {rng.choice(places)}\n")
+            if person["death_year"] < 1990:
+                out.write(f"1 DEAT\n2 DATE ABT {person['death_year']}\n")
+            if i in child_in:
+                out.write(f"1 FAMC @F{child_in[i]}@\n")
+            for f in spouse_in.get(i, ()):
+                out.write(f"1 FAMS @F{f}@\n")
+        for i, (husband, wife) in enumerate(tree.couples):
+            year = max(tree.people[husband]["birth_year"], tree.people[wife]["birth_year"]) + 22
+            out.write(f"0 @F{i}@ FAM\n1 HUSB @I{husband}@\n1 WIFE @I{wife}@\n1 MARR\n2 DATE {year}\n")
+            for child in children.get(i, ()):
+                out.write(f"1 CHIL @I{child}@\n")
+        out.write("0 TRLR\n")
@@ -5,6 +5,7 @@ Database models for the Family Genealogy Platform
 from datetime import datetime, timezone
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship, create_engine, Session
+from sqlalchemy import DDL, Index, UniqueConstraint, event
 from pydantic import EmailStr
 import os
 
@@ -109,6 +110,224 @@ class AdminSession(SQLModel, table=True):
     is_active: bool = Field(default=True)
 
 
+class Person(SQLModel, table=True):
+    """A person in a family tree"""
+    __tablename__ = "people"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    family_name: str = Field(index=True)
+    given_name: str = Field(default="")
+    surname: str = Field(default="", index=True)
+    sex: str = Field(default="U")  # M, F, U
+    birth_year: Optional[int] = None  # Denormalized from events for listings and matching
+    death_year: Optional[int] = None
+    slug: Optional[str] = None  # Family site page, e.g. willie_bull
+    xref: Optional[str] = Field(default=None, index=True)  # Source record id, e.g. GEDCOM @I1@
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class FamilyRelationship(SQLModel, table=True):
+    """Parent/child or spouse link between two people"""
+    __tablename__ = "relationships"
+    __table_args__ = (
+        UniqueConstraint("person_id", "related_id", "kind", name="uq_relationship"),
+        Index("ix_relationships_related", "related_id", "kind"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    family_name: str = Field(index=True)
+    person_id: int = Field(foreign_key="people.id")  # Parent, or the lower spouse id
+    related_id: int = Field(foreign_key="people.id")  # Child, or the higher spouse id
+    kind: str = Field(default="parent")  # parent, spouse
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Event(SQLModel, table=True):
+    """Dated life event (birth, death, marriage, residence, ...)"""
+    __tablename__ = "events"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    family_name: str = Field(index=True)
+    person_id: int = Field(foreign_key="people.id", index=True)
+    event_type: str  # birth, death, marriage, residence, ...
+    date: Optional[str] = None  # As recorded, e.g. "ABT 1901"
+    year: Optional[int] = None
+    place: Optional[str] = None
+    description: Optional[str] = None
+
+
+class AncestorClosure(SQLModel, table=True):
+    """
+    Transitive closure of parent links: one row per ancestor path length
+    
+    Every person has a depth-0 row to itself. Pedigree collapse (cousin marriages)
+    yields several rows for the same pair at different depths.
+    """
+    __tablename__ = "ancestor_closure"
+    __table_args__ = (
+        # Covering (person, depth, other) indexes make N-generation lookups one range scan
+        Index("ix_closure_descendant", "descendant_id", "depth", "ancestor_id"),
+        Index("ix_closure_ancestor", "ancestor_id", "depth", "descendant_id"),
+    )
+    
+    ancestor_id: int = Field(foreign_key="people.id", primary_key=True)
+    descendant_id: int = Field(foreign_key="people.id", primary_key=True)
+    depth: int = Field(primary_key=True)
+    family_name: str = Field(index=True)
+
+
+class TreeVersion(SQLModel, table=True):
+    """
+    Change counter for one family's tree (people, relationships, events)
+    
+    Every write bumps it in the same transaction, so ETags and per-process
+    indexes can tell a changed tree apart even when a re-import reuses ids.
+    cleared_at only moves when rows are deleted: until then new rows have
+    higher ids, so an index can apply just those.
+    """
+    __tablename__ = "tree_versions"
+    
+    family_name: str = Field(primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    cleared_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class MergeSuggestion(SQLModel, table=True):
+    """Two people the duplicate finder thinks are the same, waiting for review"""
+    __tablename__ = "merge_suggestions"
+    __table_args__ = (
+        UniqueConstraint("person_id", "other_id", name="uq_merge_suggestion"),
+        Index("ix_merge_suggestions_review", "family_name", "status", "score"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    family_name: str
+    person_id: int = Field(foreign_key="people.id")  # Lower id of the pair
+    other_id: int = Field(foreign_key="people.id")
+    score: float  # Weighted similarity, 0..1
+    evidence: str = Field(default="{}")  # JSON: per-feature similarities behind the score
+    status: str = Field(default="pending")  # pending, merged, dismissed
+    reviewed_by: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    reviewed_at: Optional[datetime] = None
+
+
+class Place(SQLModel, table=True):
+    """A place as written in a family's events, geocoded when coordinates are known"""
+    __tablename__ = "places"
+    __table_args__ = (
+        UniqueConstraint("family_name", "key", name="uq_place_key"),
+        Index("ix_places_coordinates", "latitude", "longitude"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    family_name: str
+    name: str  # As first recorded, e.g. "Minneapolis, Hennepin, Minnesota, USA"
+    key: str  # Normalized name that events are matched on
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    source: Optional[str] = None  # gedcom, gazetteer, manual
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class EventSpan(SQLModel, table=True):
+    """
+    Date-interval index over events: the first and last day an event could fall on
+    
+    Spans are partitioned by length (span_class), so a time-window lookup is one
+    bounded range scan on start_day per class instead of a scan of every earlier event.
+    """
+    __tablename__ = "event_spans"
+    __table_args__ = (
+        # Both cover map and timeline queries, so neither reads the table
+        Index("ix_event_spans_window", "family_name", "span_class", "start_day", "end_day", "place_id", "person_id"),
+        Index("ix_event_spans_place", "place_id", "span_class", "start_day", "end_day", "person_id"),
+    )
+    
+    event_id: int = Field(foreign_key="events.id", primary_key=True)
+    family_name: str
+    person_id: int = Field(foreign_key="people.id")
+    place_id: Optional[int] = Field(default=None, foreign_key="places.id")
+    start_day: Optional[int] = None  # Proleptic Gregorian ordinal (date.toordinal())
+    end_day: Optional[int] = None
+    span_class: Optional[int] = None  # Index into families.places.SPAN_CLASSES; None when undated
+
+
+class Story(SQLModel, table=True):
+    """A family story indexed for full-text search: a site page or a structured story"""
+    __tablename__ = "stories"
+    __table_args__ = (
+        UniqueConstraint("family_name", "path", name="uq_story_path"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    family_name: str
+    path: str  # Site page relative to the family site (annie.html), or story/<id> for structured stories
+    title: str
+    body: str  # Plain text that is indexed and snippeted
+    source: str = Field(default="site")  # site, story
+    content_hash: str  # SHA-256 of the page bytes (or title and body); unchanged stories are not reindexed
+    indexed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SiteImage(SQLModel, table=True):
+    """An image in a family site with what galleries filter and sort on, read once at scan time"""
+    __tablename__ = "site_images"
+    __table_args__ = (
+        UniqueConstraint("family_name", "path", name="uq_site_image_path"),
+        # One index per sort order; each leads with the family so a page is one range scan
+        Index("ix_site_images_page", "family_name", "page", "image_index", "id"),
+        Index("ix_site_images_bytes", "family_name", "bytes", "id"),
+        Index("ix_site_images_pixels", "family_name", "pixels", "id"),
+        Index("ix_site_images_orientation", "family_name", "orientation", "page", "image_index", "id"),
+        Index("ix_site_images_sha256", "family_name", "sha256"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    family_name: str
+    path: str  # Relative to the family site (images/page_101_img_1.png)
+    page: int = 0  # Memoir page and image index from page_N_img_M names; 0 for other images
+    image_index: int = 0
+    width: int
+    height: int
+    pixels: int  # width * height
+    orientation: str  # landscape, portrait, square
+    bytes: int
+    mtime_ns: int  # With bytes, decides whether the file is read again on the next scan
+    sha256: str
+    color: str  # Dominant color as #rrggbb
+    scanned_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SiteImageLink(SQLModel, table=True):
+    """A site page that embeds or links to an image"""
+    __tablename__ = "site_image_links"
+    __table_args__ = (
+        Index("ix_site_image_links_page", "family_name", "page_path", "image_id"),
+    )
+    
+    image_id: int = Field(foreign_key="site_images.id", primary_key=True)
+    page_path: str = Field(primary_key=True)  # annie.html
+    family_name: str
+
+
+# Geocoded places are also kept as points in an R*Tree for bounding-box queries
+# (SQLite only; other databases use ix_places_coordinates)
+event.listen(Place.__table__, "after_create", DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS place_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+).execute_if(dialect="sqlite"))
+
+
+# Stories are searched through an FTS5 index that reads from the stories table; the family is
+# indexed too, so a search is filtered to the caller's families inside the index (SQLite only;
+# other databases fall back to substring matching)
+event.listen(Story.__table__, "after_create", DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS story_fts USING fts5(family_name, title, body, content='stories', "
+    "content_rowid='id', prefix='2 3', tokenize='porter unicode61 remove_diacritics 2')"
+).execute_if(dialect="sqlite"))
+
+
 # Database configuration
 def get_database_url() -> str:
     """Get database URL from environment or use default"""
@@ -0,0 +1,423 @@
+"""
+Duplicate-person detection for Family Genealogy Platform
+Record linkage for trees merged from several relatives' GEDCOMs: people are
+blocked by phonetic surname and birth decade, pairs inside a block are scored
+with a weighted similarity model across a process pool, and likely
+duplicates are written to merge_suggestions for review
+"""
+
+import argparse
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple, Iterable, Any
+from sqlalchemy import insert, text
+from sqlmodel import Session
+
+from db.models import MergeSuggestion, db_manager
+from families.phonetics import double_metaphone, normalize
+
+logger = logging.getLogger(__name__)
+
+# Feature weights of the similarity model (summing to 1); missing features drop out and the rest are renormalized
+WEIGHTS = {"surname": 0.2, "given": 0.25, "birth": 0.2, "death": 0.1, "place": 0.05, "family": 0.2}
+GIVEN_FLOOR = 0.7  # Given-name Jaro-Winkler at or below this counts as no agreement
+THRESHOLD = 0.85  # Pairs scoring at least this become suggestions
+MAX_BLOCK = 500  # Larger blocks are split again by given-name sound
+SERIAL_LIMIT = 20000  # Fewer pairs than this are scored in-process; pool start-up would dominate
+TASK_PAIRS = 50000  # Pairs per pool task
+
+# (id, given, surname, sex, birth year, death year, birth place words, relatives' given names, block keys)
+Record = Tuple[int, str, str, str, Optional[int], Optional[int], frozenset, frozenset, Tuple[str, ...]]
+
+
+@dataclass
+class DedupeStats:
+    """What a duplicate-detection run compared and found"""
+    people: int = 0
+    blocks: int = 0
+    largest_block: int = 0
+    pairs_compared: int = 0
+    suggestions: int = 0
+    elapsed: float = 0.0
+    score_seconds: float = 0.0
+    distribution: Dict[str, int] = field(default_factory=dict)  # Suggestions per score band
+
+    @property
+    def all_pairs(self) -> int:
+        return self.people * (self.people - 1) // 2
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "people": self.people,
+            "blocks": self.blocks,
+            "largest_block": self.largest_block,
+            "pairs_compared": self.pairs_compared,
+            "all_pairs": self.all_pairs,
+            "suggestions": self.suggestions,
+            "elapsed_seconds": round(self.elapsed, 2),
+            "score_seconds": round(self.score_seconds, 2),
+        }
+
+
+@lru_cache(maxsize=1 << 16)
+def jaro_winkler(a: str, b: str) -> float:
+    """Jaro-Winkler similarity of two strings (1.0 = identical)"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    window = max(0, max(len(a), len(b)) // 2 - 1)
+    taken = [False] * len(b)
+    matched_a = []
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not taken[j] and b[j] == ch:
+                taken[j] = True
+                matched_a.append(ch)
+                break
+    if not matched_a:
+        return 0.0
+    matched_b = [b[j] for j in range(len(b)) if taken[j]]
+    transpositions = sum(x != y for x, y in zip(matched_a, matched_b)) / 2
+    m = len(matched_a)
+    jaro = (m / len(a) + m / len(b) + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def year_similarity(a: Optional[int], b: Optional[int]) -> Optional[float]:
+    """1.0 for the same year, falling off over five years; None when either is unknown"""
+    if a is None or b is None:
+        return None
+    return {0: 1.0, 1: 0.85, 2: 0.6, 3: 0.4, 4: 0.25, 5: 0.1}.get(abs(a - b), 0.0)
+
+
+@lru_cache(maxsize=1 << 16)
+def given_similarity(a: str, b: str) -> float:
+    """
+    First given names; an initial ("J") agrees with any name it starts
+
+    Jaro-Winkler is rescaled so that siblings' distinct names (Mary/Martha,
+    0.83) count as mostly disagreeing rather than mostly agreeing.
+    """
+    if len(a) == 1 or len(b) == 1:
+        return 0.8 if a[:1] == b[:1] else 0.0
+    return max(0.0, (jaro_winkler(a, b) - GIVEN_FLOOR) / (1 - GIVEN_FLOOR))
+
+
+def set_similarity(a: frozenset, b: frozenset) -> Optional[float]:
+    """Overlap of two sets relative to the smaller (one relative's GEDCOM often lists fewer kin)"""
+    if not a or not b:
+        return None
+    return len(a & b) / min(len(a), len(b))
+
+
+def features(a: Record, b: Record) -> Dict[str, float]:
+    """Per-feature similarities of two people, for the features both records have"""
+    found = {"surname": jaro_winkler(a[2], b[2])}
+    if a[1] and b[1]:
+        found["given"] = given_similarity(a[1], b[1])
+    for name, value in (("birth", year_similarity(a[4], b[4])), ("death", year_similarity(a[5], b[5])),
+                        ("place", set_similarity(a[6], b[6])), ("family", set_similarity(a[7], b[7]))):
+        if value is not None:
+            found[name] = value
+    return found
+
+
+def compare(a: Record, b: Record, threshold: float = 0.0) -> float:
+    """
+    Weighted similarity of two people, 0..1 (0 when the recorded sexes conflict)
+
+    Names are scored first; when even perfect agreement on everything else
+    could not lift the pair to threshold, the rest is skipped.
+    """
+    if a[3] != b[3] and a[3] != "U" and b[3] != "U":
+        return 0.0
+    surname = jaro_winkler(a[2], b[2])
+    weighted, total = WEIGHTS["surname"] * surname, WEIGHTS["surname"]
+    if a[1] and b[1]:
+        given = given_similarity(a[1], b[1])
+        weighted += WEIGHTS["given"] * given
+        total += WEIGHTS["given"]
+    if total - weighted > 1 - threshold:  # Weights sum to 1
+        return 0.0
+    for name, value in (("birth", year_similarity(a[4], b[4])), ("death", year_similarity(a[5], b[5])),
+                        ("place", set_similarity(a[6], b[6])), ("family", set_similarity(a[7], b[7]))):
+        if value is not None:
+            weighted += WEIGHTS[name] * value
+            total += WEIGHTS[name]
+    return weighted / total
+
+
+def block_keys(given: str, surname: str, birth_year: Optional[int]) -> Tuple[str, ...]:
+    """
+    Blocks a person is compared in: each Double Metaphone code of the surname
+    with the birth decade and the decade shifted by five years, so births up
+    to four years apart always share a block (1899 and 1901 meet in 1895-1904)
+
+    Everyone is also in an undated block per surname code and given-name
+    initial ("KLNK:?M"), where people without a birth year meet everyone.
+    """
+    primary, alternate = double_metaphone(surname)
+    codes = {primary, alternate} - {""} or {surname[:4]}
+    decades = {f"{birth_year // 10}", f"{(birth_year + 5) // 10}+"} if birth_year is not None else set()
+    decades.add(f"?{given[:1]}")
+    return tuple(sorted(f"{code}:{decade}" for code in codes for decade in decades))
+
+
+def build_blocks(records: Iterable[Record]) -> Dict[str, List[Record]]:
+    """Group records by block key; members of oversized blocks are split again by given-name sound"""
+    records = list(records)
+    sizes = Counter(key for record in records for key in record[8])
+    oversized = {key for key, size in sizes.items() if size > MAX_BLOCK}
+    blocks: Dict[str, List[Record]] = defaultdict(list)
+    for record in records:
+        keys = record[8]
+        if oversized.intersection(keys):
+            sound = double_metaphone(record[1])[0][:2] or "?"
+            keys = tuple(sorted(f"{key}/{sound}" if key in oversized else key for key in keys))
+            record = record[:8] + (keys,)
+        for key in keys:
+            blocks[key].append(record)
+    for key, members in blocks.items():
+        if ":?" in key:
+            members.sort(key=lambda record: record[4] is not None)  # Undated people first
+    return blocks
+
+
+def score_blocks(blocks: List[Tuple[str, List[Record]]], threshold: float = THRESHOLD) -> Tuple[int, List[Tuple]]:
+    """
+    Score every pair inside each block (runs in pool workers)
+
+    A pair that shares several blocks is only scored in the one with the
+    smallest shared key, so no pair is compared twice. Undated blocks only
+    pair people with someone undated (the rest met by decade).
+
+    Returns:
+        (pairs compared, [(person_id, other_id, score, evidence)] at or above threshold)
+    """
+    compared, found = 0, []
+    for key, members in blocks:
+        undated = ":?" in key
+        for i, a in enumerate(members):
+            if undated and a[4] is not None:
+                break
+            earlier = set(a[8][:a[8].index(key)])  # Keys sort, so a pair sharing one of these belongs elsewhere
+            for b in members[i + 1:]:
+                if earlier and not earlier.isdisjoint(b[8]):
+                    continue
+                compared += 1
+                score = compare(a, b, threshold)
+                if score >= threshold:
+                    low, high = (a[0], b[0]) if a[0] < b[0] else (b[0], a[0])
+                    evidence = {name: round(value, 3) for name, value in features(a, b).items()}
+                    found.append((low, high, round(score, 4), evidence))
+    return compared, found
+
+
+def plan_tasks(blocks: Dict[str, List[Record]], task_pairs: int = TASK_PAIRS) -> List[List[Tuple[str, List[Record]]]]:
+    """Pack blocks into pool tasks of about task_pairs pairs each, largest blocks first"""
+    tasks, current, pairs = [], [], 0
+    for key, members in sorted(blocks.items(), key=lambda item: -len(item[1])):
+        if len(members) < 2:
+            continue
+        current.append((key, members))
+        pairs += len(members) * (len(members) - 1) // 2
+        if pairs >= task_pairs:
+            tasks.append(current)
+            current, pairs = [], 0
+    if current:
+        tasks.append(current)
+    return tasks
+
+
+def find_duplicates(records: List[Record], threshold: float = THRESHOLD,
+                    workers: Optional[int] = None) -> Tuple[DedupeStats, List[Tuple]]:
+    """
+    Block and score people already loaded as records
+
+    Args:
+        records: People as Record tuples (see load_records)
+        threshold: Minimum score for a suggestion
+        workers: Process pool size (defaults to CPU count); 1 scores in-process
+
+    Returns:
+        (stats, suggestions as (person_id, other_id, score, evidence), best first)
+    """
+    stats = DedupeStats(people=len(records))
+    blocks = build_blocks(records)
+    stats.blocks = len(blocks)
+    stats.largest_block = max(map(len, blocks.values()), default=0)
+    tasks = plan_tasks(blocks)
+    upper_bound = sum(len(m) * (len(m) - 1) // 2 for task in tasks for _, m in task)
+
+    start = time.perf_counter()
+    if workers == 1 or upper_bound < SERIAL_LIMIT:
+        results = [score_blocks(task, threshold) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(score_blocks, tasks, [threshold] * len(tasks)))
+    stats.score_seconds = time.perf_counter() - start
+
+    suggestions = []
+    for compared, found in results:
+        stats.pairs_compared += compared
+        suggestions.extend(found)
+    suggestions.sort(key=lambda s: -s[2])
+    stats.suggestions = len(suggestions)
+    return stats, suggestions
+
+
+class DuplicateFinder:
+    """Runs duplicate detection for one family and keeps its review table"""
+
+    def __init__(self, family_name: str, engine=None, threshold: float = THRESHOLD,
+                 workers: Optional[int] = None):
+        self.family_name = family_name
+        self._engine = engine
+        self.threshold = threshold
+        self.workers = workers
+
+    @property
+    def engine(self):
+        return self._engine or db_manager.engine
+
+    def load_records(self) -> List[Record]:
+        """People with their birth place and relatives' given names, as compact tuples"""
+        params = {"family": self.family_name}
+        with Session(self.engine) as session:
+            places = dict(session.execute(text(
+                "SELECT person_id, MIN(place) FROM events "
+                "WHERE family_name = :family AND event_type = 'birth' AND place IS NOT NULL "
+                "GROUP BY person_id"), params).all())
+            relatives: Dict[int, set] = defaultdict(set)
+            # Parents, children and spouses in both directions, by their first given name
+            for person_id, given in session.execute(text(
+                    "SELECT r.person_id, p.given_name FROM relationships r JOIN people p ON p.id = r.related_id "
+                    "WHERE r.family_name = :family "
+                    "UNION ALL "
+                    "SELECT r.related_id, p.given_name FROM relationships r JOIN people p ON p.id = r.person_id "
+                    "WHERE r.family_name = :family"), params):
+                words = (given or "").split()
+                if words:
+                    relatives[person_id].add(normalize(words[0]))
+            records = []
+            for person_id, given, surname, sex, birth, death in session.execute(text(
+                    "SELECT id, given_name, surname, sex, birth_year, death_year FROM people "
+                    "WHERE family_name = :family"), params):
+                given = normalize((given or "").split()[0]) if (given or "").split() else ""
+                surname = normalize(surname or "")
+                if not surname and not given:
+                    continue
+                place = frozenset(normalize(part) for part in (places.get(person_id) or "").replace(",", " ").split())
+                records.append((person_id, given, surname, sex or "U", birth, death, place - {""},
+                                frozenset(relatives.get(person_id, ())), block_keys(given, surname, birth)))
+        return records
+
+    def run(self) -> DedupeStats:
+        """
+        Find likely duplicates and refresh the family's pending suggestions
+
+        Pairs already merged or dismissed by a reviewer are not suggested again.
+        """
+        start = time.perf_counter()
+        records = self.load_records()
+        stats, suggestions = find_duplicates(records, self.threshold, self.workers)
+
+        params = {"family": self.family_name}
+        with Session(self.engine) as session:
+            session.execute(text(
+                "DELETE FROM merge_suggestions WHERE family_name = :family AND status = 'pending'"), params)
+            reviewed = set(session.execute(text(
+                "SELECT person_id, other_id FROM merge_suggestions WHERE family_name = :family"), params).all())
+            rows = [{"family_name": self.family_name, "person_id": low, "other_id": high, "score": score,
+                     "evidence": json.dumps(evidence, sort_keys=True), "status": "pending",
+                     "created_at": datetime.now(timezone.utc)}
+                    for low, high, score, evidence in suggestions if (low, high) not in reviewed]
+            for i in range(0, len(rows), 5000):
+                session.execute(insert(MergeSuggestion.__table__), rows[i:i + 5000])
+            session.commit()
+        stats.suggestions = len(rows)
+        bands = Counter(f"{int(s[2] * 20) / 20:.2f}" for s in suggestions)
+        stats.distribution = dict(sorted(bands.items(), reverse=True))
+        stats.elapsed = time.perf_counter() - start
+        logger.info(f"Duplicate detection for {self.family_name}: {stats.pairs_compared:,} pairs in "
+                    f"{stats.blocks:,} blocks, {stats.suggestions:,} suggestions, {stats.elapsed:.1f}s")
+        return stats
+
+
+def list_suggestions(family_name: str, status: str = "pending", limit: int = 50,
+                     after_score: Optional[float] = None, after_id: Optional[int] = None,
+                     engine=None) -> List[Dict[str, Any]]:
+    """
+    Suggestions for review, best first, with both people summarized
+
+    Pages by keyset: pass the last row's score and id to get the next page.
+    """
+    sql = ("SELECT s.id, s.score, s.evidence, s.status, "
+           "a.id, a.given_name, a.surname, a.sex, a.birth_year, a.death_year, "
+           "b.id, b.given_name, b.surname, b.sex, b.birth_year, b.death_year "
+           "FROM merge_suggestions s JOIN people a ON a.id = s.person_id JOIN people b ON b.id = s.other_id "
+           "WHERE s.family_name = :family AND s.status = :status ")
+    params = {"family": family_name, "status": status, "limit": limit}
+    if after_score is not None and after_id is not None:
+        sql += "AND (s.score < :score OR (s.score = :score AND s.id > :after)) "
+        params.update(score=after_score, after=after_id)
+    sql += "ORDER BY s.score DESC, s.id LIMIT :limit"
+
+    def person(row):
+        return dict(zip(("id", "given_name", "surname", "sex", "birth_year", "death_year"), row))
+
+    with Session(engine or db_manager.engine) as session:
+        return [{"id": row[0], "score": row[1], "evidence": json.loads(row[2]), "status": row[3],
+                 "person": person(row[4:10]), "other": person(row[10:16])}
+                for row in session.execute(text(sql), params)]
+
+
+def review_suggestion(family_name: str, suggestion_id: int, status: str, reviewer: str,
+                      engine=None) -> bool:
+    """Record a reviewer's decision (merged or dismissed); False when there is no such suggestion"""
+    if status not in ("merged", "dismissed", "pending"):
+        raise ValueError(f"Unknown review status: {status}")
+    with Session(engine or db_manager.engine) as session:
+        result = session.execute(text(
+            "UPDATE merge_suggestions SET status = :status, reviewed_by = :reviewer, reviewed_at = :now "
+            "WHERE id = :id AND family_name = :family"
+        ), {"status": status, "reviewer": reviewer, "now": datetime.now(timezone.utc),
+            "id": suggestion_id, "family": family_name})
+        session.commit()
+        return result.rowcount > 0
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Find likely duplicate people in a family tree")
+    parser.add_argument("--family", required=True, help="Family to check (e.g. bull)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Minimum score for a suggestion")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    db_manager.init_database()
+    stats = DuplicateFinder(args.family, threshold=args.threshold, workers=args.workers).run()
+    print(f"✓ {stats.people:,} people in {stats.blocks:,} blocks (largest {stats.largest_block:,}): "
+          f"{stats.pairs_compared:,} pairs compared of {stats.all_pairs:,} possible, "
+          f"{stats.suggestions:,} suggestions in {stats.elapsed:.1f}s")
+    for band, count in stats.distribution.items():
+        print(f"  score ≥ {band}: {count:,}")
+
+
+if __name__ == "__main__":
+    main()
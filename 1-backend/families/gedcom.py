@@ -0,0 +1,645 @@
+"""
+GEDCOM import and export for Family Genealogy Platform
+Streams GEDCOM 5.5.1 / 7.0 files record by record into the family tables with
+batched inserts. Family records are resolved in a second pass through an
+on-disk xref -> person id map, so memory is bounded by the batch size. An import
+(including the wipe for a replace) commits once, so a failure leaves the old tree.
+Exports merge ordered server-side cursors, so memory stays flat in both directions.
+"""
+
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from itertools import groupby
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Iterator, Callable, Any
+from sqlalchemy import DateTime, bindparam, insert, text
+from sqlmodel import Session
+
+from db.models import Person, Event, db_manager
+from families.tree import bump_tree_version, rebuild_closure
+from families.kinship import get_kinship_service
+from families.names import get_name_search
+from families.places import PlaceIndexService, get_place_index, parse_coordinate, valid_coordinates
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000  # Records per insert batch (and per id-map lookup)
+PROGRESS_EVERY = 10000  # Records between progress callbacks
+
+LINE_RE = re.compile(r"^\s*(\d+)\s+(?:(@[^@\s]+@)\s+)?(\S+)(?: (.*))?$")
+YEAR_RE = re.compile(r"\b(\d{3,4})\b")
+
+# GEDCOM event tags -> Event.event_type
+INDIVIDUAL_EVENTS = {
+    "BIRT": "birth", "CHR": "christening", "BAPM": "baptism", "DEAT": "death", "BURI": "burial",
+    "CREM": "cremation", "RESI": "residence", "OCCU": "occupation", "EDUC": "education",
+    "GRAD": "graduation", "EMIG": "emigration", "IMMI": "immigration", "NATU": "naturalization",
+    "CENS": "census", "RELI": "religion", "EVEN": "event",
+}
+FAMILY_EVENTS = {"MARR": "marriage", "DIV": "divorce", "ENGA": "engagement", "MARB": "marriage banns"}
+
+EXPORT_CHUNK_SIZE = 64 * 1024  # Characters per streamed chunk
+ATTRIBUTE_TAGS = {"OCCU", "EDUC", "RELI"}  # Description is the line value, not a TYPE
+EVENT_TAGS = {event_type: tag for tag, event_type in {**INDIVIDUAL_EVENTS, **FAMILY_EVENTS}.items()}
+
+_RELATIONSHIP_SQL = text("""
+    INSERT INTO relationships (family_name, person_id, related_id, kind, created_at)
+    VALUES (:family_name, :person_id, :related_id, :kind, :created_at)
+    ON CONFLICT DO NOTHING
+""").bindparams(bindparam("created_at", type_=DateTime()))
+
+
+@dataclass
+class GedcomNode:
+    """One GEDCOM line with its subordinate lines"""
+    tag: str
+    value: str = ""
+    xref: Optional[str] = None
+    children: List["GedcomNode"] = field(default_factory=list)
+
+    def first(self, tag: str) -> Optional["GedcomNode"]:
+        for child in self.children:
+            if child.tag == tag:
+                return child
+        return None
+
+    def value_of(self, tag: str, default: str = "") -> str:
+        node = self.first(tag)
+        return node.value if node else default
+
+
+@dataclass
+class ImportStats:
+    """Counters reported while and after importing"""
+    individuals: int = 0
+    families: int = 0
+    events: int = 0
+    relationships: int = 0
+    unresolved: int = 0  # Pointers to records missing from the file
+    closure_rows: int = 0
+    geocoded_places: int = 0  # Places given coordinates by PLAC.MAP
+    lines: int = 0
+    bytes_read: int = 0  # Across both passes
+    total_bytes: int = 0
+    phase: str = "individuals"
+    elapsed: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        return self.individuals + self.events + self.relationships
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.bytes_read / (2 * self.total_bytes) if self.total_bytes else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "individuals": self.individuals,
+            "families": self.families,
+            "events": self.events,
+            "relationships": self.relationships,
+            "unresolved_pointers": self.unresolved,
+            "closure_rows": self.closure_rows,
+            "geocoded_places": self.geocoded_places,
+            "seconds": round(self.elapsed, 2),
+            "rows_per_second": round(self.rows_per_second),
+        }
+
+
+def _decode(raw: bytes) -> str:
+    """UTF-8 (required by GEDCOM 7), falling back to Latin-1 for older ANSI exports"""
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def iter_records(path: Path, stats: ImportStats = None) -> Iterator[GedcomNode]:
+    """
+    Yield level-0 records one at a time
+
+    Only the current record is held in memory. CONT/CONC lines are folded
+    into their parent's value.
+    """
+    record: Optional[GedcomNode] = None
+    stack: List[GedcomNode] = []
+    with open(path, "rb") as f:
+        for raw in f:
+            if stats is not None:
+                stats.bytes_read += len(raw)
+                stats.lines += 1
+            match = LINE_RE.match(_decode(raw).lstrip("\ufeff").rstrip("\r\n"))
+            if not match:
+                continue
+            level, xref, tag, value = int(match.group(1)), match.group(2), match.group(3).upper(), match.group(4) or ""
+
+            if level == 0:
+                if record is not None:
+                    yield record
+                record = GedcomNode(tag=tag, value=value, xref=xref)
+                stack = [record]
+                continue
+            if record is None:
+                continue
+
+            del stack[level:]
+            if tag == "CONT":
+                stack[-1].value += "\n" + value
+                continue
+            if tag == "CONC":
+                stack[-1].value += value
+                continue
+            node = GedcomNode(tag=tag, value=value, xref=xref)
+            stack[-1].children.append(node)
+            stack.append(node)
+    if record is not None:
+        yield record
+
+
+def parse_year(date: str) -> Optional[int]:
+    """First 3-4 digit year in a GEDCOM date ("ABT 1901", "BET 1900 AND 1905")"""
+    match = YEAR_RE.search(date or "")
+    return int(match.group(1)) if match else None
+
+
+def parse_name(node: Optional[GedcomNode]) -> Tuple[str, str]:
+    """(given, surname) from NAME "Given /Surname/" or its GIVN/SURN parts"""
+    if node is None:
+        return "", ""
+    given, surname = node.value_of("GIVN"), node.value_of("SURN")
+    if not (given or surname):
+        parts = node.value.split("/")
+        given = parts[0]
+        surname = parts[1] if len(parts) > 1 else ""
+        if len(parts) > 2 and parts[2].strip():
+            given = f"{given.strip()} {parts[2].strip()}"
+    return " ".join(given.split()), " ".join(surname.split())
+
+
+def event_rows(node: GedcomNode, tags: Dict[str, str],
+               coordinates: Dict[str, Tuple[float, float]] = None) -> List[Dict[str, Any]]:
+    """
+    Event dicts (without person/family ids) for a record's event substructures
+
+    Places with PLAC.MAP LATI/LONG are added to coordinates (place name -> (lat, lon)) when given.
+    """
+    rows = []
+    for child in node.children:
+        event_type = tags.get(child.tag)
+        if not event_type:
+            continue
+        date = child.value_of("DATE") or None
+        place = child.first("PLAC")
+        position = place.first("MAP") if place is not None and coordinates is not None else None
+        if position is not None and place.value:
+            point = parse_coordinate(position.value_of("LATI")), parse_coordinate(position.value_of("LONG"))
+            if valid_coordinates(*point):
+                coordinates[place.value] = point
+        description = child.value_of("TYPE") or (child.value if child.value not in ("", "Y") else None)
+        rows.append({
+            "event_type": event_type,
+            "date": date,
+            "year": parse_year(date),
+            "place": child.value_of("PLAC") or None,
+            "description": description,
+        })
+    return rows
+
+
+def individual_row(node: GedcomNode, family_name: str, coordinates: Dict[str, Tuple[float, float]] = None
+                   ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Person row and its events from an INDI record"""
+    given, surname = parse_name(node.first("NAME"))
+    sex = node.value_of("SEX", "U")[:1].upper()
+    events = event_rows(node, INDIVIDUAL_EVENTS, coordinates)
+    years = {}
+    for event in events:
+        if event["year"] is not None:
+            years.setdefault(event["event_type"], event["year"])
+    return {
+        "family_name": family_name,
+        "given_name": given,
+        "surname": surname,
+        "sex": sex if sex in ("M", "F") else "U",
+        "birth_year": years.get("birth", years.get("christening", years.get("baptism"))),
+        "death_year": years.get("death", years.get("burial")),
+        "xref": node.xref,
+        "created_at": datetime.now(timezone.utc),
+    }, events
+
+
+class XrefMap:
+    """On-disk GEDCOM xref -> person id map (a throwaway SQLite file)"""
+
+    def __init__(self, directory: str = None):
+        handle, self.path = tempfile.mkstemp(suffix=".xref.db", dir=directory)
+        os.close(handle)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("CREATE TABLE xref (xref TEXT PRIMARY KEY, person_id INTEGER) WITHOUT ROWID")
+
+    def add(self, pairs: List[Tuple[str, int]]):
+        self.db.executemany("INSERT OR REPLACE INTO xref VALUES (?, ?)", pairs)
+        self.db.commit()
+
+    def resolve(self, xrefs: List[str]) -> Dict[str, int]:
+        """Batch lookup; xrefs missing from the map are left out"""
+        found = {}
+        unique = list(set(xrefs))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            found.update(self.db.execute(
+                f"SELECT xref, person_id FROM xref WHERE xref IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def close(self):
+        self.db.close()
+        os.unlink(self.path)
+
+
+class GedcomImporter:
+    """Two-pass streaming GEDCOM importer for one family"""
+
+    def __init__(self, family_name: str, engine=None, batch_size: int = BATCH_SIZE,
+                 progress: Callable[[ImportStats], None] = None):
+        self.family_name = family_name
+        self._engine = engine
+        self.batch_size = batch_size
+        self.progress = progress
+        self.stats = ImportStats()
+        self.coordinates: Dict[str, Tuple[float, float]] = {}  # PLAC.MAP positions seen so far
+        self._start = 0.0
+
+    @property
+    def engine(self):
+        return self._engine or db_manager.engine
+
+    def _report(self, count: int):
+        self.stats.elapsed = time.perf_counter() - self._start
+        if self.progress and count % PROGRESS_EVERY == 0:
+            self.progress(self.stats)
+
+    def _clear(self, session: Session):
+        """Delete the family's existing tree (caller commits)"""
+        params = {"family": self.family_name}
+        for table in ("merge_suggestions", "event_spans", "ancestor_closure", "events", "relationships", "people"):
+            session.execute(text(f"DELETE FROM {table} WHERE family_name = :family"), params)
+        bump_tree_version(session, self.family_name, cleared=True)
+
+    def clear_family(self):
+        """Delete the family's existing tree"""
+        with Session(self.engine) as session:
+            self._clear(session)
+            session.commit()
+
+    def _insert_individuals(self, session: Session, batch: List[Tuple[Dict, List[Dict]]], xrefs: XrefMap):
+        ids = session.execute(
+            insert(Person.__table__).returning(Person.__table__.c.id, sort_by_parameter_order=True),
+            [person for person, _ in batch]
+        ).scalars().all()
+        events = [{**event, "family_name": self.family_name, "person_id": person_id}
+                  for person_id, (_, person_events) in zip(ids, batch) for event in person_events]
+        if events:
+            session.execute(insert(Event.__table__), events)
+        xrefs.add([(person["xref"], person_id) for person_id, (person, _) in zip(ids, batch) if person["xref"]])
+        self.stats.individuals += len(ids)
+        self.stats.events += len(events)
+
+    def _insert_families(self, session: Session, batch: List[GedcomNode], xrefs: XrefMap):
+        pointers = [child.value for record in batch for child in record.children
+                    if child.tag in ("HUSB", "WIFE", "CHIL")]
+        ids = xrefs.resolve(pointers)
+        self.stats.unresolved += sum(1 for p in pointers if p not in ids and p != "@VOID@")
+
+        now = datetime.now(timezone.utc)
+        relationships, events = [], []
+        for record in batch:
+            parents = [ids[record.value_of(tag)] for tag in ("HUSB", "WIFE") if record.value_of(tag) in ids]
+            children = [ids[c.value] for c in record.children if c.tag == "CHIL" and c.value in ids]
+            for parent in parents:
+                relationships.extend({"family_name": self.family_name, "person_id": parent, "related_id": child,
+                                      "kind": "parent", "created_at": now} for child in children if child != parent)
+            if len(parents) == 2 and parents[0] != parents[1]:
+                low, high = sorted(parents)
+                relationships.append({"family_name": self.family_name, "person_id": low, "related_id": high,
+                                      "kind": "spouse", "created_at": now})
+            for event in event_rows(record, FAMILY_EVENTS, self.coordinates):
+                events.extend({**event, "family_name": self.family_name, "person_id": p} for p in parents)
+
+        if relationships:
+            session.execute(_RELATIONSHIP_SQL, relationships)
+        if events:
+            session.execute(insert(Event.__table__), events)
+        self.stats.families += len(batch)
+        self.stats.relationships += len(relationships)
+        self.stats.events += len(events)
+
+    def run(self, path: Path, replace: bool = False) -> ImportStats:
+        """
+        Import a GEDCOM file
+
+        Args:
+            path: GEDCOM file (5.5.1 or 7.0, UTF-8)
+            replace: Delete the family's existing tree first, in the same transaction as the import
+
+        Returns:
+            ImportStats with counts and rows per second
+        """
+        self._start = time.perf_counter()
+        self.stats = ImportStats(total_bytes=Path(path).stat().st_size)
+        self.coordinates = {}
+
+        # One transaction: a parse or constraint error leaves the previous tree as it was
+        xrefs = XrefMap()
+        try:
+            with Session(self.engine) as session:
+                if replace:
+                    self._clear(session)
+
+                # Pass 1: people and their events, recording xref -> id on disk
+                batch: List[Tuple[Dict, List[Dict]]] = []
+                for record in iter_records(path, self.stats):
+                    if record.tag != "INDI":
+                        continue
+                    batch.append(individual_row(record, self.family_name, self.coordinates))
+                    if len(batch) >= self.batch_size:
+                        self._insert_individuals(session, batch, xrefs)
+                        batch = []
+                    self._report(self.stats.individuals + len(batch))
+                if batch:
+                    self._insert_individuals(session, batch, xrefs)
+
+                # Pass 2: FAM records, resolving HUSB/WIFE/CHIL pointers through the map
+                self.stats.phase = "families"
+                families: List[GedcomNode] = []
+                for record in iter_records(path, self.stats):
+                    if record.tag != "FAM":
+                        continue
+                    families.append(record)
+                    if len(families) >= self.batch_size:
+                        self._insert_families(session, families, xrefs)
+                        families = []
+                    self._report(self.stats.families + len(families))
+                if families:
+                    self._insert_families(session, families, xrefs)
+
+                self.stats.phase = "closure"
+                if self.progress:
+                    self.progress(self.stats)
+                self.stats.closure_rows = rebuild_closure(session, self.family_name)
+                bump_tree_version(session, self.family_name)
+                session.commit()
+        finally:
+            xrefs.close()
+        if replace:
+            get_kinship_service().invalidate(self.family_name)
+            get_name_search().invalidate(self.family_name)
+            get_place_index().invalidate(self.family_name)
+
+        # Geocoding only adds coordinates to places, so it runs once the tree is in
+        if self.coordinates:
+            self.stats.geocoded_places = PlaceIndexService(self.engine).record_coordinates(
+                self.family_name, self.coordinates)
+        self.stats.phase = "done"
+        self.stats.elapsed = time.perf_counter() - self._start
+        logger.info(f"Imported {self.stats.individuals} individuals, {self.stats.families} families "
+                    f"into {self.family_name} in {self.stats.elapsed:.1f}s")
+        return self.stats
+
+
+# GEDCOM families are rebuilt from the relationships table: one unit per set of
+# parents (children's FAMC) and per spouse pair, named @F<p1>@ / @F<p1>_<p2>@
+_UNITS_CTE = """
+    WITH parent_sets AS (
+        SELECT related_id AS child, MIN(person_id) AS p1,
+               CASE WHEN COUNT(*) > 1 THEN MAX(person_id) END AS p2
+        FROM relationships WHERE family_name = :family AND kind = 'parent'
+        GROUP BY related_id
+    ), units AS (
+        SELECT p1, p2 FROM parent_sets
+        UNION
+        SELECT person_id, related_id FROM relationships WHERE family_name = :family AND kind = 'spouse'
+    )
+"""
+
+_FAMILY_EVENT_TYPES = ", ".join(f"'{t}'" for t in FAMILY_EVENTS.values())
+
+# A family-type event recorded on both spouses with the same date is written once under the FAM
+_SHARED_WITH_SPOUSE = f"""
+    e.event_type IN ({_FAMILY_EVENT_TYPES}) AND EXISTS (
+        SELECT 1 FROM relationships r JOIN events e2
+            ON e2.person_id = CASE WHEN r.person_id = e.person_id THEN r.related_id ELSE r.person_id END
+        WHERE r.kind = 'spouse' AND (r.person_id = e.person_id OR r.related_id = e.person_id)
+          AND e2.event_type = e.event_type AND COALESCE(e2.date, '') = COALESCE(e.date, '')
+    )
+"""
+
+_EXPORT_PEOPLE_SQL = text(_UNITS_CTE + """
+    SELECT p.id, p.given_name, p.surname, p.sex, ps.p1, ps.p2
+    FROM people p LEFT JOIN parent_sets ps ON ps.child = p.id
+    WHERE p.family_name = :family ORDER BY p.id
+""")
+
+_EXPORT_SPOUSE_UNITS_SQL = text(_UNITS_CTE + """
+    SELECT member, p1, p2 FROM (
+        SELECT p1 AS member, p1, p2 FROM units
+        UNION ALL
+        SELECT p2 AS member, p1, p2 FROM units WHERE p2 IS NOT NULL
+    ) m ORDER BY member, p1, COALESCE(p2, 0)
+""")
+
+_EXPORT_PERSON_EVENTS_SQL = text(f"""
+    SELECT e.person_id, e.event_type, e.date, e.place, e.description FROM events e
+    WHERE e.family_name = :family AND NOT ({_SHARED_WITH_SPOUSE})
+    ORDER BY e.person_id, e.id
+""")
+
+_EXPORT_UNITS_SQL = text(_UNITS_CTE + """
+    SELECT u.p1, u.p2, a.sex, b.sex FROM units u
+    JOIN people a ON a.id = u.p1 LEFT JOIN people b ON b.id = u.p2
+    ORDER BY u.p1, COALESCE(u.p2, 0)
+""")
+
+_EXPORT_CHILDREN_SQL = text(_UNITS_CTE + """
+    SELECT p1, p2, child FROM parent_sets ORDER BY p1, COALESCE(p2, 0), child
+""")
+
+_EXPORT_FAMILY_EVENTS_SQL = text(f"""
+    SELECT r.person_id, r.related_id, e.event_type, e.date, e.place, e.description
+    FROM relationships r JOIN events e ON e.person_id = r.person_id
+    WHERE r.family_name = :family AND r.kind = 'spouse' AND {_SHARED_WITH_SPOUSE}
+    ORDER BY r.person_id, r.related_id, e.id
+""")
+
+
+class _OrderedGroups:
+    """Rows of an ordered cursor grouped by key, consumed in step with another stream"""
+
+    def __init__(self, rows, key: Callable):
+        self._groups = groupby(rows, key)
+        self._advance()
+
+    def _advance(self):
+        key, rows = next(self._groups, (None, None))
+        self.key, self.rows = key, list(rows) if rows is not None else []
+
+    def take(self, key) -> List:
+        """Rows for key; keys must be requested in ascending order"""
+        while self.key is not None and self.key < key:
+            self._advance()
+        if self.key != key:
+            return []
+        rows = self.rows
+        self._advance()
+        return rows
+
+
+def _family_xref(p1: int, p2: Optional[int]) -> str:
+    return f"@F{p1}@" if p2 is None else f"@F{p1}_{p2}@"
+
+
+def _gedcom_lines(level: int, tag: str, value: Optional[str] = None) -> str:
+    """One line, with embedded newlines continued as CONT lines"""
+    if value is None or value == "":
+        return f"{level} {tag}\n"
+    first, *rest = str(value).split("\n")
+    return f"{level} {tag} {first}\n" + "".join(f"{level + 1} CONT {line}\n" for line in rest)
+
+
+def _event_lines(event_type: str, date: Optional[str], place: Optional[str], description: Optional[str],
+                 level: int = 1) -> str:
+    tag = EVENT_TAGS.get(event_type, "EVEN")
+    if tag in ATTRIBUTE_TAGS:
+        out = _gedcom_lines(level, tag, description)
+    else:
+        out = _gedcom_lines(level, tag)
+        if tag == "EVEN" or description:
+            out += _gedcom_lines(level + 1, "TYPE", description or event_type)
+    if date:
+        out += _gedcom_lines(level + 1, "DATE", date)
+    if place:
+        out += _gedcom_lines(level + 1, "PLAC", place)
+    return out
+
+
+def export_gedcom(family_name: str, engine=None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Generate a family's tree as GEDCOM 5.5.1 text in chunks
+
+    INDI and FAM records come from ordered server-side cursors merged by id, so
+    only one person's or family's rows are in memory at a time.
+    """
+    params = {"family": family_name}
+    buffer: List[str] = []
+    size = 0
+
+    def emit(text_: str):
+        nonlocal size
+        buffer.append(text_)
+        size += len(text_)
+
+    with Session(engine or db_manager.engine) as session:
+        connection = session.connection().execution_options(stream_results=True, yield_per=1000)
+
+        def cursor(sql):
+            return connection.execute(sql, params)
+
+        emit("0 HEAD\n1 SOUR FAMILY_GENEALOGY_PLATFORM\n2 NAME Family Genealogy Platform\n"
+             "1 GEDC\n2 VERS 5.5.1\n2 FORM LINEAGE-LINKED\n1 CHAR UTF-8\n")
+
+        events = _OrderedGroups(cursor(_EXPORT_PERSON_EVENTS_SQL), key=lambda row: row[0])
+        spouse_units = _OrderedGroups(cursor(_EXPORT_SPOUSE_UNITS_SQL), key=lambda row: row[0])
+        for person_id, given, surname, sex, p1, p2 in cursor(_EXPORT_PEOPLE_SQL):
+            emit(f"0 @I{person_id}@ INDI\n")
+            emit(_gedcom_lines(1, "NAME", f"{given} /{surname}/".strip()))
+            if given:
+                emit(_gedcom_lines(2, "GIVN", given))
+            if surname:
+                emit(_gedcom_lines(2, "SURN", surname))
+            emit(f"1 SEX {sex or 'U'}\n")
+            for _, event_type, date, place, description in events.take(person_id):
+                emit(_event_lines(event_type, date, place, description))
+            if p1 is not None:
+                emit(f"1 FAMC {_family_xref(p1, p2)}\n")
+            for _, unit_p1, unit_p2 in spouse_units.take(person_id):
+                emit(f"1 FAMS {_family_xref(unit_p1, unit_p2)}\n")
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer, size = [], 0
+
+        children = _OrderedGroups(cursor(_EXPORT_CHILDREN_SQL), key=lambda row: (row[0], row[1] or 0))
+        family_events = _OrderedGroups(cursor(_EXPORT_FAMILY_EVENTS_SQL), key=lambda row: (row[0], row[1]))
+        for p1, p2, sex1, sex2 in cursor(_EXPORT_UNITS_SQL):
+            emit(f"0 {_family_xref(p1, p2)} FAM\n")
+            # HUSB/WIFE by sex where known, otherwise in id order; a lone mother is WIFE
+            if p2 is None:
+                emit(f"1 {'WIFE' if sex1 == 'F' else 'HUSB'} @I{p1}@\n")
+            else:
+                first, second = (p2, p1) if sex1 == "F" or sex2 == "M" else (p1, p2)
+                emit(f"1 HUSB @I{first}@\n1 WIFE @I{second}@\n")
+                for _, _, event_type, date, place, description in family_events.take((p1, p2)):
+                    emit(_event_lines(event_type, date, place, description))
+            for _, _, child in children.take((p1, p2 or 0)):
+                emit(f"1 CHIL @I{child}@\n")
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer, size = [], 0
+
+    emit("0 TRLR\n")
+    yield "".join(buffer)
+
+
+def print_progress(stats: ImportStats):
+    """One-line progress for the CLI"""
+    sys.stdout.write(f"\r  {stats.phase:<12} {stats.percent:5.1f}%  {stats.individuals:,} individuals, "
+                     f"{stats.families:,} families, {stats.rows_per_second:,.0f} rows/s ")
+    sys.stdout.flush()
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Import a GEDCOM file into a family tree, or export one")
+    parser.add_argument("path", type=Path, help="GEDCOM file (5.5.1 or 7.0)")
+    parser.add_argument("--family", required=True, help="Family to import into (e.g. bull)")
+    parser.add_argument("--export", action="store_true", help="Write the family's tree to path instead")
+    parser.add_argument("--replace", action="store_true", help="Delete the family's existing tree first")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Records per insert batch")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    db_manager.init_database()
+    if args.export:
+        start = time.perf_counter()
+        with open(args.path, "w", encoding="utf-8", newline="\n") as out:
+            for chunk in export_gedcom(args.family):
+                out.write(chunk)
+        print(f"✓ Exported {args.family} to {args.path} ({args.path.stat().st_size / 1024 / 1024:.1f} MB) "
+              f"in {time.perf_counter() - start:.1f}s")
+        return
+
+    stats = GedcomImporter(args.family, batch_size=args.batch_size, progress=print_progress).run(
+        args.path, replace=args.replace)
+    print()
+    print(f"✓ {stats.individuals:,} individuals, {stats.families:,} families, {stats.events:,} events, "
+          f"{stats.relationships:,} relationships in {stats.elapsed:.1f}s ({stats.rows_per_second:,.0f} rows/s)")
+    if stats.unresolved:
+        print(f"⚠️ {stats.unresolved} pointers to missing records were skipped")
+
+
+if __name__ == "__main__":
+    main()
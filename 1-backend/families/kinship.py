@@ -0,0 +1,319 @@
+"""
+Kinship calculator for Family Genealogy Platform
+Names the blood relationship between two people ("second cousin once removed")
+from an in-memory lowest-common-ancestor index that follows relationship changes
+"""
+
+import logging
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Set, Tuple, Any
+from sqlmodel import Session, select
+
+from db.models import Person, FamilyRelationship, db_manager
+from families.tree import tree_state
+
+logger = logging.getLogger(__name__)
+
+ORDINALS = ["zeroth", "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth", "ninth", "tenth"]
+REMOVALS = ["", "once removed", "twice removed", "three times removed"]
+
+# Gendered words by sex, falling back to the neutral term
+WORDS = {
+    "parent": {"M": "father", "F": "mother"},
+    "child": {"M": "son", "F": "daughter"},
+    "sibling": {"M": "brother", "F": "sister"},
+    "spouse": {"M": "husband", "F": "wife"},
+    "pibling": {"M": "uncle", "F": "aunt"},
+    "nibling": {"M": "nephew", "F": "niece"},
+}
+NEUTRAL = {"pibling": "aunt/uncle", "nibling": "niece/nephew"}
+
+
+def _numbered(n: int) -> str:
+    """11th, 2nd, 23rd, ..."""
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def ordinal(n: int) -> str:
+    """first, second, ... then 11th, 12th, ..."""
+    return ORDINALS[n] if n < len(ORDINALS) else _numbered(n)
+
+
+def greats(n: int) -> str:
+    """Prefix for n extra generations: "", "great-", "2nd great-", ..."""
+    if n <= 0:
+        return ""
+    return "great-" if n == 1 else f"{_numbered(n)} great-"
+
+
+def word(base: str, sex: str) -> str:
+    return WORDS.get(base, {}).get(sex) or NEUTRAL.get(base, base)
+
+
+def relationship_name(up: int, down: int, sex: str = "U", half: bool = False) -> str:
+    """
+    Name what B is to A, given the generations from A and from B up to their common ancestor
+
+    Args:
+        up: Generations from A to the common ancestor (0 when B is A's ancestor)
+        down: Generations from B to the common ancestor (0 when A is B's ancestor)
+        sex: B's sex (M, F, U) for gendered terms
+        half: Known to share only one ancestor of a couple (see KinshipIndex.is_half)
+    """
+    half_prefix = "half-" if half else ""
+    if down == 0:
+        if up == 1:
+            return word("parent", sex)
+        return greats(up - 2) + "grand" + word("parent", sex)
+    if up == 0:
+        if down == 1:
+            return word("child", sex)
+        return greats(down - 2) + "grand" + word("child", sex)
+    if up == 1 and down == 1:
+        return half_prefix + word("sibling", sex)
+    if down == 1:
+        return half_prefix + greats(up - 2) + word("pibling", sex)
+    if up == 1:
+        return half_prefix + greats(down - 2) + word("nibling", sex)
+
+    degree = min(up, down) - 1
+    removed = abs(up - down)
+    name = f"{'half ' if half else ''}{ordinal(degree)} cousin"
+    if removed:
+        name += " " + (REMOVALS[removed] if removed < len(REMOVALS) else f"{removed} times removed")
+    return name
+
+
+@dataclass
+class Kinship:
+    """Relationship between two people, as seen from person A"""
+    person_a: int
+    person_b: int
+    relationship: Optional[str]  # Closest blood relationship, None when unrelated
+    paths: List[Dict[str, Any]] = field(default_factory=list)  # Every distinct relationship, closest first
+    spouse: bool = False
+
+
+class KinshipIndex:
+    """
+    Per-person ancestor -> generation maps for one family
+
+    Pedigrees are DAGs (two parents, cousin marriages), so instead of a single-parent
+    LCA structure each person keeps every ancestor at its shortest distance. Two
+    people's common ancestors are the intersection of two small maps, and the lowest
+    ones are those that are not an ancestor of another common ancestor.
+    """
+
+    def __init__(self):
+        self.ancestors: Dict[int, Dict[int, int]] = defaultdict(dict)
+        self.children: Dict[int, Set[int]] = defaultdict(set)
+        self.spouses: Dict[int, Set[int]] = defaultdict(set)
+        self.sex: Dict[int, str] = {}
+        self.version: Optional[str] = None  # tree_version the index is up to date with
+        self.epoch: Optional[str] = None  # Tree epoch it was loaded in (see tree_state)
+        self.last_relationship_id = 0
+        self.last_person_id = 0
+
+    def add_parent(self, parent: int, child: int):
+        """Apply a parent link, pushing new ancestors down through the child's descendants"""
+        if child in self.children[parent]:
+            return
+        self.children[parent].add(child)
+        inherited = dict(self.ancestors.get(parent, {}))  # Distances from the parent
+        inherited[parent] = 0
+
+        queue = deque([(child, 1)])
+        while queue:
+            person, offset = queue.popleft()
+            known = self.ancestors[person]
+            changed = False
+            for ancestor, depth in inherited.items():
+                if depth + offset < known.get(ancestor, depth + offset + 1):
+                    known[ancestor] = depth + offset
+                    changed = True
+            if changed:
+                queue.extend((grandchild, offset + 1) for grandchild in self.children.get(person, ()))
+
+    def add_spouses(self, first: int, second: int):
+        self.spouses[first].add(second)
+        self.spouses[second].add(first)
+
+    def build(self, parent_links: List[Tuple[int, int]]):
+        """Bulk load in topological order (each person after all of their parents)"""
+        parents: Dict[int, List[int]] = defaultdict(list)
+        for parent, child in parent_links:
+            self.children[parent].add(child)
+            parents[child].append(parent)
+
+        pending = {child: len(ps) for child, ps in parents.items()}
+        queue = deque(p for p in self.children if p not in pending)
+        while queue:
+            person = queue.popleft()
+            known = self.ancestors[person] if person in parents else None
+            if known is not None:
+                for parent in parents[person]:
+                    known[parent] = 1
+                    for ancestor, depth in self.ancestors.get(parent, {}).items():
+                        if depth + 1 < known.get(ancestor, depth + 2):
+                            known[ancestor] = depth + 1
+            for child in self.children.get(person, ()):
+                pending[child] -= 1
+                if pending[child] == 0:
+                    queue.append(child)
+
+    def parents(self, person: int) -> Set[int]:
+        return {ancestor for ancestor, depth in self.ancestors.get(person, {}).items() if depth == 1}
+
+    def _other_parents(self, person: int, ancestor: int, generations: int) -> Set[int]:
+        """Recorded co-parents of the ancestor's children on the person's line up to it"""
+        if generations == 1:
+            line = {person}
+        else:
+            known = self.ancestors.get(person, {})
+            line = {x for x, depth in known.items() if depth == generations - 1 and ancestor in self.parents(x)}
+        return set().union(*(self.parents(x) for x in line)) - {ancestor}
+
+    def is_half(self, a: int, b: int, ancestor: int, up: int, down: int) -> bool:
+        """
+        Whether A and B descend from a single shared ancestor through different partners
+
+        Only claimed when both lines record another parent and those differ;
+        with parentage missing on either side the plain term is used, since
+        many trees only record one parent of a couple.
+        """
+        theirs_a = self._other_parents(a, ancestor, up)
+        theirs_b = self._other_parents(b, ancestor, down)
+        return bool(theirs_a) and bool(theirs_b) and theirs_a.isdisjoint(theirs_b)
+
+    def kinship(self, a: int, b: int) -> Kinship:
+        """What person B is to person A"""
+        result = Kinship(person_a=a, person_b=b, relationship=None, spouse=b in self.spouses.get(a, ()))
+        if a == b:
+            result.relationship = "self"
+            return result
+
+        sex = self.sex.get(b, "U")
+        ancestors_a = self.ancestors.get(a, {})
+        ancestors_b = self.ancestors.get(b, {})
+
+        if b in ancestors_a:
+            result.paths.append({"generations": [ancestors_a[b], 0], "common_ancestors": [b],
+                                 "relationship": relationship_name(ancestors_a[b], 0, sex)})
+        elif a in ancestors_b:
+            result.paths.append({"generations": [0, ancestors_b[a]], "common_ancestors": [a],
+                                 "relationship": relationship_name(0, ancestors_b[a], sex)})
+        else:
+            small, large = (ancestors_a, ancestors_b) if len(ancestors_a) <= len(ancestors_b) \
+                else (ancestors_b, ancestors_a)
+            common = {c for c in small if c in large}
+            # Lowest common ancestors: no child is also a common ancestor (a common ancestor's
+            # ancestors are all common, so any lower one would be reached through a child)
+            lowest = [c for c in common if common.isdisjoint(self.children.get(c, ()))]
+
+            by_generations: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+            for c in lowest:
+                by_generations[(ancestors_a[c], ancestors_b[c])].append(c)
+            for (up, down), shared in sorted(by_generations.items(), key=lambda item: (sum(item[0]), item[0])):
+                half = len(shared) == 1 and self.is_half(a, b, shared[0], up, down)
+                result.paths.append({"generations": [up, down], "common_ancestors": sorted(shared),
+                                     "relationship": relationship_name(up, down, sex, half=half)})
+
+        if result.paths:
+            result.relationship = result.paths[0]["relationship"]
+        elif result.spouse:
+            result.relationship = word("spouse", sex)
+        return result
+
+
+class KinshipService:
+    """Keeps one KinshipIndex per family in step with the family's tree"""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._indexes: Dict[str, KinshipIndex] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()  # Guards _locks only
+
+    @property
+    def engine(self):
+        return self._engine or db_manager.engine
+
+    def _family_lock(self, family_name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(family_name, threading.Lock())
+
+    def _load(self, session: Session, family_name: str, index: Optional[KinshipIndex]) -> KinshipIndex:
+        """
+        Bring the family's index up to date with the database
+
+        While the tree's epoch stays put, only relationship rows with a higher
+        id than the last one applied are read and pushed through add_parent
+        and add_spouses. A new index, or a delete or replace import (a new
+        epoch, after which ids can be reused), loads the family in one pass.
+        """
+        version, epoch = tree_state(session, family_name)
+        if index is not None and index.version == version:
+            return index
+        fresh = index is None or index.epoch != epoch
+        if fresh:
+            index = KinshipIndex()
+
+        rows = session.exec(select(
+            FamilyRelationship.id, FamilyRelationship.person_id,
+            FamilyRelationship.related_id, FamilyRelationship.kind
+        ).where(
+            FamilyRelationship.family_name == family_name,
+            FamilyRelationship.id > index.last_relationship_id
+        ).order_by(FamilyRelationship.id)).all()
+        people = select(Person.id, Person.sex).where(Person.family_name == family_name)
+        if not fresh:
+            people = people.where(Person.id > index.last_person_id)
+        index.sex.update(dict(session.exec(people).all()))
+
+        parent_links = [(person_id, related_id) for _, person_id, related_id, kind in rows if kind == "parent"]
+        if fresh:
+            index.build(parent_links)
+        else:
+            for parent, child in parent_links:
+                index.add_parent(parent, child)
+        for _, person_id, related_id, kind in rows:
+            if kind == "spouse":
+                index.add_spouses(person_id, related_id)
+        if rows:
+            index.last_relationship_id = rows[-1][0]
+        if index.sex:
+            index.last_person_id = max(index.sex)
+        index.version, index.epoch = version, epoch
+        if fresh:
+            logger.info(f"Built kinship index for {family_name}: {len(index.ancestors)} people with ancestors")
+        return index
+
+    def index(self, family_name: str) -> KinshipIndex:
+        """The family's index, with any people and relationships added since the last call applied"""
+        with self._family_lock(family_name), Session(self.engine) as session:
+            index = self._indexes[family_name] = self._load(session, family_name, self._indexes.get(family_name))
+            return index
+
+    def invalidate(self, family_name: str):
+        """Drop a family's index now rather than on the next version check"""
+        with self._family_lock(family_name):
+            self._indexes.pop(family_name, None)
+
+    def kinship(self, family_name: str, person_a: int, person_b: int) -> Kinship:
+        """What person B is to person A"""
+        with self._family_lock(family_name), Session(self.engine) as session:
+            # Held through the lookup: add_parent changes ancestor maps in place
+            index = self._indexes[family_name] = self._load(session, family_name, self._indexes.get(family_name))
+            return index.kinship(person_a, person_b)
+
+
+# Global instance
+kinship_service = KinshipService()
+
+
+def get_kinship_service() -> KinshipService:
+    """Get kinship service instance"""
+    return kinship_service
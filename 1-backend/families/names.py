@@ -0,0 +1,454 @@
+"""
+Name search for Family Genealogy Platform
+Ranked, spelling-tolerant person search per family: every distinct given name
+and surname is keyed once by Soundex, Double Metaphone and Daitch-Mokotoff and
+broken into trigrams, so a query only touches the names it could match
+"""
+
+import heapq
+import logging
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import chain
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Tuple, Iterable, Any
+from sqlmodel import Session, select
+
+from db.models import Person, db_manager
+from families.phonetics import normalize, name_codes
+from families.tree import person_summary, tree_state
+
+logger = logging.getLogger(__name__)
+
+# Score of a name match by how it matched; trigram similarity (0..1) is scaled by TRIGRAM
+EXACT, PREFIX, TRIGRAM = 1.0, 0.9, 0.9
+PHONETIC = {"M": 0.8, "D": 0.75, "S": 0.6}  # Double Metaphone, Daitch-Mokotoff, Soundex
+MIN_TRIGRAM_SIMILARITY = 0.45
+MIN_PREFIX_CONTAINMENT = 0.65  # Share of a typed prefix's trigrams a name must contain
+GIVEN_WEIGHT, SURNAME_WEIGHT = 0.45, 0.55  # Two-word queries: "mary klingenberg"
+SWAPPED, CONFIDENT = 0.95, 0.8  # "klingenberg mary" is discounted, and only tried without a confident match
+GIVEN_ONLY = 0.9  # One-word queries prefer surnames over given names with the same score
+PREFIX_CANDIDATES = 48  # Most frequent names kept per typed prefix
+NAME_CANDIDATES = 64  # Best-scoring names per query word carried into person ranking
+PAIR_CANDIDATES = 16  # Given names and surnames per word combined in two-word queries
+TRIGRAM_POSTINGS_CAP = 1000  # Trigrams shared by more names than this are checked per candidate, not counted
+MATCH_CACHE = 4096  # Recent query words per vocabulary whose matches are kept
+MERGE_THRESHOLD = 20000  # Pending people merged into the sorted layout after this many
+
+
+def name_words(value: Optional[str]) -> List[str]:
+    """Normalized words of a name ("Mary-Ann  O'Neil" -> MARY, ANN, ONEIL)"""
+    words = (value or "").replace("-", " ").split()
+    return [w for w in (normalize(word) for word in words) if w]
+
+
+def trigrams(name: str, prefix: bool = False) -> set:
+    """Trigrams of a normalized name, padded so short names and word starts count"""
+    padded = f"  {name}" if prefix else f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class NameMatch:
+    """One ranked person in a search result"""
+    person_id: int
+    score: float
+    matched: List[str] = field(default_factory=list)  # How each query word matched
+
+
+class NameVocabulary:
+    """Distinct names of one field (given or surname) with their phonetic and trigram postings"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.frequency = array("i")
+        self.codes: Dict[str, List[int]] = {}
+        self.grams: Dict[str, List[int]] = {}
+        self.gram_counts = array("i")
+        self._sorted: Optional[List[str]] = None
+        self._sorted_ids: List[int] = []
+        self._prefix_cache: Dict[str, List[int]] = {}
+        self._matches: Dict[Tuple[str, bool], Dict[int, Tuple[float, str]]] = {}
+        self._common_grams: Dict[str, set] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name: str) -> int:
+        """Id of a normalized name, keying it on first sight"""
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.ids[name] = name_id
+            self.names.append(name)
+            self.frequency.append(0)
+            for code in name_codes(name):
+                self.codes.setdefault(code, []).append(name_id)
+            grams = trigrams(name)
+            for gram in grams:
+                self.grams.setdefault(name[0] + gram, []).append(name_id)
+            self.gram_counts.append(len(grams))
+            self._sorted = None
+            self._common_grams.clear()
+            self.clear_cache()
+        self.frequency[name_id] += 1
+        return name_id
+
+    def clear_cache(self):
+        self._prefix_cache.clear()
+        self._matches.clear()
+
+    def _prefixed(self, prefix: str) -> List[int]:
+        """Most frequent names starting with a prefix"""
+        cached = self._prefix_cache.get(prefix)
+        if cached is not None:
+            return cached
+        if self._sorted is None:
+            order = sorted(range(len(self.names)), key=self.names.__getitem__)
+            self._sorted = [self.names[i] for i in order]
+            self._sorted_ids = order
+        lo = bisect_left(self._sorted, prefix)
+        hi = bisect_right(self._sorted, prefix + "\x7f", lo)
+        found = sorted(self._sorted_ids[lo:hi], key=lambda i: -self.frequency[i])[:PREFIX_CANDIDATES]
+        if len(prefix) <= 3:
+            self._prefix_cache[prefix] = found  # Short prefixes have the widest ranges
+        return found
+
+    def match(self, word: str, prefix: bool = False) -> Dict[int, Tuple[float, str]]:
+        """
+        Names similar to a query word
+
+        Args:
+            word: Normalized query word
+            prefix: The word may be incomplete (the user is still typing it)
+
+        Returns:
+            Best NAME_CANDIDATES names as {name id: (score, how it matched)}
+        """
+        # Every keystroke repeats the words typed before it
+        cached = self._matches.get((word, prefix))
+        if cached is None:
+            if len(self._matches) >= MATCH_CACHE:
+                self._matches.clear()
+            cached = self._matches[word, prefix] = self._match(word, prefix)
+        return cached
+
+    def _match(self, word: str, prefix: bool) -> Dict[int, Tuple[float, str]]:
+        scores: Dict[int, Tuple[float, str]] = {}
+
+        def offer(name_id: int, score: float, how: str):
+            if score > scores.get(name_id, (0.0, ""))[0]:
+                scores[name_id] = (score, how)
+
+        exact = self.ids.get(word)
+        if exact is not None:
+            offer(exact, EXACT, "exact")
+        if prefix:
+            for name_id in self._prefixed(word):
+                offer(name_id, PREFIX + 0.1 * len(word) / len(self.names[name_id]), "prefix")
+        # Phonetic codes of a word still being typed only mean something once it has a few letters
+        for code in name_codes(word) if not prefix or len(word) >= 4 else ():
+            weight = PHONETIC[code[0]]
+            how = {"M": "metaphone", "D": "daitch-mokotoff", "S": "soundex"}[code[0]]
+            for name_id in self.codes.get(code, ()):
+                offer(name_id, weight, how)
+        if len(word) >= (4 if prefix else 3):
+            for name_id, similarity in self._similar(word, prefix).items():
+                offer(name_id, TRIGRAM * similarity, "trigram")
+                if name_id in scores and scores[name_id][1] != "trigram":
+                    # Among phonetic matches, closer spellings rank first
+                    score, how = scores[name_id]
+                    scores[name_id] = (score + 0.05 * similarity, how)
+
+        frequency = self.frequency
+        return dict(heapq.nlargest(NAME_CANDIDATES, scores.items(),
+                                   key=lambda item: (item[1][0], frequency[item[0]])))
+
+    def _similar(self, word: str, prefix: bool) -> Dict[int, float]:
+        """
+        Names sharing enough trigrams with the word, by Jaccard (or containment for prefixes)
+
+        Trigram postings are kept per initial: a misspelled first letter is
+        left to the phonetic codes (Klein/Cline), which keeps the postings a
+        query has to count short.
+        """
+        query = {word[0] + gram for gram in trigrams(word, prefix=prefix)}
+        size = len(query)
+        threshold = MIN_PREFIX_CONTAINMENT if prefix else MIN_TRIGRAM_SIMILARITY
+        needed = max(1, math.ceil(size * threshold))
+        # The most common trigrams ("  S", "ER ") are left out of the count and
+        # only checked for the names that reach the threshold without them
+        postings = sorted(((len(self.grams.get(gram, ())), gram) for gram in query), reverse=True)
+        common = [gram for count, gram in postings[:needed - 1] if count > TRIGRAM_POSTINGS_CAP]
+        counts = Counter(chain.from_iterable(self.grams.get(gram, ()) for gram in query if gram not in common))
+        common_sets = [self._posting_set(gram) for gram in common]
+        floor, gram_counts = needed - len(common), self.gram_counts
+        similar = {}
+        for name_id, shared in [item for item in counts.items() if item[1] >= floor]:
+            for members in common_sets:
+                shared += name_id in members
+            similarity = shared / size if prefix else shared / (size + gram_counts[name_id] - shared)
+            if similarity >= threshold:
+                similar[name_id] = similarity
+        return similar
+
+    def _posting_set(self, gram: str) -> set:
+        found = self._common_grams.get(gram)
+        if found is None:
+            found = self._common_grams[gram] = set(self.grams[gram])
+        return found
+
+
+class NameIndex:
+    """
+    Name search over one family's people
+
+    People are laid out twice, sorted by (surname, given name) and by
+    (given name, surname), so a surname's people are one contiguous range and
+    a given name inside it one bisect away. People added since the last layout
+    wait in a small pending list that every query also scans.
+    """
+
+    def __init__(self):
+        self.given = NameVocabulary()
+        self.surnames = NameVocabulary()
+        self.person_ids = array("q")
+        self.given_ids = array("i")
+        self.surname_ids = array("i")
+        self.last_person_id = 0
+        self._by_surname = array("i")  # Row numbers sorted by (surname id, given id)
+        self._by_surname_keys = array("q")
+        self._by_given = array("i")
+        self._by_given_keys = array("q")
+        self._laid_out = (0, 0)  # Surname and given name counts when the layout was built
+        self._raw: Dict[Tuple[Optional[str], bool], str] = {}
+        self._pending = 0
+        self._pending_by_surname: Dict[int, List[int]] = {}
+        self._pending_by_given: Dict[int, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.person_ids)
+
+    def add(self, person_id: int, given_name: Optional[str], surname: Optional[str]):
+        """Index one person by first given name and full surname"""
+        self._insert(person_id, given_name, surname)
+        if self._pending > MERGE_THRESHOLD:
+            self.layout()
+
+    def _insert(self, person_id: int, given_name: Optional[str], surname: Optional[str]):
+        given, surname = self._normalized(given_name, True), self._normalized(surname, False)
+        given_id = self.given.add(given) if given else -1
+        surname_id = self.surnames.add(surname) if surname else -1
+        row = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.given_ids.append(given_id)
+        self.surname_ids.append(surname_id)
+        self.last_person_id = max(self.last_person_id, person_id)
+        self._pending_by_surname.setdefault(surname_id, []).append(row)
+        self._pending_by_given.setdefault(given_id, []).append(row)
+        self._pending += 1
+
+    def clear_caches(self):
+        """Forget cached word matches (they are also dropped whenever a new name is indexed)"""
+        self.given.clear_cache()
+        self.surnames.clear_cache()
+
+    def _normalized(self, value: Optional[str], first_word: bool) -> str:
+        """Index form of a raw name, cached since most raw spellings repeat"""
+        key = (value, first_word)
+        found = self._raw.get(key)
+        if found is None:
+            words = name_words(value)
+            found = self._raw[key] = "".join(words[:1] if first_word else words)
+        return found
+
+    def build(self, people: Iterable[Tuple[int, Optional[str], Optional[str]]]):
+        """Bulk load (person_id, given_name, surname) rows, then lay everyone out once"""
+        for person_id, given_name, surname in people:
+            self._insert(person_id, given_name, surname)
+        self.layout()
+
+    def layout(self):
+        """Re-sort every person into the two search orders"""
+        with self._lock:
+            surnames, given = len(self.surnames), len(self.given)
+            surname_keys = [(s + 1) * (given + 1) + g + 1 for s, g in zip(self.surname_ids, self.given_ids)]
+            order = sorted(range(len(surname_keys)), key=surname_keys.__getitem__)
+            self._by_surname = array("i", order)
+            self._by_surname_keys = array("q", (surname_keys[i] for i in order))
+
+            given_keys = [(g + 1) * (surnames + 1) + s + 1 for s, g in zip(self.surname_ids, self.given_ids)]
+            order = sorted(range(len(given_keys)), key=given_keys.__getitem__)
+            self._by_given = array("i", order)
+            self._by_given_keys = array("q", (given_keys[i] for i in order))
+
+            self._laid_out = (surnames, given)
+            self._pending = 0
+            self._pending_by_surname = {}
+            self._pending_by_given = {}
+
+    def _rows(self, surname: Optional[int] = None, given: Optional[int] = None,
+              limit: Optional[int] = None) -> List[int]:
+        """Row numbers of people with a surname id, a given name id, or both (at most limit of them)"""
+        surnames, given_names = self._laid_out
+        found: List[int] = []
+        if surname is not None:
+            rows, keys, stride, major, minor, majors = (self._by_surname, self._by_surname_keys,
+                                                        given_names + 1, surname, given, surnames)
+        else:
+            rows, keys, stride, major, minor, majors = (self._by_given, self._by_given_keys,
+                                                        surnames + 1, given, None, given_names)
+        # Names first seen after the layout was built only have pending people
+        if major < majors and (minor is None or minor < given_names):
+            if minor is None:
+                lo = bisect_left(keys, (major + 1) * stride)
+                hi = bisect_left(keys, (major + 2) * stride, lo)
+            else:
+                key = (major + 1) * stride + minor + 1
+                lo = bisect_left(keys, key)
+                hi = bisect_right(keys, key, lo)
+            found.extend(rows[lo:hi if limit is None else min(hi, lo + limit)])
+        if self._pending:
+            if surname is not None:
+                pending = self._pending_by_surname.get(surname, ())
+                found.extend(row for row in pending if given is None or self.given_ids[row] == given)
+            else:
+                found.extend(self._pending_by_given.get(given, ()))
+        return found
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True) -> List[NameMatch]:
+        """
+        Ranked people for a free-text name query
+
+        One word matches surnames and given names; with two or more, the first
+        is the given name and the last the surname. Unless that order finds
+        people with a confident score, the other order is tried too, at a small
+        discount. The last word is treated as a prefix while typing.
+        """
+        words = name_words(query)
+        if not words:
+            return []
+        # (score, how it matched, surname id, given name id); rows are only looked up
+        # for entries the result list actually reaches
+        ranked: List[Tuple[float, List[str], Optional[int], Optional[int]]] = []
+
+        if len(words) == 1:
+            for name_id, (score, how) in self.surnames.match(words[0], prefix).items():
+                ranked.append((score, [f"surname:{how}"], name_id, None))
+            for name_id, (score, how) in self.given.match(words[0], prefix).items():
+                ranked.append((score * GIVEN_ONLY, [f"given:{how}"], None, name_id))
+        else:
+            first, last = words[0], words[-1]
+            for given_word, surname_word, discount, given_prefix, surname_prefix in (
+                    (first, last, 1.0, False, prefix), (last, first, SWAPPED, prefix, False)):
+                if discount == SWAPPED and any(
+                        score >= CONFIDENT and self._rows(surname_id, given_id, 1)
+                        for score, _, surname_id, given_id in ranked if given_id is not None):
+                    break  # The names were in the expected order
+                given_matches = list(self.given.match(given_word, given_prefix).items())[:PAIR_CANDIDATES]
+                surname_matches = list(self.surnames.match(surname_word, surname_prefix).items())[:PAIR_CANDIDATES]
+                for surname_id, (surname_score, surname_how) in surname_matches:
+                    for given_id, (given_score, given_how) in given_matches:
+                        score = (GIVEN_WEIGHT * given_score + SURNAME_WEIGHT * surname_score) * discount
+                        ranked.append((score, [f"given:{given_how}", f"surname:{surname_how}"], surname_id, given_id))
+                    if discount == 1.0 and surname_score >= PHONETIC["M"]:
+                        # Right surname, unmatched given name, ranked below any two-word match
+                        ranked.append((SURNAME_WEIGHT * surname_score * 0.8, [f"surname:{surname_how}"],
+                                       surname_id, None))
+
+        ranked.sort(key=lambda item: -item[0])
+        matches: List[NameMatch] = []
+        seen = set()
+        for score, how, surname_id, given_id in ranked:
+            # Rows already listed can repeat, so one entry never needs more than limit + seen
+            for row in self._rows(surname_id, given_id, limit + len(seen)):
+                if row in seen:
+                    continue
+                seen.add(row)
+                matches.append(NameMatch(person_id=self.person_ids[row], score=round(score, 4), matched=how))
+                if len(matches) >= limit:
+                    return matches
+        return matches
+
+
+class NameSearchService:
+    """Keeps one NameIndex per family in step with the family's people"""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._indexes: Dict[str, NameIndex] = {}
+        self._states: Dict[str, Tuple[str, str]] = {}  # family -> (tree_version, epoch) its index is at
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()  # Guards _locks only
+
+    @property
+    def engine(self):
+        return self._engine or db_manager.engine
+
+    def _family_lock(self, family_name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(family_name, threading.Lock())
+
+    def index(self, family_name: str) -> NameIndex:
+        """
+        The family's index, with people added since the last call indexed
+
+        While the tree's epoch stays put (see tree_state), only people with a
+        higher id than the last one indexed are read and added through
+        NameIndex.add, which lays the index out again once enough are pending.
+        A new index, or a delete or replace import (a new epoch, after which
+        ids can be reused), loads the family in one pass.
+        """
+        with self._family_lock(family_name), Session(self.engine) as session:
+            version, epoch = tree_state(session, family_name)
+            index = self._indexes.get(family_name)
+            known = self._states.get(family_name)
+            if index is not None and known == (version, epoch):
+                return index
+
+            query = select(Person.id, Person.given_name, Person.surname).where(Person.family_name == family_name)
+            if index is not None and known[1] == epoch:
+                added = session.exec(query.where(Person.id > index.last_person_id).order_by(Person.id)).all()
+                if len(added) > MERGE_THRESHOLD:
+                    index.build(added)  # An appending import: one layout instead of one per threshold
+                else:
+                    for person_id, given_name, surname in added:
+                        index.add(person_id, given_name, surname)
+            else:
+                index = NameIndex()
+                index.build(session.exec(query.order_by(Person.id)).all())
+                logger.info(f"Built name index for {family_name}: {len(index)} people, "
+                            f"{len(index.surnames)} surnames, {len(index.given)} given names")
+            self._indexes[family_name] = index
+            self._states[family_name] = (version, epoch)
+            return index
+
+    def invalidate(self, family_name: str):
+        """Drop a family's index now rather than on the next version check"""
+        with self._family_lock(family_name):
+            self._indexes.pop(family_name, None)
+
+    def search(self, family_name: str, query: str, limit: int = 20, prefix: bool = True) -> List[Dict[str, Any]]:
+        """Ranked people matching a name query, as person summaries with score and match details"""
+        matches = self.index(family_name).search(query, limit=limit, prefix=prefix)
+        if not matches:
+            return []
+        with Session(self.engine) as session:
+            people = {p.id: p for p in session.exec(
+                select(Person).where(Person.id.in_([m.person_id for m in matches]))).all()}
+        return [dict(person_summary(people[m.person_id]), score=m.score, matched=m.matched)
+                for m in matches if m.person_id in people]
+
+
+# Global instance
+name_search = NameSearchService()
+
+
+def get_name_search() -> NameSearchService:
+    """Get name search service instance"""
+    return name_search
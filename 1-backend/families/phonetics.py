@@ -0,0 +1,488 @@
+"""
+Phonetic name codes for Family Genealogy Platform
+Soundex, Double Metaphone and Daitch-Mokotoff Soundex, so spelling variants
+of the same name (Klingenberg/Klingenburg, Herrman/Herman) share a key
+"""
+
+import re
+import unicodedata
+from typing import List, Set, Tuple
+
+VOWELS = set("AEIOUY")
+_LETTERS_RE = re.compile(r"[^A-Z]")
+
+
+def normalize(name: str) -> str:
+    """Uppercase ASCII letters only: accents folded, punctuation and spaces dropped"""
+    folded = unicodedata.normalize("NFKD", name or "")
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return _LETTERS_RE.sub("", folded.upper().replace("ß", "SS"))
+
+
+# -- Soundex ---------------------------------------------------------------
+
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(
+    ["AEIOUYHW", "BFPV", "CGJKQSXZ", "DT", "L", "MN", "R"]) for c in letters}
+
+
+def soundex(name: str) -> str:
+    """American Soundex: first letter plus three digits (H and W don't separate equal codes)"""
+    name = normalize(name)
+    if not name:
+        return ""
+    code = [name[0]]
+    last = _SOUNDEX_CODES[name[0]]
+    for c in name[1:]:
+        digit = _SOUNDEX_CODES[c]
+        if digit != "0" and digit != last:
+            code.append(digit)
+        if c not in "HW":
+            last = digit
+        if len(code) == 4:
+            break
+    return "".join(code).ljust(4, "0")
+
+
+# -- Double Metaphone -------------------------------------------------------
+
+def double_metaphone(name: str, max_length: int = 4) -> Tuple[str, str]:
+    """
+    Lawrence Philips' Double Metaphone
+
+    Returns:
+        (primary, alternate) codes; the alternate equals the primary when the
+        name has only one plausible pronunciation
+    """
+    word = normalize(name)
+    if not word:
+        return "", ""
+    length = len(word)
+    padded = word + "     "  # Lookahead past the end never raises
+    primary: List[str] = []
+    alternate: List[str] = []
+
+    def at(pos: int, *options: str) -> bool:
+        return pos >= 0 and any(padded.startswith(o, pos) for o in options)
+
+    def char(pos: int) -> str:
+        return padded[pos] if 0 <= pos < len(padded) else ""
+
+    def vowel(pos: int) -> bool:
+        return 0 <= pos < length and word[pos] in VOWELS
+
+    def add(main: str, alt: str = None):
+        primary.append(main)
+        alternate.append(main if alt is None else alt)
+
+    slavo_germanic = any(s in word for s in ("W", "K", "CZ", "WITZ"))
+
+    def germanic() -> bool:
+        return word.startswith(("VAN", "VON", "SCH"))  # Spaces are gone, so "Van Buren" is VANBUREN
+
+    pos = 0
+    if at(0, "GN", "KN", "PN", "WR", "PS"):
+        pos = 1
+    if word[0] == "X":
+        add("S")  # Xavier
+        pos = 1
+
+    while len("".join(primary)) < max_length or len("".join(alternate)) < max_length:
+        if pos >= length:
+            break
+        c = word[pos]
+
+        if c in VOWELS:
+            if pos == 0:
+                add("A")
+            pos += 1
+
+        elif c == "B":
+            add("P")
+            pos += 2 if char(pos + 1) == "B" else 1
+
+        elif c == "C":
+            if pos > 1 and not vowel(pos - 2) and at(pos - 1, "ACH") \
+                    and char(pos + 2) != "I" and (char(pos + 2) != "E" or at(pos - 2, "BACHER", "MACHER")):
+                add("K")
+                pos += 2
+            elif pos == 0 and at(pos, "CAESAR"):
+                add("S")
+                pos += 2
+            elif at(pos, "CHIA"):
+                add("K")
+                pos += 2
+            elif at(pos, "CH"):
+                if pos > 0 and at(pos, "CHAE"):
+                    add("K", "X")
+                elif pos == 0 and (at(pos + 1, "HARAC", "HARIS") or at(pos + 1, "HOR", "HYM", "HIA", "HEM")) \
+                        and not at(0, "CHORE"):
+                    add("K")
+                elif germanic() or at(pos - 2, "ORCHES", "ARCHIT", "ORCHID") or at(pos + 2, "T", "S") \
+                        or ((at(pos - 1, "A", "O", "U", "E") or pos == 0)
+                            and at(pos + 2, "L", "R", "N", "M", "B", "H", "F", "V", "W", " ")):
+                    add("K")
+                elif pos > 0:
+                    add("K") if at(0, "MC") else add("X", "K")
+                else:
+                    add("X")
+                pos += 2
+            elif at(pos, "CZ") and not at(pos - 2, "WICZ"):
+                add("S", "X")
+                pos += 2
+            elif at(pos + 1, "CIA"):
+                add("X")
+                pos += 3
+            elif at(pos, "CC") and not (pos == 1 and word[0] == "M"):
+                if at(pos + 2, "I", "E", "H") and not at(pos + 2, "HU"):
+                    if (pos == 1 and char(pos - 1) == "A") or at(pos - 1, "UCCEE", "UCCES"):
+                        add("KS")
+                    else:
+                        add("X")
+                    pos += 3
+                else:
+                    add("K")
+                    pos += 2
+            elif at(pos, "CK", "CG", "CQ"):
+                add("K")
+                pos += 2
+            elif at(pos, "CI", "CE", "CY"):
+                add("S", "X") if at(pos, "CIO", "CIE", "CIA") else add("S")
+                pos += 2
+            else:
+                add("K")
+                if at(pos + 1, " C", " Q", " G"):
+                    pos += 3
+                elif at(pos + 1, "C", "K", "Q") and not at(pos + 1, "CE", "CI"):
+                    pos += 2
+                else:
+                    pos += 1
+
+        elif c == "D":
+            if at(pos, "DG"):
+                if at(pos + 2, "I", "E", "Y"):
+                    add("J")
+                    pos += 3
+                else:
+                    add("TK")
+                    pos += 2
+            elif at(pos, "DT", "DD"):
+                add("T")
+                pos += 2
+            else:
+                add("T")
+                pos += 1
+
+        elif c == "F":
+            add("F")
+            pos += 2 if char(pos + 1) == "F" else 1
+
+        elif c == "G":
+            if char(pos + 1) == "H":
+                if pos > 0 and not vowel(pos - 1):
+                    add("K")
+                    pos += 2
+                elif pos == 0:
+                    add("J") if char(pos + 2) == "I" else add("K")
+                    pos += 2
+                elif (pos > 1 and at(pos - 2, "B", "H", "D")) or (pos > 2 and at(pos - 3, "B", "H", "D")) \
+                        or (pos > 3 and at(pos - 4, "B", "H")):
+                    pos += 2
+                else:
+                    if pos > 2 and char(pos - 1) == "U" and at(pos - 3, "C", "G", "L", "R", "T"):
+                        add("F")  # Laugh, tough
+                    elif pos > 0 and char(pos - 1) != "I":
+                        add("K")
+                    pos += 2
+            elif char(pos + 1) == "N":
+                if pos == 1 and vowel(0) and not slavo_germanic:
+                    add("KN", "N")
+                elif not at(pos + 2, "EY") and char(pos + 1) != "Y" and not slavo_germanic:
+                    add("N", "KN")
+                else:
+                    add("KN")
+                pos += 2
+            elif at(pos + 1, "LI") and not slavo_germanic:
+                add("KL", "L")
+                pos += 2
+            elif pos == 0 and (char(pos + 1) == "Y"
+                               or at(pos + 1, "ES", "EP", "EB", "EL", "EY", "IB", "IL", "IN", "IE", "EI", "ER")):
+                add("K", "J")
+                pos += 2
+            elif (at(pos + 1, "ER") or char(pos + 1) == "Y") and not at(0, "DANGER", "RANGER", "MANGER") \
+                    and not at(pos - 1, "E", "I") and not at(pos - 1, "RGY", "OGY"):
+                add("K", "J")
+                pos += 2
+            elif at(pos + 1, "E", "I", "Y") or at(pos - 1, "AGGI", "OGGI"):
+                if germanic() or at(pos + 1, "ET"):
+                    add("K")
+                elif at(pos + 1, "IER "):
+                    add("J")
+                else:
+                    add("J", "K")
+                pos += 2
+            else:
+                add("K")
+                pos += 2 if char(pos + 1) == "G" else 1
+
+        elif c == "H":
+            if (pos == 0 or vowel(pos - 1)) and vowel(pos + 1):
+                add("H")
+                pos += 2
+            else:
+                pos += 1
+
+        elif c == "J":
+            if at(pos, "JOSE") or at(0, "SAN "):
+                if (pos == 0 and char(pos + 4) == " ") or at(0, "SAN "):
+                    add("H")
+                else:
+                    add("J", "H")
+                pos += 1
+            else:
+                if pos == 0 and not at(pos, "JOSE"):
+                    add("J", "A")
+                elif vowel(pos - 1) and not slavo_germanic and char(pos + 1) in ("A", "O"):
+                    add("J", "H")
+                elif pos == length - 1:
+                    add("J", "")
+                elif not at(pos + 1, "L", "T", "K", "S", "N", "M", "B", "Z") and not at(pos - 1, "S", "K", "L"):
+                    add("J")
+                pos += 2 if char(pos + 1) == "J" else 1
+
+        elif c == "K":
+            add("K")
+            pos += 2 if char(pos + 1) == "K" else 1
+
+        elif c == "L":
+            if char(pos + 1) == "L":
+                if (pos == length - 3 and at(pos - 1, "ILLO", "ILLA", "ALLE")) \
+                        or ((at(length - 2, "AS", "OS") or at(length - 1, "A", "O")) and at(pos - 1, "ALLE")):
+                    add("L", "")
+                else:
+                    add("L")
+                pos += 2
+            else:
+                add("L")
+                pos += 1
+
+        elif c == "M":
+            add("M")
+            if (at(pos - 1, "UMB") and (pos + 1 == length - 1 or at(pos + 2, "ER"))) or char(pos + 1) == "M":
+                pos += 2
+            else:
+                pos += 1
+
+        elif c == "N":
+            add("N")
+            pos += 2 if char(pos + 1) == "N" else 1
+
+        elif c == "P":
+            if char(pos + 1) == "H":
+                add("F")
+                pos += 2
+            else:
+                add("P")
+                pos += 2 if char(pos + 1) in ("P", "B") else 1
+
+        elif c == "Q":
+            add("K")
+            pos += 2 if char(pos + 1) == "Q" else 1
+
+        elif c == "R":
+            if pos == length - 1 and not slavo_germanic and at(pos - 2, "IE") \
+                    and not at(pos - 4, "ME", "MA"):
+                add("", "R")  # French: Rogier
+            else:
+                add("R")
+            pos += 2 if char(pos + 1) == "R" else 1
+
+        elif c == "S":
+            if at(pos - 1, "ISL", "YSL"):
+                pos += 1
+            elif pos == 0 and at(pos, "SUGAR"):
+                add("X", "S")
+                pos += 1
+            elif at(pos, "SH"):
+                add("S") if at(pos + 1, "HEIM", "HOEK", "HOLM", "HOLZ") else add("X")
+                pos += 2
+            elif at(pos, "SIO", "SIA", "SIAN"):
+                add("S") if slavo_germanic else add("S", "X")
+                pos += 3
+            elif (pos == 0 and at(pos + 1, "M", "N", "L", "W")) or at(pos + 1, "Z"):
+                add("S", "X")
+                pos += 2 if at(pos + 1, "Z") else 1
+            elif at(pos, "SC"):
+                if char(pos + 2) == "H":
+                    if at(pos + 3, "OO", "ER", "EN", "UY", "ED", "EM"):
+                        # Dutch: school, schooner; Schermerhorn, Schenker
+                        add("X", "SK") if at(pos + 3, "ER", "EN") else add("SK")
+                    elif pos == 0 and not vowel(3) and char(3) != "W":
+                        add("X", "S")
+                    else:
+                        add("X")
+                elif at(pos + 2, "I", "E", "Y"):
+                    add("S")
+                else:
+                    add("SK")
+                pos += 3
+            else:
+                if pos == length - 1 and at(pos - 2, "AI", "OI"):
+                    add("", "S")  # French: Artois
+                else:
+                    add("S")
+                pos += 2 if at(pos + 1, "S", "Z") else 1
+
+        elif c == "T":
+            if at(pos, "TION"):
+                add("X")
+                pos += 3
+            elif at(pos, "TIA", "TCH"):
+                add("X")
+                pos += 3
+            elif at(pos, "TH") or at(pos, "TTH"):
+                if at(pos + 2, "OM", "AM") or germanic():
+                    add("T")
+                else:
+                    add("0", "T")
+                pos += 2
+            else:
+                add("T")
+                pos += 2 if at(pos + 1, "T", "D") else 1
+
+        elif c == "V":
+            add("F")
+            pos += 2 if char(pos + 1) == "V" else 1
+
+        elif c == "W":
+            if at(pos, "WR"):
+                add("R")
+                pos += 2
+            else:
+                if pos == 0 and (vowel(pos + 1) or at(pos, "WH")):
+                    add("A", "F") if vowel(pos + 1) else add("A")
+                if (pos == length - 1 and vowel(pos - 1)) or at(pos - 1, "EWSKI", "EWSKY", "OWSKI", "OWSKY") \
+                        or at(0, "SCH"):
+                    add("", "F")  # Polish: Filipowicz
+                    pos += 1
+                elif at(pos, "WICZ", "WITZ"):
+                    add("TS", "FX")
+                    pos += 4
+                else:
+                    pos += 1
+
+        elif c == "X":
+            if not (pos == length - 1 and (at(pos - 3, "IAU", "EAU") or at(pos - 2, "AU", "OU"))):
+                add("KS")
+            pos += 2 if at(pos + 1, "C", "X") else 1
+
+        elif c == "Z":
+            if char(pos + 1) == "H":
+                add("J")
+                pos += 2
+            else:
+                if at(pos + 1, "ZO", "ZI", "ZA") or (slavo_germanic and pos > 0 and char(pos - 1) != "T"):
+                    add("S", "TS")
+                else:
+                    add("S")
+                pos += 2 if char(pos + 1) == "Z" else 1
+
+        else:
+            pos += 1
+
+    return "".join(primary)[:max_length], "".join(alternate)[:max_length]
+
+
+# -- Daitch-Mokotoff Soundex -----------------------------------------------
+
+# pattern: (at the start of a name, before a vowel, anywhere else); None means not coded
+# and a "|" separates the alternatives of ambiguous letters (CH as in "Chaim" or "Charlotte")
+_DM_RULES = {
+    "AI": ("0", "1", None), "AJ": ("0", "1", None), "AY": ("0", "1", None), "AU": ("0", "7", None),
+    "A": ("0", None, None), "B": ("7", "7", "7"),
+    "CHS": ("5", "54", "54"), "CH": ("5|4", "5|4", "5|4"), "CK": ("5|45", "5|45", "5|45"),
+    "CSZ": ("4", "4", "4"), "CZS": ("4", "4", "4"), "CZ": ("4", "4", "4"), "CS": ("4", "4", "4"),
+    "C": ("5|4", "5|4", "5|4"),
+    "DRZ": ("4", "4", "4"), "DRS": ("4", "4", "4"), "DSH": ("4", "4", "4"), "DSZ": ("4", "4", "4"),
+    "DS": ("4", "4", "4"), "DZH": ("4", "4", "4"), "DZS": ("4", "4", "4"), "DZ": ("4", "4", "4"),
+    "DT": ("3", "3", "3"), "D": ("3", "3", "3"),
+    "EI": ("0", "1", None), "EJ": ("0", "1", None), "EY": ("0", "1", None), "EU": ("1", "1", None),
+    "E": ("0", None, None), "FB": ("7", "7", "7"), "F": ("7", "7", "7"), "G": ("5", "5", "5"),
+    "H": ("5", "5", None),
+    "IA": ("1", None, None), "IE": ("1", None, None), "IO": ("1", None, None), "IU": ("1", None, None),
+    "I": ("0", None, None), "J": ("1|4", "1|4", "1|4"),
+    "KS": ("5", "54", "54"), "KH": ("5", "5", "5"), "K": ("5", "5", "5"), "L": ("8", "8", "8"),
+    "MN": ("66", "66", "66"), "M": ("6", "6", "6"), "NM": ("66", "66", "66"), "N": ("6", "6", "6"),
+    "OI": ("0", "1", None), "OJ": ("0", "1", None), "OY": ("0", "1", None), "O": ("0", None, None),
+    "PF": ("7", "7", "7"), "PH": ("7", "7", "7"), "P": ("7", "7", "7"), "Q": ("5", "5", "5"),
+    "RZ": ("94|4", "94|4", "94|4"), "RS": ("94|4", "94|4", "94|4"), "R": ("9", "9", "9"),
+    "SCHTSCH": ("2", "4", "4"), "SCHTSH": ("2", "4", "4"), "SCHTCH": ("2", "4", "4"),
+    "SHTCH": ("2", "4", "4"), "SHTSH": ("2", "4", "4"), "SHCH": ("2", "4", "4"),
+    "STSCH": ("2", "4", "4"), "STRZ": ("2", "4", "4"), "STRS": ("2", "4", "4"), "STSH": ("2", "4", "4"),
+    "STCH": ("2", "4", "4"), "SZCZ": ("2", "4", "4"), "SZCS": ("2", "4", "4"),
+    "SCHT": ("2", "43", "43"), "SCHD": ("2", "43", "43"), "SHT": ("2", "43", "43"),
+    "SZT": ("2", "43", "43"), "SHD": ("2", "43", "43"), "SZD": ("2", "43", "43"),
+    "SCH": ("4", "4", "4"), "ST": ("2", "43", "43"), "SD": ("2", "43", "43"),
+    "SH": ("4", "4", "4"), "SZ": ("4", "4", "4"), "SC": ("2", "4", "4"), "S": ("4", "4", "4"),
+    "TTSCH": ("4", "4", "4"), "TTCH": ("4", "4", "4"), "TTSZ": ("4", "4", "4"),
+    "TSCH": ("4", "4", "4"), "TCH": ("4", "4", "4"), "TRZ": ("4", "4", "4"), "TRS": ("4", "4", "4"),
+    "TSH": ("4", "4", "4"), "TTS": ("4", "4", "4"), "TTZ": ("4", "4", "4"), "TZS": ("4", "4", "4"),
+    "TSZ": ("4", "4", "4"), "TH": ("3", "3", "3"), "TS": ("4", "4", "4"), "TC": ("4", "4", "4"),
+    "TZ": ("4", "4", "4"), "T": ("3", "3", "3"),
+    "UI": ("0", "1", None), "UJ": ("0", "1", None), "UY": ("0", "1", None), "UE": ("0", None, None),
+    "U": ("0", None, None), "V": ("7", "7", "7"), "W": ("7", "7", "7"), "X": ("5", "54", "54"),
+    "Y": ("1", None, None),
+    "ZHDZH": ("2", "4", "4"), "ZDZH": ("2", "4", "4"), "ZSCH": ("4", "4", "4"), "ZDZ": ("2", "4", "4"),
+    "ZHD": ("2", "43", "43"), "ZSH": ("4", "4", "4"), "ZD": ("2", "43", "43"), "ZH": ("4", "4", "4"),
+    "ZS": ("4", "4", "4"), "Z": ("4", "4", "4"),
+}
+_DM_PATTERNS = {}  # first letter -> patterns, longest first
+for _pattern in sorted(_DM_RULES, key=len, reverse=True):
+    _DM_PATTERNS.setdefault(_pattern[0], []).append(_pattern)
+_DM_VOWELS = set("AEIOU")
+_DM_MAX_BRANCHES = 32  # Names like "Czerszczyszcz" branch at every ambiguous letter
+
+
+def daitch_mokotoff(name: str) -> Set[str]:
+    """
+    Daitch-Mokotoff Soundex: six digits, with several codes for ambiguous spellings
+
+    Adjacent letters with the same code are coded once, except across M/N.
+    """
+    word = normalize(name)
+    if not word:
+        return set()
+    branches = [("", None)]  # (digits so far, last replacement)
+    pos, last_letter = 0, ""
+    while pos < len(word):
+        pattern = next((p for p in _DM_PATTERNS.get(word[pos], []) if word.startswith(p, pos)), None)
+        if pattern is None:
+            pos += 1
+            continue
+        start, before_vowel, other = _DM_RULES[pattern]
+        following = word[pos + len(pattern)] if pos + len(pattern) < len(word) else ""
+        rule = start if pos == 0 else before_vowel if following in _DM_VOWELS else other
+        replacements = (rule or "").split("|")
+        force = (last_letter, pattern[0]) in (("M", "N"), ("N", "M"))
+
+        grown = []
+        for digits, last in branches:
+            for replacement in replacements:
+                if last is not None and last.endswith(replacement) and replacement and not force:
+                    grown.append((digits, replacement))
+                else:
+                    grown.append((digits + replacement, replacement))
+        branches = list(dict.fromkeys(grown))[:_DM_MAX_BRANCHES]
+        last_letter = pattern[-1]
+        pos += len(pattern)
+    return {(digits + "000000")[:6] for digits, _ in branches}
+
+
+def name_codes(name: str) -> Set[str]:
+    """Every phonetic key of a name, prefixed by algorithm (S: Soundex, M: metaphone, D: D-M)"""
+    if not normalize(name):
+        return set()
+    primary, alternate = double_metaphone(name)
+    codes = {f"S{soundex(name)}", f"M{primary}", f"M{alternate}"}
+    codes.update(f"D{code}" for code in daitch_mokotoff(name))
+    codes.discard("M")
+    return codes
@@ -0,0 +1,554 @@
+"""
+Places and the event index for Family Genealogy Platform
+Answers "who lived near X between 1900 and 1930": places are geocoded into a
+SQLite R*Tree, and every event's GEDCOM date becomes a day interval in a
+date-interval index partitioned by span length. Map (bounding box) and
+timeline (time window) queries are then a handful of index range scans.
+"""
+
+import argparse
+import calendar
+import csv
+import logging
+import re
+import threading
+import time
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Iterable, Any
+from sqlalchemy import bindparam, text
+from sqlmodel import Session
+
+from db.models import db_manager
+from families.tree import tree_version
+
+logger = logging.getLogger(__name__)
+
+# Longest span (days) in each span class; longer spans go in the last class, len(SPAN_CLASSES).
+# A window scan in class k also reads spans that ended up to SPAN_CLASSES[k] days before the
+# window, so classes are only a few times apart: a day or month, a year, ABT (5 years), ...
+SPAN_CLASSES = (31, 366, 1827, 3653, 7305, 14610, 36525)
+WINDOW_SCAN_SHARE = 0.33  # Boxes holding more of a family's places read the window index and filter on place
+APPROXIMATE_YEARS = 2  # ABT/CAL/EST 1901 is taken as 1899-1903
+OPEN_YEARS = 10  # BEF/AFT/FROM/TO without the other end reach this far
+BATCH_SIZE = 10000  # Events indexed per statement
+
+MONTHS = {"JAN": 1, "FEB": 2, "MAR": 3, "APR": 4, "MAY": 5, "JUN": 6,
+          "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12}
+YEAR_TOKEN_RE = re.compile(r"(\d{1,4})(?:/\d{1,2})?")  # 1901, or dual-dated 1700/01
+RANGE_RE = re.compile(r"(?:BET|FROM)\s+(.+?)\s+(?:AND|TO)\s+(.+)|(\d{3,4})\s*-\s*(\d{3,4})")
+IGNORED_RE = re.compile(r"@#D[^@]*@|\([^)]*\)|\b(?:INT|GREGORIAN|JULIAN)\b")
+
+
+def _point(text_: str) -> Optional[Tuple[int, int]]:
+    """First and last day of "12 MAR 1901", "MAR 1901" or "1901" """
+    tokens = text_.split()
+    match = YEAR_TOKEN_RE.fullmatch(tokens[-1]) if tokens else None
+    if not match or not 1 <= int(match.group(1)) <= 9999:
+        return None
+    year = int(match.group(1))
+    month = MONTHS.get(tokens[-2]) if len(tokens) >= 2 else None
+    if month is None:
+        return date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()
+    last = calendar.monthrange(year, month)[1]
+    if len(tokens) >= 3 and tokens[-3].isdigit() and 1 <= int(tokens[-3]) <= last:
+        day = date(year, month, int(tokens[-3])).toordinal()
+        return day, day
+    return date(year, month, 1).toordinal(), date(year, month, last).toordinal()
+
+
+def _shift(day: int, years: int) -> int:
+    """The same day a number of years later (or earlier), within the years date supports"""
+    moved = date.fromordinal(day)
+    year = min(9999, max(1, moved.year + years))
+    return (moved.replace(year=year) if (moved.month, moved.day) != (2, 29) else date(year, 2, 28)).toordinal()
+
+
+@lru_cache(maxsize=65536)
+def parse_span(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    First and last day (proleptic Gregorian ordinals) a GEDCOM date could mean
+
+    Handles exact and partial dates, ABT/CAL/EST, BEF/AFT, BET .. AND ..,
+    FROM .. TO .. and "1900-1910"; returns None for undated or unreadable
+    values and for Hebrew/French Republican calendar dates.
+    """
+    if not value:
+        return None
+    text_ = value.upper()
+    if "HEBREW" in text_ or "FRENCH" in text_:
+        return None
+    text_ = " ".join(IGNORED_RE.sub(" ", text_).split())
+    match = RANGE_RE.fullmatch(text_)
+    if match:
+        first, last = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+        first, last = _point(first), _point(last)
+        if not (first and last):
+            return None
+        return min(first[0], last[0]), max(first[1], last[1])
+
+    qualifier, _, rest = text_.partition(" ")
+    span = _point(rest) if qualifier in ("ABT", "CAL", "EST", "BEF", "AFT", "FROM", "TO") else _point(text_)
+    if span is None:
+        return None
+    if qualifier in ("ABT", "CAL", "EST"):
+        return _shift(span[0], -APPROXIMATE_YEARS), _shift(span[1], APPROXIMATE_YEARS)
+    if qualifier in ("BEF", "TO"):
+        return _shift(span[0], -OPEN_YEARS), span[0] if qualifier == "BEF" else span[1]
+    if qualifier in ("AFT", "FROM"):
+        return span[1] if qualifier == "AFT" else span[0], _shift(span[1], OPEN_YEARS)
+    return span
+
+
+def span_class(start_day: int, end_day: int) -> int:
+    """Partition of the interval index a span of this length is stored in"""
+    length = end_day - start_day
+    for number, longest in enumerate(SPAN_CLASSES):
+        if length <= longest:
+            return number
+    return len(SPAN_CLASSES)
+
+
+def place_key(name: str) -> str:
+    """Normalized place name: "Minneapolis,Hennepin , Minnesota" -> "minneapolis, hennepin, minnesota" """
+    parts = (" ".join(part.split()) for part in name.lower().split(","))
+    return ", ".join(part for part in parts if part)
+
+
+def parse_coordinate(value: Optional[str]) -> Optional[float]:
+    """GEDCOM MAP LATI/LONG ("N41.8781", "W87.6298") or a plain signed number"""
+    value = (value or "").strip().upper()
+    if not value:
+        return None
+    sign = -1 if value[0] in "SW" else 1
+    try:
+        return sign * float(value.lstrip("NSEW"))
+    except ValueError:
+        return None
+
+
+def valid_coordinates(latitude: Optional[float], longitude: Optional[float]) -> bool:
+    return latitude is not None and longitude is not None and -90 <= latitude <= 90 and -180 <= longitude <= 180
+
+
+def load_gazetteer(path: Path) -> Dict[str, Tuple[float, float]]:
+    """Place key -> (latitude, longitude) from a CSV with name, latitude and longitude columns"""
+    gazetteer = {}
+    with open(path, newline="", encoding="utf-8") as source:
+        for row in csv.DictReader(source):
+            latitude, longitude = parse_coordinate(row.get("latitude")), parse_coordinate(row.get("longitude"))
+            if row.get("name") and valid_coordinates(latitude, longitude):
+                gazetteer.setdefault(place_key(row["name"]), (latitude, longitude))
+    return gazetteer
+
+
+def geocode_key(key: str, gazetteer: Dict[str, Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+    """
+    Look a place key up in a gazetteer, falling back to coarser names
+
+    Tries the full name, then the first part with each later part
+    ("chicago, illinois" for "chicago, cook, illinois, usa"), then the same
+    with leading parts dropped ("hennepin, minnesota" for a farm there).
+    """
+    parts = key.split(", ")
+    for first in range(len(parts)):
+        for candidate in [", ".join(parts[first:])] + [f"{parts[first]}, {part}" for part in parts[first + 1:]]:
+            if candidate in gazetteer:
+                return gazetteer[candidate]
+    return None
+
+
+def _lon_ranges(west: float, east: float) -> List[Tuple[float, float]]:
+    """Longitude ranges of a bounding box, split in two when it crosses the antimeridian"""
+    return [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+
+
+def _day_iso(day: Optional[int]) -> Optional[str]:
+    return date.fromordinal(day).isoformat() if day else None
+
+
+_NEW_EVENTS_SQL = text("""
+    SELECT id, person_id, date, place FROM events
+    WHERE id > :last AND family_name = :family ORDER BY id LIMIT :limit
+""")
+
+_INSERT_SPANS_SQL = text("""
+    INSERT INTO event_spans (event_id, family_name, person_id, place_id, start_day, end_day, span_class)
+    VALUES (:event_id, :family_name, :person_id, :place_id, :start_day, :end_day, :span_class)
+    ON CONFLICT DO NOTHING
+""")
+
+_INSERT_PLACES_SQL = text("""
+    INSERT INTO places (family_name, name, key, updated_at) VALUES (:family_name, :name, :key, :updated_at)
+    ON CONFLICT DO NOTHING
+""")
+
+_PLACE_IDS_SQL = text("SELECT key, id FROM places WHERE family_name = :family AND key IN :keys").bindparams(
+    bindparam("keys", expanding=True))
+
+
+class PlaceIndexService:
+    """Geocoded places and the event interval index, kept in step with the events table"""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+        self._last_event: Dict[str, int] = {}  # family -> highest event id already indexed
+        self._place_ids: Dict[str, Dict[str, int]] = {}  # family -> place key -> id
+        self._versions: Dict[str, str] = {}  # family -> tree_version the two above were read at
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        return self._engine or db_manager.engine
+
+    @property
+    def _rtree(self) -> bool:
+        return self.engine.dialect.name == "sqlite"
+
+    def invalidate(self, family_name: str):
+        """Forget what was indexed for a family now rather than on the next version check"""
+        with self._lock:
+            self._forget(family_name)
+
+    def _forget(self, family_name: str):
+        self._last_event.pop(family_name, None)
+        self._place_ids.pop(family_name, None)
+        self._versions.pop(family_name, None)
+
+    def _known_places(self, session: Session, family_name: str) -> Dict[str, int]:
+        """Place key -> id for the family, loaded once per process"""
+        known = self._place_ids.get(family_name)
+        if known is None:
+            known = self._place_ids[family_name] = dict(session.execute(
+                text("SELECT key, id FROM places WHERE family_name = :family"), {"family": family_name}).all())
+        return known
+
+    def _resolve_places(self, session: Session, family_name: str, names: Iterable[str]) -> Dict[str, int]:
+        """Place id for each name as written, adding places not seen before (named as first written)"""
+        known = self._known_places(session, family_name)
+        keys = {}
+        for name in names:
+            if name not in keys:
+                keys[name] = place_key(name)
+        new = {}
+        for name, key in keys.items():
+            if key and key not in known:
+                new.setdefault(key, name.strip())
+        if new:
+            now = datetime.now(timezone.utc)
+            session.execute(_INSERT_PLACES_SQL, [{"family_name": family_name, "name": name, "key": key,
+                                                  "updated_at": now} for key, name in new.items()])
+            known.update(session.execute(_PLACE_IDS_SQL, {"family": family_name, "keys": list(new)}).all())
+        return {name: known[key] for name, key in keys.items() if key}
+
+    def sync(self, family_name: str) -> int:
+        """
+        Index the family's events added since the last call
+
+        The first call in a process picks up from the highest event id in
+        event_spans; later calls only read events with a higher id. When the
+        tree version moved (a write in this or any other process), the
+        position is reread from event_spans, which a re-import clears along
+        with the events it reuses ids of.
+
+        Returns:
+            Number of events indexed
+        """
+        with self._lock, Session(self.engine) as session:
+            version = tree_version(session, family_name)
+            if self._versions.get(family_name) != version:
+                self._forget(family_name)
+                self._versions[family_name] = version
+            self._known_places(session, family_name)
+            last = self._last_event.get(family_name)
+            if last is None:
+                last = session.execute(text("SELECT COALESCE(MAX(event_id), 0) FROM event_spans "
+                                            "WHERE family_name = :family"), {"family": family_name}).scalar()
+            indexed = 0
+            while True:
+                events = session.execute(_NEW_EVENTS_SQL, {"family": family_name, "last": last,
+                                                           "limit": BATCH_SIZE}).all()
+                if not events:
+                    break
+                places = self._resolve_places(session, family_name, [e.place for e in events if e.place])
+                rows = []
+                for event in events:
+                    span = parse_span(event.date)
+                    rows.append({
+                        "event_id": event.id,
+                        "family_name": family_name,
+                        "person_id": event.person_id,
+                        "place_id": places.get(event.place),
+                        "start_day": span[0] if span else None,
+                        "end_day": span[1] if span else None,
+                        "span_class": span_class(*span) if span else None,
+                    })
+                session.execute(_INSERT_SPANS_SQL, rows)
+                session.commit()
+                last = events[-1].id
+                indexed += len(events)
+            self._last_event[family_name] = last
+        if indexed:
+            logger.info(f"Indexed {indexed} events for {family_name}")
+        return indexed
+
+    def _store_coordinates(self, session: Session, place_id: int, latitude: float, longitude: float, source: str):
+        session.execute(text("UPDATE places SET latitude = :lat, longitude = :lon, source = :source, "
+                             "updated_at = :now WHERE id = :id"),
+                        {"lat": latitude, "lon": longitude, "source": source, "id": place_id,
+                         "now": datetime.now(timezone.utc)})
+        if self._rtree:
+            session.execute(text("INSERT OR REPLACE INTO place_rtree VALUES (:id, :lat, :lat, :lon, :lon)"),
+                            {"id": place_id, "lat": latitude, "lon": longitude})
+
+    def record_coordinates(self, family_name: str, coordinates: Dict[str, Tuple[float, float]],
+                           source: str = "gedcom") -> int:
+        """
+        Geocode places by name (adding them if needed), leaving manually placed ones alone
+
+        Args:
+            family_name: Family the places belong to
+            coordinates: Place name as written -> (latitude, longitude)
+            source: Where the coordinates came from (gedcom, gazetteer, manual)
+
+        Returns:
+            Number of places updated
+        """
+        coordinates = {name: point for name, point in coordinates.items() if valid_coordinates(*point)}
+        if not coordinates:
+            return 0
+        updated = 0
+        with self._lock, Session(self.engine) as session:
+            places = self._resolve_places(session, family_name, coordinates)
+            manual = set(session.execute(text("SELECT id FROM places WHERE family_name = :family "
+                                              "AND source = 'manual'"), {"family": family_name}).scalars())
+            for name, (latitude, longitude) in coordinates.items():
+                place_id = places[name]
+                if source == "manual" or place_id not in manual:
+                    self._store_coordinates(session, place_id, latitude, longitude, source)
+                    updated += 1
+            session.commit()
+        return updated
+
+    def set_coordinates(self, family_name: str, place_id: int, latitude: float, longitude: float) -> bool:
+        """Place one place by hand; False if it is not in the family"""
+        with self._lock, Session(self.engine) as session:
+            found = session.execute(text("SELECT 1 FROM places WHERE id = :id AND family_name = :family"),
+                                    {"id": place_id, "family": family_name}).first()
+            if found:
+                self._store_coordinates(session, place_id, latitude, longitude, "manual")
+                session.commit()
+        return bool(found)
+
+    def geocode(self, family_name: str, gazetteer: Dict[str, Tuple[float, float]]) -> Tuple[int, int]:
+        """
+        Fill in coordinates for the family's places from a gazetteer
+
+        Returns:
+            (places geocoded, places still without coordinates)
+        """
+        with Session(self.engine) as session:
+            missing = session.execute(text("SELECT name, key FROM places WHERE family_name = :family "
+                                           "AND latitude IS NULL"), {"family": family_name}).all()
+        found = {name: point for name, key in missing if (point := geocode_key(key, gazetteer))}
+        self.record_coordinates(family_name, found, source="gazetteer")
+        return len(found), len(missing) - len(found)
+
+    def ungeocoded(self, family_name: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Places without coordinates, most used first"""
+        self.sync(family_name)
+        with Session(self.engine) as session:
+            rows = session.execute(text("""
+                SELECT p.id, p.name, COUNT(s.event_id) AS events FROM places p
+                LEFT JOIN event_spans s ON s.place_id = p.id
+                WHERE p.family_name = :family AND p.latitude IS NULL
+                GROUP BY p.id, p.name ORDER BY events DESC, p.id LIMIT :limit
+            """), {"family": family_name, "limit": limit}).all()
+        return [{"id": row.id, "name": row.name, "events": row.events} for row in rows]
+
+    def places_within(self, session: Session, family_name: str,
+                      south: float, west: float, north: float, east: float) -> List[int]:
+        """Ids of the family's geocoded places inside a bounding box (west > east crosses the antimeridian)"""
+        ids = []
+        for low, high in _lon_ranges(west, east):
+            params = {"family": family_name, "south": south, "north": north, "west": low, "east": high}
+            if self._rtree:
+                sql = """
+                    SELECT r.id FROM place_rtree r CROSS JOIN places p ON p.id = r.id
+                    WHERE r.min_lat <= :north AND r.max_lat >= :south AND r.min_lon <= :east AND r.max_lon >= :west
+                      AND p.family_name = :family
+                """
+            else:
+                sql = """
+                    SELECT id FROM places WHERE latitude BETWEEN :south AND :north
+                      AND longitude BETWEEN :west AND :east AND family_name = :family
+                """
+            ids.extend(session.execute(text(sql), params).scalars())
+        return ids
+
+    @staticmethod
+    def _window(start_year: int, end_year: int) -> Tuple[List[str], Dict[str, int]]:
+        """
+        One WHERE clause per span class for spans overlapping the window, and their parameters
+
+        A span in class k overlaps [start, end] only if it starts in
+        [start - SPAN_CLASSES[k], end], so each clause is a bounded range scan.
+        """
+        params = {"start_day": date(start_year, 1, 1).toordinal(), "end_day": date(end_year, 12, 31).toordinal()}
+        clauses = []
+        for number, longest in enumerate(SPAN_CLASSES):
+            params[f"low{number}"] = max(1, params["start_day"] - longest)
+            clauses.append(f"s.span_class = {number} AND s.start_day BETWEEN :low{number} AND :end_day "
+                           f"AND s.end_day >= :start_day")
+        clauses.append(f"s.span_class = {len(SPAN_CLASSES)} AND s.start_day <= :end_day AND s.end_day >= :start_day")
+        return clauses, params
+
+    def _place_scope(self, family_name: str, place_ids: List[int]) -> str:
+        """
+        WHERE clause for windowed spans at some places
+
+        Places are looked up one by one in ix_event_spans_place, unless the box
+        holds a large share of the family's places: then it is cheaper to read the
+        window from ix_event_spans_window and check the place (the unary + stops
+        SQLite from using the place index for it).
+        """
+        if len(place_ids) > WINDOW_SCAN_SHARE * len(self._place_ids.get(family_name) or ()):
+            return "s.family_name = :family AND +s.place_id IN :places"
+        return "s.place_id IN :places"
+
+    def map(self, family_name: str, south: float, west: float, north: float, east: float,
+            start_year: Optional[int] = None, end_year: Optional[int] = None,
+            limit: int = 500) -> List[Dict[str, Any]]:
+        """
+        Geocoded places inside a bounding box with their event and people counts
+
+        Args:
+            family_name: Family to look in
+            south, west, north, east: Bounding box in degrees
+            start_year, end_year: Only count events that could fall in these years
+            limit: Most places returned (busiest first)
+        """
+        self.sync(family_name)
+        with Session(self.engine) as session:
+            place_ids = self.places_within(session, family_name, south, west, north, east)
+            if not place_ids:
+                return []
+            params: Dict[str, Any] = {"family": family_name, "places": place_ids}
+            if start_year is None:
+                spans = "SELECT s.place_id, s.person_id FROM event_spans s WHERE s.place_id IN :places"
+            else:
+                clauses, window = self._window(start_year, end_year)
+                params.update(window)
+                scope = self._place_scope(family_name, place_ids)
+                spans = " UNION ALL ".join(f"SELECT s.place_id, s.person_id FROM event_spans s "
+                                           f"WHERE {scope} AND {clause}" for clause in clauses)
+            sql = text(f"""
+                SELECT p.id, p.name, p.latitude, p.longitude, c.events, c.people FROM (
+                    SELECT place_id, COUNT(*) AS events, COUNT(DISTINCT person_id) AS people
+                    FROM ({spans}) s GROUP BY place_id
+                ) c JOIN places p ON p.id = c.place_id
+                ORDER BY c.events DESC, p.id LIMIT :limit
+            """).bindparams(bindparam("places", expanding=True))
+            rows = session.execute(sql, {**params, "limit": limit}).all()
+        return [{"id": row.id, "name": row.name, "latitude": row.latitude, "longitude": row.longitude,
+                 "events": row.events, "people": row.people} for row in rows]
+
+    def timeline(self, family_name: str, start_year: int, end_year: int,
+                 bbox: Optional[Tuple[float, float, float, float]] = None, limit: int = 100,
+                 after_day: Optional[int] = None, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Events that could fall between two years, earliest first
+
+        Args:
+            family_name: Family to look in
+            start_year, end_year: Time window (inclusive)
+            bbox: Optional (south, west, north, east) to keep only events at places inside it
+            limit: Page size
+            after_day, after_id: start_day and event_id of the last event on the previous page
+        """
+        self.sync(family_name)
+        with Session(self.engine) as session:
+            clauses, params = self._window(start_year, end_year)
+            params.update({"family": family_name, "limit": limit})
+            if bbox is None:
+                scope = "s.family_name = :family"
+            else:
+                params["places"] = self.places_within(session, family_name, *bbox)
+                if not params["places"]:
+                    return []
+                scope = self._place_scope(family_name, params["places"])
+            if after_day is not None:
+                scope += " AND (s.start_day > :after_day OR (s.start_day = :after_day AND s.event_id > :after_id))"
+                params.update({"after_day": after_day, "after_id": after_id or 0})
+
+            # Each class is read in start order up to the page size; only the merged page is joined to events
+            pages = " UNION ALL ".join(
+                f"SELECT * FROM (SELECT s.event_id, s.start_day, s.end_day, s.place_id FROM event_spans s "
+                f"WHERE {scope} AND {clause} ORDER BY s.start_day, s.event_id LIMIT :limit)" for clause in clauses)
+            sql = text(f"""
+                SELECT s.event_id, s.start_day, s.end_day, s.place_id, e.person_id, e.event_type, e.date, e.place,
+                       p.given_name, p.surname, pl.latitude, pl.longitude
+                FROM (SELECT * FROM ({pages}) ORDER BY start_day, event_id LIMIT :limit) s
+                JOIN events e ON e.id = s.event_id JOIN people p ON p.id = e.person_id
+                LEFT JOIN places pl ON pl.id = s.place_id
+                ORDER BY s.start_day, s.event_id LIMIT :limit
+            """)
+            if "places" in params:
+                sql = sql.bindparams(bindparam("places", expanding=True))
+            rows = session.execute(sql, params).all()
+        results = []
+        for row in rows:
+            results.append({
+                "event_id": row.event_id,
+                "person_id": row.person_id,
+                "name": f"{row.given_name} {row.surname}".strip(),
+                "event_type": row.event_type,
+                "date": row.date,
+                "start": _day_iso(row.start_day),
+                "end": _day_iso(row.end_day),
+                "start_day": row.start_day,
+                "place": row.place,
+                "place_id": row.place_id,
+                "latitude": row.latitude,
+                "longitude": row.longitude,
+            })
+        return results
+
+
+# Global instance
+place_index = PlaceIndexService()
+
+
+def get_place_index() -> PlaceIndexService:
+    """Get place index service instance"""
+    return place_index
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Index a family's events by date and place, and geocode places")
+    parser.add_argument("--family", required=True, help="Family to index (e.g. bull)")
+    parser.add_argument("--gazetteer", type=Path, help="CSV of name, latitude, longitude to geocode places from")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    db_manager.init_database()
+    index = get_place_index()
+    start = time.perf_counter()
+    indexed = index.sync(args.family)
+    print(f"✓ Indexed {indexed:,} new events for {args.family} in {time.perf_counter() - start:.1f}s")
+    if args.gazetteer:
+        found, missing = index.geocode(args.family, load_gazetteer(args.gazetteer))
+        print(f"✓ Geocoded {found:,} places from {args.gazetteer} ({missing:,} not found)")
+    remaining = index.ungeocoded(args.family)
+    if remaining:
+        print("Busiest places without coordinates:")
+        for place in remaining:
+            print(f"  {place['id']:>6}  {place['events']:>6} events  {place['name']}")
+
+
+if __name__ == "__main__":
+    main()
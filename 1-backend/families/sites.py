@@ -0,0 +1,385 @@
+"""
+Family site serving for Family Genealogy Platform
+Resolves /families/{family}/{path} to a file in the family's built site and
+picks the representation to send: the .br/.gz sibling written at build time
+when the client accepts it, with a strong ETag taken from the deploy
+manifest's SHA-256. SiteFileResponse answers single byte ranges and hands
+the file to the server (zero-copy send, or nginx X-Accel-Redirect) when it can.
+"""
+
+import json
+import logging
+import mimetypes
+import os
+import re
+import stat
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "deploy-manifest.json"  # Written by scripts/sitebuild/compress.py
+DATA_DIR = "data"  # Structured records the pages are generated from; never served
+INDEX_PAGE = "index.html"
+MANIFEST_CHECK_SECONDS = 1.0  # How often the manifest's mtime is checked for a new deploy
+CHUNK_SIZE = 256 * 1024
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # Preference order when the client accepts both
+MANIFEST_KEYS = {"br": "br", "gzip": "gz"}
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+# Written by scripts/sitebuild/image_store.py under the file's SHA-256, so a name never changes content
+IMMUTABLE_RE = re.compile(r"/images/store/[0-9a-f]{64}\.\w+$")
+REVALIDATE = "private, no-cache"
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+mimetypes.add_type("text/markdown", ".md")
+mimetypes.add_type("image/webp", ".webp")
+
+
+DEFAULT_SITES_ROOT = Path(__file__).resolve().parents[2] / "2-family-sites"
+
+
+def sites_root() -> Path:
+    """Directory holding one site directory per family (FAMILY_SITES_DIR, default the repo's 2-family-sites)"""
+    configured = os.getenv("FAMILY_SITES_DIR")
+    return Path(configured) if configured else DEFAULT_SITES_ROOT
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> set:
+    """Content codings an Accept-Encoding header allows (q > 0)"""
+    accepted = set()
+    refused = set()
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        (accepted if quality > 0 else refused).add(coding.strip())
+    if "*" in accepted:
+        accepted.update(coding for coding, _ in ENCODINGS if coding not in refused)
+    return accepted
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag (RFC 9110 13.1.2)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range
+
+    Returns:
+        Inclusive (start, end), or None to ignore the header and send the whole
+        file (multiple ranges, other units, malformed, empty file)
+
+    Raises:
+        ValueError: The range cannot be satisfied (416)
+    """
+    match = RANGE_RE.match(header.strip().replace(" ", ""))
+    if not match or match.group(1) == match.group(2) == "" or size == 0:
+        return None  # An empty file has no bytes to slice: it is sent whole
+    first, last = match.groups()
+    if first == "":
+        length = int(last)  # Suffix range: the last N bytes
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range starts past the end of the file")
+    return start, end
+
+
+@lru_cache(maxsize=256)
+def content_type(name: str) -> str:
+    """Content-Type for a file name, with a charset for text"""
+    guessed, _ = mimetypes.guess_type(name)
+    guessed = guessed or "application/octet-stream"
+    if guessed.startswith("text/") or guessed in ("application/javascript", "application/json"):
+        guessed += "; charset=utf-8"
+    return guessed
+
+
+@dataclass
+class SiteFile:
+    """The representation of a site file chosen for one request"""
+    path: str  # File to send: the original or its .br/.gz sibling
+    key: str  # The same, relative to the sites root (bull/annie.html.br)
+    size: int
+    mtime: float
+    content_type: str
+    etag: str
+    encoding: Optional[str] = None  # br or gzip when a precompressed sibling was chosen
+    negotiable: bool = False  # Other codings exist, so responses vary on Accept-Encoding
+
+
+class SiteFileService:
+    """Maps family site paths to files and keeps the deploy manifest loaded"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self._root = root
+        self._manifest: Dict[str, Dict] = {}
+        self._written: Dict[str, float] = {}  # Manifest key -> mtime of the manifest that listed it
+        self._manifest_files: Dict[str, Tuple[float, Dict[str, Dict]]] = {}  # Path -> (mtime, prefixed entries)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        return self._root or sites_root()
+
+    def manifest(self) -> Dict[str, Dict]:
+        """
+        File entries of the deploy manifests, reloaded when a deploy rewrites one
+
+        Reads the sites-wide manifest (compress.py without --family) and each
+        family's own (compress.py --family, or the build orchestrator). Keys
+        are paths relative to the sites root (bull/annie.html); where both
+        list a file, the more recently written manifest wins.
+        """
+        now = time.monotonic()
+        if now - self._checked_at < MANIFEST_CHECK_SECONDS:
+            return self._manifest
+        with self._lock:
+            self._checked_at = now
+            mtimes = {}
+            for manifest_file, _ in self._manifest_paths():
+                try:
+                    mtimes[manifest_file] = os.stat(manifest_file).st_mtime
+                except OSError:
+                    continue
+            if mtimes != {path: loaded[0] for path, loaded in self._manifest_files.items()}:
+                self._reload(mtimes)
+        return self._manifest
+
+    def _manifest_paths(self) -> List[Tuple[str, str]]:
+        """(manifest path, key prefix) for the sites-wide manifest and every family's"""
+        paths = [(os.path.join(self.root, MANIFEST_NAME), "")]
+        try:
+            with os.scandir(self.root) as entries:
+                for entry in entries:
+                    if entry.is_dir() and not entry.name.startswith("."):
+                        paths.append((os.path.join(entry.path, MANIFEST_NAME), f"{entry.name}/"))
+        except OSError:
+            pass
+        return paths
+
+    def _reload(self, mtimes: Dict[str, float]):
+        """Re-read the manifests whose mtime changed and merge all of them"""
+        prefixes = dict(self._manifest_paths())
+        loaded = {}
+        for manifest_file, mtime in mtimes.items():
+            previous = self._manifest_files.get(manifest_file)
+            if previous and previous[0] == mtime:
+                loaded[manifest_file] = previous
+                continue
+            try:
+                files = json.loads(Path(manifest_file).read_text(encoding="utf-8"))["files"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable site manifest {manifest_file}: {e}")
+                files = {}
+            prefix = prefixes.get(manifest_file, "")
+            loaded[manifest_file] = (mtime, {f"{prefix}{key}": entry for key, entry in files.items()})
+            logger.info(f"Loaded site manifest {manifest_file}: {len(files)} files")
+        merged: Dict[str, Dict] = {}
+        written: Dict[str, float] = {}
+        for mtime, files in sorted(loaded.values(), key=lambda item: item[0]):
+            merged.update(files)
+            written.update(dict.fromkeys(files, mtime))
+        self._manifest_files, self._manifest, self._written = loaded, merged, written
+
+    def resolve(self, family_name: str, path: str) -> Optional[Tuple[str, str, os.stat_result]]:
+        """
+        The file a request path names inside the family's site
+
+        Directories map to their index.html. Page data, dotfiles (and with
+        them ..) are never served, so a path cannot leave the family's
+        directory. This runs on every request, so it is string joins and a
+        stat() or two rather than Path.resolve().
+
+        Returns:
+            (filesystem path, manifest key, stat result), or None
+        """
+        parts = [part for part in path.split("/") if part]
+        if (any(part.startswith(".") or "\\" in part or "\0" in part for part in parts)
+                or (parts and parts[0] == DATA_DIR) or "/" in family_name or family_name.startswith(".")):
+            return None
+        key = "/".join([family_name, *parts])
+        try:
+            info = os.stat(os.path.join(self.root, key))
+            if stat.S_ISDIR(info.st_mode):
+                key = f"{key}/{INDEX_PAGE}"
+                info = os.stat(os.path.join(self.root, key))
+        except (OSError, ValueError):
+            return None
+        if not stat.S_ISREG(info.st_mode):
+            return None
+        return os.path.join(self.root, key), key, info
+
+    def select(self, family_name: str, path: str, accept_encoding: Optional[str] = None,
+               identity: bool = False) -> Optional[SiteFile]:
+        """
+        Choose the representation of a site file to send
+
+        Args:
+            family_name: Family site
+            path: Path below /families/{family}/
+            accept_encoding: The request's Accept-Encoding header
+            identity: Skip precompressed siblings (range requests address the original bytes)
+
+        Returns:
+            The chosen SiteFile, or None when there is no such file
+        """
+        resolved = self.resolve(family_name, path)
+        if resolved is None:
+            return None
+        source, key, info = resolved
+        entry = self.manifest().get(key)
+        if entry and entry.get("size") == info.st_size and info.st_mtime <= self._written.get(key, 0):
+            # Strong validator: the content hash the build recorded for exactly these bytes
+            tag = entry["sha256"][:32]
+            codings = [(coding, suffix) for coding, suffix in ENCODINGS if entry.get(MANIFEST_KEYS[coding])]
+        else:
+            # Not in the manifest (or changed since the build): all we know is size and mtime.
+            # A sibling older than the file was compressed from earlier content, so it is skipped
+            tag = None
+            codings = [(coding, suffix) for coding, suffix in ENCODINGS
+                       if fresh_sibling(source + suffix, info.st_mtime)]
+
+        chosen = SiteFile(path=source, key=key, size=info.st_size, mtime=info.st_mtime,
+                          content_type=content_type(key),
+                          etag=f'"{tag}"' if tag else f'W/"{info.st_size:x}-{info.st_mtime_ns:x}"',
+                          negotiable=bool(codings))
+        if identity or not codings:
+            return chosen
+        accepted = accepted_encodings(accept_encoding)
+        for coding, suffix in codings:
+            if coding not in accepted:
+                continue
+            try:
+                sibling = os.stat(source + suffix)
+            except FileNotFoundError:
+                continue
+            chosen.path, chosen.key = source + suffix, key + suffix
+            chosen.size, chosen.encoding = sibling.st_size, coding
+            # Each coding is a different representation, so it gets its own strong tag
+            chosen.etag = (f'"{tag}-{suffix[1:]}"' if tag
+                           else f'W/"{sibling.st_size:x}-{sibling.st_mtime_ns:x}"')
+            break
+        return chosen
+
+
+def fresh_sibling(path: str, source_mtime: float) -> bool:
+    """Whether a precompressed sibling exists and was written no earlier than its source"""
+    try:
+        return os.stat(path).st_mtime >= source_mtime
+    except OSError:
+        return False
+
+
+def cache_control_for(key: str) -> str:
+    """Content-addressed store files can be kept without revalidating; everything else revalidates"""
+    return IMMUTABLE if IMMUTABLE_RE.search(key) else REVALIDATE
+
+
+def file_headers(site_file: SiteFile, cache_control: str) -> Dict[str, str]:
+    """Validator and caching headers shared by 200, 206 and 304 responses"""
+    headers = {
+        "etag": site_file.etag,
+        "last-modified": formatdate(site_file.mtime, usegmt=True),
+        "cache-control": cache_control,
+    }
+    if site_file.negotiable:
+        headers["vary"] = "Accept-Encoding"
+    return headers
+
+
+class SiteFileResponse(Response):
+    """
+    Sends a SiteFile, or one byte range of it
+
+    The body goes out as http.response.zerocopysend (sendfile) or
+    http.response.pathsend when the ASGI server offers them, as an
+    X-Accel-Redirect to accel_prefix when nginx sits in front, and as
+    chunked reads otherwise.
+    """
+
+    def __init__(self, site_file: SiteFile, headers: Dict[str, str], byte_range: Optional[Tuple[int, int]] = None,
+                 accel_prefix: Optional[str] = None):
+        self.site_file = site_file
+        self.byte_range = byte_range
+        self.accel_prefix = accel_prefix
+        self.background = None
+        headers = dict(headers)
+        headers["content-type"] = site_file.content_type
+        headers["accept-ranges"] = "none" if site_file.encoding else "bytes"
+        if site_file.encoding:
+            headers["content-encoding"] = site_file.encoding
+        start, end = byte_range or (0, site_file.size - 1)
+        self.status_code = 206 if byte_range else 200
+        if byte_range:
+            headers["content-range"] = f"bytes {start}-{end}/{site_file.size}"
+        if accel_prefix:
+            # nginx serves the bytes (and any range) itself from an internal location
+            headers["x-accel-redirect"] = accel_prefix.rstrip("/") + "/" + site_file.key
+            self.status_code = 200
+            headers.pop("content-range", None)
+        else:
+            headers["content-length"] = str(end - start + 1)
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.accel_prefix:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        start, end = self.byte_range or (0, self.site_file.size - 1)
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.site_file.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                            "offset": start, "count": end - start + 1})
+            return
+        if "http.response.pathsend" in extensions and self.byte_range is None:
+            await send({"type": "http.response.pathsend", "path": self.site_file.path})
+            return
+        # Blocking reads: site files are small or sit in the page cache, and a threadpool hop per
+        # chunk costs more than the read itself
+        with open(self.site_file.path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+# Global instance
+site_files = SiteFileService()
+
+
+def get_site_files() -> SiteFileService:
+    """Get site file service instance"""
+    return site_files
@@ -0,0 +1,393 @@
+"""
+Story search for Family Genealogy Platform
+Full-text search over the family site pages (and structured stories added
+through the API) with SQLite FTS5: bm25-ranked, title hits weighted above
+body hits, with highlighted snippets. Pages are reindexed only when their
+content hash changes.
+"""
+
+import argparse
+import hashlib
+import html
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple, Any
+from sqlalchemy import bindparam, text
+from sqlmodel import Session
+
+from db.models import db_manager, is_valid_family
+from families.sites import sites_root
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 5.0  # bm25 weight of a title hit relative to a body hit
+SNIPPET_TOKENS = 16
+MAX_QUERY_TERMS = 12
+STORY_PREFIX = "story/"  # Paths of structured stories; site pages are plain file names
+
+# Snippets are marked with control characters, escaped, then given <mark> tags
+_MARK_OPEN, _MARK_CLOSE = "\x02", "\x03"
+QUERY_RE = re.compile(r'"([^"]*)"|([^\W_]+)(\*?)')
+TERM_RE = re.compile(r"[^\W_]+")
+
+
+class _PageText(HTMLParser):
+    """Collects the <h1> and text inside <div class="content">, falling back to <title>"""
+
+    BLOCK_TAGS = {"p", "div", "li", "h1", "h2", "h3", "h4", "br", "pre", "tr", "td", "th", "caption", "dt", "dd"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0  # <div> nesting inside the content area, 0 = outside
+        self.skip = 0
+        self.in_title = False
+        self.in_heading = False
+        self.title = ""
+        self.heading: List[str] = []
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self.in_title = True
+        elif tag == "div":
+            if self.depth:
+                self.depth += 1
+            elif ("class", "content") in attrs:
+                self.depth = 1
+        if not self.depth:
+            return
+        if tag in ("script", "style"):
+            self.skip += 1
+        elif tag == "h1" and not self.heading:
+            self.in_heading = True
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self.in_title = False
+        if not self.depth:
+            return
+        if tag in ("script", "style"):
+            self.skip -= 1
+        elif tag == "h1":
+            self.in_heading = False
+        elif tag == "div":
+            self.depth -= 1
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        elif self.depth and not self.skip:
+            self.parts.append(data)
+            if self.in_heading:
+                self.heading.append(data)
+
+
+def page_text(page: str) -> Tuple[str, str]:
+    """
+    Extract the title and plain text of a site page
+
+    Returns:
+        (title, text); title is the first <h1> of the content area, else <title>
+    """
+    parser = _PageText()
+    parser.feed(page)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    body = "\n".join(line for line in lines if line)
+    title = " ".join("".join(parser.heading).split()) or " ".join(parser.title.split())
+    return title, body
+
+
+def match_query(query: str) -> Optional[str]:
+    """
+    Turn what a user typed into an FTS5 query
+
+    Words are quoted so FTS5 operators and punctuation cannot break the
+    query; "quoted phrases" stay phrases and a trailing * keeps a prefix.
+    All terms must match.
+
+    Returns:
+        The MATCH expression, or None when the query has no searchable words
+    """
+    terms = []
+    for phrase, word, star in QUERY_RE.findall(query):
+        if phrase:
+            words = TERM_RE.findall(phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+        elif word:
+            terms.append(f'"{word}"' + ("*" if star else ""))
+    return " ".join(terms[:MAX_QUERY_TERMS]) or None
+
+
+def highlight(snippet: str) -> str:
+    """Escape a marked snippet for HTML, put it on one line and turn the markers into <mark> tags"""
+    return html.escape(" ".join(snippet.split())).replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+_INSERT_STORY_SQL = text("""
+    INSERT INTO stories (family_name, path, title, body, source, content_hash, indexed_at)
+    VALUES (:family, :path, :title, :body, :source, :hash, :now)
+""")
+_DELETE_FTS_SQL = text("INSERT INTO story_fts (story_fts, rowid, family_name, title, body) "
+                       "VALUES ('delete', :id, :family, :title, :body)")
+
+
+class StorySearchService:
+    """Keeps the stories table and its FTS5 index in step with the family sites"""
+
+    def __init__(self, engine=None, root: Optional[Path] = None):
+        self._engine = engine
+        self._root = root
+        self._synced: set = set()  # Families whose site was checked since the last invalidate
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        return self._engine or db_manager.engine
+
+    @property
+    def root(self) -> Path:
+        return self._root or sites_root()
+
+    def _fts(self, session: Session) -> bool:
+        """Whether the FTS5 index exists (SQLite); otherwise search falls back to LIKE"""
+        return session.get_bind().dialect.name == "sqlite"
+
+    def _write(self, session: Session, fts: bool, family_name: str, path: str, title: str, body: str,
+               source: str, content_hash: str, old=None):
+        """Insert or replace one story and its index entry; old is the row it was indexed with"""
+        now = datetime.now(timezone.utc)
+        if old is None:
+            session.execute(_INSERT_STORY_SQL, {"family": family_name, "path": path, "title": title, "body": body,
+                                                "source": source, "hash": content_hash, "now": now})
+            story_id = session.execute(text("SELECT id FROM stories WHERE family_name = :family AND path = :path"),
+                                       {"family": family_name, "path": path}).scalar()
+        else:
+            story_id = old.id
+            if fts:
+                # External-content FTS5 tables delete entries by the values they were indexed with
+                session.execute(_DELETE_FTS_SQL, {"id": story_id, "family": family_name, "title": old.title,
+                                                  "body": old.body})
+            session.execute(text("""
+                UPDATE stories SET title = :title, body = :body, source = :source,
+                    content_hash = :hash, indexed_at = :now WHERE id = :id
+            """), {"id": story_id, "title": title, "body": body, "source": source, "hash": content_hash,
+                   "now": now})
+        if fts:
+            session.execute(text("INSERT INTO story_fts (rowid, family_name, title, body) "
+                                 "VALUES (:id, :family, :title, :body)"),
+                            {"id": story_id, "family": family_name, "title": title, "body": body})
+        return story_id
+
+    def _indexed(self, session: Session, story_id: int):
+        """The values a story was indexed with (external-content FTS5 deletes need them)"""
+        return session.execute(text("SELECT id, family_name, title, body FROM stories WHERE id = :id"),
+                               {"id": story_id}).first()
+
+    def _delete(self, session: Session, fts: bool, rows):
+        for row in rows:
+            if fts:
+                session.execute(_DELETE_FTS_SQL, {"id": row.id, "family": row.family_name, "title": row.title,
+                                                  "body": row.body})
+            session.execute(text("DELETE FROM stories WHERE id = :id"), {"id": row.id})
+
+    def sync_site(self, family_name: str) -> Dict[str, int]:
+        """
+        Bring the index in line with the family's site pages
+
+        Every page is hashed; only pages whose hash changed are parsed and
+        reindexed, and pages that disappeared are dropped. Structured
+        stories are left alone.
+
+        Returns:
+            Counts of added, updated, removed and unchanged pages
+        """
+        site_dir = self.root / family_name
+        pages = {}
+        if site_dir.is_dir():
+            for path in sorted(site_dir.glob("*.html")):
+                pages[path.name] = path
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with self._lock, Session(self.engine) as session:
+            fts = self._fts(session)
+            indexed = {row.path: row for row in session.execute(text("""
+                SELECT id, path, content_hash FROM stories WHERE family_name = :family AND source = 'site'
+            """), {"family": family_name})}
+            added = []
+            for name, path in pages.items():
+                data = path.read_bytes()
+                content_hash = hashlib.sha256(data).hexdigest()
+                old = indexed.get(name)
+                if old is not None and old.content_hash == content_hash:
+                    counts["unchanged"] += 1
+                    continue
+                title, body = page_text(data.decode("utf-8", errors="replace"))
+                title = title or path.stem.replace("_", " ").title()
+                if old is None:
+                    added.append({"family": family_name, "path": name, "title": title, "body": body,
+                                  "source": "site", "hash": content_hash, "now": datetime.now(timezone.utc)})
+                    continue
+                self._write(session, fts, family_name, name, title, body, "site", content_hash,
+                            self._indexed(session, old.id))
+                counts["updated"] += 1
+            if added:
+                # New pages go in as one batch; the index picks them up by id
+                first = session.execute(text("SELECT COALESCE(MAX(id), 0) FROM stories")).scalar()
+                session.execute(_INSERT_STORY_SQL, added)
+                if fts:
+                    session.execute(text("INSERT INTO story_fts (rowid, family_name, title, body) "
+                                         "SELECT id, family_name, title, body FROM stories WHERE id > :first"),
+                                    {"first": first})
+                counts["added"] = len(added)
+            gone = [self._indexed(session, row.id) for name, row in indexed.items() if name not in pages]
+            self._delete(session, fts, gone)
+            counts["removed"] = len(gone)
+            session.commit()
+            self._synced.add(family_name)
+        if counts["added"] or counts["updated"] or counts["removed"]:
+            logger.info(f"Story index for {family_name}: {counts}")
+        return counts
+
+    def add_story(self, family_name: str, story_id: str, title: str, body: str) -> int:
+        """
+        Index (or reindex) a structured story under story/<story_id>
+
+        Returns:
+            The story's row id
+        """
+        path = STORY_PREFIX + story_id
+        content_hash = hashlib.sha256(f"{title}\0{body}".encode("utf-8")).hexdigest()
+        with self._lock, Session(self.engine) as session:
+            old = session.execute(text("""
+                SELECT id, family_name, title, body, content_hash FROM stories
+                WHERE family_name = :family AND path = :path
+            """), {"family": family_name, "path": path}).first()
+            if old is not None and old.content_hash == content_hash:
+                return old.id
+            row_id = self._write(session, self._fts(session), family_name, path, title, body, "story",
+                                 content_hash, old)
+            session.commit()
+        return row_id
+
+    def remove_story(self, family_name: str, story_id: str) -> bool:
+        """Drop a structured story from the index"""
+        with self._lock, Session(self.engine) as session:
+            rows = session.execute(text("""
+                SELECT id, family_name, title, body FROM stories WHERE family_name = :family AND path = :path
+            """), {"family": family_name, "path": STORY_PREFIX + story_id}).all()
+            self._delete(session, self._fts(session), rows)
+            session.commit()
+        return bool(rows)
+
+    def invalidate(self, family_name: str):
+        """Recheck the family's site pages on the next search"""
+        with self._lock:
+            self._synced.discard(family_name)
+
+    def search(self, families: List[str], query: str, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Search the stories of the given families, best match first
+
+        Args:
+            families: Families the caller may read (from the JWT families claim)
+            query: Words, "quoted phrases" and prefix* terms, all of which must match
+            limit: Results to return
+            offset: Results to skip, for paging
+
+        Returns:
+            Matches with family, path, title, highlighted snippet and score
+        """
+        families = [f for f in families if is_valid_family(f)]
+        expression = match_query(query)
+        if not families or not expression:
+            return []
+        for family_name in families:
+            if family_name not in self._synced:
+                self.sync_site(family_name)
+
+        with Session(self.engine) as session:
+            if not self._fts(session):
+                rows = [(row, 0.0) for row in session.execute(text("""
+                    SELECT s.family_name, s.path, s.title, s.source, NULL AS snippet
+                    FROM stories s WHERE s.family_name IN :families AND (s.title || ' ' || s.body) LIKE :pattern
+                    ORDER BY s.title LIMIT :limit OFFSET :offset
+                """).bindparams(bindparam("families", expanding=True)),
+                    {"families": families, "pattern": "%" + " ".join(TERM_RE.findall(query)) + "%",
+                     "limit": limit, "offset": offset})]
+            else:
+                # Rank first, then snippet only the page of results (snippet() is the costly part)
+                scope = " OR ".join(f'"{family_name}"' for family_name in families)
+                expression = f"family_name : ({scope}) AND {{title body}} : ({expression})"
+                ranked = session.execute(text(f"""
+                    SELECT rowid AS id, bm25(story_fts, 0.0, {TITLE_WEIGHT}, 1.0) AS rank FROM story_fts
+                    WHERE story_fts MATCH :query ORDER BY rank LIMIT :limit OFFSET :offset
+                """), {"query": expression, "limit": limit, "offset": offset}).all()
+                if not ranked:
+                    return []
+                snippets = {row.id: row for row in session.execute(text(f"""
+                    SELECT s.id, s.family_name, s.path, s.title, s.source,
+                           snippet(story_fts, 2, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet
+                    FROM story_fts JOIN stories s ON s.id = story_fts.rowid
+                    WHERE story_fts MATCH :query AND story_fts.rowid IN :ids
+                """).bindparams(bindparam("ids", expanding=True)),
+                    {"query": expression, "ids": [r.id for r in ranked], "open": _MARK_OPEN,
+                     "close": _MARK_CLOSE})}
+                rows = [(snippets[r.id], r.rank) for r in ranked if r.id in snippets]
+
+        results = []
+        for row, rank in rows:
+            site_page = row.source == "site"
+            results.append({
+                "family": row.family_name,
+                "path": row.path,
+                "url": f"/families/{row.family_name}/{row.path}" if site_page else None,
+                "title": row.title,
+                "snippet": highlight(row.snippet) if row.snippet else None,
+                "score": round(-rank, 4),  # bm25() is lower-is-better
+            })
+        return results
+
+
+# Global instance
+story_search = StorySearchService()
+
+
+def get_story_search() -> StorySearchService:
+    """Get story search service instance"""
+    return story_search
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Index a family's site pages for story search")
+    parser.add_argument("--family", required=True, help="Family site to index (e.g. bull)")
+    parser.add_argument("--search", help="Run a search once indexing is done")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    db_manager.init_database()
+    search = get_story_search()
+    start = time.perf_counter()
+    counts = search.sync_site(args.family)
+    print(f"✓ Indexed {args.family} site pages in {time.perf_counter() - start:.2f}s: "
+          + ", ".join(f"{count} {what}" for what, count in counts.items()))
+    if args.search:
+        for result in search.search([args.family], args.search):
+            print(f"  {result['score']:7.2f}  {result['path']:<32} {result['title']}")
+            print(f"           {result['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Family tree service for Family Genealogy Platform
+People, relationships and events per family, with an ancestor closure table
+kept up to date on every parent link so pedigree and descendant queries are
+single indexed lookups instead of recursive walks
+"""
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from db.models import Person, FamilyRelationship, Event, db_manager
+
+logger = logging.getLogger(__name__)
+
+MAX_GENERATIONS = 64
+
+# New paths through parent -> child: every ancestor of the parent (itself included)
+# to every descendant of the child (itself included)
+_LINK_CLOSURE_SQL = text("""
+    INSERT INTO ancestor_closure (ancestor_id, descendant_id, depth, family_name)
+    SELECT a.ancestor_id, d.descendant_id, a.depth + d.depth + 1, :family
+    FROM ancestor_closure a, ancestor_closure d
+    WHERE a.descendant_id = :parent AND d.ancestor_id = :child
+    ON CONFLICT DO NOTHING
+""")
+
+_SELF_CLOSURE_SQL = text("""
+    INSERT INTO ancestor_closure (ancestor_id, descendant_id, depth, family_name)
+    VALUES (:person, :person, 0, :family)
+    ON CONFLICT DO NOTHING
+""")
+
+_IS_ANCESTOR_SQL = text("""
+    SELECT 1 FROM ancestor_closure WHERE ancestor_id = :ancestor AND descendant_id = :descendant LIMIT 1
+""")
+
+# No GROUP BY: it steers SQLite onto the primary key and a scan of every depth.
+# Duplicate paths (pedigree collapse) are folded to the shortest in Python.
+_PEDIGREE_SQL = text("""
+    SELECT ancestor_id, depth FROM ancestor_closure
+    WHERE descendant_id = :person AND depth BETWEEN 1 AND :generations
+""")
+
+_DESCENDANTS_SQL = text("""
+    SELECT descendant_id, depth FROM ancestor_closure
+    WHERE ancestor_id = :person AND depth BETWEEN 1 AND :generations
+""")
+
+
+_BUMP_VERSION_SQL = text("""
+    INSERT INTO tree_versions (family_name, version, updated_at, cleared_at) VALUES (:family, 1, :now, :now)
+    ON CONFLICT (family_name) DO UPDATE SET version = tree_versions.version + 1, updated_at = :now,
+        cleared_at = CASE WHEN :cleared THEN :now ELSE tree_versions.cleared_at END
+""")
+
+_VERSION_SQL = text("SELECT version, updated_at, cleared_at FROM tree_versions WHERE family_name = :family")
+
+
+class TreeError(ValueError):
+    """Invalid change to a family tree"""
+
+
+def bump_tree_version(session: Session, family_name: str, cleared: bool = False):
+    """
+    Mark a family's tree as changed (caller commits, in the same transaction as the change)
+
+    Pass cleared=True when rows were deleted, so per-process indexes rebuild
+    instead of applying rows with higher ids.
+    """
+    session.execute(_BUMP_VERSION_SQL, {"family": family_name, "now": datetime.now(timezone.utc),
+                                        "cleared": cleared})
+
+
+def tree_state(session: Session, family_name: str) -> Tuple[str, str]:
+    """
+    (tree_version, epoch) of a family's tree
+
+    The epoch is when rows were last deleted (or the counter was created).
+    While it stays put, a change only added rows, with ids above any the
+    index has seen.
+    """
+    row = session.execute(_VERSION_SQL, {"family": family_name}).first()
+    version, updated_at, cleared_at = row if row else (0, None, None)
+    return hashlib.sha256(f"{family_name}:{version}:{updated_at}".encode()).hexdigest()[:20], str(cleared_at)
+
+
+def tree_version(session: Session, family_name: str) -> str:
+    """
+    Fingerprint of a family's tree: its change counter and when it last moved
+
+    The timestamp keeps a recreated database from repeating an old
+    fingerprint once its counter catches up.
+    """
+    return tree_state(session, family_name)[0]
+
+
+def insert_person(session: Session, person: Person) -> Person:
+    """Add a person and its depth-0 closure row (caller commits)"""
+    session.add(person)
+    session.flush()
+    session.execute(_SELF_CLOSURE_SQL, {"person": person.id, "family": person.family_name})
+    return person
+
+
+def link_parent(session: Session, family_name: str, parent_id: int, child_id: int) -> FamilyRelationship:
+    """
+    Record parent_id as a parent of child_id and extend the closure (caller commits)
+
+    Raises:
+        TreeError: If the link would make someone their own ancestor
+    """
+    if parent_id == child_id or session.execute(
+            _IS_ANCESTOR_SQL, {"ancestor": child_id, "descendant": parent_id}).first():
+        raise TreeError(f"Person {child_id} is already an ancestor of {parent_id}")
+
+    relationship = FamilyRelationship(
+        family_name=family_name,
+        person_id=parent_id,
+        related_id=child_id,
+        kind="parent"
+    )
+    session.add(relationship)
+    session.flush()
+    session.execute(_LINK_CLOSURE_SQL, {"family": family_name, "parent": parent_id, "child": child_id})
+    return relationship
+
+
+def link_spouses(session: Session, family_name: str, first_id: int, second_id: int) -> FamilyRelationship:
+    """Record a couple, stored once with the lower id first (caller commits)"""
+    if first_id == second_id:
+        raise TreeError("A person cannot be their own spouse")
+    low, high = sorted((first_id, second_id))
+    relationship = FamilyRelationship(family_name=family_name, person_id=low, related_id=high, kind="spouse")
+    session.add(relationship)
+    session.flush()
+    return relationship
+
+
+def rebuild_closure(session: Session, family_name: str) -> int:
+    """
+    Recompute a family's closure from its parent links, one generation per statement (caller commits)
+
+    Faster than per-link maintenance for bulk loads; returns the row count.
+    """
+    params = {"family": family_name}
+    session.execute(text("DELETE FROM ancestor_closure WHERE family_name = :family"), params)
+    session.execute(text("""
+        INSERT INTO ancestor_closure (ancestor_id, descendant_id, depth, family_name)
+        SELECT id, id, 0, family_name FROM people WHERE family_name = :family
+    """), params)
+    depth = 0
+    while True:
+        inserted = session.execute(text("""
+            INSERT INTO ancestor_closure (ancestor_id, descendant_id, depth, family_name)
+            SELECT DISTINCT r.person_id, c.descendant_id, c.depth + 1, :family
+            FROM ancestor_closure c
+            JOIN relationships r ON r.related_id = c.ancestor_id AND r.kind = 'parent'
+            WHERE c.family_name = :family AND c.depth = :depth
+            ON CONFLICT DO NOTHING
+        """), {**params, "depth": depth}).rowcount
+        if not inserted or depth >= 10 * MAX_GENERATIONS:
+            break
+        depth += 1
+    total = session.execute(
+        text("SELECT COUNT(*) FROM ancestor_closure WHERE family_name = :family"), params).scalar()
+    logger.info(f"Rebuilt ancestor closure for {family_name}: {total} rows, {depth + 1} generations")
+    return total
+
+
+def person_summary(person: Person) -> Dict[str, Any]:
+    """Compact JSON form used in tree responses"""
+    return {
+        "id": person.id,
+        "given_name": person.given_name,
+        "surname": person.surname,
+        "sex": person.sex,
+        "birth_year": person.birth_year,
+        "death_year": person.death_year,
+        "slug": person.slug,
+    }
+
+
+class FamilyTreeService:
+    """Reads and writes family trees with closure maintenance"""
+
+    def __init__(self, engine=None):
+        self._engine = engine
+
+    @property
+    def engine(self):
+        return self._engine or db_manager.engine
+
+    def get_person(self, family_name: str, person_id: int) -> Optional[Person]:
+        """Get a person, only if they belong to the family"""
+        with Session(self.engine) as session:
+            person = session.get(Person, person_id)
+            if person is None or person.family_name != family_name:
+                return None
+            return person
+
+    def add_person(self, family_name: str, **fields) -> Person:
+        """Create a person in a family"""
+        with Session(self.engine) as session:
+            person = insert_person(session, Person(family_name=family_name, **fields))
+            bump_tree_version(session, family_name)
+            session.commit()
+            session.refresh(person)
+            return person
+
+    def add_relationship(self, family_name: str, person_id: int, related_id: int,
+                         kind: str = "parent") -> FamilyRelationship:
+        """
+        Link two people of the same family
+
+        Args:
+            family_name: Family both people belong to
+            person_id: Parent (kind=parent) or either spouse
+            related_id: Child (kind=parent) or the other spouse
+            kind: parent or spouse
+
+        Returns:
+            The stored relationship
+        """
+        with Session(self.engine) as session:
+            for pid in (person_id, related_id):
+                person = session.get(Person, pid)
+                if person is None or person.family_name != family_name:
+                    raise TreeError(f"Person {pid} not found in {family_name}")
+
+            if kind == "parent":
+                relationship = link_parent(session, family_name, person_id, related_id)
+            elif kind == "spouse":
+                relationship = link_spouses(session, family_name, person_id, related_id)
+            else:
+                raise TreeError(f"Unknown relationship kind: {kind}")
+
+            bump_tree_version(session, family_name)
+            session.commit()
+            session.refresh(relationship)
+            return relationship
+
+    def add_event(self, family_name: str, person_id: int, event_type: str, date: str = None,
+                  year: int = None, place: str = None, description: str = None) -> Event:
+        """Record an event, keeping the person's birth/death year in step"""
+        with Session(self.engine) as session:
+            person = session.get(Person, person_id)
+            if person is None or person.family_name != family_name:
+                raise TreeError(f"Person {person_id} not found in {family_name}")
+
+            event = Event(
+                family_name=family_name,
+                person_id=person_id,
+                event_type=event_type,
+                date=date,
+                year=year,
+                place=place,
+                description=description
+            )
+            session.add(event)
+            if year is not None and event_type in ("birth", "death"):
+                setattr(person, f"{event_type}_year", year)
+                session.add(person)
+            bump_tree_version(session, family_name)
+            session.commit()
+            session.refresh(event)
+            return event
+
+    def _related_people(self, sql, family_name: str, person_id: int, generations: int) -> Dict[str, Any]:
+        """People reached through one closure lookup, plus the parent links among them"""
+        generations = max(1, min(generations, MAX_GENERATIONS))
+        with Session(self.engine) as session:
+            depths: Dict[int, int] = {}
+            for pid, depth in session.execute(sql, {"person": person_id, "generations": generations}):
+                if depth < depths.get(pid, depth + 1):
+                    depths[pid] = depth
+            ids = list(depths) + [person_id]
+            people = session.exec(select(Person).where(Person.id.in_(ids))).all() if depths else []
+            links = session.exec(select(FamilyRelationship.person_id, FamilyRelationship.related_id).where(
+                FamilyRelationship.kind == "parent",
+                FamilyRelationship.person_id.in_(ids),
+                FamilyRelationship.related_id.in_(ids)
+            )).all() if depths else []
+
+        members = sorted(
+            ({**person_summary(p), "generation": depths[p.id]}
+             for p in people if p.id in depths and p.family_name == family_name),
+            key=lambda p: (p["generation"], p["id"])
+        )
+        return {
+            "person_id": person_id,
+            "generations": generations,
+            "people": members,
+            "parent_links": [[parent, child] for parent, child in links]
+        }
+
+    def pedigree(self, family_name: str, person_id: int, generations: int = 4) -> Dict[str, Any]:
+        """Ancestors up to N generations back (generation 1 = parents)"""
+        return self._related_people(_PEDIGREE_SQL, family_name, person_id, generations)
+
+    def descendants(self, family_name: str, person_id: int, generations: int = 4) -> Dict[str, Any]:
+        """Descendants up to N generations down (generation 1 = children)"""
+        return self._related_people(_DESCENDANTS_SQL, family_name, person_id, generations)
+
+    def tree_version(self, family_name: str) -> str:
+        """Fingerprint of a family's tree for conditional requests; changes with every write"""
+        with Session(self.engine) as session:
+            return tree_version(session, family_name)
+
+    def rebuild_closure(self, family_name: str) -> int:
+        """Recompute a family's closure from its parent links (see rebuild_closure); returns the row count"""
+        with Session(self.engine) as session:
+            total = rebuild_closure(session, family_name)
+            session.commit()
+        return total
+
+
+# Global instance
+family_tree = FamilyTreeService()
+
+
+def get_family_tree() -> FamilyTreeService:
+    """Get family tree service instance"""
+    return family_tree
@@ -6,10 +6,13 @@ Multi-family authentication and access control service
 import os
 import secrets
 import logging
+import tempfile
+from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, List
-from fastapi import FastAPI, HTTPException, Depends, Query, Cookie, Request, Response
-from fastapi.responses import RedirectResponse, JSONResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Depends, Query, Cookie, Request, Response, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, EmailStr
@@ -22,7 +25,18 @@ load_dotenv()
 # Import our modules
 from db.models import init_db, get_session, db_manager, is_valid_family, get_valid_families, FamilyInvitationCode
 from auth.google import get_google_auth, GoogleAuthService
+from auth.verdicts import get_family_access, bearer_token, family_from_uri, ALLOWED, NOT_AUTHENTICATED
 from email_service.ses_service import get_family_email_service
+from families.tree import get_family_tree, TreeError, person_summary
+from families.kinship import get_kinship_service
+from families.names import get_name_search
+from families.gedcom import GedcomImporter, export_gedcom
+from families.dedupe import DuplicateFinder, list_suggestions, review_suggestion
+from families.places import get_place_index
+from families.stories import get_story_search
+from families.images import get_image_catalog, page_cursor
+from families.sites import (get_site_files, etag_matches, file_headers, parse_range, cache_control_for,
+                            SiteFileResponse)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -61,6 +75,8 @@ async def startup():
         db_manager.init_database()
         logger.info("Database initialized successfully")
         logger.info(f"Valid families: {get_valid_families()}")
+        # Gallery queries answer from the catalog; bring it in line with the deployed sites meanwhile
+        get_image_catalog().scan_in_background(get_valid_families())
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
@@ -84,6 +100,37 @@ class ConsentRequest(BaseModel):
     marketing_consent: bool
     terms_accepted: bool
 
+class PersonCreate(BaseModel):
+    given_name: str = ""
+    surname: str = ""
+    sex: str = "U"
+    birth_year: Optional[int] = None
+    death_year: Optional[int] = None
+    slug: Optional[str] = None
+
+class RelationshipCreate(BaseModel):
+    person_id: int  # Parent, or either spouse
+    related_id: int  # Child, or the other spouse
+    kind: str = "parent"
+
+class EventCreate(BaseModel):
+    event_type: str
+    date: Optional[str] = None
+    year: Optional[int] = None
+    place: Optional[str] = None
+    description: Optional[str] = None
+
+class SuggestionReview(BaseModel):
+    status: str  # merged, dismissed, or pending to reopen
+
+class PlaceCoordinates(BaseModel):
+    latitude: float
+    longitude: float
+
+class StoryContent(BaseModel):
+    title: str
+    body: str
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -112,6 +159,23 @@ async def get_current_user(authorization: Optional[str] = Cookie(None)) -> Optio
     return payload
 
 
+def require_family_member(family: str, user: Optional[Dict]):
+    """Reject requests whose JWT does not grant access to the family"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not is_valid_family(family) or family not in user.get("families", []):
+        raise HTTPException(status_code=403, detail="No access to this family")
+
+
+def require_site_access(family: str, authorization: Optional[str]):
+    """require_family_member for site files: the verdict is cached per (token, family) until the token expires"""
+    status = get_family_access().check(bearer_token(authorization), family)
+    if status == NOT_AUTHENTICATED:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if status != ALLOWED:
+        raise HTTPException(status_code=403, detail="No access to this family")
+
+
 # Routes
 @app.get("/")
 async def root():
@@ -508,16 +572,373 @@ async def record_consent(
     }
 
 
+# Family tree endpoints
+@app.post("/families/{family}/people")
+async def create_person(family: str, person: PersonCreate, user: Optional[Dict] = Depends(get_current_user)):
+    """Add a person to a family tree"""
+    require_family_member(family, user)
+    created = get_family_tree().add_person(family, **person.model_dump())
+    return person_summary(created)
+
+
+@app.get("/families/{family}/people/search")
+async def search_people(
+    family: str,
+    q: str = Query(..., min_length=1, max_length=100, description="Name to look for, e.g. 'mary klingenb'"),
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = Query(True, description="Treat the last word as still being typed"),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Ranked, spelling-tolerant name search (Klingenberg finds Klingenburg)"""
+    require_family_member(family, user)
+    # The first search in a family builds its index, so keep it off the event loop
+    results = await run_in_threadpool(get_name_search().search, family, q, limit, prefix)
+    return {"family": family, "query": q, "count": len(results), "results": results}
+
+
+@app.get("/families/{family}/people/{person_id}")
+async def get_person(family: str, person_id: int, user: Optional[Dict] = Depends(get_current_user)):
+    """Get one person"""
+    require_family_member(family, user)
+    person = get_family_tree().get_person(family, person_id)
+    if not person:
+        raise HTTPException(status_code=404, detail="Person not found")
+    return person_summary(person)
+
+
+@app.post("/families/{family}/relationships")
+async def create_relationship(family: str, relationship: RelationshipCreate,
+                              user: Optional[Dict] = Depends(get_current_user)):
+    """Link two people as parent/child or spouses"""
+    require_family_member(family, user)
+    try:
+        created = get_family_tree().add_relationship(
+            family, relationship.person_id, relationship.related_id, relationship.kind)
+    except TreeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "id": created.id,
+        "person_id": created.person_id,
+        "related_id": created.related_id,
+        "kind": created.kind
+    }
+
+
+@app.post("/families/{family}/people/{person_id}/events")
+async def create_event(family: str, person_id: int, event: EventCreate,
+                       user: Optional[Dict] = Depends(get_current_user)):
+    """Record a life event for a person"""
+    require_family_member(family, user)
+    try:
+        created = get_family_tree().add_event(family, person_id, **event.model_dump())
+    except TreeError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return created.model_dump()
+
+
+@app.get("/families/{family}/people/{person_id}/pedigree")
+async def get_pedigree(
+    family: str,
+    person_id: int,
+    generations: int = Query(4, ge=1, le=64, description="Generations back (1 = parents)"),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Ancestors of a person up to N generations, from the closure table"""
+    require_family_member(family, user)
+    tree = get_family_tree()
+    if not tree.get_person(family, person_id):
+        raise HTTPException(status_code=404, detail="Person not found")
+    return tree.pedigree(family, person_id, generations)
+
+
+@app.get("/families/{family}/people/{person_id}/descendants")
+async def get_descendants(
+    family: str,
+    person_id: int,
+    generations: int = Query(4, ge=1, le=64, description="Generations down (1 = children)"),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Descendants of a person up to N generations, from the closure table"""
+    require_family_member(family, user)
+    tree = get_family_tree()
+    if not tree.get_person(family, person_id):
+        raise HTTPException(status_code=404, detail="Person not found")
+    return tree.descendants(family, person_id, generations)
+
+
+@app.get("/families/{family}/kinship")
+async def get_kinship(
+    family: str,
+    person_a: int = Query(..., description="Person the relationship is described from"),
+    person_b: int = Query(..., description="Person whose relationship to person_a is named"),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """How two people are related, e.g. 'second cousin once removed'"""
+    require_family_member(family, user)
+    tree = get_family_tree()
+    a = tree.get_person(family, person_a)
+    b = tree.get_person(family, person_b)
+    if not a or not b:
+        raise HTTPException(status_code=404, detail="Person not found")
+    
+    kinship = await run_in_threadpool(get_kinship_service().kinship, family, person_a, person_b)
+    name_a = f"{a.given_name} {a.surname}".strip()
+    name_b = f"{b.given_name} {b.surname}".strip()
+    return {
+        "person_a": person_summary(a),
+        "person_b": person_summary(b),
+        "relationship": kinship.relationship,
+        "description": (f"{name_b} is {name_a}'s {kinship.relationship}" if kinship.relationship
+                        else f"{name_b} and {name_a} are not related by blood"),
+        "spouse": kinship.spouse,
+        "paths": kinship.paths
+    }
+
+
+@app.get("/families/{family}/merge-suggestions")
+async def get_merge_suggestions(
+    family: str,
+    status: str = Query("pending", pattern="^(pending|merged|dismissed)$"),
+    limit: int = Query(50, ge=1, le=500),
+    after_score: Optional[float] = Query(None, description="Score of the last suggestion on the previous page"),
+    after_id: Optional[int] = Query(None, description="Id of the last suggestion on the previous page"),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Likely duplicate people for review, best match first"""
+    require_family_member(family, user)
+    suggestions = list_suggestions(family, status, limit, after_score, after_id)
+    return {"family": family, "status": status, "count": len(suggestions), "suggestions": suggestions}
+
+
+@app.post("/families/{family}/merge-suggestions/{suggestion_id}")
+async def review_merge_suggestion(
+    family: str,
+    suggestion_id: int,
+    review: SuggestionReview,
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Mark a suggestion merged or dismissed (dismissed pairs are not suggested again)"""
+    require_family_member(family, user)
+    if review.status not in ("merged", "dismissed", "pending"):
+        raise HTTPException(status_code=400, detail="Status must be merged, dismissed or pending")
+    if not review_suggestion(family, suggestion_id, review.status, user["email"]):
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+    return {"id": suggestion_id, "status": review.status}
+
+
+def require_window(from_year: Optional[int], to_year: Optional[int]):
+    """Reject half-open or reversed year windows"""
+    if (from_year is None) != (to_year is None):
+        raise HTTPException(status_code=400, detail="Give both from_year and to_year, or neither")
+    if from_year is not None and from_year > to_year:
+        raise HTTPException(status_code=400, detail="from_year must not be after to_year")
+
+
+@app.get("/families/{family}/map")
+async def get_family_map(
+    family: str,
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180, description="Less than west when the box crosses the antimeridian"),
+    from_year: Optional[int] = Query(None, ge=1, le=9999),
+    to_year: Optional[int] = Query(None, ge=1, le=9999),
+    limit: int = Query(500, ge=1, le=5000),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Geocoded places in a bounding box with event and people counts, optionally within a year window"""
+    require_family_member(family, user)
+    require_window(from_year, to_year)
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must not be north of north")
+    
+    places = await run_in_threadpool(get_place_index().map, family, south, west, north, east,
+                                     from_year, to_year, limit)
+    return {"family": family, "count": len(places), "places": places}
+
+
+@app.get("/families/{family}/timeline")
+async def get_family_timeline(
+    family: str,
+    from_year: int = Query(..., ge=1, le=9999),
+    to_year: int = Query(..., ge=1, le=9999),
+    south: Optional[float] = Query(None, ge=-90, le=90),
+    west: Optional[float] = Query(None, ge=-180, le=180),
+    north: Optional[float] = Query(None, ge=-90, le=90),
+    east: Optional[float] = Query(None, ge=-180, le=180),
+    limit: int = Query(100, ge=1, le=1000),
+    after_day: Optional[int] = Query(None, description="start_day of the last event on the previous page"),
+    after_id: Optional[int] = Query(None, description="event_id of the last event on the previous page"),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Events that could fall in a year window, earliest first, optionally only at places in a bounding box"""
+    require_family_member(family, user)
+    require_window(from_year, to_year)
+    bbox = (south, west, north, east)
+    if all(v is None for v in bbox):
+        bbox = None
+    elif any(v is None for v in bbox) or south > north:
+        raise HTTPException(status_code=400, detail="A bounding box needs south <= north, west and east")
+    
+    events = await run_in_threadpool(get_place_index().timeline, family, from_year, to_year, bbox,
+                                     limit, after_day, after_id)
+    result = {"family": family, "count": len(events), "events": events}
+    if len(events) == limit:
+        result["next"] = {"after_day": events[-1]["start_day"], "after_id": events[-1]["event_id"]}
+    return result
+
+
+@app.get("/stories/search")
+async def search_stories(
+    q: str = Query(..., min_length=1, max_length=200, description='Words, "quoted phrases" and prefix* terms'),
+    family: Optional[str] = Query(None, description="Only this family (default: every family you belong to)"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Full-text search over family stories, best match first, with highlighted snippets"""
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    families = user.get("families", [])
+    if family is not None:
+        require_family_member(family, user)
+        families = [family]
+    
+    # The first search in a family since startup checks its site pages for changes
+    results = await run_in_threadpool(get_story_search().search, families, q, limit, offset)
+    return {"query": q, "count": len(results), "results": results}
+
+
+@app.get("/families/{family}/gallery")
+async def get_family_gallery(
+    family: str,
+    sort: str = Query("page", pattern="^(page|bytes|pixels)$",
+                      description="page (memoir order), bytes or pixels (largest first)"),
+    orientation: Optional[str] = Query(None, pattern="^(landscape|portrait|square)$"),
+    min_width: Optional[int] = Query(None, ge=1),
+    min_height: Optional[int] = Query(None, ge=1),
+    max_bytes: Optional[int] = Query(None, ge=1),
+    from_page: Optional[int] = Query(None, ge=0),
+    to_page: Optional[int] = Query(None, ge=0),
+    page: Optional[str] = Query(None, description="Only images this site page embeds or links to, "
+                                "directly or through their viewer page (annie.html)"),
+    limit: int = Query(48, ge=1, le=500),
+    after: Optional[str] = Query(None, description="Cursor from next on the previous page"),
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Family site images from the image catalog, filtered and paged by keyset"""
+    require_family_member(family, user)
+    
+    # The catalog is rescanned in the background (at startup, and after the first query per process)
+    try:
+        images = await run_in_threadpool(get_image_catalog().query, family, sort, orientation, min_width,
+                                         min_height, max_bytes, from_page, to_page, page, limit, after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    result = {"family": family, "sort": sort, "count": len(images), "images": images}
+    if len(images) == limit:
+        result["next"] = page_cursor(sort, images[-1])
+    return result
+
+
+@app.get("/families/{family}/export.ged")
+async def export_family_gedcom(
+    family: str,
+    request: Request,
+    user: Optional[Dict] = Depends(get_current_user)
+):
+    """Download the family tree as GEDCOM, streamed; 304 when the tree is unchanged"""
+    require_family_member(family, user)
+    version = await run_in_threadpool(get_family_tree().tree_version, family)
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    
+    headers["Content-Disposition"] = f'attachment; filename="{family}.ged"'
+    return StreamingResponse(export_gedcom(family), media_type="text/plain; charset=utf-8", headers=headers)
+
+
+@app.get("/auth/site")
+async def authorize_site_request(
+    request: Request,
+    family: Optional[str] = Query(None, description="Family site (default: taken from X-Original-URI)"),
+    authorization: Optional[str] = Cookie(None)
+):
+    """
+    nginx auth_request target: 204 when the cookie grants access to the family, else 401/403
+    
+    Lets a front proxy serve 2-family-sites itself while the backend only decides:
+        location /families/ { auth_request /_auth; alias /srv/2-family-sites/; }
+        location = /_auth { internal; proxy_pass http://api/auth/site;
+                            proxy_pass_request_body off; proxy_set_header Content-Length "";
+                            proxy_set_header X-Original-URI $request_uri; }
+    """
+    family = family or family_from_uri(request.headers.get("x-original-uri"))
+    if not family:
+        return Response(status_code=403)
+    status = get_family_access().check(bearer_token(authorization), family)
+    return Response(status_code=204 if status == ALLOWED else status, headers={"Cache-Control": "no-store"})
+
+
+@app.api_route("/families/{family}/{path:path}", methods=["GET", "HEAD"])
+async def serve_family_site(
+    family: str,
+    path: str,
+    request: Request,
+    authorization: Optional[str] = Cookie(None)
+):
+    """
+    Serve the family's built site to its members
+    
+    Strong ETags come from the deploy manifest (304 on If-None-Match), .br/.gz
+    siblings are sent to clients that accept them, and single byte ranges are
+    answered from the original file (large scans). Declared after every other
+    /families/{family}/... route, which it would otherwise shadow.
+    """
+    require_site_access(family, authorization)
+    byte_range = request.headers.get("range")
+    # A few stat() calls: cheaper inline than a hop to the threadpool
+    site_file = get_site_files().select(family, path, request.headers.get("accept-encoding"),
+                                  identity=byte_range is not None)
+    if site_file is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    if path and not path.endswith("/") and site_file.key.endswith("/index.html") and not path.endswith("index.html"):
+        # Relative links in a directory's index page need the trailing slash
+        return RedirectResponse(f"/families/{family}/{path}/", status_code=308)
+    
+    headers = file_headers(site_file, cache_control_for(site_file.key))
+    if etag_matches(request.headers.get("if-none-match"), site_file.etag):
+        return Response(status_code=304, headers=headers)
+    
+    selected_range = None
+    if_range = request.headers.get("if-range")
+    if byte_range and (if_range is None or (if_range == site_file.etag and not if_range.startswith("W/"))):
+        try:
+            selected_range = parse_range(byte_range, site_file.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{site_file.size}"})
+    
+    return SiteFileResponse(site_file, headers, selected_range, accel_prefix=os.getenv("SITE_ACCEL_REDIRECT"))
+
+
 # Admin endpoints (protected by ADMIN_TOKEN)
+def require_admin_token(admin_token: str):
+    """Reject requests without the configured ADMIN_TOKEN"""
+    expected_token = os.getenv("ADMIN_TOKEN")
+    if not expected_token or not secrets.compare_digest(admin_token, expected_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
 @app.get("/admin/emails/{family}.csv")
 async def export_family_emails(
     family: str,
     admin_token: str = Query(..., description="Admin authentication token")
 ):
     """Export marketing emails for specific family (CSV format)"""
-    expected_token = os.getenv("ADMIN_TOKEN")
-    if not expected_token or admin_token != expected_token:
-        raise HTTPException(status_code=401, detail="Invalid admin token")
+    require_admin_token(admin_token)
     
     if not is_valid_family(family):
         raise HTTPException(status_code=400, detail="Invalid family name")
@@ -531,6 +952,159 @@ async def export_family_emails(
     }
 
 
+@app.post("/admin/families/{family}/import")
+async def import_family_gedcom(
+    family: str,
+    file: UploadFile = File(..., description="GEDCOM 5.5.1 or 7.0 file"),
+    admin_token: str = Query(..., description="Admin authentication token"),
+    replace: bool = Query(False, description="Delete the family's existing tree first")
+):
+    """Import a GEDCOM upload into a family tree (streamed to disk, then imported in two passes)"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    
+    with tempfile.NamedTemporaryFile(suffix=".ged", delete=False) as upload:
+        while chunk := await file.read(1024 * 1024):
+            upload.write(chunk)
+    
+    try:
+        stats = await run_in_threadpool(GedcomImporter(family).run, Path(upload.name), replace)
+    finally:
+        os.unlink(upload.name)
+    
+    logger.info(f"GEDCOM import into {family}: {stats.individuals} individuals, {stats.families} families")
+    return {
+        "message": f"Imported {file.filename} into {family}",
+        "family": family,
+        **stats.as_dict()
+    }
+
+
+@app.get("/admin/families/{family}/places")
+async def list_ungeocoded_places(
+    family: str,
+    admin_token: str = Query(..., description="Admin authentication token"),
+    limit: int = Query(50, ge=1, le=1000)
+):
+    """Places without coordinates, most used first (they are left off maps and bounding-box timelines)"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    
+    places = await run_in_threadpool(get_place_index().ungeocoded, family, limit)
+    return {"family": family, "count": len(places), "places": places}
+
+
+@app.put("/admin/families/{family}/places/{place_id}")
+async def set_place_coordinates(
+    family: str,
+    place_id: int,
+    coordinates: PlaceCoordinates,
+    admin_token: str = Query(..., description="Admin authentication token")
+):
+    """Geocode a place by hand (later GEDCOM imports and gazetteer runs keep these coordinates)"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    if not (-90 <= coordinates.latitude <= 90 and -180 <= coordinates.longitude <= 180):
+        raise HTTPException(status_code=400, detail="Coordinates out of range")
+    
+    if not await run_in_threadpool(get_place_index().set_coordinates, family, place_id,
+                                   coordinates.latitude, coordinates.longitude):
+        raise HTTPException(status_code=404, detail="Place not found")
+    return {"id": place_id, "latitude": coordinates.latitude, "longitude": coordinates.longitude}
+
+
+@app.post("/admin/families/{family}/stories/reindex")
+async def reindex_family_stories(
+    family: str,
+    admin_token: str = Query(..., description="Admin authentication token")
+):
+    """Reindex the family's site pages whose content changed (run after deploying the site)"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    
+    counts = await run_in_threadpool(get_story_search().sync_site, family)
+    return {"family": family, **counts}
+
+
+@app.put("/admin/families/{family}/stories/{story_id}")
+async def put_family_story(
+    family: str,
+    story_id: str,
+    story: StoryContent,
+    admin_token: str = Query(..., description="Admin authentication token")
+):
+    """Add or replace a structured story in the family's story search"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    if not story.title.strip() or not story.body.strip():
+        raise HTTPException(status_code=400, detail="A story needs a title and a body")
+    
+    await run_in_threadpool(get_story_search().add_story, family, story_id, story.title, story.body)
+    return {"family": family, "path": f"story/{story_id}", "title": story.title}
+
+
+@app.delete("/admin/families/{family}/stories/{story_id}")
+async def delete_family_story(
+    family: str,
+    story_id: str,
+    admin_token: str = Query(..., description="Admin authentication token")
+):
+    """Remove a structured story from the family's story search"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    
+    if not await run_in_threadpool(get_story_search().remove_story, family, story_id):
+        raise HTTPException(status_code=404, detail="Story not found")
+    return {"family": family, "path": f"story/{story_id}", "deleted": True}
+
+
+@app.post("/admin/families/{family}/images/scan")
+async def scan_family_images(
+    family: str,
+    admin_token: str = Query(..., description="Admin authentication token")
+):
+    """Catalog the family's new and changed site images (run after deploying the site)"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    
+    counts = await run_in_threadpool(get_image_catalog().scan, family)
+    return {"family": family, **counts}
+
+
+@app.post("/admin/families/{family}/dedupe")
+async def find_family_duplicates(
+    family: str,
+    admin_token: str = Query(..., description="Admin authentication token"),
+    threshold: float = Query(0.85, ge=0.5, le=1.0, description="Minimum similarity for a suggestion")
+):
+    """Run duplicate detection and refresh the family's pending merge suggestions"""
+    require_admin_token(admin_token)
+    
+    if not is_valid_family(family):
+        raise HTTPException(status_code=400, detail="Invalid family name")
+    
+    stats = await run_in_threadpool(DuplicateFinder(family, threshold=threshold).run)
+    return {
+        "message": f"Found {stats.suggestions} possible duplicates in {family}",
+        "family": family,
+        **stats.as_dict()
+    }
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
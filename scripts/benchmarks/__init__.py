@@ -0,0 +1 @@
+# Benchmarks for the site build stages (python -m benchmarks.<name>, run from scripts/)
@@ -0,0 +1,116 @@
+"""
+Page generator benchmark
+Copies a family's site data into a scratch directory (optionally cloned to a
+larger site), then times full builds against single edits that the dependency
+graph narrows down to the affected pages
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+
+from sitebuild.generate import KIND_DIRS, generate, load_data
+from sitebuild.site import DATA_DIR, family_argument_parser, iter_images, resolve_site
+
+
+def scratch_site(site_dir: Path, scale: int) -> Path:
+    """
+    Site directory holding the data, links to the scans and their image pages
+
+    With scale > 1 every person and place is cloned scale times; clones keep
+    their related links inside their own copy of the family.
+    """
+    root = Path(tempfile.mkdtemp(prefix="bench_generate_"))
+    (root / "images").mkdir()
+    for image in iter_images(site_dir):
+        os.symlink(image, root / "images" / image.name)
+        page = site_dir / f"{image.stem}.html"
+        if page.exists():
+            os.symlink(page, root / page.name)
+
+    data = load_data(site_dir)
+    site = dict(data.site)
+    for directory in KIND_DIRS.values():
+        (root / DATA_DIR / directory).mkdir(parents=True)
+    for copy in range(scale):
+        suffix = f"_{copy}" if copy else ""
+        for slug, record in data.entities.items():
+            record = {key: value for key, value in record.items() if key != "kind"}
+            record["name"] += f" ({copy})" if copy else ""
+            record["related"] = [f"{other}{suffix}" for other in record["related"]]
+            path = root / DATA_DIR / KIND_DIRS[data.entities[slug]["kind"]] / f"{slug}{suffix}.json"
+            path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    (root / DATA_DIR / "site.json").write_text(json.dumps(site, indent=2), encoding="utf-8")
+    return root
+
+
+def edit_record(root: Path, slug: str, change: Callable[[dict], None]):
+    """Apply an in-place edit to one person/place record"""
+    for directory in KIND_DIRS.values():
+        path = root / DATA_DIR / directory / f"{slug}.json"
+        if path.exists():
+            record = json.loads(path.read_text(encoding="utf-8"))
+            change(record)
+            path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+            return
+    raise KeyError(slug)
+
+
+def timed_build(label: str, root: Path, **kwargs):
+    start = time.perf_counter()
+    report = generate(root, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<48}{len(report.rendered):>6} of {report.pages:<6}{elapsed * 1000:>9.1f} ms")
+    return report
+
+
+def run(site_dir: Path, scale: int, workers: int):
+    root = scratch_site(site_dir, scale)
+    try:
+        data = load_data(root)
+        print(f"Site x{scale}: {len(data.entities):,} people/places, {len(data.images):,} scans")
+        print(f"  {'build':<48}{'pages':>6}{'':<10}{'time':>9}")
+        timed_build("full build, 1 process", root, force=True, workers=1)
+        timed_build(f"full build, pool ({workers or os.cpu_count()} workers)", root, force=True, workers=workers)
+        timed_build("no-op rebuild", root, workers=workers)
+
+        key = set(data.site.get("key_people", [])) | set(data.site.get("notable_places", []))
+        inbound = Counter(other for record in data.entities.values() for other in record.get("related", []))
+        person = next(slug for slug, record in data.entities.items()
+                      if record["kind"] == "person" and slug not in key and not inbound[slug])
+        linked = next(slug for slug, _ in inbound.most_common() if slug not in key)
+        place = next(slug for slug, record in data.entities.items() if record["kind"] == "place")
+        spare = next(stem for stem in data.images if stem not in data.entities[place]["images"])
+
+        edit_record(root, person, lambda r: r.update(description=r["description"] + " Edited."))
+        timed_build(f"edit description ({person})", root, workers=workers)
+        edit_record(root, linked, lambda r: r.update(name=r["name"] + " Jr."))
+        report = timed_build(f"rename ({linked}, {inbound[linked]} inbound links)", root, workers=workers)
+        print(f"    {', '.join(sorted(report.rendered)[:8])}{' ...' if len(report.rendered) > 8 else ''}")
+        edit_record(root, place, lambda r: r["images"].append(spare))
+        timed_build(f"add related image ({place})", root, workers=workers)
+        os.symlink(site_dir / "images" / f"{spare}.png", root / "images" / "page_999_img_1.png")
+        timed_build("new scan (image count in every layout)", root, workers=workers)
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    parser = family_argument_parser("Benchmark full versus incremental page generation")
+    parser.add_argument("--scale", type=int, default=50, help="Clone the people/places this many times")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    site_dir = resolve_site(args)
+
+    run(site_dir, 1, args.workers)
+    print()
+    run(site_dir, args.scale, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Image store benchmark
+Times scan fingerprinting (SHA-256 plus pHash/dHash) in one process and in
+the pool, the incremental pass that reuses unchanged fingerprints, and
+near-duplicate lookups in the banded hash index against a BK-tree and a
+linear Hamming scan over synthetic hashes
+"""
+
+import os
+import random
+import statistics
+import time
+
+from sitebuild.image_store import NEAR_DISTANCE, HashIndex, fingerprint_images, hamming
+from sitebuild.site import family_argument_parser, iter_images, resolve_site
+
+
+class BKTree:
+    """Burkhard-Keller tree under Hamming distance, the textbook alternative to the banded index"""
+
+    def __init__(self):
+        self.root = None  # [hash, items, {distance: child}]
+
+    def add(self, value: int, item) -> None:
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            if distance not in node[2]:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = node[2][distance]
+
+    def search(self, value: int, radius: int):
+        found, pending = [], [self.root]
+        while pending:
+            node = pending.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.extend(node[1])
+            pending.extend(child for d, child in node[2].items() if abs(d - distance) <= radius)
+        return found
+
+
+def synthetic_hashes(count: int, rng: random.Random):
+    """64-bit hashes in clusters of a few near-duplicates each, like repeated photos and letterheads"""
+    hashes = []
+    while len(hashes) < count:
+        base = rng.getrandbits(64)
+        hashes.append(base)
+        for _ in range(rng.randint(0, 3)):
+            noise = 0
+            for bit in rng.sample(range(64), rng.randint(1, NEAR_DISTANCE)):
+                noise |= 1 << bit
+            hashes.append(base ^ noise)
+    return hashes[:count]
+
+
+def main():
+    parser = family_argument_parser("Benchmark scan fingerprinting and near-duplicate lookups")
+    parser.add_argument("--hashes", type=int, default=200_000, help="Synthetic hashes for the lookup comparison")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    images = iter_images(resolve_site(args))
+    scan_bytes = sum(image.stat().st_size for image in images)
+
+    print(f"Fingerprinting {len(images)} scans ({scan_bytes / 1024 / 1024:.0f} MB):")
+    for workers in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        fingerprints, _ = fingerprint_images(images, {}, workers=workers)
+        elapsed = time.perf_counter() - start
+        print(f"  {workers} worker(s): {elapsed:6.2f}s ({len(images) / elapsed:,.0f} scans/s, "
+              f"{scan_bytes / 1024 / 1024 / elapsed:,.0f} MB/s)")
+    start = time.perf_counter()
+    _, hashed = fingerprint_images(images, fingerprints)
+    print(f"  rerun, nothing changed: {(time.perf_counter() - start) * 1000:.0f} ms ({hashed} hashed)")
+
+    rng = random.Random(args.seed)
+    hashes = synthetic_hashes(args.hashes, rng)
+    queries = rng.sample(hashes, args.queries)
+    print(f"Near-duplicate lookup, radius {NEAR_DISTANCE}, {args.hashes:,} hashes, {args.queries} queries:")
+    for label, index in (("banded index", HashIndex(NEAR_DISTANCE)), ("BK-tree", BKTree())):
+        start = time.perf_counter()
+        for number, value in enumerate(hashes):
+            index.add(value, number)
+        built = time.perf_counter() - start
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query) if isinstance(index, HashIndex) else index.search(query, NEAR_DISTANCE)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {label:<13} p50 {statistics.median(timings):8.2f} ms   (built in {built:.1f}s)")
+    timings = []
+    for query in queries[:50]:
+        start = time.perf_counter()
+        [number for number, value in enumerate(hashes) if hamming(query, value) <= NEAR_DISTANCE]
+        timings.append((time.perf_counter() - start) * 1000)
+    print(f"  {'linear scan':<13} p50 {statistics.median(timings):8.2f} ms")
+
+if __name__ == "__main__":
+    main()
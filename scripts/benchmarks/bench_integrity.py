@@ -0,0 +1,73 @@
+"""
+Integrity check benchmark
+Runs the link and asset check on a scratch copy of a family site's pages
+(images linked in, not copied): cold with one parser process and with the
+pool, then warm from the parse cache, after touching every page (rehashed
+but not reparsed), and after editing one page
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sitebuild.integrity import CACHE_NAME, check_site
+from sitebuild.site import DATA_DIR, family_argument_parser, iter_pages, resolve_site
+
+
+def timed(function, runs: int = 5):
+    """(median milliseconds, last result) of a call"""
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = family_argument_parser("Benchmark the link and asset integrity check")
+    args = parser.parse_args()
+    source = resolve_site(args)
+    site_dir = Path(tempfile.mkdtemp(prefix="bench_integrity_"))
+    pages = iter_pages(source)
+    for page in pages:
+        shutil.copy2(page, site_dir / page.name)
+    for name in ("images", "search", "graph"):
+        if (source / name).is_dir():
+            os.symlink(source / name, site_dir / name)
+    cache = site_dir / DATA_DIR / CACHE_NAME
+
+    print(f"Checking {len(pages)} pages:")
+    for workers in sorted({1, os.cpu_count() or 1}):
+        def cold():
+            cache.unlink(missing_ok=True)
+            return check_site(site_dir, workers=workers)
+        elapsed, report = timed(cold, runs=3)
+        print(f"  cold, {workers} worker(s):      {elapsed:8.0f} ms ({report.parsed} parsed, {report.links} references)")
+
+    elapsed, report = timed(lambda: check_site(site_dir))
+    print(f"  warm cache:              {elapsed:8.0f} ms ({report.parsed} parsed)")
+
+    def touched():
+        for page in site_dir.glob("*.html"):
+            os.utime(page)
+        return check_site(site_dir)
+    elapsed, report = timed(touched)
+    print(f"  every page touched:      {elapsed:8.0f} ms ({report.parsed} parsed, all rehashed)")
+
+    edited = site_dir / "index.html"
+    original = edited.read_text(encoding="utf-8")
+
+    def edit():
+        edited.write_text(original.replace("</body>", f"<!-- {time.perf_counter()} --></body>"), encoding="utf-8")
+        return check_site(site_dir)
+    elapsed, report = timed(edit)
+    print(f"  one page edited:         {elapsed:8.0f} ms ({report.parsed} parsed)")
+    shutil.rmtree(site_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Minification benchmark
+Times the minifier alone over a family site's pages, then the whole dry-run
+stage (minify plus gzip/brotli measurement) with one worker and with the
+pool, and checks the output is deterministic: two passes give the same
+bytes and minifying minified pages changes nothing, including around
+dropped and kept comments
+"""
+
+import hashlib
+import os
+import time
+
+from sitebuild.minify import minify_html, minify_site
+from sitebuild.site import family_argument_parser, iter_pages, resolve_site
+
+# Whitespace around comments: (page, expected output)
+COMMENT_CASES = [
+    ("<b>a</b> <!-- x --> <b>b</b>", "<b>a</b> <b>b</b>\n"),
+    ("<b>a</b> <!--[if IE]>x<![endif]--><b>b</b>", "<b>a</b> <!--[if IE]>x<![endif]--><b>b</b>\n"),
+    ("<p>a</p>\n<!-- x -->\n<p>b</p>", "<p>a</p><p>b</p>\n"),
+]
+
+
+def main():
+    parser = family_argument_parser("Benchmark the HTML/CSS/JS minification stage")
+    args = parser.parse_args()
+    site_dir = resolve_site(args)
+    pages = {page.name: page.read_text(encoding="utf-8") for page in iter_pages(site_dir)}
+
+    start = time.perf_counter()
+    first = {name: minify_html(html) for name, html in pages.items()}
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Minifying {len(pages)} pages: {elapsed:.0f} ms ({elapsed / len(pages):.2f} ms per page)")
+
+    def digest(outputs):
+        return hashlib.sha256("".join(outputs[name] for name in sorted(outputs)).encode("utf-8")).hexdigest()
+    second = {name: minify_html(html) for name, html in pages.items()}
+    again = {name: minify_html(html) for name, html in first.items()}
+    print(f"  deterministic: {digest(first) == digest(second)}, idempotent: {digest(first) == digest(again)}")
+    comments = all(minify_html(page) == expected and minify_html(expected) == expected
+                   for page, expected in COMMENT_CASES)
+    print(f"  whitespace around comments kept once: {comments}")
+
+    for workers in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        report = minify_site(site_dir, dry_run=True, workers=workers)
+        print(f"  dry-run stage, {workers} worker(s): {time.perf_counter() - start:6.1f} s")
+    for label, before, after in (("raw", "before", "after"), ("gzip", "gzip_before", "gzip_after"),
+                                 ("brotli", "brotli_before", "brotli_after")):
+        print(f"  {label:<7} {report.total(before) / 1024:7.0f} KB -> {report.total(after) / 1024:6.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
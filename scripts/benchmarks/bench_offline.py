@@ -0,0 +1,145 @@
+"""
+Offline caching benchmark
+Times building the precache manifest, then replays one returning visitor's
+seeded random walks over the site's link graph and counts what page views
+wait on: with the no-cache headers every page and image revalidates (one
+round trip each, full bytes the first time), while with the service worker
+the shell comes from the precache and cached images are served before their
+background revalidation. Reports the image LRU hit rate for several cache
+budgets and how many of the viewed pages stay readable offline
+"""
+
+import random
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+
+from sitebuild.offline import IMAGE_CACHE_MB, PAGE_CACHE_MB, SHELL, precache_entries, render_worker
+from sitebuild.site import family_argument_parser, iter_pages, resolve_site
+
+HREF_RE = re.compile(r'href="([^"#?:]+\.html)"')
+IMAGE_RE = re.compile(r'src="([^":]+\.(?:png|jpe?g|gif|webp))"', re.I)
+
+
+class ByteLru:
+    """The worker's LruCache policy: byte budget, entries over a quarter of it are not kept"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.total = 0
+
+    def get(self, key: str) -> bool:
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return True
+        return False
+
+    def put(self, key: str, size: int) -> None:
+        if size > self.max_bytes / 4:
+            return
+        self.total += size - self.entries.pop(key, 0)
+        self.entries[key] = size
+        while self.total > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total -= evicted
+
+
+def link_graph(site_dir: Path):
+    """Pages -> (linked pages, referenced images with their sizes)"""
+    pages = {page.name: page.read_text(encoding="utf-8") for page in iter_pages(site_dir)}
+    graph = {}
+    for name, html in pages.items():
+        links = sorted({href for href in HREF_RE.findall(html) if href in pages and href != name})
+        images = []
+        for src in dict.fromkeys(IMAGE_RE.findall(html)):
+            path = site_dir / src
+            if not path.is_file():
+                # Viewer pages name their scan bare; the scans live in images/
+                src = f"images/{src.rsplit('/', 1)[-1]}"
+                path = site_dir / src
+            if path.is_file():
+                images.append((src, path.stat().st_size))
+        graph[name] = (links, images)
+    sizes = {name: len(html.encode("utf-8")) for name, html in pages.items()}
+    return graph, sizes
+
+
+def sessions(graph: Dict, count: int, length: int, rng: random.Random) -> List[List[str]]:
+    """Random walks from index.html, restarting at the index on dead ends"""
+    walks = []
+    for _ in range(count):
+        page, walk = "index.html", []
+        for _ in range(length):
+            walk.append(page)
+            links = graph[page][0]
+            page = rng.choice(links) if links and rng.random() < 0.85 else "index.html"
+        walks.append(walk)
+    return walks
+
+
+def replay(history: List[str], graph: Dict, sizes: Dict, shell: set, image_bytes: int, worker: bool):
+    """(critical-path round trips, bytes downloaded, image hit rate, pages readable offline) for one visitor"""
+    trips = downloaded = hits = lookups = 0
+    seen = set()
+    images = ByteLru(image_bytes)
+    pages = ByteLru(PAGE_CACHE_MB * 1024 * 1024)
+    for page in history:
+        if not (worker and page in shell):
+            trips += 1
+            if page not in seen:
+                downloaded += sizes[page]
+            if worker:
+                pages.put(page, sizes[page])
+        seen.add(page)
+        for src, size in graph[page][1]:
+            lookups += 1
+            if worker and images.get(src):
+                hits += 1
+                continue  # Served from the cache; revalidated in the background
+            trips += 1
+            # The HTTP cache keeps everything and answers 304s; the worker refetches what it evicted
+            if src not in seen or worker:
+                downloaded += size
+            seen.add(src)
+            if worker:
+                images.put(src, size)
+    offline = len({page for page in history if page in shell or page in pages.entries}) if worker else 0
+    return trips, downloaded, hits / max(lookups, 1), offline
+
+
+def main():
+    parser = family_argument_parser("Benchmark the service worker caches on simulated browsing sessions")
+    parser.add_argument("--sessions", type=int, default=200, help="Visits by one returning relative")
+    parser.add_argument("--length", type=int, default=40, help="Page views per visit")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    site_dir = resolve_site(args)
+
+    start = time.perf_counter()
+    entries = precache_entries(site_dir, SHELL)
+    render_worker(entries, IMAGE_CACHE_MB, PAGE_CACHE_MB)
+    shell_bytes = sum((site_dir / path).stat().st_size for path, _ in entries)
+    print(f"Precache manifest: {len(entries)} files, {shell_bytes / 1024:.0f} KB "
+          f"({(time.perf_counter() - start) * 1000:.0f} ms to hash and render)")
+
+    graph, sizes = link_graph(site_dir)
+    shell = {path for path, _ in entries if path.endswith(".html")}
+    history = [page for walk in sessions(graph, args.sessions, args.length, random.Random(args.seed))
+               for page in walk]
+    distinct = len(set(history))
+    print(f"{args.sessions} visits of {args.length} page views ({distinct} of {len(graph)} pages seen):")
+    print(f"  {'':<24} {'round trips/view':>17} {'MB total':>9} {'image hits':>11} {'offline pages':>14}")
+    rows = [("no-cache revalidation", replay(history, graph, sizes, shell, 0, worker=False))]
+    for budget in (5, 10, 25, IMAGE_CACHE_MB):
+        rows.append((f"worker, {budget} MB images",
+                     replay(history, graph, sizes, shell, budget * 1024 * 1024, worker=True)))
+    for label, (trips, downloaded, hit_rate, offline) in rows:
+        print(f"  {label:<24} {trips / len(history):17.2f} {downloaded / 1024 / 1024:9.1f} "
+              f"{hit_rate:11.0%} {offline / distinct:14.0%}")
+
+
+if __name__ == "__main__":
+    main()
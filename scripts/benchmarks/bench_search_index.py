@@ -0,0 +1,56 @@
+"""
+Search index benchmark
+Times a full index build and reports the bytes a browser fetches per query
+"""
+
+import statistics
+import time
+
+from sitebuild.search_index import INDEX_DIR, build_search_index, shard_key, tokenize
+from sitebuild.site import family_argument_parser, resolve_site
+
+SAMPLE_QUERIES = [
+    "gladys",
+    "mary safrona",
+    "lutheran church",
+    "minneapolis",
+    "family farm",
+    "page 13",
+    "klingen",
+    "pymupdf",
+]
+
+
+def shard_bytes(meta, query: str) -> int:
+    """Bytes of the distinct shards a query's terms touch"""
+    keys = {shard_key(term) for term, _ in tokenize(query)}
+    return sum(meta["shards"].get(key, 0) for key in keys)
+
+
+def main():
+    parser = family_argument_parser("Benchmark search index build time and per-query transfer")
+    parser.add_argument("--runs", type=int, default=5, help="Index builds to time")
+    args = parser.parse_args()
+    site_dir = resolve_site(args)
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        meta = build_search_index(site_dir)
+        timings.append(time.perf_counter() - start)
+
+    shard_total = sum(meta["shards"].values())
+    meta_size = (site_dir / INDEX_DIR / "meta.json").stat().st_size
+    print(f"Index build ({len(meta['documents'])} pages, {meta['terms']} terms): "
+          f"median {statistics.median(timings) * 1000:.0f} ms over {args.runs} runs")
+    print(f"Shards: {len(meta['shards'])}, total {shard_total / 1024:.1f} KB; "
+          f"meta.json {meta_size / 1024:.1f} KB (fetched once per page view)")
+    print()
+    print(f"{'query':<20}{'shard bytes':>12}{'% of index':>12}")
+    for query in SAMPLE_QUERIES:
+        fetched = shard_bytes(meta, query)
+        print(f"{query:<20}{fetched:>12,}{fetched / shard_total * 100:>11.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Deep-zoom tile benchmark
+Cuts the site's large scans into pyramids in a scratch directory (one worker
+and the pool), then compares what a viewer downloads against the whole scan:
+the first paint (the one-tile overview), the tiles in view in a fitted
+1152x720 lightbox, and after zooming in 4x on the centre
+"""
+
+import math
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sitebuild.site import family_argument_parser, iter_images, resolve_site
+from sitebuild.tiles import (MAX_ZOOM, MIN_BYTES, MIN_PIXELS, TILE_FORMAT, TILE_SIZE, Pyramid, build_pyramid,
+                             needs_tiles)
+
+VIEW_WIDTH, VIEW_HEIGHT = 1152, 720  # 90% of a 1280x800 window, the lightbox frame
+
+
+def visible_tiles(pyramid: Pyramid, zoom: float):
+    """(level, column, row) of the tiles the viewer requests at zoom x fit, centred (mirrors deepzoom.js)"""
+    fitted = min(VIEW_WIDTH / pyramid.width, VIEW_HEIGHT / pyramid.height)
+    scale = max(fitted, min(fitted * zoom, MAX_ZOOM))
+    level = max(0, min(pyramid.max_level, pyramid.max_level + math.ceil(math.log2(scale))))
+    factor = 2 ** (pyramid.max_level - level)
+    view_width, view_height = min(pyramid.width, VIEW_WIDTH / scale), min(pyramid.height, VIEW_HEIGHT / scale)
+    x, y = (pyramid.width - view_width) / 2, (pyramid.height - view_height) / 2
+    level_width, level_height = pyramid.level_size(level)
+    columns = range(int(x / factor // TILE_SIZE), min(math.ceil(level_width / TILE_SIZE),
+                                                     math.ceil((x + view_width) / factor / TILE_SIZE)))
+    rows = range(int(y / factor // TILE_SIZE), min(math.ceil(level_height / TILE_SIZE),
+                                                  math.ceil((y + view_height) / factor / TILE_SIZE)))
+    return [(level, column, row) for column in columns for row in rows]
+
+
+def main():
+    parser = family_argument_parser("Benchmark tile pyramids against downloading whole scans")
+    parser.add_argument("--min-bytes", type=int, default=MIN_BYTES)
+    parser.add_argument("--min-pixels", type=int, default=MIN_PIXELS)
+    args = parser.parse_args()
+    site_dir = resolve_site(args)
+    selected = [(image, pyramid) for image in iter_images(site_dir)
+                if (pyramid := needs_tiles(image, args.min_bytes, args.min_pixels))]
+    scan_bytes = sum(image.stat().st_size for image, _ in selected)
+
+    out_dir = Path(tempfile.mkdtemp(prefix="bench_tiles_"))
+    print(f"Tiling {len(selected)} scans ({scan_bytes / 1024 / 1024:.1f} MB):")
+    for workers in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            built = list(pool.map(build_pyramid, [str(image) for image, _ in selected],
+                                  [str(out_dir)] * len(selected)))
+        elapsed = time.perf_counter() - start
+        print(f"  {workers} worker(s): {elapsed:6.2f}s ({sum(b['tiles'] for b in built)} tiles, "
+              f"{sum(b['tile_bytes'] for b in built) / 1024 / 1024:.1f} MB)")
+
+    def tile_bytes(stem, tiles):
+        return sum((out_dir / f"{stem}_files" / str(level) / f"{column}_{row}.{TILE_FORMAT}").stat().st_size
+                   for level, column, row in tiles)
+
+    print(f"{'scan':<18} {'whole scan':>11} {'first paint':>12} {'fitted view':>16} {'4x zoom':>16}")
+    totals = [0, 0, 0, 0]
+    for image, pyramid in sorted(selected, key=lambda item: -item[0].stat().st_size):
+        overview = [(pyramid.overview_level, 0, 0)]
+        fitted, zoomed = visible_tiles(pyramid, 1), visible_tiles(pyramid, 4)
+        row = [image.stat().st_size, tile_bytes(image.stem, overview),
+               tile_bytes(image.stem, fitted), tile_bytes(image.stem, zoomed)]
+        totals = [total + value for total, value in zip(totals, row)]
+        print(f"{image.stem:<18} {row[0] / 1024:8.0f} KB {row[1] / 1024:6.1f} KB/1 "
+              f"{row[2] / 1024:7.0f} KB/{len(fitted):<3} {row[3] / 1024:7.0f} KB/{len(zoomed):<3}")
+    print(f"{'total':<18} {totals[0] / 1024:8.0f} KB {totals[1] / 1024:6.1f} KB   "
+          f"{totals[2] / 1024:7.0f} KB     {totals[3] / 1024:7.0f} KB")
+    shutil.rmtree(out_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Incremental upload benchmark
+Deploys a copy of a family site to a local pyftpdlib server three times:
+a full deploy, a deploy after editing one page, and a deploy that resumes
+an interrupted transfer of a changed scan. Reports throughput and the
+share of bytes that were skipped.
+"""
+
+import logging
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import ThreadedFTPServer
+
+from sitebuild.compress import build_deploy_manifest
+from sitebuild.site import family_argument_parser, resolve_site
+from sitebuild.upload import JOURNAL_NAME, PART_SUFFIX, FtpTarget, IncrementalUploader
+
+
+def start_server(home: Path) -> ThreadedFTPServer:
+    """Local FTP stand-in for the static host"""
+    authorizer = DummyAuthorizer()
+    authorizer.add_user("deploy", "deploy", str(home), perm="elradfmwMT")
+    handler = type("DeployHandler", (FTPHandler,), {"authorizer": authorizer})
+    server = ThreadedFTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def deploy(label: str, site: Path, target: FtpTarget, workers: int):
+    report = IncrementalUploader(site, target, workers=workers).run(delete_orphans=True)
+    print(f"{label:<28}{report.files_uploaded:>7}{report.bytes_uploaded / 1024 / 1024:>10.1f}"
+          f"{report.bytes_resumed / 1024:>12.0f}{report.elapsed:>9.2f}"
+          f"{report.throughput / 1024 / 1024:>10.1f}{report.skipped_ratio * 100:>10.2f}%")
+
+
+def main():
+    parser = family_argument_parser("Benchmark incremental uploads against a local FTP server")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        site = Path(tmp) / "site"
+        remote = Path(tmp) / "remote"
+        remote.mkdir()
+        shutil.copytree(resolve_site(args), site, ignore=shutil.ignore_patterns("*.br", "*.gz", "deploy-manifest.json"))
+        build_deploy_manifest(site)
+
+        server = start_server(remote)
+        host, port = server.socket.getsockname()[:2]
+        target = FtpTarget(host=host, port=port, user="deploy", password="deploy")
+
+        print(f"{'deploy':<28}{'files':>7}{'MB sent':>10}{'KB resumed':>12}{'secs':>9}{'MB/s':>10}{'skipped':>11}")
+        deploy("full", site, target, args.workers)
+        deploy("no changes", site, target, args.workers)
+
+        page = next(site.glob("*.html"))
+        page.write_text(page.read_text(encoding="utf-8") + "\n<!-- edited -->\n", encoding="utf-8")
+        build_deploy_manifest(site)
+        deploy("one page edited", site, target, args.workers)
+
+        # Simulate a deploy that died halfway through a large scan
+        scan = max((site / "images").glob("*.png"), key=lambda p: p.stat().st_size)
+        scan.write_bytes(scan.read_bytes() + b"\0")
+        manifest = build_deploy_manifest(site)
+        unit = scan.relative_to(site).as_posix()
+        data = scan.read_bytes()
+        (remote / (unit + PART_SUFFIX)).write_bytes(data[:len(data) // 2])
+        (site / JOURNAL_NAME).write_text(f"start {manifest['files'][unit]['sha256']} {unit}\n", encoding="utf-8")
+        deploy("resumed interrupted scan", site, target, args.workers)
+
+        assert (remote / unit).read_bytes() == data
+        server.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Wiki link rendering benchmark
+Compares the parse work of rendering each page as shipped against rendering
+it with the old runtime pass, which read .content.innerHTML, regex-replaced
+[[links]] and assigned it back, forcing the content to be parsed twice.
+An HTML parser stands in for the browser's parser.
+"""
+
+import statistics
+import time
+from html.parser import HTMLParser
+
+from sitebuild.site import family_argument_parser, iter_pages, resolve_site
+from sitebuild.wikilinks import CONTENT_END, CONTENT_START, WIKI_LINK_RE
+
+
+def parse(html: str):
+    parser = HTMLParser()
+    parser.feed(html)
+    parser.close()
+
+
+def render_static(html: str):
+    """Page with links resolved at build time: one parse"""
+    parse(html)
+
+
+def render_with_runtime_pass(html: str):
+    """Page with the DOMContentLoaded rewrite: parse, serialize content, rewrite, re-parse content"""
+    parse(html)
+    start = html.find(CONTENT_START)
+    inner = html[start:html.find(CONTENT_END, start)]
+    parse(WIKI_LINK_RE.sub(lambda m: f'<a href="#" class="wiki-link">{m.group(1)}</a>', inner))
+
+
+def time_pages(pages, render, runs: int) -> float:
+    """Median wall time in milliseconds to render every page once"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for html in pages:
+            render(html)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = family_argument_parser("Benchmark build-time versus runtime wiki link resolution")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [page.read_text(encoding="utf-8") for page in iter_pages(resolve_site(args))]
+    static_ms = time_pages(pages, render_static, args.runs)
+    runtime_ms = time_pages(pages, render_with_runtime_pass, args.runs)
+
+    print(f"{len(pages)} pages, median of {args.runs} runs")
+    print(f"  build-time links:   {static_ms:8.1f} ms ({static_ms / len(pages):.3f} ms/page)")
+    print(f"  runtime rewrite:    {runtime_ms:8.1f} ms ({runtime_ms / len(pages):.3f} ms/page)")
+    print(f"  runtime overhead:   {(runtime_ms - static_ms) / static_ms * 100:8.1f}%")
+
+
+if __name__ == "__main__":
+    main()
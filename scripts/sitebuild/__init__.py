@@ -0,0 +1 @@
+# Static site build pipeline for the family sites in 2-family-sites/
@@ -0,0 +1,374 @@
+"""
+Build orchestrator for all family sites
+Discovers the family directories under 2-family-sites/ and runs each
+family's pipeline (record extraction, page generation, wiki links, images,
+image store, search index, graph, minification, service worker,
+compression) in its own worker process.
+Every stage is fingerprinted by the files it reads in that family plus its
+own code, and the fingerprints are kept in the family's
+data/.build-state.json, so a stage only runs when something it reads
+changed and an edit in one family never makes another family rebuild.
+Prints a per-family, per-stage timing breakdown.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sitebuild.compress import COMPRESSED_SUFFIXES, MANIFEST_NAME, build_deploy_manifest, summarize
+from sitebuild.entities import INDEX_PAGES, extract_entities
+from sitebuild.generate import adopt_outputs, generate, import_pages
+from sitebuild.graph_layout import write_graph
+from sitebuild.image_store import INDEX_PATH, NEAR_DISTANCE, build_image_store, load_index
+from sitebuild.minify import minify_site
+from sitebuild.offline import WORKER_NAME, build_offline, load_settings
+from sitebuild.search_index import build_search_index
+from sitebuild.site import DATA_DIR, SITES_ROOT
+from sitebuild.thumbnails import build_thumbnails
+from sitebuild.tiles import build_tiles
+from sitebuild.wikilinks import resolve_wiki_links
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = ".build-state.json"  # Inside DATA_DIR; a build output, git-ignored
+SOURCE_DIR = Path(__file__).resolve().parent
+
+
+def _extract(site_dir: Path, workers: int) -> str:
+    if (site_dir / DATA_DIR / "site.json").exists():
+        return "records present"
+    if not (site_dir / "index.html").exists():
+        return "no pages to import"
+    if not all((site_dir / page).exists() for page in INDEX_PAGES.values()):
+        return "no entity pages to import"
+    return f"{import_pages(site_dir)} records imported"
+
+
+def _generate(site_dir: Path, workers: int) -> str:
+    if not (site_dir / DATA_DIR / "site.json").exists():
+        return "no records, pages left as they are"
+    report = generate(site_dir, workers=workers)
+    return f"{len(report.rendered)} of {report.pages} pages rendered"
+
+
+def _wikilinks(site_dir: Path, workers: int) -> str:
+    report = resolve_wiki_links(site_dir)
+    return f"{report.links_resolved} links resolved, {len(report.broken)} broken"
+
+
+def _thumbnails(site_dir: Path, workers: int) -> str:
+    return f"{build_thumbnails(site_dir, workers=workers)['count']} scans in the gallery"
+
+
+def _image_store(site_dir: Path, workers: int) -> str:
+    if not (site_dir / INDEX_PATH).exists():
+        return "not enabled (run sitebuild.image_store once)"
+    index = load_index(site_dir)
+    report = build_image_store(site_dir, near_distance=index.get("near_distance", NEAR_DISTANCE),
+                               merge_near=index.get("merge_near", False), workers=workers)
+    return f"{report.unique} of {report.images} scans distinct, {report.references_rewritten} references rewritten"
+
+
+def _tiles(site_dir: Path, workers: int) -> str:
+    result = build_tiles(site_dir, workers=workers)
+    return f"{result['built']} pyramids built, {len(result['images'])} tiled"
+
+
+def _search_index(site_dir: Path, workers: int) -> str:
+    meta = build_search_index(site_dir)
+    return f"{len(meta['documents'])} pages, {meta['terms']} terms"
+
+
+def _graph_layout(site_dir: Path, workers: int) -> str:
+    index = write_graph(site_dir, extract_entities(site_dir))
+    return f"{index['nodes']} nodes, {index['edges']} edges"
+
+
+def _minify(site_dir: Path, workers: int) -> str:
+    report = minify_site(site_dir, workers=workers, measure=False)  # compress measures what ships
+    return f"{report.rewritten} pages rewritten, {(report.total('before') - report.total('after')) / 1024:.0f} KB saved"
+
+
+def _offline(site_dir: Path, workers: int) -> str:
+    settings = load_settings(site_dir)
+    if settings is None:
+        return "not enabled (run sitebuild.offline once)"
+    result = build_offline(site_dir, tuple(settings["patterns"]), settings["image_cache_mb"],
+                           settings["page_cache_mb"])
+    return (f"{WORKER_NAME} {result['version']}{'' if result['worker_changed'] else ' (unchanged)'}, "
+            f"{result['pages_rewritten']} pages rewritten")
+
+
+def _compress(site_dir: Path, workers: int) -> str:
+    totals = summarize(build_deploy_manifest(site_dir, workers=workers))
+    return f"{totals['files']} files, {totals['compressed']} precompressed"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A pipeline step: what it runs, the family files it reads, and the code it depends on"""
+    name: str
+    run: Callable[[Path, int], str]  # (site_dir, workers) -> one-line summary
+    inputs: Tuple[str, ...]  # Globs relative to the family directory
+    code: Tuple[str, ...]  # Files or directories relative to sitebuild/
+
+
+PIPELINE = (
+    Stage("extract", _extract, ("data/site.json",), ("generate.py", "entities.py")),
+    Stage("generate", _generate, ("data/*.json", "data/*/*.json", "images/*.png"), ("generate.py", "templates")),
+    Stage("wikilinks", _wikilinks, ("*.html",), ("wikilinks.py",)),
+    Stage("thumbnails", _thumbnails, ("images/*.png", "*.html"), ("thumbnails.py",)),
+    Stage("image_store", _image_store, ("images/*.png", "images/manifest.json", "images/store/index.json", "*.html"),
+          ("image_store.py",)),
+    Stage("tiles", _tiles, ("images/*.png", "images/store/index.json", "*.html"), ("tiles.py", "static/deepzoom.js")),
+    Stage("search_index", _search_index, ("*.html",), ("search_index.py", "static/search.js")),
+    Stage("graph_layout", _graph_layout, ("*.html",), ("graph_layout.py", "entities.py")),
+    Stage("minify", _minify, ("*.html",), ("minify.py",)),
+    # Every file: pages get the snippet, and a site's --precache globs (data/.offline.json) can name anything
+    Stage("offline", _offline, ("**/*",), ("offline.py", "static/sw.js")),
+    Stage("compress", _compress, ("**/*",), ("compress.py",)),
+)
+STAGES = {stage.name: stage for stage in PIPELINE}
+
+
+def discover_families(root: Path = SITES_ROOT) -> List[str]:
+    """Family directories under root: anything with pages or generator data, dot-directories excluded"""
+    return sorted(path.name for path in root.iterdir()
+                  if path.is_dir() and not path.name.startswith(".")
+                  and ((path / "index.html").exists() or (path / DATA_DIR / "site.json").exists()))
+
+
+def _code_digest(stage: Stage) -> str:
+    digest = hashlib.sha256()
+    for name in stage.code:
+        path = SOURCE_DIR / name
+        for file in sorted(path.rglob("*")) if path.is_dir() else [path]:
+            if file.is_file():
+                digest.update(file.relative_to(SOURCE_DIR).as_posix().encode("utf-8"))
+                digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def fingerprint(site_dir: Path, stage: Stage) -> str:
+    """
+    Digest of the stage's code and the path, size and mtime of every file it reads
+
+    Dotfiles (build state and caches), compressed siblings and the deploy
+    manifest are left out: they are outputs, not inputs.
+    """
+    files = set()
+    for pattern in stage.inputs:
+        files.update(path for path in site_dir.glob(pattern) if path.is_file())
+    digest = hashlib.sha256(_code_digest(stage).encode("ascii"))
+    for path in sorted(files):
+        key = path.relative_to(site_dir).as_posix()
+        if any(part.startswith(".") for part in key.split("/")) or key.endswith(COMPRESSED_SUFFIXES) \
+                or path.name == MANIFEST_NAME:
+            continue
+        stat = path.stat()
+        digest.update(f"{key}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_state(site_dir: Path) -> Dict[str, str]:
+    """Stage fingerprints recorded by the family's last build"""
+    path = site_dir / DATA_DIR / STATE_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8")).get("stages", {})
+
+
+def save_state(site_dir: Path, stages: Dict[str, str]) -> None:
+    path = site_dir / DATA_DIR / STATE_FILE
+    path.parent.mkdir(exist_ok=True)
+    state = {"version": 1, "stages": stages}
+    path.write_text(json.dumps(state, indent=1, sort_keys=True), encoding="utf-8")
+
+
+@dataclass
+class StageResult:
+    """Outcome of one stage for one family"""
+    stage: str
+    status: str  # "ran", "skipped", "would run", "failed" or "not reached"
+    seconds: float = 0.0
+    summary: str = ""
+
+
+@dataclass
+class FamilyResult:
+    """Outcome of one family's pipeline"""
+    family: str
+    stages: List[StageResult] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return any(result.status == "failed" for result in self.stages)
+
+
+def build_family(family: str, site_dir: str, stage_names: List[str], force: bool = False,
+                 dry_run: bool = False, workers: Optional[int] = None) -> FamilyResult:
+    """
+    Run one family's pipeline (runs in pool workers)
+
+    Each stage runs when its fingerprint differs from the recorded one, or
+    when forced. After the pipeline, every stage that completed records the
+    fingerprint of the tree as it was left, so in-place rewrites by later
+    stages do not make earlier ones run again next time. A failing stage
+    stops the family; it and the stages after it keep their old
+    fingerprints and run again on the next build.
+
+    Args:
+        family: Family name, for the report
+        site_dir: Family site directory
+        stage_names: Stages to consider, in pipeline order
+        force: Run every stage regardless of fingerprints
+        dry_run: Only report which stages would run
+        workers: Process pool size handed to the stages
+
+    Returns:
+        FamilyResult with a StageResult per stage
+    """
+    start = time.perf_counter()
+    site = Path(site_dir)
+    recorded = load_state(site)
+    result = FamilyResult(family=family)
+    completed = []
+    for name in stage_names:
+        stage = STAGES[name]
+        if result.failed:
+            result.stages.append(StageResult(name, "not reached"))
+            continue
+        if not force and recorded.get(name) == fingerprint(site, stage):
+            result.stages.append(StageResult(name, "skipped"))
+            completed.append(stage)
+            continue
+        if dry_run:
+            result.stages.append(StageResult(name, "would run"))
+            continue
+        stage_start = time.perf_counter()
+        try:
+            summary = stage.run(site, workers)
+        except Exception as error:
+            logger.exception(f"{family}: {name} failed")
+            result.stages.append(StageResult(name, "failed", time.perf_counter() - stage_start, str(error)))
+            continue
+        result.stages.append(StageResult(name, "ran", time.perf_counter() - stage_start, summary))
+        completed.append(stage)
+
+    if not dry_run and any(stage.status == "ran" for stage in result.stages):
+        if "generate" in stage_names and (site / DATA_DIR / "site.json").exists():
+            adopt_outputs(site)
+        for stage in completed:
+            recorded[stage.name] = fingerprint(site, stage)
+        save_state(site, recorded)
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+def build_all(families: List[str], root: Path = SITES_ROOT, stage_names: List[str] = None, force: bool = False,
+              dry_run: bool = False, jobs: Optional[int] = None,
+              workers: Optional[int] = None) -> List[FamilyResult]:
+    """
+    Build several families side by side, one worker process per family
+
+    Args:
+        families: Family directory names under root
+        root: Directory holding the family sites
+        stage_names: Stages to run (default: the whole pipeline)
+        force: Ignore the recorded fingerprints
+        dry_run: Only report which stages would run
+        jobs: Families built at once (default: one per family, at most the CPU count)
+        workers: Process pool size inside each stage (default: CPUs shared between the running families)
+
+    Returns:
+        A FamilyResult per family, in the order given
+    """
+    stage_names = stage_names or [stage.name for stage in PIPELINE]
+    cpus = os.cpu_count() or 1
+    jobs = jobs or max(1, min(len(families), cpus))
+    workers = workers or max(1, cpus // jobs)
+    site_dirs = [str(root / family) for family in families]
+    if jobs == 1 or len(families) == 1:
+        return [build_family(family, site_dir, stage_names, force, dry_run, workers)
+                for family, site_dir in zip(families, site_dirs)]
+    count = len(families)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(build_family, families, site_dirs, [stage_names] * count, [force] * count,
+                             [dry_run] * count, [workers] * count))
+
+
+def print_timings(results: List[FamilyResult], stage_names: List[str], elapsed: float) -> None:
+    """Stage-by-family timing table, then what each stage that ran did"""
+    width = max([len(name) for name in stage_names] + [5])
+    print(f"  {'stage':<{width}} " + " ".join(f"{result.family:>12}" for result in results) + f" {'total':>9}")
+    marks = {"skipped": "·", "would run": "run", "failed": "FAILED", "not reached": "-"}
+    for name in stage_names:
+        cells, total = [], 0.0
+        for result in results:
+            stage = next(r for r in result.stages if r.stage == name)
+            total += stage.seconds
+            cells.append(f"{stage.seconds:11.2f}s" if stage.status == "ran" else f"{marks[stage.status]:>12}")
+        print(f"  {name:<{width}} " + " ".join(cells) + f" {total:8.2f}s")
+    busy = sum(result.seconds for result in results)
+    print(f"  {'total':<{width}} " + " ".join(f"{result.seconds:11.2f}s" for result in results)
+          + f" {busy:8.2f}s  ({elapsed:.2f}s wall)")
+    for result in results:
+        for stage in result.stages:
+            if stage.status in ("ran", "failed"):
+                print(f"  {result.family}/{stage.stage}: {stage.summary}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build every family site, each in its own worker process")
+    parser.add_argument("--family", action="append",
+                        help="Only build this family (repeatable; default: every directory under 2-family-sites/)")
+    parser.add_argument("--root", type=Path, default=SITES_ROOT, help="Directory holding the family sites")
+    parser.add_argument("--stages", help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--force", action="store_true", help="Run every stage regardless of what changed")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the stages that would run")
+    parser.add_argument("--jobs", type=int, help="Families built at once (default: CPU count)")
+    parser.add_argument("--workers", type=int, help="Worker processes per stage (default: CPUs per family)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    root = args.root.resolve()
+    families = args.family or discover_families(root)
+    missing = [family for family in families if not (root / family).is_dir()]
+    if missing:
+        parser.error(f"no site directory for {', '.join(missing)} under {root}")
+    if not families:
+        parser.error(f"no family sites under {root}")
+    stage_names = [stage.name for stage in PIPELINE]
+    if args.stages:
+        wanted = [name.strip() for name in args.stages.split(",") if name.strip()]
+        unknown = [name for name in wanted if name not in STAGES]
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(unknown)}")
+        stage_names = [name for name in stage_names if name in wanted]
+
+    start = time.perf_counter()
+    results = build_all(families, root, stage_names, force=args.force, dry_run=args.dry_run,
+                        jobs=args.jobs, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    status = "would run" if args.dry_run else "ran"
+    count = sum(1 for result in results for stage in result.stages if stage.status == status)
+    print(f"✓ {len(results)} families, {count} stages {status} ({elapsed:.1f}s)")
+    print_timings(results, stage_names, elapsed)
+    failed = [result.family for result in results if result.failed]
+    if failed:
+        print(f"⚠️  Failed: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Deploy build stage for the family sites
+Writes maximum-level .br and .gz siblings for text assets so the web server
+can serve them without compressing per request, and records every file's
+size, SHA-256 and compressed sizes in a manifest that deploys diff against
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import brotli
+
+from sitebuild.site import DATA_DIR, SITES_ROOT, family_dir, file_sha256, stored_scans
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "deploy-manifest.json"
+TEXT_EXTENSIONS = {".html", ".css", ".js", ".json", ".txt", ".svg", ".xml", ".md"}
+COMPRESSED_SUFFIXES = (".br", ".gz")
+
+
+def iter_site_files(root: Path) -> List[Path]:
+    """
+    Every deployable file under root, excluding build siblings, the manifest, page data and dotfiles
+
+    Scans the image store serves are left out too: once image_store has
+    pointed pages and the gallery at images/store/, the originals are only
+    build inputs (tiles, thumbnails) and would double the deploy.
+    """
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d != DATA_DIR)
+        stored = stored_scans(Path(dirpath).parent) if os.path.basename(dirpath) == "images" else {}
+        for name in sorted(filenames):
+            if name.startswith(".") or name.endswith(COMPRESSED_SUFFIXES) or name == MANIFEST_NAME \
+                    or name in stored:
+                continue
+            files.append(Path(dirpath) / name)
+    return files
+
+
+def compress_file(path: str, previous: Optional[Dict]) -> Dict:
+    """
+    Hash one file and (re)write its compressed siblings if it changed
+
+    Args:
+        path: File to process
+        previous: This file's entry from the last manifest, if any
+
+    Returns:
+        Manifest entry with size, sha256 and br/gz sizes (None when not compressed)
+    """
+    source = Path(path)
+    entry = {"size": source.stat().st_size, "sha256": file_sha256(source), "br": None, "gz": None}
+    if source.suffix.lower() not in TEXT_EXTENSIONS:
+        return entry
+
+    unchanged = previous is not None and previous.get("sha256") == entry["sha256"]
+    data = None
+    for suffix, key in ((".br", "br"), (".gz", "gz")):
+        sibling = source.with_name(source.name + suffix)
+        if unchanged and previous.get(key) is not None and sibling.exists():
+            entry[key] = previous[key]
+            continue
+        if data is None:
+            data = source.read_bytes()
+        if key == "br":
+            packed = brotli.compress(data, quality=11)
+        else:
+            packed = gzip.compress(data, compresslevel=9, mtime=0)  # mtime=0 keeps output byte-identical
+        if len(packed) < len(data):
+            sibling.write_bytes(packed)
+            entry[key] = len(packed)
+        elif sibling.exists():
+            sibling.unlink()
+    return entry
+
+
+def load_manifest(root: Path) -> Dict:
+    """Load the deploy manifest under root, or an empty one"""
+    manifest_file = root / MANIFEST_NAME
+    if not manifest_file.exists():
+        return {"version": 1, "files": {}}
+    return json.loads(manifest_file.read_text(encoding="utf-8"))
+
+
+def build_deploy_manifest(root: Path, workers: int = None) -> Dict:
+    """
+    Precompress text assets under root and write the deploy manifest
+
+    Args:
+        root: Directory to walk (all of 2-family-sites/ or a single family)
+        workers: Process pool size (defaults to CPU count)
+
+    Returns:
+        The manifest dict that was written
+    """
+    previous = load_manifest(root)["files"]
+    files = iter_site_files(root)
+    keys = [path.relative_to(root).as_posix() for path in files]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        entries = pool.map(compress_file, [str(p) for p in files],
+                           [previous.get(key) for key in keys], chunksize=16)
+        manifest = {"version": 1, "files": dict(zip(keys, entries))}
+
+    # Drop siblings left behind by files that no longer exist
+    for key in set(previous) - set(manifest["files"]):
+        for suffix in COMPRESSED_SUFFIXES:
+            stale = root / (key + suffix)
+            if stale.exists():
+                stale.unlink()
+
+    (root / MANIFEST_NAME).write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+def summarize(manifest: Dict) -> Dict:
+    """Totals for text assets that have compressed siblings"""
+    text = [e for e in manifest["files"].values() if e["gz"] is not None or e["br"] is not None]
+    return {
+        "files": len(manifest["files"]),
+        "compressed": len(text),
+        "text_bytes": sum(e["size"] for e in text),
+        "gz_bytes": sum(e["gz"] or e["size"] for e in text),
+        "br_bytes": sum(e["br"] or e["size"] for e in text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress site assets and write the deploy manifest")
+    parser.add_argument("--family", help="Only process one family site (default: all of 2-family-sites/)")
+    parser.add_argument("--site", type=Path, help="Explicit directory to process (overrides --family)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.site:
+        root = args.site.resolve()
+    else:
+        root = family_dir(args.family) if args.family else SITES_ROOT
+    start = time.perf_counter()
+    manifest = build_deploy_manifest(root, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    totals = summarize(manifest)
+    print(f"✓ {totals['files']} files hashed, {totals['compressed']} text assets precompressed ({elapsed:.1f}s)")
+    if totals["text_bytes"]:
+        print(f"  text: {totals['text_bytes'] / 1024:.0f} KB → "
+              f"gzip {totals['gz_bytes'] / 1024:.0f} KB, brotli {totals['br_bytes'] / 1024:.0f} KB")
+    print(f"  manifest: {root / MANIFEST_NAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+People and places of a family site
+Reads the people.html/places.html indexes and each entity page to recover
+the structured data the pages were generated from: memoir page references,
+related people and related images
+"""
+
+import posixpath
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sitebuild.site import PageContent, extract_content
+
+PAGE_LIST_RE = re.compile(r"^(?:Mentioned|Referenced) on pages:\s*([\d,\s]+)$", re.M)
+IMAGE_LINK_RE = re.compile(r"(page_\d+_img_\d+)\.html$")
+INDEX_PAGES = {"person": "people.html", "place": "places.html"}
+
+
+@dataclass
+class Entity:
+    """A person or place with its own page"""
+    slug: str
+    name: str
+    kind: str  # person, place
+    pages: List[int] = field(default_factory=list)  # Memoir pages it appears on
+    related: List[str] = field(default_factory=list)  # Slugs from the "Related People" section
+    images: List[str] = field(default_factory=list)  # page_N_img_M stems from "Related Images"
+    description: str = ""
+
+    @property
+    def url(self) -> str:
+        return f"{self.slug}.html"
+
+
+def normalize_slug(href: str) -> Optional[str]:
+    """
+    Map an entity link to a page slug
+
+    The generator emitted several spellings for the same page
+    (people/x.html, people_x.html, x.html); all resolve to x.
+    """
+    if "://" in href or href.startswith(("#", "javascript:", "mailto:")):
+        return None
+    name = posixpath.basename(href.split("#", 1)[0])
+    if not name.endswith(".html"):
+        return None
+    slug = name[:-len(".html")]
+    for prefix in ("people_", "places_"):
+        if slug.startswith(prefix):
+            slug = slug[len(prefix):]
+    return slug
+
+
+def _section_text(content: PageContent, heading: str) -> str:
+    """Text of the first paragraph after a heading line"""
+    lines = content.text.splitlines()
+    for i, line in enumerate(lines[:-1]):
+        if line == heading:
+            return lines[i + 1]
+    return ""
+
+
+def parse_entity(slug: str, kind: str, content: PageContent, known: Dict[str, str]) -> Entity:
+    """Build an Entity from a parsed person/place page"""
+    entity = Entity(slug=slug, name=content.title or slug.replace("_", " ").title(), kind=kind)
+    match = PAGE_LIST_RE.search(content.text)
+    if match:
+        entity.pages = sorted({int(p) for p in re.findall(r"\d+", match.group(1))})
+    entity.description = _section_text(content, "About")
+    for link in content.links:
+        if link.section == "Related People":
+            target = normalize_slug(link.href)
+            if target in known and target != slug and target not in entity.related:
+                entity.related.append(target)
+        elif link.section == "Related Images":
+            image = IMAGE_LINK_RE.search(link.href)
+            if image and image.group(1) not in entity.images:
+                entity.images.append(image.group(1))
+    return entity
+
+
+def extract_entities(site_dir: Path) -> Dict[str, Entity]:
+    """
+    Read every person and place listed on the site's index pages
+
+    Returns:
+        Entities keyed by slug, people first, in index order
+    """
+    known: Dict[str, str] = {}
+    for kind, index_page in INDEX_PAGES.items():
+        index_file = site_dir / index_page
+        if not index_file.exists():
+            continue
+        for link in extract_content(index_file.read_text(encoding="utf-8")).links:
+            slug = normalize_slug(link.href)
+            if slug and slug not in known and f"{slug}.html" not in INDEX_PAGES.values() \
+                    and (site_dir / f"{slug}.html").exists():
+                known[slug] = kind
+
+    entities = {}
+    for slug, kind in known.items():
+        content = extract_content((site_dir / f"{slug}.html").read_text(encoding="utf-8"))
+        entities[slug] = parse_entity(slug, kind, content, known)
+    return entities
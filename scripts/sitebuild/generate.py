@@ -0,0 +1,484 @@
+"""
+Page generator for the family sites
+Renders the person, place and index pages from the structured data in
+<site>/data with the templates in sitebuild/templates. A dependency graph
+records which people, places, images and templates each page was rendered
+from, so an edit only re-renders the pages that read what changed.
+"""
+
+import hashlib
+import html
+import json
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from sitebuild.entities import INDEX_PAGES, extract_entities, normalize_slug
+from sitebuild.site import (DATA_DIR, extract_content, family_argument_parser, iter_images, parse_image_name,
+                            resolve_site)
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = ".generate-state.json"  # Inside DATA_DIR; a build output, git-ignored
+TEMPLATE_DIR = Path(__file__).resolve().parent / "templates"
+KIND_DIRS = {"person": "people", "place": "places"}
+IMAGES_PAGE = "images.html"
+INDEX_STYLE = {"person": ("#3498db", "👤"), "place": ("#e74c3c", "📍")}
+INDEX_NAMES = {"person": ("People", "People Index"), "place": ("Places", "Places Index")}
+SERIAL_LIMIT = 16  # Fewer stale pages than this render in-process; pool start-up would dominate
+
+MENTION_RE = re.compile(r"^Page (\d+): (.*)$")
+TYPE_RE = re.compile(r"^Type: (.+)$", re.M)
+HEADER_TITLE_RE = re.compile(r'<header class="header">.*?<h1>(.*?)</h1>', re.S)
+FOOTER_RE = re.compile(r"Generated from (.+?)'s memoir with (\S+) pages")
+SIDEBAR_LIST_RE = r"<h3>{}</h3>\s*<ul>(.*?)</ul>"
+HREF_RE = re.compile(r'href="([^"]+)"')
+COUNT_RE = re.compile(r"\b\d+\b")
+
+
+@dataclass
+class SiteData:
+    """Everything the pages are rendered from"""
+    site: Dict
+    entities: Dict[str, Dict]  # slug -> record, each with a "kind"
+    images: Dict[str, str]  # page_N_img_M stem -> link target
+
+    @cached_property
+    def counts(self) -> Dict[str, int]:
+        """Totals shown in every page's sidebar and footer"""
+        kinds = [record["kind"] for record in self.entities.values()]
+        return {"people": kinds.count("person"), "places": kinds.count("place"), "images": len(self.images)}
+
+
+@dataclass
+class PageJob:
+    """One output page: template, context and the input keys it read"""
+    output: str
+    template: str
+    context: Dict
+    inputs: List[str]
+
+
+@dataclass
+class GenerateReport:
+    """Outcome of a generator run"""
+    pages: int = 0
+    rendered: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed_inputs: List[str] = field(default_factory=list)
+    reasons: Dict[str, str] = field(default_factory=dict)
+    plan_seconds: float = 0.0
+    render_seconds: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return self.plan_seconds + self.render_seconds
+
+
+def digest(value) -> str:
+    """Short stable hash of a JSON-serializable value"""
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def image_links(site_dir: Path) -> Dict[str, str]:
+    """Link target for every scan: its image page when one exists, else the file itself"""
+    links = {}
+    for image in iter_images(site_dir):
+        page = f"{image.stem}.html"
+        links[image.stem] = page if (site_dir / page).exists() else f"images/{image.name}"
+    return links
+
+
+def load_data(site_dir: Path) -> SiteData:
+    """Read site.json and every person/place record under <site>/data"""
+    data_dir = site_dir / DATA_DIR
+    site_file = data_dir / "site.json"
+    if not site_file.exists():
+        raise FileNotFoundError(f"No site data in {data_dir}; run with --import-pages first")
+    site = json.loads(site_file.read_text(encoding="utf-8"))
+
+    entities = {}
+    for kind, directory in KIND_DIRS.items():
+        for path in sorted((data_dir / directory).glob("*.json")):
+            record = json.loads(path.read_text(encoding="utf-8"))
+            record["kind"] = kind
+            entities[path.stem] = record
+    return SiteData(site=site, entities=entities, images=image_links(site_dir))
+
+
+def input_digests(data: SiteData) -> Dict[str, str]:
+    """
+    Digest of every input a page can depend on
+
+    Keys are facets rather than files: "person:john" is John's whole record and
+    is only read by his own page, while "name:john" is what every page linking
+    to him reads, so editing John's description doesn't touch those pages.
+    """
+    digests = {
+        "site": digest(data.site),
+        "counts": digest(data.counts),
+    }
+    for slug, record in data.entities.items():
+        digests[f"{record['kind']}:{slug}"] = digest(record)
+        digests[f"name:{slug}"] = digest([record["name"], record["kind"]])
+    for stem, href in data.images.items():
+        digests[f"image:{stem}"] = digest(href)
+    for template in sorted(TEMPLATE_DIR.glob("*.html")):
+        digests[f"template:{template.name}"] = hashlib.sha256(template.read_bytes()).hexdigest()[:16]
+    return digests
+
+
+def _links(data: SiteData, slugs: Iterable[str], inputs: List[str]) -> List[Dict]:
+    """Name/url pairs for entity slugs, recording a dependency on each name"""
+    links = []
+    for slug in slugs:
+        inputs.append(f"name:{slug}")
+        record = data.entities.get(slug)
+        if record:
+            links.append({"name": record["name"], "url": f"{slug}.html"})
+    return links
+
+
+def _layout(data: SiteData, template: str, inputs: List[str]) -> Dict:
+    """Context shared by every page: site settings, counts and the sidebar lists"""
+    inputs.extend(["site", "counts", "template:layout.html", f"template:{template}"])
+    return {
+        "site": data.site,
+        "counts": data.counts,
+        "key_people": _links(data, data.site.get("key_people", []), inputs),
+        "notable_places": _links(data, data.site.get("notable_places", []), inputs),
+    }
+
+
+def page_outputs(data: SiteData) -> List[str]:
+    """Every page the generator owns"""
+    return [f"{slug}.html" for slug in data.entities] + list(INDEX_PAGES.values()) + [IMAGES_PAGE]
+
+
+def plan_page(data: SiteData, output: str) -> PageJob:
+    """Render context and input keys for one page"""
+    inputs: List[str] = []
+    if output == IMAGES_PAGE:
+        context = _layout(data, "images.html", inputs)
+        context.update({"page_title": "Images", "breadcrumbs": [{"name": "Images"}]})
+        return PageJob(output=output, template="images.html", context=context, inputs=inputs)
+
+    index_kinds = {page: kind for kind, page in INDEX_PAGES.items()}
+    if output in index_kinds:
+        kind = index_kinds[output]
+        context = _layout(data, "index.html", inputs)
+        members = sorted((s for s, r in data.entities.items() if r["kind"] == kind),
+                         key=lambda s: data.entities[s]["name"].casefold())
+        index_title = INDEX_NAMES[kind][0]
+        index = data.site["indexes"][KIND_DIRS[kind]]
+        color, icon = INDEX_STYLE[kind]
+        context.update({
+            "page_title": index_title,
+            "breadcrumbs": [{"name": index_title}],
+            "heading": index["heading"],
+            "intro": index["intro"].replace("{count}", str(len(members))),
+            "entries": _links(data, members, inputs),
+            "color": color,
+            "icon": icon,
+        })
+        return PageJob(output=output, template="index.html", context=context, inputs=inputs)
+
+    slug = output[:-len(".html")]
+    record = data.entities[slug]
+    kind = record["kind"]
+    inputs.append(f"{kind}:{slug}")
+    context = _layout(data, "entity.html", inputs)
+    images = []
+    for stem in record.get("images", []):
+        inputs.append(f"image:{stem}")
+        if stem in data.images:
+            images.append({"url": data.images[stem], "page": parse_image_name(f"{stem}.png")[0]})
+    index_title, index_name = INDEX_NAMES[kind]
+    context.update({
+        "page_title": record["name"],
+        "breadcrumbs": [{"name": index_title, "url": INDEX_PAGES[kind]}, {"name": record["name"]}],
+        "entity": record,
+        "images": images,
+        "related": _links(data, record.get("related", []), inputs),
+        "index_page": {"name": index_name, "url": INDEX_PAGES[kind]},
+    })
+    return PageJob(output=output, template="entity.html", context=context, inputs=inputs)
+
+
+class DependencyGraph:
+    """
+    Input digests and the input keys each generated page read, as of the last run
+
+    The inverse (input -> pages) answers "what does this edit touch" without
+    re-rendering anything to find out.
+    """
+
+    def __init__(self, digests: Dict[str, str] = None, pages: Dict[str, Dict] = None):
+        self.digests = digests or {}
+        self.pages = pages or {}  # output -> {"inputs": [...], "size": n, "mtime_ns": n}
+        self.dependents: Dict[str, Set[str]] = defaultdict(set)
+        for output, entry in self.pages.items():
+            for key in entry["inputs"]:
+                self.dependents[key].add(output)
+
+    @classmethod
+    def load(cls, site_dir: Path) -> "DependencyGraph":
+        path = site_dir / DATA_DIR / STATE_FILE
+        if not path.exists():
+            return cls()
+        state = json.loads(path.read_text(encoding="utf-8"))
+        return cls(state.get("digests"), state.get("pages"))
+
+    def save(self, site_dir: Path):
+        path = site_dir / DATA_DIR / STATE_FILE
+        state = {"version": 1, "digests": self.digests, "pages": self.pages}
+        path.write_text(json.dumps(state, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+
+    def changed(self, digests: Dict[str, str]) -> Set[str]:
+        """Input keys added, removed or modified since the recorded run"""
+        return {key for key in digests.keys() | self.digests.keys()
+                if digests.get(key) != self.digests.get(key)}
+
+    def affected(self, keys: Iterable[str]) -> Set[str]:
+        """Pages that read any of the given inputs"""
+        pages: Set[str] = set()
+        for key in keys:
+            pages |= self.dependents.get(key, set())
+        return pages
+
+
+def stale_pages(site_dir: Path, outputs: List[str], graph: DependencyGraph,
+                changed: Set[str], force: bool = False) -> Dict[str, str]:
+    """
+    Pages to render, each with the reason
+
+    A page is stale when it is new, reads a changed input, or its output file
+    was removed or edited by hand since it was generated.
+    """
+    reasons = {}
+    for output in sorted(graph.affected(changed)):
+        keys = sorted(changed.intersection(graph.pages[output]["inputs"]))
+        reasons[output] = "changed " + ", ".join(keys[:3]) + (f" (+{len(keys) - 3})" if len(keys) > 3 else "")
+    for output in outputs:
+        if output in reasons:
+            continue
+        recorded = graph.pages.get(output)
+        path = site_dir / output
+        if force:
+            reasons[output] = "forced"
+        elif recorded is None:
+            reasons[output] = "new page"
+        elif not path.exists():
+            reasons[output] = "output missing"
+        else:
+            stat = path.stat()
+            if (stat.st_size, stat.st_mtime_ns) != (recorded["size"], recorded["mtime_ns"]):
+                reasons[output] = "output edited"
+    return reasons
+
+
+@lru_cache(maxsize=None)
+def _environment() -> Environment:
+    """Template environment, created once per process"""
+    return Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)), autoescape=select_autoescape(["html"]),
+                       trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True)
+
+
+def render_page(site_dir: str, template: str, output: str, context: Dict) -> Tuple[str, int, int]:
+    """
+    Render one page and write it if its content changed
+
+    Returns:
+        (output, size, mtime_ns) of the file on disk
+    """
+    content = _environment().get_template(template).render(context).encode("utf-8")
+    path = Path(site_dir) / output
+    if not path.exists() or path.read_bytes() != content:
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, path)
+    stat = path.stat()
+    return output, stat.st_size, stat.st_mtime_ns
+
+
+def generate(site_dir: Path, force: bool = False, workers: Optional[int] = None,
+             dry_run: bool = False) -> GenerateReport:
+    """
+    Bring the generated pages up to date with <site>/data
+
+    Args:
+        site_dir: Family site directory
+        force: Render every page regardless of the dependency graph
+        workers: Process pool size (defaults to CPU count); 1 renders in-process
+        dry_run: Only report what would be rendered
+
+    Returns:
+        GenerateReport with the rendered and removed pages and timings
+    """
+    start = time.perf_counter()
+    data = load_data(site_dir)
+    digests = input_digests(data)
+    outputs = page_outputs(data)
+    graph = DependencyGraph.load(site_dir)
+    changed = graph.changed(digests)
+    reasons = stale_pages(site_dir, outputs, graph, changed, force=force)
+    owned = set(outputs)
+    removed = sorted(output for output in graph.pages if output not in owned)
+
+    report = GenerateReport(pages=len(outputs), changed_inputs=sorted(changed), reasons=reasons, removed=removed)
+    # Only stale pages get a context; the recorded graph already says what the rest read
+    stale = [plan_page(data, output) for output in outputs if output in reasons]
+    report.plan_seconds = time.perf_counter() - start
+    if dry_run:
+        report.rendered = [job.output for job in stale]
+        return report
+
+    start = time.perf_counter()
+    args = ([str(site_dir)] * len(stale), [job.template for job in stale],
+            [job.output for job in stale], [job.context for job in stale])
+    if workers == 1 or len(stale) < SERIAL_LIMIT:
+        results = list(map(render_page, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(stale) // (4 * (workers or os.cpu_count())))
+            results = list(pool.map(render_page, *args, chunksize=chunksize))
+    for output in removed:
+        (site_dir / output).unlink(missing_ok=True)
+
+    inputs = {job.output: job.inputs for job in stale}
+    pages = {output: entry for output, entry in graph.pages.items() if output in owned}
+    for output, size, mtime_ns in results:
+        pages[output] = {"inputs": sorted(set(inputs[output])), "size": size, "mtime_ns": mtime_ns}
+    DependencyGraph(digests, pages).save(site_dir)
+    report.rendered = [output for output, _, _ in results]
+    report.render_seconds = time.perf_counter() - start
+    logger.info(f"Rendered {len(results)} of {len(outputs)} pages, removed {len(removed)}")
+    return report
+
+
+def adopt_outputs(site_dir: Path) -> int:
+    """
+    Re-record the size and mtime of the generated pages as they are now
+
+    Later build stages (wikilinks, tiles, minify) rewrite pages in place; a
+    build that ran them calls this so the next run does not take their
+    rewrites for hand edits and re-render every page.
+
+    Returns:
+        Number of pages whose record changed
+    """
+    graph = DependencyGraph.load(site_dir)
+    adopted = 0
+    for output, entry in graph.pages.items():
+        path = site_dir / output
+        if not path.exists():
+            continue
+        stat = path.stat()
+        if (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+            entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+            adopted += 1
+    if adopted:
+        graph.save(site_dir)
+    return adopted
+
+
+def import_pages(site_dir: Path) -> int:
+    """
+    Write <site>/data from the existing hand-maintained pages
+
+    Recovers each person/place record (description, type, memoir mentions,
+    related people and images) plus the site-wide settings from the layout,
+    so the generator can take the pages over without losing content.
+
+    Returns:
+        Number of person/place records written
+    """
+    data_dir = site_dir / DATA_DIR
+    entities = extract_entities(site_dir)
+    for directory in KIND_DIRS.values():
+        (data_dir / directory).mkdir(parents=True, exist_ok=True)
+
+    main_index = "index.html"
+    for slug, entity in entities.items():
+        content = extract_content((site_dir / entity.url).read_text(encoding="utf-8"))
+        record = {"name": entity.name, "description": entity.description}
+        place_type = TYPE_RE.search(content.text)
+        if place_type:
+            record["type"] = place_type.group(1)
+        record["mentions"] = [{"page": int(m.group(1)), "note": m.group(2)}
+                              for m in map(MENTION_RE.match, content.text.splitlines()) if m]
+        record.update({"pages": entity.pages, "related": entity.related, "images": entity.images})
+        for link in content.links:
+            if link.text == "Main Index":
+                main_index = link.href
+        path = data_dir / KIND_DIRS[entity.kind] / f"{slug}.json"
+        path.write_text(json.dumps(record, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    sample = (site_dir / INDEX_PAGES["person"]).read_text(encoding="utf-8")
+    footer = FOOTER_RE.search(sample)
+    site = {
+        "title": html.unescape(HEADER_TITLE_RE.search(sample).group(1)),
+        "subject": html.unescape(footer.group(1)) if footer else "",
+        "memoir_pages": footer.group(2) if footer else "",
+        "main_index": main_index,
+        "key_people": [],
+        "notable_places": [],
+        "indexes": {},
+    }
+    for key, heading in (("key_people", "Key People"), ("notable_places", "Notable Places")):
+        block = re.search(SIDEBAR_LIST_RE.format(heading), sample, re.S)
+        slugs = [normalize_slug(href) for href in HREF_RE.findall(block.group(1))] if block else []
+        site[key] = [slug for slug in slugs if slug in entities]
+    for directory, page in (("people", "people.html"), ("places", "places.html"), ("images", IMAGES_PAGE)):
+        content = extract_content((site_dir / page).read_text(encoding="utf-8"))
+        lines = content.text.splitlines()
+        intro = lines[1] if len(lines) > 1 else ""
+        if directory != "images":
+            intro = COUNT_RE.sub("{count}", intro, count=1)  # Filled in with the live count
+        site["indexes"][directory] = {"heading": content.title, "intro": intro}
+    (data_dir / "site.json").write_text(json.dumps(site, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return len(entities)
+
+
+def main():
+    parser = family_argument_parser("Render person, place and index pages from the site data")
+    parser.add_argument("--import-pages", action="store_true",
+                        help="Write <site>/data from the current pages instead of rendering")
+    parser.add_argument("--force", action="store_true", help="Render every page")
+    parser.add_argument("--dry-run", action="store_true", help="List stale pages and why, without rendering")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    if args.import_pages:
+        count = import_pages(site_dir)
+        print(f"✓ Wrote {count} person/place records and site.json to {site_dir / DATA_DIR}")
+        return
+
+    report = generate(site_dir, force=args.force, workers=args.workers, dry_run=args.dry_run)
+    verb = "Would render" if args.dry_run else "Rendered"
+    print(f"✓ {verb} {len(report.rendered)} of {report.pages} pages in {report.elapsed * 1000:.0f} ms "
+          f"(plan {report.plan_seconds * 1000:.0f} ms, render {report.render_seconds * 1000:.0f} ms)")
+    if report.changed_inputs and len(report.changed_inputs) <= 10:
+        print(f"  Changed inputs: {', '.join(report.changed_inputs)}")
+    for output in report.rendered[:20]:
+        print(f"  {output}: {report.reasons[output]}")
+    if len(report.rendered) > 20:
+        print(f"  ... and {len(report.rendered) - 20} more")
+    for output in report.removed:
+        print(f"  removed {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Relationship graph layout stage for the family sites
+Builds the people/places graph from the entity pages, lays it out offline
+with a force-directed (Fruchterman-Reingold) pass and writes tiled
+coordinate JSON so graph.html only fetches and draws the visible region
+"""
+
+import json
+import logging
+import math
+import random
+import shutil
+import time
+from collections import defaultdict
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from sitebuild.entities import Entity, extract_entities
+from sitebuild.site import family_argument_parser, resolve_site
+
+logger = logging.getLogger(__name__)
+
+GRAPH_DIR = "graph"
+TILE_SIZE = 1024  # World units per tile edge
+NODE_SPACING = 160  # Target world units between neighbouring nodes
+ITERATIONS = 200
+GRAVITY = 0.02  # Pull toward the centre so disconnected nodes stay on screen
+MAX_PAGE_MENTIONS = 40  # Pages mentioning more entities than this don't add co-mention edges
+OVERVIEW_NODES = 200  # Highest-degree nodes drawn when zoomed out past the tile budget
+KINDS = ["person", "place"]
+RELATED_WEIGHT = 3.0
+
+
+def build_graph(entities: Dict[str, Entity]) -> Tuple[List[str], Dict[Tuple[int, int], float]]:
+    """
+    Nodes and weighted edges: explicit "Related People" links plus co-mentions on memoir pages
+
+    Returns:
+        (node slugs, {(a, b): weight} with a < b as node indexes)
+    """
+    slugs = list(entities)
+    index = {slug: i for i, slug in enumerate(slugs)}
+    edges: Dict[Tuple[int, int], float] = defaultdict(float)
+
+    for slug, entity in entities.items():
+        for other in entity.related:
+            a, b = sorted((index[slug], index[other]))
+            edges[(a, b)] = max(edges[(a, b)], RELATED_WEIGHT)
+
+    by_page: Dict[int, List[int]] = defaultdict(list)
+    for slug, entity in entities.items():
+        for page in entity.pages:
+            by_page[page].append(index[slug])
+    for members in by_page.values():
+        if len(members) > MAX_PAGE_MENTIONS:
+            continue
+        for a, b in combinations(sorted(members), 2):
+            edges[(a, b)] += 1.0
+    return slugs, dict(edges)
+
+
+def force_layout(count: int, edges: Dict[Tuple[int, int], float], seed: int = 42,
+                 iterations: int = ITERATIONS) -> List[Tuple[float, float]]:
+    """
+    Fruchterman-Reingold layout with grid-bucketed repulsion
+
+    Repulsion is only computed between nodes in neighbouring grid cells, which keeps each
+    iteration close to linear in the node count instead of quadratic.
+    """
+    if count == 0:
+        return []
+    rng = random.Random(seed)
+    side = NODE_SPACING * math.sqrt(count) * 2
+    k = NODE_SPACING
+    cell = 2 * k
+    positions = [[rng.uniform(0, side), rng.uniform(0, side)] for _ in range(count)]
+    max_weight = max(edges.values(), default=1.0)
+    temperature = side / 10
+
+    for step in range(iterations):
+        displacement = [[0.0, 0.0] for _ in range(count)]
+
+        grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, (x, y) in enumerate(positions):
+            grid[(int(x // cell), int(y // cell))].append(i)
+        for (cx, cy), members in grid.items():
+            neighbours = [j for dx in (-1, 0, 1) for dy in (-1, 0, 1) for j in grid.get((cx + dx, cy + dy), ())]
+            for i in members:
+                xi, yi = positions[i]
+                for j in neighbours:
+                    if j == i:
+                        continue
+                    dx, dy = xi - positions[j][0], yi - positions[j][1]
+                    distance = math.hypot(dx, dy) or 0.01
+                    if distance < cell:
+                        force = k * k / distance
+                        displacement[i][0] += dx / distance * force
+                        displacement[i][1] += dy / distance * force
+
+        for i, (x, y) in enumerate(positions):
+            displacement[i][0] += (side / 2 - x) * GRAVITY
+            displacement[i][1] += (side / 2 - y) * GRAVITY
+
+        for (a, b), weight in edges.items():
+            dx, dy = positions[a][0] - positions[b][0], positions[a][1] - positions[b][1]
+            distance = math.hypot(dx, dy) or 0.01
+            force = distance * distance / k * (weight / max_weight)
+            fx, fy = dx / distance * force, dy / distance * force
+            displacement[a][0] -= fx
+            displacement[a][1] -= fy
+            displacement[b][0] += fx
+            displacement[b][1] += fy
+
+        for i in range(count):
+            dx, dy = displacement[i]
+            length = math.hypot(dx, dy)
+            if length:
+                scale = min(length, temperature) / length
+                positions[i][0] += dx * scale
+                positions[i][1] += dy * scale
+        temperature = max(side / 10 * (1 - (step + 1) / iterations), 1.0)
+
+    # Shift into positive world coordinates with a margin
+    min_x = min(p[0] for p in positions) - NODE_SPACING / 2
+    min_y = min(p[1] for p in positions) - NODE_SPACING / 2
+    return [(x - min_x, y - min_y) for x, y in positions]
+
+
+def tile_range(x1: float, y1: float, x2: float, y2: float) -> List[Tuple[int, int]]:
+    """Tiles overlapped by an axis-aligned box"""
+    return [(tx, ty)
+            for tx in range(int(min(x1, x2) // TILE_SIZE), int(max(x1, x2) // TILE_SIZE) + 1)
+            for ty in range(int(min(y1, y2) // TILE_SIZE), int(max(y1, y2) // TILE_SIZE) + 1)]
+
+
+def write_graph(site_dir: Path, entities: Dict[str, Entity], seed: int = 42) -> Dict:
+    """
+    Lay out the graph and write its tiles
+
+    Layout under <site>/graph/:
+        index.json           world size, tile size, tile list and counts
+        overview.json        highest-degree nodes for zoomed-out views
+        tiles/<tx>_<ty>.json {"nodes": [[x, y, label, url, kind, degree]], "edges": [[x1, y1, x2, y2, weight]]}
+
+    Returns:
+        The index dict that was written
+    """
+    slugs, edges = build_graph(entities)
+    positions = force_layout(len(slugs), edges, seed=seed)
+    degree = [0] * len(slugs)
+    for a, b in edges:
+        degree[a] += 1
+        degree[b] += 1
+
+    def node_record(i: int) -> List:
+        entity = entities[slugs[i]]
+        x, y = positions[i]
+        return [round(x), round(y), entity.name, entity.url, KINDS.index(entity.kind), degree[i]]
+
+    tiles: Dict[Tuple[int, int], Dict[str, List]] = defaultdict(lambda: {"nodes": [], "edges": []})
+    for i in range(len(slugs)):
+        x, y = positions[i]
+        tiles[(int(x // TILE_SIZE), int(y // TILE_SIZE))]["nodes"].append(node_record(i))
+    for (a, b), weight in sorted(edges.items()):
+        (x1, y1), (x2, y2) = positions[a], positions[b]
+        record = [round(x1), round(y1), round(x2), round(y2), round(weight, 1)]
+        for tile in tile_range(x1, y1, x2, y2):
+            tiles[tile]["edges"].append(record)
+
+    out_dir = site_dir / GRAPH_DIR
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    (out_dir / "tiles").mkdir(parents=True)
+    for (tx, ty), tile in sorted(tiles.items()):
+        (out_dir / "tiles" / f"{tx}_{ty}.json").write_text(
+            json.dumps(tile, separators=(",", ":"), ensure_ascii=False), encoding="utf-8")
+
+    top = sorted(range(len(slugs)), key=lambda i: -degree[i])[:OVERVIEW_NODES]
+    (out_dir / "overview.json").write_text(
+        json.dumps({"nodes": [node_record(i) for i in top]}, separators=(",", ":"), ensure_ascii=False),
+        encoding="utf-8")
+
+    index = {
+        "version": 1,
+        "width": math.ceil(max((p[0] for p in positions), default=0) + NODE_SPACING / 2),
+        "height": math.ceil(max((p[1] for p in positions), default=0) + NODE_SPACING / 2),
+        "tile_size": TILE_SIZE,
+        "tiles": sorted(f"{tx}_{ty}" for tx, ty in tiles),
+        "kinds": KINDS,
+        "nodes": len(slugs),
+        "edges": len(edges),
+    }
+    (out_dir / "index.json").write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8")
+    logger.info(f"Laid out {len(slugs)} nodes and {len(edges)} edges in {len(tiles)} tiles")
+    return index
+
+
+def main():
+    parser = family_argument_parser("Precompute the relationship graph layout")
+    parser.add_argument("--seed", type=int, default=42, help="Layout random seed")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    index = write_graph(site_dir, extract_entities(site_dir), seed=args.seed)
+    print(f"✓ {index['nodes']} nodes, {index['edges']} edges, {len(index['tiles'])} tiles "
+          f"({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
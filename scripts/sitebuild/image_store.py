@@ -0,0 +1,392 @@
+"""
+Content-addressed image store for the family sites
+Page-by-page extraction stores the same photo or letterhead once per page it
+appears on. This stage hashes every scan (SHA-256 plus 64-bit pHash and dHash)
+in a process pool, links each distinct file into images/store/<sha256>.png,
+finds near-duplicates with a multi-index lookup over the perceptual hashes, and rewrites
+page references so every copy of an image is served from one canonical asset
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from PIL import Image
+
+from sitebuild.site import STORE_INDEX, family_argument_parser, iter_images, iter_pages, resolve_site
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = "images/store"
+INDEX_PATH = STORE_INDEX
+GALLERY_MANIFEST = "images/manifest.json"  # Written by sitebuild.thumbnails
+NEAR_DISTANCE = 6  # Max differing bits (of 64) in both pHash and dHash for a near-duplicate
+MAX_ASPECT_CHANGE = 0.02  # Near-duplicates keep the aspect ratio; other crops are different pictures
+FLAT_SHARE = 0.9  # Share of pixels in one 16-level gray band that makes an image a fill or frame, not a picture
+DCT_SIZE = 32  # pHash samples a 32x32 grayscale image and keeps the lowest 8x8 DCT frequencies
+DCT_KEEP = 8
+
+# Scan references in page markup: the viewers use src="page_N_img_M.png", other pages images/...
+# References this stage rewrote keep the scan name in data-scan, so a later run can re-point them
+SCAN_REF_RE = re.compile(r'\b(src|href)="(?:(?:images/)?(page_\d+_img_\d+\.png)'
+                         r'|images/store/[0-9a-f]{64}\.png" data-scan="(page_\d+_img_\d+\.png))"')
+
+_DCT = [[math.cos((2 * x + 1) * u * math.pi / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+        for u in range(DCT_KEEP)]
+
+
+def perceptual_hash(gray: Image.Image) -> int:
+    """64-bit pHash: signs of the lowest DCT frequencies of a 32x32 image against their median"""
+    pixels = gray.resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS).tobytes()
+    rows = [pixels[y * DCT_SIZE:(y + 1) * DCT_SIZE] for y in range(DCT_SIZE)]
+    # Separable DCT-II, computing only the DCT_KEEP x DCT_KEEP block that is kept
+    row_freqs = [[sum(c * p for c, p in zip(basis, row)) for basis in _DCT] for row in rows]
+    coefficients = [sum(_DCT[v][y] * row_freqs[y][u] for y in range(DCT_SIZE))
+                    for v in range(DCT_KEEP) for u in range(DCT_KEEP)]
+    median = sorted(coefficients[1:])[len(coefficients) // 2 - 1]  # DC term left out of the median
+    bits = 0
+    for coefficient in coefficients:
+        bits = (bits << 1) | (coefficient > median)
+    return bits
+
+
+def difference_hash(gray: Image.Image) -> int:
+    """64-bit dHash: whether each pixel of a 9x8 image is brighter than its left neighbour"""
+    pixels = gray.resize((9, 8), Image.LANCZOS).tobytes()
+    bits = 0
+    for y in range(8):
+        for x in range(8):
+            bits = (bits << 1) | (pixels[y * 9 + x + 1] > pixels[y * 9 + x])
+    return bits
+
+
+def is_flat(gray: Image.Image) -> bool:
+    """Whether nearly every pixel has the same tone (blank masks and frame plates from the PDF extraction)"""
+    histogram = gray.histogram()
+    bands = [sum(histogram[i:i + 16]) for i in range(0, 256, 16)]
+    return max(bands) >= FLAT_SHARE * sum(bands)
+
+
+def fingerprint(path: str) -> Dict:
+    """
+    Hash one scan, reading it once
+
+    Returns:
+        Dict with sha256, size, width, height, the pHash/dHash as 16-digit hex
+        and whether the image is flat
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    with Image.open(BytesIO(data)) as im:
+        width, height = im.size
+        im.draft("L", (DCT_SIZE * 4, DCT_SIZE * 4))
+        gray = im.convert("L")
+        # Shrink in integer steps first; the hashes only look at 32x32 and 9x8
+        gray.thumbnail((DCT_SIZE * 4, DCT_SIZE * 4), Image.BOX, reducing_gap=2.0)
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "size": len(data),
+        "width": width,
+        "height": height,
+        "phash": f"{perceptual_hash(gray):016x}",
+        "dhash": f"{difference_hash(gray):016x}",
+        "flat": is_flat(gray),
+    }
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class HashIndex:
+    """
+    Near-duplicate lookup over 64-bit hashes within a fixed Hamming radius
+
+    Each hash is cut into radius + 1 bands. Two hashes that differ in at most
+    radius bits agree exactly on at least one band (pigeonhole), so a lookup
+    only checks hashes sharing a band with the query. A BK-tree prunes almost
+    nothing at 64 bits: at radius 6 it visits more nodes than a linear scan.
+    """
+
+    def __init__(self, radius: int):
+        self.radius = radius
+        bands = radius + 1
+        self._bands = []  # (shift, mask)
+        shift = 0
+        for band in range(bands):
+            width = 64 // bands + (band < 64 % bands)
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables: List[Dict[int, list]] = [{} for _ in self._bands]
+        self._values: list = []
+        self._items: list = []
+
+    def add(self, value: int, item) -> None:
+        slot = len(self._values)
+        self._values.append(value)
+        self._items.append(item)
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            table.setdefault((value >> shift) & mask, []).append(slot)
+
+    def search(self, value: int) -> List[Tuple[int, object]]:
+        """(distance, item) for every item whose hash is within the radius of value"""
+        candidates = set()
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            candidates.update(table.get((value >> shift) & mask, ()))
+        found = []
+        for slot in candidates:
+            distance = hamming(value, self._values[slot])
+            if distance <= self.radius:
+                found.append((distance, self._items[slot]))
+        return found
+
+
+@dataclass
+class StoreReport:
+    """Outcome of an image store pass over a site"""
+    images: int = 0
+    hashed: int = 0  # Scans whose size or mtime changed since the last run
+    unique: int = 0
+    scan_bytes: int = 0
+    store_bytes: int = 0  # What the store holds, and what deploys instead of the scans
+    exact_groups: List[List[str]] = field(default_factory=list)  # Byte-identical scans, 2+ per group
+    near_groups: List[List[str]] = field(default_factory=list)  # Canonical first
+    near_bytes: int = 0  # Bytes the non-canonical members of near groups take up
+    near_merged: bool = False
+    pages_rewritten: int = 0
+    references_rewritten: int = 0
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        """Deploy bytes saved: compress ships the store in place of the scans it serves"""
+        return self.scan_bytes - self.store_bytes
+
+
+def store_name(sha256: str) -> str:
+    return f"{STORE_DIR}/{sha256}.png"
+
+
+def link_into_store(site_dir: Path, source: Path, sha256: str) -> None:
+    """Add a scan to the store under its hash (hard link when the filesystem allows it)"""
+    target = site_dir / store_name(sha256)
+    if target.exists():
+        return
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def write_if_changed(path: Path, text: str) -> None:
+    """Leave an identical file alone, so an unchanged rerun keeps mtimes (and build fingerprints) quiet"""
+    if not path.exists() or path.read_text(encoding="utf-8") != text:
+        path.write_text(text, encoding="utf-8")
+
+
+def load_index(site_dir: Path) -> Dict:
+    """The index the previous run wrote (fingerprints and canonical store paths by scan name)"""
+    try:
+        index = json.loads((site_dir / INDEX_PATH).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {"images": {}}
+    return index if index.get("version") == 1 else {"images": {}}
+
+
+def fingerprint_images(images: List[Path], previous: Dict[str, Dict],
+                       workers: int = None) -> Tuple[Dict[str, Dict], int]:
+    """
+    Fingerprints of every scan, reusing previous ones for files whose size and mtime are unchanged
+
+    Returns:
+        (fingerprints by file name, number of scans that had to be hashed)
+    """
+    fingerprints, stale = {}, []
+    for image in images:
+        info = image.stat()
+        known = previous.get(image.name)
+        if known and known.get("size") == info.st_size and known.get("mtime_ns") == info.st_mtime_ns:
+            fingerprints[image.name] = known
+        else:
+            stale.append((image, info.st_mtime_ns))
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashed = pool.map(fingerprint, [str(image) for image, _ in stale], chunksize=4)
+            for (image, mtime_ns), result in zip(stale, hashed):
+                fingerprints[image.name] = {**result, "mtime_ns": mtime_ns}
+    return fingerprints, len(stale)
+
+
+def near_duplicate_groups(fingerprints: Dict[str, Dict], distance: int) -> List[List[str]]:
+    """
+    Group distinct files whose pHash and dHash both lie within distance bits
+
+    Files are taken largest first and each one not yet grouped collects its
+    neighbours, so every member is close to the canonical itself rather than
+    to some chain of intermediate files. Flat images (blank masks, fills) hash
+    alike whatever their size and are left to exact matching.
+
+    Returns:
+        Groups of SHA-256s, the canonical (largest by pixels, then bytes) first
+    """
+    by_sha = {}
+    for entry in fingerprints.values():
+        if not entry.get("flat"):
+            by_sha.setdefault(entry["sha256"], entry)
+    index = HashIndex(distance)
+    for sha, entry in by_sha.items():
+        index.add(int(entry["phash"], 16), sha)
+
+    def aspect(entry):
+        return entry["width"] / entry["height"]
+
+    grouped = set()
+    groups = []
+    for sha in sorted(by_sha, key=lambda s: (-by_sha[s]["width"] * by_sha[s]["height"], -by_sha[s]["size"], s)):
+        if sha in grouped:
+            continue
+        entry = by_sha[sha]
+        dhash = int(entry["dhash"], 16)
+        members = [sha]
+        for _, other in sorted(index.search(int(entry["phash"], 16))):
+            candidate = by_sha[other]
+            if (other not in grouped and other != sha
+                    and hamming(dhash, int(candidate["dhash"], 16)) <= distance
+                    and abs(aspect(candidate) / aspect(entry) - 1) <= MAX_ASPECT_CHANGE):
+                members.append(other)
+        if len(members) > 1:
+            grouped.update(members)
+            groups.append(members)
+    return sorted(groups, key=lambda members: -sum(by_sha[s]["size"] for s in members[1:]))
+
+
+def rewrite_references(site_dir: Path, canonical: Dict[str, str], report: StoreReport, dry_run: bool) -> None:
+    """Point page src/href attributes and gallery manifest entries at canonical store paths"""
+
+    def replace(match):
+        name = match.group(2) or match.group(3)
+        target = canonical.get(name)
+        if target is None:
+            return match.group(0)
+        rewritten = f'{match.group(1)}="{target}" data-scan="{name}"'
+        if rewritten != match.group(0):
+            report.references_rewritten += 1
+        return rewritten
+
+    for page in iter_pages(site_dir):
+        original = page.read_text(encoding="utf-8")
+        html = SCAN_REF_RE.sub(replace, original)
+        if html != original:
+            report.pages_rewritten += 1
+            if not dry_run:
+                page.write_text(html, encoding="utf-8")
+
+    manifest_file = site_dir / GALLERY_MANIFEST
+    if manifest_file.exists() and not dry_run:
+        manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+        for entry in manifest["images"]:
+            name = f"page_{entry['page']}_img_{entry['index']}.png"
+            entry["file"] = canonical.get(name, entry["file"])
+        write_if_changed(manifest_file, json.dumps(manifest, separators=(",", ":")))
+
+
+def build_image_store(site_dir: Path, near_distance: int = NEAR_DISTANCE, merge_near: bool = False,
+                      dry_run: bool = False, workers: int = None) -> StoreReport:
+    """
+    Hash the scans, fill the store, and point pages at one copy of each image
+
+    Args:
+        site_dir: Family site directory
+        near_distance: Hamming radius for near-duplicates
+        merge_near: Also point near-duplicates at their group's canonical file (otherwise only reported)
+        dry_run: Report without writing the store, index or pages
+        workers: Process pool size (defaults to CPU count)
+
+    Returns:
+        StoreReport with duplicate groups, byte counts and rewrite counts
+    """
+    report = StoreReport(near_merged=merge_near)
+    images = iter_images(site_dir)
+    previous = load_index(site_dir)
+    fingerprints, report.hashed = fingerprint_images(images, previous["images"], workers=workers)
+    report.images = len(images)
+
+    by_sha: Dict[str, List[str]] = {}
+    for image in images:
+        by_sha.setdefault(fingerprints[image.name]["sha256"], []).append(image.name)
+    report.unique = len(by_sha)
+    report.scan_bytes = sum(entry["size"] for entry in fingerprints.values())
+    report.exact_groups = sorted((names for names in by_sha.values() if len(names) > 1),
+                                 key=lambda names: -fingerprints[names[0]]["size"] * (len(names) - 1))
+
+    sha_size = {sha: fingerprints[names[0]]["size"] for sha, names in by_sha.items()}
+    canonical_sha = {sha: sha for sha in by_sha}
+    for group in near_duplicate_groups(fingerprints, near_distance):
+        report.near_groups.append([name for sha in group for name in by_sha[sha]])
+        report.near_bytes += sum(sha_size[sha] for sha in group[1:])
+        if merge_near:
+            canonical_sha.update((sha, group[0]) for sha in group[1:])
+    canonical = {image.name: store_name(canonical_sha[fingerprints[image.name]["sha256"]]) for image in images}
+    # Merged near-duplicates are served from their canonical file, so only canonical files are stored
+    stored = set(canonical_sha.values())
+    report.store_bytes = sum(sha_size[sha] for sha in stored)
+
+    if not dry_run:
+        (site_dir / STORE_DIR).mkdir(parents=True, exist_ok=True)
+        for sha in stored:
+            link_into_store(site_dir, site_dir / "images" / by_sha[sha][0], sha)
+        for path in (site_dir / STORE_DIR).glob("*.png"):
+            if path.stem not in stored:
+                path.unlink()  # The scan it held was replaced, removed or merged
+        index = {"version": 1, "near_distance": near_distance, "merge_near": merge_near,
+                 "images": fingerprints, "canonical": canonical}
+        write_if_changed(site_dir / INDEX_PATH, json.dumps(index, separators=(",", ":"), sort_keys=True))
+    rewrite_references(site_dir, canonical, report, dry_run)
+    logger.info(f"Hashed {report.hashed} scans, {report.images - report.hashed} unchanged")
+    return report
+
+
+def main():
+    parser = family_argument_parser("Deduplicate scans into a content-addressed store and rewrite page references")
+    parser.add_argument("--near-distance", type=int, default=NEAR_DISTANCE,
+                        help=f"Hamming radius for near-duplicates (default: {NEAR_DISTANCE})")
+    parser.add_argument("--merge-near", action="store_true",
+                        help="Serve near-duplicates from their group's canonical scan too")
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    start = time.perf_counter()
+    report = build_image_store(resolve_site(args), near_distance=args.near_distance,
+                               merge_near=args.merge_near, dry_run=args.dry_run, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    mb = 1024 * 1024
+    print(f"✓ {report.images} scans, {report.unique} distinct ({elapsed:.1f}s, {report.hashed} hashed)")
+    print(f"  Exact duplicates: {sum(len(g) - 1 for g in report.exact_groups)} copies in "
+          f"{len(report.exact_groups)} groups; store {report.store_bytes / mb:.1f} MB "
+          f"for {report.scan_bytes / mb:.1f} MB of scans")
+    for names in report.exact_groups[:5]:
+        print(f"    {len(names)} x {names[0]} ({', '.join(names[1:4])}{', ...' if len(names) > 4 else ''})")
+    verb = "merged" if report.near_merged else "found (--merge-near to serve one copy)"
+    print(f"  Near-duplicates {verb}: {len(report.near_groups)} groups, "
+          f"{report.near_bytes / mb:.1f} MB outside the canonical scans")
+    for names in report.near_groups[:5]:
+        print(f"    {names[0]} ~ {', '.join(names[1:4])}{', ...' if len(names) > 4 else ''}")
+    print(f"  Bytes reclaimed from the deploy (the store ships instead of the scans): "
+          f"{report.bytes_reclaimed / mb:.1f} MB; "
+          f"{report.references_rewritten} references rewritten on {report.pages_rewritten} pages")
+
+
+if __name__ == "__main__":
+    main()
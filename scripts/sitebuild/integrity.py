@@ -0,0 +1,324 @@
+"""
+Link and asset integrity check for the family sites
+Parses every page in a process pool into the links, assets and anchors it
+holds, builds the site's link graph, and reports broken internal links
+(missing files, missing #anchors, unresolved [[wiki links]]), pages that
+cannot be reached from index.html, and images nothing references. Parsed
+pages are cached in data/.integrity-cache.json keyed by content hash, so a
+rerun only parses the pages that changed and is cheap enough for every
+commit.
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from sitebuild.site import DATA_DIR, family_argument_parser, file_sha256, iter_pages, resolve_site
+from sitebuild.wikilinks import WIKI_LINK_RE, target_filename
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = ".integrity-cache.json"
+CACHE_VERSION = 1  # Bump when parse_page's output changes
+ENTRY_PAGES = ("index.html",)
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg"}
+GENERATED_IMAGE_DIRS = {"thumbs", "tiles"}  # Build outputs, referenced from JSON the stages write
+MANIFEST_PATH = "images/manifest.json"  # Gallery entries written by sitebuild.thumbnails
+SERIAL_LIMIT = 16  # Fewer stale pages than this are parsed in-process
+SKIPPED_SCHEMES = ("data:", "mailto:", "tel:", "javascript:", "//")
+
+
+class _LinkParser(HTMLParser):
+    """Every reference in a page plus the ids it defines"""
+
+    ASSET_ATTRS = {"src", "data-src", "data-dzi"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.refs: List[Tuple[str, str]] = []  # (kind, url): "link", "asset" or "scan" (name in images/)
+        self.ids: List[str] = []
+        self.wiki: List[str] = []
+        self.raw = 0  # Inside <script>/<style>, where [[...]] is code rather than markup
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        for name in ("id", "name") if tag == "a" else ("id",):
+            if attributes.get(name):
+                self.ids.append(attributes[name])
+        for name, value in attrs:
+            if not value:
+                continue
+            if name in self.ASSET_ATTRS:
+                self.refs.append(("asset", value))
+            elif name == "data-scan":
+                self.refs.append(("scan", value))
+            elif name == "href":
+                rel = (attributes.get("rel") or "").lower().split()
+                self.refs.append(("asset" if tag == "link" and ("stylesheet" in rel or "icon" in rel) else "link",
+                                  value))
+        if tag in ("script", "style"):
+            self.raw += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self.raw:
+            self.raw -= 1
+
+    def handle_data(self, data):
+        if not self.raw and "[[" in data:
+            self.wiki.extend(match.group(1) for match in WIKI_LINK_RE.finditer(data))
+
+
+def parse_page(path: str) -> Dict:
+    """References, anchors and leftover wiki markup of one page (runs in pool workers)"""
+    parser = _LinkParser()
+    parser.feed(Path(path).read_text(encoding="utf-8", errors="replace"))
+    parser.close()
+    return {"refs": parser.refs, "ids": sorted(set(parser.ids)), "wiki": parser.wiki}
+
+
+def load_cache(site_dir: Path) -> Dict[str, Dict]:
+    try:
+        cache = json.loads((site_dir / DATA_DIR / CACHE_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return cache.get("pages", {}) if cache.get("version") == CACHE_VERSION else {}
+
+
+def parse_pages(site_dir: Path, workers: Optional[int] = None) -> Tuple[Dict[str, Dict], int]:
+    """
+    Parsed data for every page, from the cache where the content is unchanged
+
+    Size and mtime match first; pages that were only touched are rehashed and
+    still reused when their SHA-256 matches.
+
+    Returns:
+        (parsed data by page name, number of pages parsed this run)
+    """
+    previous = load_cache(site_dir)
+    pages, stale = {}, []
+    for page in iter_pages(site_dir):
+        info = page.stat()
+        entry = previous.get(page.name)
+        if entry and entry["size"] == info.st_size and entry["mtime_ns"] == info.st_mtime_ns:
+            pages[page.name] = entry
+            continue
+        sha256 = file_sha256(page)
+        if entry and entry["sha256"] == sha256:
+            pages[page.name] = {**entry, "mtime_ns": info.st_mtime_ns}
+            continue
+        pages[page.name] = {"size": info.st_size, "mtime_ns": info.st_mtime_ns, "sha256": sha256}
+        stale.append(page)
+
+    if len(stale) > SERIAL_LIMIT and (workers or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parse_page, [str(page) for page in stale], chunksize=8))
+    else:
+        parsed = [parse_page(str(page)) for page in stale]
+    for page, result in zip(stale, parsed):
+        pages[page.name].update(result)
+
+    if stale or len(pages) != len(previous) or any(pages[name] is not previous.get(name) for name in pages):
+        cache_file = site_dir / DATA_DIR / CACHE_NAME
+        cache_file.parent.mkdir(exist_ok=True)
+        cache_file.write_text(json.dumps({"version": CACHE_VERSION, "pages": pages}, separators=(",", ":")),
+                              encoding="utf-8")
+    return pages, len(stale)
+
+
+def resolve(site_dir: Path, page: str, url: str) -> Optional[Tuple[str, str]]:
+    """(site-relative path, fragment) a reference points at, or None for external references"""
+    url = url.strip()
+    if not url or url.lower().startswith(SKIPPED_SCHEMES) or "://" in url.split("?")[0].split("#")[0]:
+        return None
+    path, _, fragment = url.partition("#")
+    path = unquote(path.split("?")[0])
+    if not path:
+        return page, fragment  # "#anchor" in the same page
+    base = page.rpartition("/")[0]
+    joined = os.path.normpath(path.lstrip("/") if path.startswith("/") or not base else f"{base}/{path}")
+    if joined.startswith(".."):
+        return None  # Outside the site; not ours to check
+    if path.endswith("/") or os.path.isdir(os.path.join(site_dir, joined)):
+        joined = f"{joined}/index.html"
+    return joined.replace(os.sep, "/"), fragment
+
+
+@dataclass
+class IntegrityReport:
+    """Outcome of an integrity check"""
+    pages: int = 0
+    parsed: int = 0
+    links: int = 0
+    broken: List[Tuple[str, str, str]] = field(default_factory=list)  # (page, reference, reason)
+    orphans: List[str] = field(default_factory=list)  # Pages not reachable from the entry pages
+    unreferenced: List[str] = field(default_factory=list)  # Images no page, data-scan or gallery entry names
+    misreferenced: Dict[str, List[str]] = field(default_factory=dict)  # Image -> broken refs naming it by file name
+    graph: Dict[str, List[str]] = field(default_factory=dict)  # Page -> pages it links to
+
+
+def site_images(site_dir: Path) -> List[str]:
+    """Site-relative paths of the images under images/, outside the generated thumbnail and tile trees"""
+    images = []
+    root = site_dir / "images"
+    for dirpath, dirnames, filenames in os.walk(root):
+        if Path(dirpath) == root:
+            dirnames[:] = sorted(d for d in dirnames if d not in GENERATED_IMAGE_DIRS)
+        for name in sorted(filenames):
+            if Path(name).suffix.lower() in IMAGE_EXTENSIONS:
+                images.append((Path(dirpath) / name).relative_to(site_dir).as_posix())
+    return images
+
+
+def check_site(site_dir: Path, entry_pages=ENTRY_PAGES, workers: Optional[int] = None) -> IntegrityReport:
+    """
+    Check every page's links and assets and the site's images
+
+    Args:
+        site_dir: Family site directory
+        entry_pages: Pages visitors start from; pages they cannot reach are orphans
+        workers: Process pool size for parsing (defaults to CPU count)
+
+    Returns:
+        IntegrityReport
+    """
+    pages, parsed = parse_pages(site_dir, workers)
+    report = IntegrityReport(pages=len(pages), parsed=parsed)
+    exists: Dict[str, bool] = {}
+
+    def is_file(path: str) -> bool:
+        if path not in exists:
+            exists[path] = path in pages or (site_dir / path).is_file()
+        return exists[path]
+
+    images = site_images(site_dir)
+    by_name = defaultdict(list)
+    for image in images:
+        by_name[image.rsplit("/", 1)[-1]].append(image)
+    referenced: Set[str] = set()
+
+    resolved_refs: Dict[Tuple[str, str], Optional[Tuple[str, str]]] = {}  # Sidebars repeat the same links
+    for page, data in sorted(pages.items()):
+        targets = set()
+        for kind, url in data["refs"]:
+            if kind == "scan":
+                referenced.add(f"images/{url}")
+                continue
+            key = (page.rpartition("/")[0], url) if not url.startswith("#") else (page, url)
+            if key not in resolved_refs:
+                resolved_refs[key] = resolve(site_dir, page, url)
+            resolved = resolved_refs[key]
+            if resolved is None:
+                continue
+            path, fragment = resolved
+            report.links += 1
+            if not is_file(path):
+                report.broken.append((page, url, "missing file"))
+                for image in by_name.get(path.rsplit("/", 1)[-1], ()):
+                    report.misreferenced.setdefault(image, []).append(f"{page}: {url}")
+                continue
+            referenced.add(path)
+            if path in pages:
+                if kind == "link" and path != page:
+                    targets.add(path)
+                if fragment and fragment not in pages[path]["ids"]:
+                    report.broken.append((page, url, "missing anchor"))
+        for target in data["wiki"]:
+            filename = target_filename(target)
+            report.links += 1
+            if filename in pages:
+                targets.add(filename)
+                report.broken.append((page, f"[[{target}]]", "unresolved wiki link (run sitebuild.wikilinks)"))
+            else:
+                report.broken.append((page, f"[[{target}]]", "wiki link to a missing page"))
+        report.graph[page] = sorted(targets)
+
+    try:
+        manifest = json.loads((site_dir / MANIFEST_PATH).read_text(encoding="utf-8"))
+        for entry in manifest.get("images", []):
+            if entry.get("file"):
+                referenced.add(entry["file"])
+            # After sitebuild.image_store the file is the store's copy; the entry still stands for its scan
+            if "page" in entry and "index" in entry:
+                referenced.add(f"images/page_{entry['page']}_img_{entry['index']}.png")
+    except (FileNotFoundError, ValueError):
+        pass
+
+    reachable = set()
+    queue = deque(page for page in entry_pages if page in pages)
+    while queue:
+        page = queue.popleft()
+        if page in reachable:
+            continue
+        reachable.add(page)
+        queue.extend(target for target in report.graph[page] if target not in reachable)
+    report.orphans = sorted(set(pages) - reachable)
+    report.unreferenced = [image for image in images if image not in referenced and image not in report.misreferenced]
+    return report
+
+
+def report_json(report: IntegrityReport) -> Dict:
+    return {
+        "version": 1,
+        "pages": report.pages,
+        "links": report.links,
+        "broken": [{"page": page, "reference": url, "reason": reason} for page, url, reason in report.broken],
+        "orphans": report.orphans,
+        "unreferenced_images": report.unreferenced,
+        "misreferenced_images": report.misreferenced,
+        "graph": report.graph,
+    }
+
+
+def main():
+    parser = family_argument_parser("Check links, anchors and image references across a family site")
+    parser.add_argument("--entry", action="append", help="Entry page for the orphan check (default: index.html)")
+    parser.add_argument("--report", type=Path, help="Write the JSON report (with the link graph) here")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: CPU count)")
+    parser.add_argument("--strict", action="store_true", help="Exit non-zero on broken links or orphaned pages")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    report = check_site(site_dir, tuple(args.entry or ENTRY_PAGES), workers=args.workers)
+    elapsed = time.perf_counter() - start
+    if args.report:
+        args.report.write_text(json.dumps(report_json(report), indent=1), encoding="utf-8")
+
+    edges = sum(len(targets) for targets in report.graph.values())
+    print(f"✓ {report.pages} pages, {report.links} internal references, {edges} page-to-page links "
+          f"({elapsed:.2f}s, {report.parsed} pages parsed)")
+    if report.broken:
+        by_reference = defaultdict(list)
+        for page, url, reason in report.broken:
+            by_reference[(url, reason)].append(page)
+        print(f"⚠️ {len(report.broken)} broken references ({len(by_reference)} distinct) on "
+              f"{len({page for page, _, _ in report.broken})} pages:")
+        by_reference = {key: sorted(set(pages)) for key, pages in by_reference.items()}
+        for (url, reason), pages in sorted(by_reference.items(), key=lambda item: (-len(item[1]), item[0]))[:10]:
+            print(f"    {url}: {reason}, on {len(pages)} page(s) ({', '.join(pages[:3])}"
+                  f"{', ...' if len(pages) > 3 else ''})")
+    if report.misreferenced:
+        print(f"⚠️ {len(report.misreferenced)} images are only referenced by broken paths "
+              f"(e.g. {next(iter(report.misreferenced.values()))[0]})")
+    if report.orphans:
+        print(f"⚠️ {len(report.orphans)} pages unreachable from {', '.join(args.entry or ENTRY_PAGES)}: "
+              f"{', '.join(report.orphans[:8])}{', ...' if len(report.orphans) > 8 else ''}")
+    if report.unreferenced:
+        print(f"⚠️ {len(report.unreferenced)} images nothing references: "
+              f"{', '.join(report.unreferenced[:8])}{', ...' if len(report.unreferenced) > 8 else ''}")
+    if args.strict and (report.broken or report.orphans):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
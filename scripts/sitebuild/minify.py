@@ -0,0 +1,429 @@
+"""
+Minification stage for the family sites
+Strips comments and layout whitespace from the pages and from their inline
+<style> and <script> blocks, in place and in a process pool. <pre> and
+<textarea> contents are left byte for byte; scripts keep their line breaks
+(so automatic semicolon insertion is unaffected) and any script the
+tokenizer is unsure about is left as it was. The output depends only on the
+input, so identical pages minify to identical bytes and deploy hashes stay
+stable, and minifying twice changes nothing. Reports the savings per page
+and in total, raw and after gzip/brotli.
+"""
+
+import gzip
+import json
+import logging
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import brotli
+
+from sitebuild.site import family_argument_parser, iter_pages, resolve_site
+
+logger = logging.getLogger(__name__)
+
+# Whitespace between these and a neighbouring tag never renders
+BLOCK_TAGS = {
+    "html", "head", "body", "title", "meta", "link", "style", "script", "base", "div", "p", "ul", "ol", "li",
+    "dl", "dt", "dd", "table", "thead", "tbody", "tfoot", "tr", "th", "td", "caption", "colgroup", "col",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "footer", "nav", "main", "section", "article", "aside",
+    "figure", "figcaption", "form", "fieldset", "legend", "hr", "br", "blockquote", "details", "summary",
+    "noscript", "template", "pre", "address", "option", "optgroup",
+}
+JS_TYPES = {"", "text/javascript", "application/javascript", "module"}
+JSON_TYPES = {"application/json", "application/ld+json", "importmap"}
+
+TOKEN_RE = re.compile(
+    r"(?P<comment><!--.*?-->)"
+    r"|(?P<raw><(?P<raw_tag>pre|textarea|script|style)\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>.*?</(?P=raw_tag)\s*>)"
+    r"|(?P<tag></?[a-zA-Z][^\s/>]*(?:[^>\"']|\"[^\"]*\"|'[^']*')*>)"
+    r"|(?P<decl><![^>]*>)",
+    re.S | re.I,
+)
+TAG_NAME_RE = re.compile(r"</?([a-zA-Z][^\s/>]*)")
+ATTR_RE = re.compile(r"""([^\s"'>/=]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?""")
+RAW_BLOCK_RE = re.compile(r"(<[^>]*>)(.*)(</[^>]*>)$", re.S)
+WHITESPACE_RE = re.compile(r"\s+")
+
+CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)""", re.S)
+CSS_SPACE_RE = re.compile(r"\s*([{};,>~])\s*|([:(])\s+|\s+(\))")
+
+JS_REGEX_BEFORE = set("(,=:[!&|?{};+-*%<>~^") | {""}
+JS_REGEX_KEYWORDS = {"return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case",
+                     "do", "else", "yield", "await"}
+JS_SPACE_RE = re.compile(r"[ \t]*([{}()\[\];,=:?*%&|])[ \t]*")
+JS_IDENTIFIER_RE = re.compile(r"[\w$]+")
+
+
+def minify_css(css: str) -> str:
+    """Comments and optional whitespace out of a stylesheet; strings and /*! comments are kept"""
+    parts = []
+    position = 0
+    for match in CSS_TOKEN_RE.finditer(css):
+        parts.append(("code", css[position:match.start()]))
+        if match.group(1):
+            parts.append(("string", match.group(1)))
+        elif match.group(2).startswith("/*!"):
+            parts.append(("string", match.group(2)))
+        else:
+            parts.append(("code", " "))  # a/**/b must not become ab
+        position = match.end()
+    parts.append(("code", css[position:]))
+
+    out = []
+    code = []
+    for kind, text in parts + [("string", "")]:
+        if kind == "code":
+            code.append(text)
+            continue
+        compact = WHITESPACE_RE.sub(" ", "".join(code))
+        compact = CSS_SPACE_RE.sub(lambda m: m.group(1) or m.group(2) or m.group(3), compact)
+        out.append(compact.replace(";}", "}"))
+        out.append(text)
+        code = []
+    return "".join(out).strip()
+
+
+def _skip_string(source: str, start: int) -> int:
+    """End of the quoted string starting at start"""
+    quote = source[start]
+    i = start + 1
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if char == "\n":
+            break
+        i += 1
+    raise ValueError("unterminated string")
+
+
+def _skip_template(source: str, start: int) -> int:
+    """End of the template literal starting at start, including nested ${...} expressions"""
+    i = start + 1
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+        elif char == "`":
+            return i + 1
+        elif source.startswith("${", i):
+            i = _skip_braces(source, i + 2)
+        else:
+            i += 1
+    raise ValueError("unterminated template literal")
+
+
+def _skip_braces(source: str, start: int) -> int:
+    """End of a ${...} expression body, after its closing brace"""
+    depth = 1
+    i = start
+    while i < len(source):
+        char = source[i]
+        if char in "'\"":
+            i = _skip_string(source, i)
+        elif char == "`":
+            i = _skip_template(source, i)
+        elif char == "/" and source.startswith(("//", "/*"), i):
+            raise ValueError("comment inside a template expression")
+        elif char == "{":
+            depth += 1
+            i += 1
+        elif char == "}":
+            depth -= 1
+            i += 1
+            if depth == 0:
+                return i
+        else:
+            i += 1
+    raise ValueError("unterminated template expression")
+
+
+def _skip_regex(source: str, start: int) -> int:
+    """End of the regular expression literal starting at start, flags included"""
+    i = start + 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "\n":
+            break
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            while i < len(source) and (source[i].isalnum() or source[i] == "_"):
+                i += 1
+            return i
+        i += 1
+    raise ValueError("unterminated regular expression")
+
+
+def minify_js(source: str) -> str:
+    """
+    Comments and optional whitespace out of a script
+
+    Line breaks are kept, so automatic semicolon insertion sees the same
+    statements. Strings, template literals and regular expressions are copied
+    unchanged. Raises ValueError when the script cannot be tokenized safely.
+    """
+    if "<!--" in source or "-->" in source:
+        raise ValueError("HTML comment markers in script")
+    pieces = []  # (is_code, text)
+    code_start = 0
+    last = ""  # Last significant token, to tell a regex from a division
+    i = 0
+    while i < len(source):
+        char = source[i]
+        if char in "'\"`" or (char == "/" and not source.startswith(("//", "/*"), i)
+                              and (last in JS_REGEX_BEFORE or last in JS_REGEX_KEYWORDS)):
+            end = (_skip_string(source, i) if char in "'\"" else _skip_template(source, i) if char == "`"
+                   else _skip_regex(source, i))
+            pieces.append((True, source[code_start:i]))
+            pieces.append((False, source[i:end]))
+            code_start = i = end
+            last = "a"  # A value
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            end = len(source) if end < 0 else end
+            pieces.append((True, source[code_start:i]))
+            code_start = i = end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            if end < 0:
+                raise ValueError("unterminated comment")
+            comment = source[i:end + 2]
+            pieces.append((True, source[code_start:i]))
+            if comment.startswith("/*!"):
+                pieces.append((False, comment))
+            else:
+                pieces.append((True, "\n" if "\n" in comment else " "))
+            code_start = i = end + 2
+        elif char.isalnum() or char in "_$":
+            word = JS_IDENTIFIER_RE.match(source, i).group(0)
+            last = word
+            i += len(word)
+        else:
+            if not char.isspace():
+                last = char
+            i += 1
+    pieces.append((True, source[code_start:]))
+
+    out = []
+    code = []
+    for is_code, text in pieces + [(False, "")]:
+        if is_code:
+            code.append(text)
+            continue
+        compact = re.sub(r"[ \t\r\f\v]+", " ", "".join(code))
+        compact = re.sub(r" ?\n[\s]*", "\n", compact)
+        out.append(JS_SPACE_RE.sub(r"\1", compact))
+        out.append(text)
+        code = []
+    return "".join(out).strip()
+
+
+def _tag_name(tag: str) -> str:
+    return TAG_NAME_RE.match(tag).group(1).lower()
+
+
+def _minify_tag(tag: str) -> str:
+    """A start or end tag with single spaces between attributes; values are untouched"""
+    closing = tag.startswith("</")
+    name_match = TAG_NAME_RE.match(tag)
+    body = tag[name_match.end():-1]
+    self_closing = body.rstrip().endswith("/")
+    if self_closing:
+        body = body.rstrip()[:-1]
+    parts = [name_match.group(0)]
+    for attribute in ATTR_RE.finditer(body):
+        name, value = attribute.groups()
+        parts.append(name if value is None else f"{name}={value}")
+    if closing:
+        return f"{parts[0]}>"
+    rendered = " ".join(parts)
+    if self_closing:
+        # An unquoted value would swallow the slash
+        rendered += " /" if rendered[-1] not in "\"'" and len(parts) > 1 else "/"
+    return rendered + ">"
+
+
+def _minify_raw(block: str, name: str) -> str:
+    """pre/textarea verbatim; inline styles and scripts minified where their type allows"""
+    match = RAW_BLOCK_RE.match(block)
+    start, content, end = match.groups()
+    start, end = _minify_tag(start), f"</{name}>"
+    if name in ("pre", "textarea"):
+        return start + content + end
+    if name == "style":
+        return start + minify_css(content) + end
+    attributes = {m.group(1).lower(): (m.group(2) or "").strip("\"'") for m in ATTR_RE.finditer(start[7:-1])}
+    script_type = attributes.get("type", "").lower()
+    try:
+        if "src" in attributes and not content.strip():
+            return start + end
+        if script_type in JS_TYPES:
+            return start + minify_js(content) + end
+        if script_type in JSON_TYPES:
+            return start + json.dumps(json.loads(content), separators=(",", ":"), ensure_ascii=False) + end
+    except ValueError as error:
+        logger.debug(f"Left a script as it was: {error}")
+    return start + content + end
+
+
+def minify_html(html: str) -> str:
+    """
+    Minify a page
+
+    Comments go (conditional comments and <!--! ... --> stay), tags lose extra
+    whitespace, whitespace-only text next to a block-level tag goes, and other
+    whitespace runs collapse to one character (a newline if the run had one).
+    """
+    tokens = []  # (kind, text, tag name)
+
+    def add_text(text: str):
+        # Text either side of a dropped comment is one run, so it collapses the same way on every pass
+        if tokens and tokens[-1][0] == "text":
+            tokens[-1] = ("text", tokens[-1][1] + text, None)
+        else:
+            tokens.append(("text", text, None))
+
+    position = 0
+    for match in TOKEN_RE.finditer(html):
+        if match.start() > position:
+            add_text(html[position:match.start()])
+        kind = match.lastgroup if match.lastgroup != "raw_tag" else "raw"
+        if match.group("raw"):
+            kind = "raw"
+        text = match.group(0)
+        if kind == "comment" and not text.startswith(("<!--[if", "<!--!", "<!--<![")):
+            position = match.end()
+            continue
+        tokens.append((kind, text, _tag_name(text) if kind in ("tag", "raw") else None))
+        position = match.end()
+    if position < len(html):
+        add_text(html[position:])
+
+    out = []
+    for index, (kind, text, name) in enumerate(tokens):
+        if kind == "text":
+            if not text.strip():
+                before = tokens[index - 1] if index else None
+                after = tokens[index + 1] if index + 1 < len(tokens) else None
+                # A kept comment or declaration renders nothing, so it is no reason to drop the space
+                if before is None or after is None or before[2] in BLOCK_TAGS or after[2] in BLOCK_TAGS:
+                    continue
+            out.append(WHITESPACE_RE.sub(lambda m: "\n" if "\n" in m.group(0) else " ", text))
+        elif kind == "raw":
+            out.append(_minify_raw(text, name))
+        elif kind == "tag":
+            out.append(_minify_tag(text))
+        else:
+            out.append(text)
+    return "".join(out).strip() + "\n"
+
+
+@dataclass
+class PageSavings:
+    """Sizes of one page before and after minification"""
+    page: str
+    before: int
+    after: int
+    gzip_before: int
+    gzip_after: int
+    brotli_before: int
+    brotli_after: int
+
+
+def minify_page(path: str, dry_run: bool = False, measure: bool = True) -> PageSavings:
+    """Minify one page in place and measure it, compressed sizes only when measure is set (runs in pool workers)"""
+    page = Path(path)
+    original = page.read_bytes()
+    minified = minify_html(original.decode("utf-8")).encode("utf-8")
+    if minified != original and not dry_run:
+        page.write_bytes(minified)
+    if not measure:
+        return PageSavings(page.name, len(original), len(minified), 0, 0, 0, 0)
+    # Same settings as the compress stage, so the numbers match what is deployed
+    gzip_after, brotli_after = len(gzip.compress(minified, 9, mtime=0)), len(brotli.compress(minified, quality=11))
+    if minified == original:
+        gzip_before, brotli_before = gzip_after, brotli_after
+    else:
+        gzip_before, brotli_before = len(gzip.compress(original, 9, mtime=0)), len(brotli.compress(original, quality=11))
+    return PageSavings(
+        page=page.name, before=len(original), after=len(minified),
+        gzip_before=gzip_before, gzip_after=gzip_after, brotli_before=brotli_before, brotli_after=brotli_after,
+    )
+
+
+@dataclass
+class MinifyReport:
+    """Savings of a minification pass"""
+    pages: List[PageSavings] = field(default_factory=list)
+
+    def total(self, key: str) -> int:
+        return sum(getattr(page, key) for page in self.pages)
+
+    @property
+    def rewritten(self) -> int:
+        return sum(1 for page in self.pages if page.after != page.before)
+
+    def as_dict(self) -> Dict:
+        keys = ("before", "after", "gzip_before", "gzip_after", "brotli_before", "brotli_after")
+        return {"totals": {key: self.total(key) for key in keys}, "pages": [vars(page) for page in self.pages]}
+
+
+def minify_site(site_dir: Path, dry_run: bool = False, workers: int = None, measure: bool = True) -> MinifyReport:
+    """Minify every page of a site in a process pool; measure=False skips the gzip/brotli sizes"""
+    pages = [str(page) for page in iter_pages(site_dir)]
+    count = len(pages)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        savings = list(pool.map(minify_page, pages, [dry_run] * count, [measure] * count, chunksize=8))
+    report = MinifyReport(pages=savings)
+    logger.info(f"Minified {report.rewritten} of {len(savings)} pages")
+    return report
+
+
+def main():
+    parser = family_argument_parser("Minify pages and their inline CSS and JS in place")
+    parser.add_argument("--dry-run", action="store_true", help="Measure the savings without writing")
+    parser.add_argument("--top", type=int, default=10, help="Pages to list in the summary (default: 10)")
+    parser.add_argument("--report", type=Path, help="Write per-page sizes as JSON here")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    report = minify_site(site_dir, dry_run=args.dry_run, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    if args.report:
+        args.report.write_text(json.dumps(report.as_dict(), indent=1), encoding="utf-8")
+
+    def saved(before: int, after: int) -> str:
+        return f"{before / 1024:7.0f} KB -> {after / 1024:6.0f} KB ({1 - after / max(before, 1):4.0%} smaller)"
+
+    verb = "would be rewritten" if args.dry_run else "rewritten"
+    print(f"✓ {len(report.pages)} pages minified ({elapsed:.1f}s), {report.rewritten} {verb}")
+    print(f"  raw     {saved(report.total('before'), report.total('after'))}")
+    print(f"  gzip    {saved(report.total('gzip_before'), report.total('gzip_after'))}")
+    print(f"  brotli  {saved(report.total('brotli_before'), report.total('brotli_after'))}")
+    print(f"  {'page':<32} {'raw':>17} {'brotli':>17}")
+    for page in sorted(report.pages, key=lambda page: (page.after - page.before, page.page))[:args.top]:
+        print(f"  {page.page:<32} {page.before / 1024:6.1f} -> {page.after / 1024:5.1f} KB "
+              f"{page.brotli_before / 1024:6.1f} -> {page.brotli_after / 1024:5.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
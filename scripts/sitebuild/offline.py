@@ -0,0 +1,186 @@
+"""
+Offline stage for the family sites
+Generates the site's service worker (static/sw.js) with a versioned precache
+manifest of the shell: the index pages and the scripts and JSON the search,
+gallery, graph and deep-zoom viewers load. Each entry carries a revision
+taken from its content hash, so a rebuild re-downloads only the shell files
+that changed and the worker script itself only changes when one did. Every
+page gets the registration snippet; images are cached at runtime by the
+worker in a size-bounded LRU cache.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sitebuild.site import DATA_DIR, family_argument_parser, file_sha256, iter_pages, resolve_site
+
+logger = logging.getLogger(__name__)
+
+WORKER_NAME = "sw.js"
+WORKER_TEMPLATE = Path(__file__).parent / "static" / "sw.js"
+# Site-relative globs; missing outputs (a stage not run yet) are skipped
+SHELL = (
+    "index.html", "people.html", "places.html", "images.html", "graph.html",
+    "search/search.js", "search/meta.json",
+    "images/manifest.json", "images/tiles/deepzoom.js", "images/tiles/index.json",
+    "graph/index.json", "graph/overview.json",
+)
+IMAGE_CACHE_MB = 50
+PAGE_CACHE_MB = 10
+REVISION_LENGTH = 16
+SETTINGS_FILE = ".offline.json"  # Inside DATA_DIR: the options the worker was built with
+
+# Served in place of the worker after --remove: browsers that installed it drop their caches and unregister
+RETIRED_WORKER = """// Family site service worker, retired by scripts/sitebuild/offline.py --remove
+self.addEventListener('install', () => self.skipWaiting());
+self.addEventListener('activate', event => {
+    const prefix = `family-site:${new URL(self.registration.scope).pathname}:`;
+    event.waitUntil(caches.keys()
+        .then(names => Promise.all(names.filter(name => name.startsWith(prefix)).map(name => caches.delete(name))))
+        .then(() => self.registration.unregister()));
+});
+"""
+
+REGISTER_SNIPPET = ("<script>if ('serviceWorker' in navigator) "
+                    f"navigator.serviceWorker.register('{WORKER_NAME}');</script>")
+# Also matches the snippet after the minify stage has taken its spaces out
+REGISTER_RE = re.compile(r"[ \t]*<script>if ?\('serviceWorker' in navigator\) ?navigator\.serviceWorker\.register"
+                         r"\('[^']*'\);</script>\n?")
+
+
+def precache_entries(site_dir: Path, patterns) -> List[List[str]]:
+    """[path, revision] for every file matching the shell globs, sorted so the output is stable"""
+    paths = set()
+    for pattern in patterns:
+        paths.update(path for path in site_dir.glob(pattern) if path.is_file())
+    return [[path.relative_to(site_dir).as_posix(), file_sha256(path)[:REVISION_LENGTH]]
+            for path in sorted(paths)]
+
+
+def render_worker(entries: List[List[str]], image_cache_mb: int, page_cache_mb: int) -> Tuple[str, str]:
+    """The worker script with the precache manifest and cache budgets filled in, and its version"""
+    manifest = json.dumps(entries, separators=(",", ":"))
+    settings = f"{manifest}|{image_cache_mb}|{page_cache_mb}|{file_sha256(WORKER_TEMPLATE)}"
+    version = hashlib.sha256(settings.encode("utf-8")).hexdigest()[:REVISION_LENGTH]
+    script = WORKER_TEMPLATE.read_text(encoding="utf-8")
+    for placeholder, value in (("/* PRECACHE */[]", manifest), ("/* VERSION */", version),
+                               ("/* IMAGE_CACHE_BYTES */0", str(image_cache_mb * 1024 * 1024)),
+                               ("/* PAGE_CACHE_BYTES */0", str(page_cache_mb * 1024 * 1024))):
+        script = script.replace(placeholder, value, 1)
+    return script, version
+
+
+def set_registration(html: str, enabled: bool) -> str:
+    """Add the registration snippet before </body>, or remove it"""
+    registered = REGISTER_RE.search(html)
+    if enabled and registered and f"register('{WORKER_NAME}')" in registered.group(0):
+        return html  # Kept as it is, so a page minify already compacted is not rewritten
+    html = REGISTER_RE.sub("", html)
+    if enabled:
+        html = html.replace("</body>", f"    {REGISTER_SNIPPET}\n</body>", 1)
+    return html
+
+
+def load_settings(site_dir: Path) -> Optional[Dict]:
+    """
+    The options the site's worker was last built with, or None when it has no (live) worker
+
+    A worker from before the settings were recorded is rebuilt with the defaults.
+    """
+    try:
+        settings = json.loads((site_dir / DATA_DIR / SETTINGS_FILE).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        worker = site_dir / WORKER_NAME
+        if not worker.exists() or worker.read_text(encoding="utf-8") == RETIRED_WORKER:
+            return None
+        return {"patterns": list(SHELL), "image_cache_mb": IMAGE_CACHE_MB, "page_cache_mb": PAGE_CACHE_MB}
+    return None if settings.pop("removed", False) else settings
+
+
+def save_settings(site_dir: Path, settings: Dict) -> None:
+    """Record the options in the site's data directory (sites without one have no build to repeat them)"""
+    path = site_dir / DATA_DIR / SETTINGS_FILE
+    text = json.dumps(settings, indent=2)
+    if path.parent.is_dir() and (not path.exists() or path.read_text(encoding="utf-8") != text):
+        path.write_text(text, encoding="utf-8")
+
+
+def build_offline(site_dir: Path, patterns=SHELL, image_cache_mb: int = IMAGE_CACHE_MB,
+                  page_cache_mb: int = PAGE_CACHE_MB, remove: bool = False) -> Dict:
+    """
+    Register the service worker on every page and write it with a fresh precache manifest
+
+    Pages are rewritten first, since shell pages are hashed with the snippet in them.
+    The options are saved in data/.offline.json, so the build orchestrator
+    (sitebuild.build) rebuilds the worker the same way.
+
+    Args:
+        site_dir: Family site directory
+        patterns: Site-relative globs of the files to precache
+        image_cache_mb: Runtime image cache budget
+        page_cache_mb: Runtime page cache budget
+        remove: Take the registration out of every page and retire the worker instead
+
+    Returns:
+        Dict with the precache entries and bytes, the worker version, and the pages rewritten
+    """
+    pages_rewritten = 0
+    for page in iter_pages(site_dir):
+        original = page.read_text(encoding="utf-8")
+        html = set_registration(original, not remove)
+        if html != original:
+            page.write_text(html, encoding="utf-8")
+            pages_rewritten += 1
+
+    save_settings(site_dir, {"patterns": list(patterns), "image_cache_mb": image_cache_mb,
+                             "page_cache_mb": page_cache_mb, "removed": remove})
+    worker = site_dir / WORKER_NAME
+    if remove:
+        worker.write_text(RETIRED_WORKER, encoding="utf-8")
+        return {"entries": [], "bytes": 0, "version": None, "worker_changed": True,
+                "pages_rewritten": pages_rewritten}
+
+    entries = precache_entries(site_dir, patterns)
+    script, version = render_worker(entries, image_cache_mb, page_cache_mb)
+    # Rewriting an identical worker is harmless, but skipping it keeps mtimes (and deploy diffs) quiet
+    changed = not worker.exists() or worker.read_text(encoding="utf-8") != script
+    if changed:
+        worker.write_text(script, encoding="utf-8")
+    logger.info(f"Precache {len(entries)} files, worker {version}{'' if changed else ' (unchanged)'}")
+    return {"entries": entries, "bytes": sum((site_dir / path).stat().st_size for path, _ in entries),
+            "version": version, "worker_changed": changed, "pages_rewritten": pages_rewritten}
+
+
+def main():
+    parser = family_argument_parser("Generate the service worker and its precache manifest")
+    parser.add_argument("--precache", action="append", metavar="GLOB",
+                        help="Extra site-relative glob to precache, e.g. '*.html' for every page (repeatable)")
+    parser.add_argument("--image-cache-mb", type=int, default=IMAGE_CACHE_MB,
+                        help=f"Runtime image cache budget (default: {IMAGE_CACHE_MB})")
+    parser.add_argument("--page-cache-mb", type=int, default=PAGE_CACHE_MB,
+                        help=f"Runtime page cache budget (default: {PAGE_CACHE_MB})")
+    parser.add_argument("--remove", action="store_true",
+                        help="Strip the snippet and replace sw.js with one that clears its caches and unregisters")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    result = build_offline(site_dir, SHELL + tuple(args.precache or ()), args.image_cache_mb,
+                           args.page_cache_mb, remove=args.remove)
+    elapsed = time.perf_counter() - start
+    if args.remove:
+        print(f"✓ Service worker retired; {result['pages_rewritten']} pages rewritten")
+        return
+    print(f"✓ {WORKER_NAME} {result['version']}{'' if result['worker_changed'] else ' (unchanged)'}: "
+          f"{len(result['entries'])} files precached ({result['bytes'] / 1024:.0f} KB), "
+          f"{result['pages_rewritten']} pages rewritten ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""
+Page weight report for the family sites
+Parses every page and adds up what loading it costs: HTML bytes (raw and
+gzipped), inline CSS and JS, the scripts, stylesheets and images it
+references, and the number of requests. Flags references to local files
+that do not exist and images that are larger than any layout shows them.
+Checks each page against per-page budgets, writes a JSON report and prints
+the heaviest pages; the exit status is non-zero when a budget is exceeded,
+so a build can stop on it.
+"""
+
+import fnmatch
+import gzip
+import json
+import logging
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from PIL import Image
+
+from sitebuild.site import DATA_DIR, family_argument_parser, iter_pages, resolve_site
+
+logger = logging.getLogger(__name__)
+
+BUDGETS_NAME = "budgets.json"  # Optional per-family overrides in the site's data/ directory
+# Limits per page, in KB where the name says so; None switches a check off.
+# "pages" maps page-name globs to overrides, applied in order.
+DEFAULT_BUDGETS = {
+    "default": {
+        "html_kb": 48,
+        "inline_kb": 24,
+        "image_kb": 2048,
+        "total_kb": 3072,
+        "requests": 40,
+        "broken": None,
+    },
+    "pages": {
+        "images.html": {"requests": None},  # Gallery thumbnails are paged by the script
+    },
+}
+OVERSIZED_IMAGE_KB = 500
+MAX_DISPLAY_WIDTH = 2400  # Widest layout column (1200px) at 2x device pixels
+SKIPPED_SCHEMES = ("#", "data:", "mailto:", "tel:", "javascript:", "//")
+
+
+@dataclass
+class PageWeight:
+    """What one page costs to load"""
+    page: str
+    html_bytes: int = 0
+    html_gzip_bytes: int = 0
+    inline_css_bytes: int = 0
+    inline_js_bytes: int = 0
+    script_bytes: int = 0
+    style_bytes: int = 0
+    image_bytes: int = 0
+    requests: int = 1  # The page itself
+    broken: List[str] = field(default_factory=list)  # Local references to missing files
+    oversized: List[str] = field(default_factory=list)  # Loaded images heavier or wider than the layout needs
+    over_budget: Dict[str, Tuple[float, float]] = field(default_factory=dict)  # metric -> (value, limit)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.html_bytes + self.script_bytes + self.style_bytes + self.image_bytes
+
+    def metrics(self) -> Dict[str, float]:
+        """Values in the units the budgets use"""
+        return {
+            "html_kb": self.html_bytes / 1024,
+            "inline_kb": (self.inline_css_bytes + self.inline_js_bytes) / 1024,
+            "image_kb": self.image_bytes / 1024,
+            "total_kb": self.total_bytes / 1024,
+            "requests": self.requests,
+            "broken": len(self.broken),
+        }
+
+
+class _ReferenceCollector(HTMLParser):
+    """Inline CSS/JS sizes plus the subresources and links a page references"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.inline_css = 0
+        self.inline_js = 0
+        self.raw = None  # "style" or "script" while inside an inline block
+        self.subresources: List[Tuple[str, str]] = []  # (kind, url): fetched when the page loads
+        self.links: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attributes = dict(attrs)
+        if attributes.get("style"):
+            self.inline_css += len(attributes["style"].encode("utf-8"))
+        if tag == "script":
+            if attributes.get("src"):
+                self.subresources.append(("script", attributes["src"]))
+            else:
+                self.raw = "script"
+        elif tag == "style":
+            self.raw = "style"
+        elif tag == "link" and attributes.get("href"):
+            rel = (attributes.get("rel") or "").lower().split()
+            if "stylesheet" in rel:
+                self.subresources.append(("style", attributes["href"]))
+            elif "icon" in rel:
+                self.subresources.append(("image", attributes["href"]))
+            else:
+                self.links.append(attributes["href"])
+        elif tag == "img" and attributes.get("src"):
+            self.subresources.append(("image", attributes["src"]))
+        elif tag in ("source", "iframe", "video", "audio") and attributes.get("src"):
+            self.subresources.append(("image" if tag == "source" else "other", attributes["src"]))
+        elif tag == "a" and attributes.get("href"):
+            self.links.append(attributes["href"])
+
+    def handle_endtag(self, tag):
+        if tag == self.raw:
+            self.raw = None
+
+    def handle_data(self, data):
+        if self.raw == "script":
+            self.inline_js += len(data.encode("utf-8"))
+        elif self.raw == "style":
+            self.inline_css += len(data.encode("utf-8"))
+
+
+def local_target(site_dir: Path, page: Path, url: str) -> Optional[Path]:
+    """The file a reference points at inside the site, or None for external and in-page references"""
+    url = url.strip()
+    if not url or url.lower().startswith(SKIPPED_SCHEMES) or "://" in url.split("?")[0]:
+        return None
+    path = unquote(url.split("#")[0].split("?")[0])
+    if not path:
+        return None
+    target = site_dir / path.lstrip("/") if path.startswith("/") else page.parent / path
+    if path.endswith("/") or target.is_dir():
+        target = target / "index.html"
+    return target
+
+
+def load_budgets(site_dir: Path, budgets_file: Optional[Path] = None) -> Dict:
+    """Default budgets overlaid with the site's data/budgets.json and then with budgets_file"""
+    budgets = {"default": dict(DEFAULT_BUDGETS["default"]), "pages": dict(DEFAULT_BUDGETS["pages"])}
+    for path in (site_dir / DATA_DIR / BUDGETS_NAME, budgets_file):
+        if path is None or not path.exists():
+            continue
+        overrides = json.loads(path.read_text(encoding="utf-8"))
+        budgets["default"].update(overrides.get("default", {}))
+        budgets["pages"].update(overrides.get("pages", {}))
+    return budgets
+
+
+def page_budget(budgets: Dict, page: str) -> Dict:
+    """The limits for one page: the defaults with every matching glob's overrides applied"""
+    limits = dict(budgets["default"])
+    for pattern, overrides in budgets["pages"].items():
+        if fnmatch.fnmatch(page, pattern):
+            limits.update(overrides)
+    return limits
+
+
+class _FileSizes:
+    """Bytes (and pixel width for images) of referenced files, each looked up once per run"""
+
+    def __init__(self):
+        self.sizes: Dict[Path, Optional[int]] = {}
+        self.widths: Dict[Path, int] = {}
+
+    def size(self, path: Path) -> Optional[int]:
+        if path not in self.sizes:
+            self.sizes[path] = path.stat().st_size if path.is_file() else None
+        return self.sizes[path]
+
+    def width(self, path: Path) -> int:
+        if path not in self.widths:
+            try:
+                with Image.open(path) as im:
+                    self.widths[path] = im.width
+            except (OSError, ValueError):
+                self.widths[path] = 0
+        return self.widths[path]
+
+
+def weigh_page(site_dir: Path, page: Path, files: _FileSizes, oversized_kb: int = OVERSIZED_IMAGE_KB) -> PageWeight:
+    """Measure one page"""
+    data = page.read_bytes()
+    collector = _ReferenceCollector()
+    collector.feed(data.decode("utf-8", errors="replace"))
+    collector.close()
+    weight = PageWeight(page=page.name, html_bytes=len(data), html_gzip_bytes=len(gzip.compress(data, 6)),
+                        inline_css_bytes=collector.inline_css, inline_js_bytes=collector.inline_js)
+
+    loaded = set()
+    for kind, url in collector.subresources:
+        target = local_target(site_dir, page, url)
+        if target is None:
+            weight.requests += 1
+            continue
+        size = files.size(target)
+        if size is None:
+            weight.broken.append(url)
+            continue
+        if target in loaded:
+            continue  # The browser fetches a repeated URL once
+        loaded.add(target)
+        weight.requests += 1
+        if kind == "script":
+            weight.script_bytes += size
+        elif kind == "style":
+            weight.style_bytes += size
+        else:
+            weight.image_bytes += size
+            if kind == "image" and (size > oversized_kb * 1024 or files.width(target) > MAX_DISPLAY_WIDTH):
+                weight.oversized.append(url)
+    for url in collector.links:
+        target = local_target(site_dir, page, url)
+        if target is not None and files.size(target) is None:
+            weight.broken.append(url)
+    return weight
+
+
+def analyze_site(site_dir: Path, budgets: Dict, oversized_kb: int = OVERSIZED_IMAGE_KB) -> List[PageWeight]:
+    """Weigh every page and record its budget overruns, heaviest first"""
+    files = _FileSizes()
+    weights = []
+    for page in iter_pages(site_dir):
+        weight = weigh_page(site_dir, page, files, oversized_kb)
+        for metric, value in weight.metrics().items():
+            limit = page_budget(budgets, page.name).get(metric)
+            if limit is not None and value > limit:
+                weight.over_budget[metric] = (round(value, 1), limit)
+        weights.append(weight)
+    weights.sort(key=lambda weight: (-weight.total_bytes, weight.page))
+    return weights
+
+
+def build_report(site_dir: Path, weights: List[PageWeight], budgets: Dict) -> Dict:
+    """JSON-ready report: totals, budgets and every page's measurements"""
+    pages = [{**asdict(weight), "total_bytes": weight.total_bytes} for weight in weights]
+    totals = {key: sum(page[key] for page in pages) for key in (
+        "html_bytes", "html_gzip_bytes", "inline_css_bytes", "inline_js_bytes", "script_bytes", "style_bytes",
+        "image_bytes", "total_bytes", "requests")}
+    return {
+        "version": 1,
+        "site": site_dir.name,
+        "pages_checked": len(pages),
+        "pages_over_budget": sum(1 for weight in weights if weight.over_budget),
+        "broken_references": sum(len(weight.broken) for weight in weights),
+        "oversized_images": sorted({url.rsplit("/", 1)[-1] for weight in weights for url in weight.oversized}),
+        "totals": totals,
+        "budgets": budgets,
+        "pages": pages,
+    }
+
+
+def main():
+    parser = family_argument_parser("Report page weights and check them against budgets")
+    parser.add_argument("--budgets", type=Path, help=f"JSON budgets overriding the defaults and data/{BUDGETS_NAME}")
+    parser.add_argument("--report", type=Path, help="Write the JSON report here")
+    parser.add_argument("--top", type=int, default=15, help="Pages to list in the summary (default: 15)")
+    parser.add_argument("--oversized-kb", type=int, default=OVERSIZED_IMAGE_KB,
+                        help=f"Flag loaded images larger than this (default: {OVERSIZED_IMAGE_KB})")
+    parser.add_argument("--no-fail", action="store_true", help="Report budget overruns without failing")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    budgets = load_budgets(site_dir, args.budgets)
+    weights = analyze_site(site_dir, budgets, args.oversized_kb)
+    report = build_report(site_dir, weights, budgets)
+    elapsed = time.perf_counter() - start
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=1), encoding="utf-8")
+
+    totals = report["totals"]
+    print(f"✓ {len(weights)} pages weighed ({elapsed:.2f}s): {totals['html_bytes'] / 1024:.0f} KB HTML "
+          f"({totals['html_gzip_bytes'] / 1024:.0f} KB gzipped, {totals['inline_css_bytes'] / 1024:.0f} KB inline "
+          f"CSS, {totals['inline_js_bytes'] / 1024:.0f} KB inline JS), {totals['image_bytes'] / 1024 / 1024:.1f} MB "
+          f"images, {totals['requests']} requests")
+    print(f"  {'page':<32} {'total':>9} {'html':>8} {'inline':>8} {'images':>9} {'reqs':>5}")
+    for weight in weights[:args.top]:
+        metrics = weight.metrics()
+        flag = " ⚠️ " + ", ".join(weight.over_budget) if weight.over_budget else ""
+        print(f"  {weight.page:<32} {metrics['total_kb']:6.0f} KB {metrics['html_kb']:5.1f} KB "
+              f"{metrics['inline_kb']:5.1f} KB {metrics['image_kb']:6.0f} KB {weight.requests:5}{flag}")
+    if report["broken_references"]:
+        pages = sum(1 for weight in weights if weight.broken)
+        print(f"⚠️ {report['broken_references']} references to missing files on {pages} pages, most common:")
+        for url, count in Counter(url for weight in weights for url in weight.broken).most_common(5):
+            print(f"    {url} ({count} pages)")
+    if report["oversized_images"]:
+        print(f"⚠️ {len(report['oversized_images'])} oversized images (over {args.oversized_kb} KB "
+              f"or {MAX_DISPLAY_WIDTH}px wide): {', '.join(report['oversized_images'][:8])}"
+              f"{', ...' if len(report['oversized_images']) > 8 else ''}")
+    over = [weight for weight in weights if weight.over_budget]
+    if over:
+        print(f"⚠️ {len(over)} pages over budget:")
+        for weight in sorted(over, key=lambda weight: weight.page)[:args.top]:
+            details = ", ".join(f"{metric} {value:g} > {limit:g}" for metric, (value, limit) in
+                                weight.over_budget.items())
+            print(f"    {weight.page}: {details}")
+        if not args.no_fail:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Search index stage for the family sites
+Tokenizes every page and writes a prefix-sharded inverted index that the
+browser client (static/search.js) fetches lazily, one small shard per term
+"""
+
+import json
+import logging
+import re
+import shutil
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from sitebuild.site import extract_content, family_argument_parser, iter_pages, resolve_site
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = "search"
+PREFIX_LENGTH = 2
+MAX_POSITIONS = 8  # occurrences kept per (term, page) for snippet highlighting
+MIN_TOKEN_LENGTH = 2
+
+# Must match TOKEN_RE in static/search.js
+TOKEN_RE = re.compile(r"[^\W_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from had has have he her his in is it its of on or she "
+    "that the their them there they this to was were which with".split()
+)
+CLIENT_SCRIPT = Path(__file__).parent / "static" / "search.js"
+
+
+def shard_key(term: str) -> str:
+    """Shard a term by its first characters; anything outside [a-z0-9] shares the '_' shard"""
+    prefix = term[:PREFIX_LENGTH]
+    return prefix if re.fullmatch(r"[a-z0-9]+", prefix) else "_"
+
+
+def tokenize(text: str) -> List[Tuple[str, int]]:
+    """
+    Split text into index terms
+
+    Returns:
+        (term, offset) pairs; offsets count UTF-16 code units so the browser
+        can slice the stored text with them directly
+    """
+    tokens = []
+    units = 0
+    consumed = 0
+    for match in TOKEN_RE.finditer(text):
+        start = match.start()
+        units += len(text[consumed:start].encode("utf-16-le")) // 2
+        consumed = start
+        term = match.group().lower()
+        if len(term) >= MIN_TOKEN_LENGTH and term not in STOPWORDS:
+            tokens.append((term, units))
+    return tokens
+
+
+def build_search_index(site_dir: Path) -> Dict:
+    """
+    Build the sharded inverted index for a family site
+
+    Layout under <site>/search/:
+        meta.json          documents, shard sizes and tokenizer settings
+        shards/<xx>.json   {term: [doc_delta, term_frequency, [position_deltas]], ...}
+        text/<doc>.txt     plain text of each page, fetched only to render snippets
+        search.js          browser client
+
+    Returns:
+        The meta dict that was written
+    """
+    out_dir = site_dir / INDEX_DIR
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    (out_dir / "shards").mkdir(parents=True)
+    (out_dir / "text").mkdir()
+
+    documents = []
+    postings: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+    for doc_id, page in enumerate(iter_pages(site_dir)):
+        content = extract_content(page.read_text(encoding="utf-8"))
+        tokens = tokenize(content.text)
+        documents.append([page.name, content.title or page.stem, len(tokens)])
+        (out_dir / "text" / f"{doc_id}.txt").write_text(content.text, encoding="utf-8")
+        for term, offset in tokens:
+            postings[term].setdefault(doc_id, []).append(offset)
+
+    shards: Dict[str, Dict[str, List]] = defaultdict(dict)
+    for term in sorted(postings):
+        encoded = []
+        previous_doc = 0
+        for doc_id, offsets in sorted(postings[term].items()):
+            kept = offsets[:MAX_POSITIONS]
+            deltas = [kept[0]] + [b - a for a, b in zip(kept, kept[1:])]
+            encoded.append([doc_id - previous_doc, len(offsets), deltas])
+            previous_doc = doc_id
+        shards[shard_key(term)][term] = encoded
+
+    shard_sizes = {}
+    for key, terms in sorted(shards.items()):
+        data = json.dumps(terms, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        (out_dir / "shards" / f"{key}.json").write_bytes(data)
+        shard_sizes[key] = len(data)
+
+    meta = {
+        "version": 1,
+        "prefix_length": PREFIX_LENGTH,
+        "min_token_length": MIN_TOKEN_LENGTH,
+        "stopwords": sorted(STOPWORDS),
+        "documents": documents,
+        "shards": shard_sizes,
+        "terms": len(postings),
+    }
+    (out_dir / "meta.json").write_text(json.dumps(meta, separators=(",", ":"), ensure_ascii=False),
+                                       encoding="utf-8")
+    shutil.copyfile(CLIENT_SCRIPT, out_dir / "search.js")
+
+    logger.info(f"Indexed {len(documents)} pages, {len(postings)} terms in {len(shard_sizes)} shards")
+    return meta
+
+
+def main():
+    parser = family_argument_parser("Build the sharded full-text search index")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    meta = build_search_index(site_dir)
+    elapsed = time.perf_counter() - start
+
+    sizes = sorted(meta["shards"].values())
+    print(f"✓ Indexed {len(meta['documents'])} pages, {meta['terms']} terms ({elapsed:.2f}s)")
+    print(f"  {len(sizes)} shards, median {sizes[len(sizes) // 2] / 1024:.1f} KB, "
+          f"largest {sizes[-1] / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
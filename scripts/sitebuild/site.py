@@ -0,0 +1,177 @@
+"""
+Shared helpers for the family site build stages
+Locates family site trees and enumerates their pages and images
+"""
+
+import argparse
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+SITES_ROOT = REPO_ROOT / "2-family-sites"
+
+# Structured records the pages are generated from (sitebuild.generate); not deployed
+DATA_DIR = "data"
+
+# Scans extracted from the memoir PDF are named page_<page>_img_<index>.png
+IMAGE_NAME_RE = re.compile(r"^page_(\d+)_img_(\d+)\.png$")
+
+# Written by sitebuild.image_store: scan name -> the images/store/ path pages use instead
+STORE_INDEX = "images/store/index.json"
+
+
+def family_dir(family: str) -> Path:
+    """Get the site directory for a family (bull, north, etc.)"""
+    path = SITES_ROOT / family
+    if not path.is_dir():
+        raise FileNotFoundError(f"No site directory for family '{family}': {path}")
+    return path
+
+
+def iter_pages(site_dir: Path) -> List[Path]:
+    """List the HTML pages of a family site in a stable order"""
+    return sorted(site_dir.glob("*.html"))
+
+
+def iter_images(site_dir: Path) -> List[Path]:
+    """List the extracted scans of a family site ordered by page and image index"""
+    images = [p for p in (site_dir / "images").glob("*.png") if IMAGE_NAME_RE.match(p.name)]
+    return sorted(images, key=lambda p: parse_image_name(p.name))
+
+
+def stored_scans(site_dir: Path) -> Dict[str, str]:
+    """{scan name: store path} for the scans the image store serves, empty when the site has no store"""
+    try:
+        index = json.loads((site_dir / STORE_INDEX).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return index.get("canonical", {}) if index.get("version") == 1 else {}
+
+
+def parse_image_name(name: str) -> Optional[Tuple[int, int]]:
+    """Parse (page, index) from a page_N_img_M.png filename"""
+    match = IMAGE_NAME_RE.match(name)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def file_sha256(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Hex SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class PageLink:
+    """A link inside a page's content area"""
+    section: str  # Text of the nearest preceding <h2>, "" before the first one
+    href: str
+    text: str
+
+
+@dataclass
+class PageContent:
+    """Title, plain text and links of a page's main content area"""
+    title: str
+    text: str
+    links: List[PageLink] = field(default_factory=list)
+
+
+class _ContentExtractor(HTMLParser):
+    """Collects text inside <div class="content">, the only page-specific part of the layout"""
+
+    BLOCK_TAGS = {"p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "br", "hr", "pre", "tr", "table",
+                  "td", "th", "caption", "dt", "dd"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0  # <div> nesting inside the content area, 0 = outside
+        self.skip = 0
+        self.heading: Optional[str] = None  # "h1"/"h2" while inside one
+        self.heading_text: List[str] = []
+        self.parts: List[str] = []
+        self.title = ""
+        self.section = ""
+        self.link: Optional[PageLink] = None
+        self.links: List[PageLink] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self.depth:
+                self.depth += 1
+            elif ("class", "content") in attrs:
+                self.depth = 1
+        if not self.depth:
+            return
+        if tag in ("script", "style"):
+            self.skip += 1
+        elif tag in ("h1", "h2"):
+            self.heading = tag
+            self.heading_text = []
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.link = PageLink(section=self.section, href=href, text="")
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if not self.depth:
+            return
+        if tag in ("script", "style"):
+            self.skip -= 1
+        elif tag == self.heading:
+            text = " ".join("".join(self.heading_text).split())
+            if tag == "h1" and not self.title:
+                self.title = text
+            elif tag == "h2":
+                self.section = text
+            self.heading = None
+        elif tag == "a" and self.link:
+            self.link.text = " ".join(self.link.text.split())
+            self.links.append(self.link)
+            self.link = None
+        elif tag == "div":
+            self.depth -= 1
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self.depth and not self.skip:
+            self.parts.append(data)
+            if self.heading:
+                self.heading_text.append(data)
+            if self.link:
+                self.link.text += data
+
+
+def extract_content(html: str) -> PageContent:
+    """Extract the first heading, whitespace-normalized text and links of a page's content area"""
+    parser = _ContentExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    text = "\n".join(line for line in lines if line)
+    return PageContent(title=parser.title, text=text, links=parser.links)
+
+
+def family_argument_parser(description: str) -> argparse.ArgumentParser:
+    """Argument parser shared by the stage CLIs (--family or --site)"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--family", default="bull", help="Family site under 2-family-sites/ (default: bull)")
+    parser.add_argument("--site", type=Path, help="Explicit site directory (overrides --family)")
+    return parser
+
+
+def resolve_site(args: argparse.Namespace) -> Path:
+    """Resolve the site directory from parsed --family/--site arguments"""
+    return args.site.resolve() if args.site else family_dir(args.family)
@@ -0,0 +1,285 @@
+// Deep-zoom viewer for large family scans
+// Reads the DZI pyramids written by scripts/sitebuild/tiles.py. The one-tile
+// overview paints first; after that only the tiles in view at the current
+// zoom are fetched. Upgrades img[data-dzi] in place and wraps openLightbox.
+window.DeepZoom = (function() {
+    const SCRIPT_URL = document.currentScript.src;
+    const SITE_ROOT = new URL('../../', SCRIPT_URL);  // Installed at images/tiles/deepzoom.js
+    const TILES_RE = /images\/tiles\/(.+)_files\//;
+    const MAX_ZOOM = 2;  // Screen pixels per scan pixel at full zoom-in, MAX_ZOOM in tiles.py
+
+    let indexPromise = null;
+    const descriptorCache = new Map();
+
+    function loadIndex() {
+        if (!indexPromise) {
+            indexPromise = fetch(new URL('index.json', SCRIPT_URL))
+                .then(response => response.ok ? response.json() : {images: {}, aliases: {}})
+                .catch(() => ({images: {}, aliases: {}}));
+        }
+        return indexPromise;
+    }
+
+    function loadDescriptor(dzi) {
+        const url = new URL(dzi, SITE_ROOT).href;
+        if (!descriptorCache.has(url)) {
+            descriptorCache.set(url, fetch(url).then(response => {
+                if (!response.ok) throw new Error(`${url}: ${response.status}`);
+                return response.text();
+            }).then(text => {
+                const xml = new DOMParser().parseFromString(text, 'application/xml');
+                const image = xml.documentElement;
+                const size = image.getElementsByTagName('Size')[0];
+                return {
+                    url: url,
+                    tileSize: +image.getAttribute('TileSize'),
+                    overlap: +image.getAttribute('Overlap'),
+                    format: image.getAttribute('Format'),
+                    width: +size.getAttribute('Width'),
+                    height: +size.getAttribute('Height'),
+                };
+            }));
+        }
+        return descriptorCache.get(url);
+    }
+
+    // Site-relative key for a src the page handed to openLightbox
+    function lookup(index, src) {
+        const path = new URL(src, document.baseURI).pathname;
+        const tiles = path.match(TILES_RE);
+        if (tiles) return index.images[tiles[1] + '.png'];
+        const name = path.split('/').pop();
+        const store = path.indexOf('/images/store/') !== -1 ? index.aliases['images/store/' + name] : null;
+        return index.images[store || name];
+    }
+
+    class Viewer {
+        constructor(container, info, overview, interactive) {
+            this.container = container;
+            this.info = info;
+            this.maxLevel = Math.ceil(Math.log2(Math.max(info.width, info.height)));
+            this.tiles = new Map();
+            this.level = -1;
+            this.frame = null;
+
+            container.style.position = 'relative';
+            container.style.overflow = 'hidden';
+            this.layer = document.createElement('div');
+            this.layer.style.cssText = 'position:absolute;left:0;top:0;transform-origin:0 0;';
+            container.appendChild(this.layer);
+            // Stretched overview under the tiles, so nothing is ever blank while they load
+            this.base = document.createElement('img');
+            this.base.src = overview;
+            this.base.alt = '';
+            this.base.draggable = false;
+            this.base.style.cssText = `position:absolute;left:0;top:0;width:${info.width}px;height:${info.height}px;`;
+            this.layer.appendChild(this.base);
+
+            this.fit();
+            if (interactive) this.bindControls();
+            this.resizeObserver = new ResizeObserver(() => this.fit());
+            this.resizeObserver.observe(container);
+        }
+
+        fit() {
+            const width = this.container.clientWidth, height = this.container.clientHeight;
+            if (!width || !height) return;
+            this.minScale = Math.min(width / this.info.width, height / this.info.height);
+            this.scale = this.minScale;
+            this.x = (this.info.width - width / this.scale) / 2;
+            this.y = (this.info.height - height / this.scale) / 2;
+            this.schedule();
+        }
+
+        zoomAt(factor, screenX, screenY) {
+            const maxScale = Math.max(this.minScale, MAX_ZOOM / (window.devicePixelRatio || 1));
+            const scale = Math.min(maxScale, Math.max(this.minScale, this.scale * factor));
+            this.x += screenX / this.scale - screenX / scale;
+            this.y += screenY / this.scale - screenY / scale;
+            this.scale = scale;
+            this.schedule();
+        }
+
+        pan(dx, dy) {
+            this.x -= dx / this.scale;
+            this.y -= dy / this.scale;
+            this.schedule();
+        }
+
+        schedule() {
+            if (this.frame === null) {
+                this.frame = requestAnimationFrame(() => {
+                    this.frame = null;
+                    this.render();
+                });
+            }
+        }
+
+        clamp() {
+            const viewWidth = this.container.clientWidth / this.scale;
+            const viewHeight = this.container.clientHeight / this.scale;
+            const clampAxis = (value, view, size) => view >= size ? (size - view) / 2 : Math.min(size - view, Math.max(0, value));
+            this.x = clampAxis(this.x, viewWidth, this.info.width);
+            this.y = clampAxis(this.y, viewHeight, this.info.height);
+        }
+
+        render() {
+            this.clamp();
+            const info = this.info, size = info.tileSize, overlap = info.overlap;
+            this.layer.style.transform = `scale(${this.scale}) translate(${-this.x}px, ${-this.y}px)`;
+
+            // Smallest level with at least one tile pixel per device pixel
+            const wanted = this.maxLevel + Math.ceil(Math.log2(this.scale * (window.devicePixelRatio || 1)));
+            const level = Math.max(0, Math.min(this.maxLevel, wanted));
+            if (level !== this.level) {
+                this.tiles.forEach(tile => tile.remove());
+                this.tiles.clear();
+                this.level = level;
+            }
+            const factor = Math.pow(2, this.maxLevel - level);  // Scan pixels per level pixel
+            const levelWidth = Math.ceil(info.width / factor), levelHeight = Math.ceil(info.height / factor);
+            const left = Math.max(0, Math.floor(this.x / factor / size));
+            const top = Math.max(0, Math.floor(this.y / factor / size));
+            const right = Math.min(Math.ceil(levelWidth / size), Math.ceil((this.x + this.container.clientWidth / this.scale) / factor / size));
+            const bottom = Math.min(Math.ceil(levelHeight / size), Math.ceil((this.y + this.container.clientHeight / this.scale) / factor / size));
+
+            const filesUrl = info.url.replace(/\.dzi$/, '_files/');
+            for (let column = left; column < right; column++) {
+                for (let row = top; row < bottom; row++) {
+                    const key = `${column}_${row}`;
+                    if (this.tiles.has(key)) continue;
+                    const x0 = Math.max(0, column * size - overlap), y0 = Math.max(0, row * size - overlap);
+                    const x1 = Math.min(levelWidth, (column + 1) * size + overlap);
+                    const y1 = Math.min(levelHeight, (row + 1) * size + overlap);
+                    const tile = document.createElement('img');
+                    tile.alt = '';
+                    tile.draggable = false;
+                    tile.style.cssText = `position:absolute;left:${x0 * factor}px;top:${y0 * factor}px;` +
+                        `width:${(x1 - x0) * factor}px;height:${(y1 - y0) * factor}px;`;
+                    tile.src = `${filesUrl}${level}/${key}.${info.format}`;
+                    this.layer.appendChild(tile);
+                    this.tiles.set(key, tile);
+                }
+            }
+        }
+
+        bindControls() {
+            const container = this.container;
+            container.style.cursor = 'grab';
+            container.style.touchAction = 'none';
+            container.addEventListener('wheel', event => {
+                event.preventDefault();
+                const box = container.getBoundingClientRect();
+                this.zoomAt(Math.pow(2, -event.deltaY / 300), event.clientX - box.left, event.clientY - box.top);
+            }, {passive: false});
+            container.addEventListener('dblclick', event => {
+                const box = container.getBoundingClientRect();
+                this.zoomAt(2, event.clientX - box.left, event.clientY - box.top);
+            });
+            let drag = null;
+            container.addEventListener('pointerdown', event => {
+                drag = {x: event.clientX, y: event.clientY};
+                container.setPointerCapture(event.pointerId);
+                container.style.cursor = 'grabbing';
+            });
+            container.addEventListener('pointermove', event => {
+                if (!drag) return;
+                this.pan(event.clientX - drag.x, event.clientY - drag.y);
+                drag = {x: event.clientX, y: event.clientY};
+            });
+            const release = () => {
+                drag = null;
+                container.style.cursor = 'grab';
+            };
+            container.addEventListener('pointerup', release);
+            container.addEventListener('pointercancel', release);
+
+            const controls = document.createElement('div');
+            controls.style.cssText = 'position:absolute;right:8px;top:8px;display:flex;gap:4px;z-index:1;';
+            [['+', () => this.zoomAt(2, container.clientWidth / 2, container.clientHeight / 2)],
+             ['−', () => this.zoomAt(0.5, container.clientWidth / 2, container.clientHeight / 2)],
+             ['⤢', () => this.fit()]].forEach(([label, action]) => {
+                const button = document.createElement('button');
+                button.type = 'button';
+                button.textContent = label;
+                button.style.cssText = 'width:32px;height:32px;font-size:18px;cursor:pointer;';
+                button.addEventListener('pointerdown', event => event.stopPropagation());
+                button.addEventListener('click', event => {
+                    event.stopPropagation();
+                    action();
+                });
+                controls.appendChild(button);
+            });
+            container.appendChild(controls);
+        }
+
+        destroy() {
+            this.resizeObserver.disconnect();
+        }
+    }
+
+    function openViewer(entry) {
+        const overlay = document.createElement('div');
+        overlay.style.cssText = 'position:fixed;inset:0;background:rgba(0,0,0,0.8);display:flex;' +
+            'justify-content:center;align-items:center;z-index:1000;';
+        const frame = document.createElement('div');
+        frame.style.cssText = 'width:90vw;height:90vh;background:#111;';
+        overlay.appendChild(frame);
+        document.body.appendChild(overlay);
+
+        let viewer = null;
+        const close = () => {
+            if (viewer) viewer.destroy();
+            document.removeEventListener('keydown', onKey);
+            overlay.remove();
+        };
+        const onKey = event => {
+            if (event.key === 'Escape') close();
+        };
+        overlay.addEventListener('click', event => {
+            if (event.target === overlay) close();
+        });
+        document.addEventListener('keydown', onKey);
+        return loadDescriptor(entry.dzi).then(info => {
+            viewer = new Viewer(frame, info, new URL(entry.overview, SITE_ROOT).href, true);
+        });
+    }
+
+    // Inline images keep their overview tile as src; the viewer fills in detail for the rendered size
+    function upgrade(img) {
+        loadDescriptor(img.dataset.dzi).then(info => {
+            const box = document.createElement('div');
+            box.className = 'deepzoom';
+            box.style.cssText = `width:100%;max-width:${info.width}px;aspect-ratio:${info.width}/${info.height};cursor:pointer;`;
+            img.replaceWith(box);
+            new Viewer(box, info, img.src, false);
+            box.addEventListener('click', () => window.openLightbox(img.getAttribute('data-src')));
+        }).catch(() => {
+            img.src = img.getAttribute('data-src');
+        });
+    }
+
+    const fallback = window.openLightbox;
+    window.openLightbox = function(src) {
+        loadIndex().then(index => {
+            const entry = lookup(index, src);
+            if (entry) {
+                openViewer(entry).catch(() => fallback && fallback(src));
+            } else if (fallback) {
+                fallback(src);
+            }
+        });
+    };
+
+    // Upgrade after the page's own DOMContentLoaded handlers so viewer tiles never get lightbox clicks
+    function upgradeAll() {
+        document.querySelectorAll('img[data-dzi]').forEach(upgrade);
+    }
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', () => setTimeout(upgradeAll));
+    } else {
+        upgradeAll();
+    }
+
+    return {open: openViewer, loadIndex: loadIndex, Viewer: Viewer};
+})();
@@ -0,0 +1,203 @@
+// Family site search client
+// Queries the prefix-sharded index written by scripts/sitebuild/search_index.py.
+// Only meta.json and the shards for the typed terms are fetched.
+window.FamilySearch = (function() {
+    const BASE = 'search/';
+    const TOKEN_RE = /[\p{L}\p{N}]+/gu;  // Must match TOKEN_RE in search_index.py
+    const MAX_RESULTS = 10;
+    const SNIPPET_RADIUS = 60;
+
+    let metaPromise = null;
+    const shardCache = new Map();
+    const textCache = new Map();
+    let pending = null;
+
+    function fetchJson(url) {
+        return fetch(url).then(response => {
+            if (!response.ok) throw new Error(`${url}: ${response.status}`);
+            return response.json();
+        });
+    }
+
+    function loadMeta() {
+        if (!metaPromise) {
+            metaPromise = fetchJson(BASE + 'meta.json').then(meta => {
+                meta.stopwordSet = new Set(meta.stopwords);
+                return meta;
+            });
+        }
+        return metaPromise;
+    }
+
+    function shardKey(meta, term) {
+        const prefix = term.slice(0, meta.prefix_length);
+        return /^[a-z0-9]+$/.test(prefix) ? prefix : '_';
+    }
+
+    function loadShard(meta, key) {
+        if (!(key in meta.shards)) return Promise.resolve({});
+        if (!shardCache.has(key)) {
+            shardCache.set(key, fetchJson(`${BASE}shards/${key}.json`));
+        }
+        return shardCache.get(key);
+    }
+
+    // A stopword is kept as the last term while it is still being typed: it matches as a
+    // prefix ("he" finds "henry"), and only a trailing space says the word is finished
+    function tokenize(meta, query) {
+        const terms = (query.toLowerCase().match(TOKEN_RE) || [])
+            .filter(term => term.length >= meta.min_token_length);
+        const typing = !/\s$/.test(query);
+        return terms.filter((term, i) => !meta.stopwordSet.has(term) || (typing && i === terms.length - 1));
+    }
+
+    // Decode [docDelta, tf, [positionDeltas]] postings into {doc: {tf, positions}}
+    function decode(postings) {
+        const docs = new Map();
+        let doc = 0;
+        postings.forEach(([docDelta, tf, deltas]) => {
+            doc += docDelta;
+            let position = 0;
+            const positions = deltas.map(delta => (position += delta));
+            docs.set(doc, { tf, positions });
+        });
+        return docs;
+    }
+
+    // Every term must match; the last term matches as a prefix so results update while typing
+    async function query(text) {
+        const meta = await loadMeta();
+        const terms = tokenize(meta, text);
+        if (!terms.length) return { terms, results: [] };
+
+        const shards = await Promise.all(terms.map(term => loadShard(meta, shardKey(meta, term))));
+        const total = meta.documents.length;
+        let scores = null;
+
+        terms.forEach((term, i) => {
+            const isLast = i === terms.length - 1;
+            const matched = isLast
+                ? Object.keys(shards[i]).filter(candidate => candidate.startsWith(term))
+                : (term in shards[i] ? [term] : []);
+
+            const termScores = new Map();
+            matched.forEach(candidate => {
+                const postings = decode(shards[i][candidate]);
+                const idf = Math.log(1 + total / postings.size);
+                postings.forEach(({ tf, positions }, doc) => {
+                    const length = meta.documents[doc][2] || 1;
+                    const entry = termScores.get(doc) || { score: 0, positions: [] };
+                    entry.score += (tf * idf) / Math.sqrt(length);
+                    entry.positions.push(...positions.map(p => [p, candidate.length]));
+                    termScores.set(doc, entry);
+                });
+            });
+
+            if (scores === null) {
+                scores = termScores;
+            } else {
+                const merged = new Map();
+                termScores.forEach((entry, doc) => {
+                    if (!scores.has(doc)) return;
+                    const previous = scores.get(doc);
+                    merged.set(doc, {
+                        score: previous.score + entry.score,
+                        positions: previous.positions.concat(entry.positions)
+                    });
+                });
+                scores = merged;
+            }
+        });
+
+        const results = [...scores.entries()]
+            .sort((a, b) => b[1].score - a[1].score)
+            .slice(0, MAX_RESULTS)
+            .map(([doc, entry]) => ({
+                doc,
+                url: meta.documents[doc][0],
+                title: meta.documents[doc][1],
+                score: entry.score,
+                positions: entry.positions.sort((a, b) => a[0] - b[0])
+            }));
+        return { terms, results };
+    }
+
+    function loadText(doc) {
+        if (!textCache.has(doc)) {
+            textCache.set(doc, fetch(`${BASE}text/${doc}.txt`).then(response => response.text()));
+        }
+        return textCache.get(doc);
+    }
+
+    // Build a highlighted snippet around the first hit using the stored positions
+    async function snippet(result) {
+        const text = await loadText(result.doc);
+        if (!result.positions.length) return document.createTextNode(text.slice(0, SNIPPET_RADIUS * 2));
+
+        const start = Math.max(0, result.positions[0][0] - SNIPPET_RADIUS);
+        const end = Math.min(text.length, result.positions[0][0] + SNIPPET_RADIUS);
+        const fragment = document.createDocumentFragment();
+        let cursor = start;
+        if (start > 0) fragment.append('…');
+        result.positions.forEach(([position, length]) => {
+            if (position < cursor || position + length > end) return;
+            fragment.append(text.slice(cursor, position));
+            const mark = document.createElement('mark');
+            mark.textContent = text.slice(position, position + length);
+            fragment.append(mark);
+            cursor = position + length;
+        });
+        fragment.append(text.slice(cursor, end));
+        if (end < text.length) fragment.append('…');
+        return fragment;
+    }
+
+    function resultsContainer() {
+        let container = document.querySelector('.search-results');
+        if (!container) {
+            container = document.createElement('ul');
+            container.className = 'search-results';
+            container.style.cssText = 'list-style: none; margin: 0.5rem 0 0; font-size: 0.9rem;';
+            document.querySelector('.search-box').appendChild(container);
+        }
+        return container;
+    }
+
+    async function show(text) {
+        const container = resultsContainer();
+        if (text.trim().length < 2) {
+            container.replaceChildren();
+            return;
+        }
+
+        const current = pending = query(text);
+        let found;
+        try {
+            found = await current;
+        } catch (error) {
+            container.textContent = 'Search index unavailable.';
+            return;
+        }
+        if (current !== pending) return;  // A newer keystroke superseded this query
+
+        if (!found.results.length) {
+            container.textContent = 'No matches.';
+            return;
+        }
+        const items = await Promise.all(found.results.map(async result => {
+            const item = document.createElement('li');
+            item.style.marginBottom = '0.6rem';
+            const link = document.createElement('a');
+            link.href = result.url;
+            link.textContent = result.title;
+            const context = document.createElement('div');
+            context.style.color = '#666';
+            context.append(await snippet(result));
+            item.append(link, context);
+            return item;
+        }));
+        if (current === pending) container.replaceChildren(...items);
+    }
+
+    return { query, snippet, show };
+})();
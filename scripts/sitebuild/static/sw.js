@@ -0,0 +1,181 @@
+// Family site service worker
+// Generated by scripts/sitebuild/offline.py: the build fills in PRECACHE with
+// the shell files and their content-hash revisions, so any change to a shell
+// file changes this script and the browser installs the new version.
+// Precached files are served from the cache; images are stale-while-revalidate
+// in a size-bounded LRU cache, pages network-first with a cached fallback.
+const PRECACHE = /* PRECACHE */[];
+const VERSION = '/* VERSION */';
+const IMAGE_CACHE_BYTES = /* IMAGE_CACHE_BYTES */0;
+const PAGE_CACHE_BYTES = /* PAGE_CACHE_BYTES */0;
+const NETWORK_TIMEOUT = 4000;  // ms before a slow page load falls back to the cached copy
+const SAVE_DELAY = 1000;  // ms to batch LRU bookkeeping writes
+
+const SCOPE = self.registration.scope;
+// Caches are per origin, and every family site registers its own worker
+const PREFIX = `family-site:${new URL(SCOPE).pathname}:`;
+const PRECACHE_NAME = PREFIX + 'precache';
+const IMAGE_RE = /\.(png|jpe?g|gif|webp|svg)$/i;
+const IMMUTABLE_RE = /\/images\/store\/[0-9a-f]{64}\.\w+$/;  // Content-addressed, never change
+
+// URL -> cache key; the revision in the key is what busts stale copies
+const precacheKeys = new Map(PRECACHE.map(([path, revision]) => {
+    const url = new URL(path, SCOPE).href;
+    return [url, `${url}?__rev=${revision}`];
+}));
+
+class LruCache {
+    constructor(name, maxBytes) {
+        this.name = name;
+        this.maxBytes = maxBytes;
+        this.metaKey = new URL('__lru__', SCOPE).href;
+        this.ready = null;
+        this.entries = null;  // url -> [bytes, last used], oldest first
+        this.saving = null;
+    }
+
+    load() {
+        if (!this.ready) {
+            this.ready = caches.open(this.name).then(async cache => {
+                const meta = await cache.match(this.metaKey);
+                const saved = new Map(meta ? await meta.json() : []);
+                this.entries = new Map();
+                // Reconcile with what is really cached (the worker can stop before a save)
+                for (const request of await cache.keys()) {
+                    if (request.url === this.metaKey) continue;
+                    const known = saved.get(request.url);
+                    if (known) {
+                        this.entries.set(request.url, known);
+                    } else {
+                        const response = await cache.match(request);
+                        this.entries.set(request.url, [Number(response.headers.get('content-length')) || 0, 0]);
+                    }
+                }
+                this.entries = new Map([...this.entries].sort((a, b) => a[1][1] - b[1][1]));
+                return cache;
+            });
+        }
+        return this.ready;
+    }
+
+    async match(request) {
+        const cache = await this.load();
+        const response = await cache.match(request);
+        if (response) {
+            const entry = this.entries.get(request.url) || [0, 0];
+            this.entries.delete(request.url);
+            this.entries.set(request.url, [entry[0], Date.now()]);
+            this.save();
+        }
+        return response;
+    }
+
+    async put(request, response) {
+        const cache = await this.load();
+        const bytes = (await response.clone().blob()).size;  // Decoded size, what the cache stores
+        if (bytes > this.maxBytes / 4) return;  // One huge scan must not flush everything else
+        await cache.put(request, response);
+        this.entries.delete(request.url);
+        this.entries.set(request.url, [bytes, Date.now()]);
+        let total = 0;
+        this.entries.forEach(([size]) => { total += size; });
+        for (const [url, [size]] of this.entries) {
+            if (total <= this.maxBytes) break;
+            await cache.delete(url);
+            this.entries.delete(url);
+            total -= size;
+        }
+        this.save();
+    }
+
+    save() {
+        if (!this.saving) {
+            this.saving = new Promise(resolve => setTimeout(resolve, SAVE_DELAY)).then(async () => {
+                this.saving = null;
+                const cache = await this.load();
+                await cache.put(this.metaKey, new Response(JSON.stringify([...this.entries]),
+                    {headers: {'content-type': 'application/json'}}));
+            });
+        }
+        return this.saving;
+    }
+}
+
+const images = new LruCache(PREFIX + 'images', IMAGE_CACHE_BYTES);
+const pages = new LruCache(PREFIX + 'pages', PAGE_CACHE_BYTES);
+
+self.addEventListener('install', event => {
+    event.waitUntil(caches.open(PRECACHE_NAME).then(async cache => {
+        // Only files whose revision changed are downloaded again
+        for (const [url, key] of precacheKeys) {
+            if (await cache.match(key)) continue;
+            const response = await fetch(url, {cache: 'reload', credentials: 'same-origin'});
+            if (!response.ok) throw new Error(`${url}: ${response.status}`);
+            await cache.put(key, response);
+        }
+    }).then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    const current = new Set(precacheKeys.values());
+    event.waitUntil(caches.open(PRECACHE_NAME).then(async cache => {
+        for (const request of await cache.keys()) {
+            if (!current.has(request.url)) await cache.delete(request);
+        }
+    }).then(() => self.clients.claim()));
+});
+
+function precached(url) {
+    const key = precacheKeys.get(url) || (url.endsWith('/') ? precacheKeys.get(url + 'index.html') : undefined);
+    return key ? caches.open(PRECACHE_NAME).then(cache => cache.match(key)) : Promise.resolve(undefined);
+}
+
+function staleWhileRevalidate(event, cache) {
+    const request = event.request;
+    const revalidate = () => fetch(request).then(response => {
+        if (response.ok && response.status === 200) {
+            event.waitUntil(cache.put(request, response.clone()));
+        }
+        return response;
+    });
+    return cache.match(request).then(cached => {
+        if (!cached) return revalidate();
+        if (!IMMUTABLE_RE.test(request.url)) event.waitUntil(revalidate().catch(() => undefined));
+        return cached;
+    });
+}
+
+function networkFirst(event) {
+    const request = event.request;
+    const network = fetch(request).then(response => {
+        if (response.ok && response.status === 200 && !response.redirected) {
+            event.waitUntil(pages.put(request, response.clone()));
+        }
+        return response;
+    });
+    event.waitUntil(network.catch(() => undefined));
+    const timeout = new Promise(resolve => setTimeout(resolve, NETWORK_TIMEOUT));
+    const fallback = () => pages.match(request).then(cached => cached || precached(request.url));
+    return Promise.race([network.catch(() => undefined), timeout]).then(response => response || fallback().then(
+        cached => cached || network.catch(() => new Response(
+            '<!DOCTYPE html><meta charset="utf-8"><title>Offline</title>' +
+            '<p>This page has not been saved for offline reading yet. Reconnect and reload.</p>',
+            {status: 503, headers: {'content-type': 'text/html; charset=utf-8'}}))));
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET' || !request.url.startsWith(SCOPE) || request.headers.has('range')) return;
+    const url = request.url.split('#')[0];
+    if (precacheKeys.has(url)) {
+        event.respondWith(precached(url).then(cached => cached || fetch(request)));
+    } else if (request.mode === 'navigate') {
+        event.respondWith(networkFirst(event));
+    } else if (IMAGE_RE.test(new URL(url).pathname)) {
+        event.respondWith(staleWhileRevalidate(event, images));
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data === 'version') event.source.postMessage({version: VERSION});
+});
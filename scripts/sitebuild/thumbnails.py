@@ -0,0 +1,154 @@
+"""
+Gallery thumbnail stage for the family sites
+Generates fixed-size thumbnails for every extracted scan and writes the
+JSON manifest that drives the paginated gallery on images.html
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image, ImageOps
+
+from sitebuild.site import family_argument_parser, iter_images, parse_image_name, resolve_site
+
+logger = logging.getLogger(__name__)
+
+THUMB_SIZE = (240, 180)  # 4:3, matches the 150px-high gallery tiles at 2x density
+THUMB_QUALITY = 70
+THUMB_DIR = "images/thumbs"
+MANIFEST_PATH = "images/manifest.json"
+GALLERY_PAGE_SIZE = 48
+
+
+def thumb_path_for(site_dir: Path, image: Path) -> Path:
+    """Thumbnail location for a source scan"""
+    return site_dir / THUMB_DIR / f"{image.stem}.jpg"
+
+
+def make_thumbnail(image: str, thumb: str) -> Dict:
+    """
+    Render one fixed-size JPEG thumbnail
+
+    Args:
+        image: Source scan path
+        thumb: Thumbnail output path
+
+    Returns:
+        Dict with the source dimensions and thumbnail size in bytes
+    """
+    with Image.open(image) as im:
+        width, height = im.size
+        if im.mode not in ("RGB", "L"):
+            # Flatten transparency onto white so JPEG doesn't render it black
+            background = Image.new("RGB", im.size, (255, 255, 255))
+            background.paste(im, mask=im.convert("RGBA").getchannel("A"))
+            im = background
+        tile = ImageOps.fit(im, THUMB_SIZE, Image.LANCZOS)
+        tile.save(thumb, "JPEG", quality=THUMB_QUALITY, optimize=True, progressive=True)
+    return {"width": width, "height": height, "thumb_bytes": os.path.getsize(thumb)}
+
+
+def read_dimensions(image: str) -> Dict:
+    """Read source dimensions without decoding pixel data"""
+    with Image.open(image) as im:
+        width, height = im.size
+    return {"width": width, "height": height}
+
+
+def build_thumbnails(site_dir: Path, force: bool = False, workers: int = None) -> Dict:
+    """
+    Generate missing or stale thumbnails and rewrite the gallery manifest
+
+    Args:
+        site_dir: Family site directory
+        force: Regenerate every thumbnail even if it is up to date
+        workers: Process pool size (defaults to CPU count)
+
+    Returns:
+        The manifest dict that was written
+    """
+    images = iter_images(site_dir)
+    (site_dir / THUMB_DIR).mkdir(parents=True, exist_ok=True)
+
+    stale, fresh = [], []
+    for image in images:
+        thumb = thumb_path_for(site_dir, image)
+        if force or not thumb.exists() or thumb.stat().st_mtime < image.stat().st_mtime:
+            stale.append(image)
+        else:
+            fresh.append(image)
+
+    results: Dict[str, Dict] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rendered = pool.map(make_thumbnail, [str(p) for p in stale],
+                            [str(thumb_path_for(site_dir, p)) for p in stale], chunksize=8)
+        for image, info in zip(stale, rendered):
+            results[image.name] = info
+        measured = pool.map(read_dimensions, [str(p) for p in fresh], chunksize=32)
+        for image, info in zip(fresh, measured):
+            info["thumb_bytes"] = thumb_path_for(site_dir, image).stat().st_size
+            results[image.name] = info
+
+    entries: List[Dict] = []
+    for image in images:
+        page, index = parse_image_name(image.name)
+        html = f"{image.stem}.html"
+        info = results[image.name]
+        entries.append({
+            "file": f"images/{image.name}",
+            "page": page,
+            "index": index,
+            "width": info["width"],
+            "height": info["height"],
+            "bytes": image.stat().st_size,
+            "thumb": f"{THUMB_DIR}/{image.stem}.jpg",
+            "thumb_bytes": info["thumb_bytes"],
+            "html": html if (site_dir / html).exists() else None,
+        })
+
+    manifest = {
+        "version": 1,
+        "thumb_size": list(THUMB_SIZE),
+        "page_size": GALLERY_PAGE_SIZE,
+        "count": len(entries),
+        "images": entries,
+    }
+    manifest_file = site_dir / MANIFEST_PATH
+    manifest_file.write_text(json.dumps(manifest, separators=(",", ":")), encoding="utf-8")
+
+    logger.info(f"Rendered {len(stale)} thumbnails, {len(fresh)} up to date")
+    return manifest
+
+
+def first_screen_bytes(site_dir: Path, manifest: Dict) -> int:
+    """Bytes transferred for the first gallery screen: page, manifest and one page of thumbnails"""
+    total = (site_dir / "images.html").stat().st_size + (site_dir / MANIFEST_PATH).stat().st_size
+    total += sum(entry["thumb_bytes"] for entry in manifest["images"][:manifest["page_size"]])
+    return total
+
+
+def main():
+    parser = family_argument_parser("Generate gallery thumbnails and the image manifest")
+    parser.add_argument("--force", action="store_true", help="Regenerate all thumbnails")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    manifest = build_thumbnails(site_dir, force=args.force, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    full_bytes = sum(entry["bytes"] for entry in manifest["images"][:manifest["page_size"]])
+    print(f"✓ {manifest['count']} images in manifest ({elapsed:.1f}s)")
+    print(f"  First gallery screen: {first_screen_bytes(site_dir, manifest) / 1024:.0f} KB "
+          f"(full-size images for the same screen: {full_bytes / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
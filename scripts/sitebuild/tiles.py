@@ -0,0 +1,285 @@
+"""
+Deep-zoom tile stage for the family sites
+Cuts scans above a size threshold into Deep Zoom (DZI) tile pyramids in a
+process pool, installs the viewer (static/deepzoom.js), and points the
+page_N_img_M.html viewers at it: the page's <img> starts as the one-tile
+overview of the scan, and the viewer then fetches only the tiles in view at
+the current zoom instead of the whole file. The inline openLightbox on every
+page is wrapped the same way for tiled scans.
+"""
+
+import json
+import logging
+import math
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image
+
+from sitebuild.site import family_argument_parser, iter_images, iter_pages, resolve_site
+
+logger = logging.getLogger(__name__)
+
+TILES_DIR = "images/tiles"
+INDEX_PATH = "images/tiles/index.json"
+STORE_INDEX = "images/store/index.json"  # Written by sitebuild.image_store; maps scans to store paths
+VIEWER_SCRIPT = Path(__file__).parent / "static" / "deepzoom.js"
+TILE_SIZE = 254  # 254 + 2px overlap = 256px tiles, the usual DZI layout
+TILE_OVERLAP = 1
+TILE_FORMAT = "jpg"
+TILE_QUALITY = 82
+MIN_BYTES = 1024 * 1024  # Scans this large (or MIN_PIXELS) are tiled; smaller ones load whole
+MIN_PIXELS = 4_000_000
+MAX_ZOOM = 2  # Screen pixels per scan pixel the viewer zooms to; MAX_ZOOM in deepzoom.js
+
+IMG_TAG_RE = re.compile(r"<img\b[^>]*>")
+ATTR_RE = re.compile(r'\s(src|data-scan|data-src|data-dzi)="([^"]*)"')
+SCRIPT_TAG = f'<script src="{TILES_DIR}/deepzoom.js" defer></script>'
+
+
+@dataclass
+class Pyramid:
+    """Geometry of one scan's tile pyramid"""
+    width: int
+    height: int
+
+    @property
+    def max_level(self) -> int:
+        """DZI level holding the full-size image; level 0 is 1x1"""
+        return math.ceil(math.log2(max(self.width, self.height, 1)))
+
+    @property
+    def overview_level(self) -> int:
+        """Highest level that fits in a single tile, what the viewer paints first"""
+        return max(0, self.max_level - math.ceil(math.log2(max(self.width, self.height) / TILE_SIZE)))
+
+    def level_size(self, level: int):
+        scale = 2 ** (self.max_level - level)
+        return math.ceil(self.width / scale), math.ceil(self.height / scale)
+
+
+def dzi_descriptor(pyramid: Pyramid) -> str:
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{TILE_SIZE}" '
+            f'Overlap="{TILE_OVERLAP}" Format="{TILE_FORMAT}">'
+            f'<Size Width="{pyramid.width}" Height="{pyramid.height}"/></Image>\n')
+
+
+def build_pyramid(image: str, out_dir: str) -> Dict:
+    """
+    Cut one scan into a DZI pyramid (runs in pool workers)
+
+    Levels are made by halving the level above (Image.reduce), so the full
+    image is decoded once. The .dzi descriptor is written last and marks the
+    pyramid complete.
+
+    Returns:
+        Dict with the scan's width, height and the tile count and bytes written
+    """
+    stem = Path(image).stem
+    files_dir = Path(out_dir) / f"{stem}_files"
+    shutil.rmtree(files_dir, ignore_errors=True)
+    tiles = tile_bytes = 0
+    with Image.open(image) as im:
+        if im.mode not in ("RGB", "L"):
+            background = Image.new("RGB", im.size, (255, 255, 255))
+            rgba = im.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            im = background
+        pyramid = Pyramid(*im.size)
+        level_image = im
+        for level in range(pyramid.max_level, -1, -1):
+            if level != pyramid.max_level:
+                level_image = level_image.reduce(2) if min(level_image.size) > 1 else level_image
+            width, height = pyramid.level_size(level)
+            if level_image.size != (width, height):
+                level_image = level_image.resize((width, height), Image.BOX)
+            level_dir = files_dir / str(level)
+            level_dir.mkdir(parents=True)
+            for column in range(math.ceil(width / TILE_SIZE)):
+                for row in range(math.ceil(height / TILE_SIZE)):
+                    left = max(0, column * TILE_SIZE - TILE_OVERLAP)
+                    top = max(0, row * TILE_SIZE - TILE_OVERLAP)
+                    box = (left, top, min(width, (column + 1) * TILE_SIZE + TILE_OVERLAP),
+                           min(height, (row + 1) * TILE_SIZE + TILE_OVERLAP))
+                    tile = level_dir / f"{column}_{row}.{TILE_FORMAT}"
+                    level_image.crop(box).save(tile, "JPEG", quality=TILE_QUALITY, optimize=True)
+                    tiles += 1
+                    tile_bytes += tile.stat().st_size
+    (Path(out_dir) / f"{stem}.dzi").write_text(dzi_descriptor(pyramid), encoding="utf-8")
+    return {"width": pyramid.width, "height": pyramid.height, "tiles": tiles, "tile_bytes": tile_bytes}
+
+
+def needs_tiles(image: Path, min_bytes: int, min_pixels: int) -> Optional[Pyramid]:
+    """The scan's pyramid geometry when it is large enough to tile (reads only the header)"""
+    with Image.open(image) as im:
+        pyramid = Pyramid(*im.size)
+    if image.stat().st_size >= min_bytes or pyramid.width * pyramid.height >= min_pixels:
+        return pyramid
+    return None
+
+
+def overview_tile(stem: str, pyramid: Pyramid) -> str:
+    return f"{TILES_DIR}/{stem}_files/{pyramid.overview_level}/0_0.{TILE_FORMAT}"
+
+
+def rewrite_viewers(html: str, tiled: Dict[str, Dict], aliases: Dict[str, str]) -> str:
+    """
+    Point <img> tags showing a tiled scan at its overview tile and pyramid
+
+    The original src moves to data-src, so a later run can restore it when a
+    scan is no longer tiled. Tags are matched by file name, by the scan name
+    the image store stage keeps in data-scan, or by store path (aliases).
+    """
+
+    def replace(match):
+        tag = match.group(0)
+        attrs = dict(ATTR_RE.findall(tag))
+        original = attrs.get("data-src") or attrs.get("src")
+        if not original:
+            return tag
+        name = attrs.get("data-scan") or aliases.get(original) or original.rsplit("/", 1)[-1]
+        entry = tiled.get(name)
+        if entry is None:
+            if "data-dzi" not in attrs:
+                return tag
+            # No longer tiled: put the original back
+            tag = re.sub(r'\s(?:data-src|data-dzi)="[^"]*"', "", tag)
+            return re.sub(r'\ssrc="[^"]*"', f' src="{original}"', tag, count=1)
+        tag = re.sub(r'\s(?:data-src|data-dzi)="[^"]*"', "", tag)
+        return re.sub(r'\ssrc="[^"]*"', f' src="{entry["overview"]}" data-src="{original}" '
+                                         f'data-dzi="{entry["dzi"]}"', tag, count=1)
+
+    return IMG_TAG_RE.sub(replace, html)
+
+
+def toggle_viewer_script(html: str, wanted: bool) -> str:
+    """Add the viewer script before </body>, or take it out again once nothing is tiled"""
+    if wanted and SCRIPT_TAG not in html:
+        return html.replace("</body>", f"    {SCRIPT_TAG}\n</body>", 1)
+    if not wanted and SCRIPT_TAG in html:
+        return html.replace(f"    {SCRIPT_TAG}\n", "").replace(SCRIPT_TAG, "")
+    return html
+
+
+def build_tiles(site_dir: Path, min_bytes: int = MIN_BYTES, min_pixels: int = MIN_PIXELS,
+                force: bool = False, dry_run: bool = False, workers: int = None) -> Dict:
+    """
+    Build missing or stale tile pyramids, drop unneeded ones, and rewrite the viewer pages
+
+    Args:
+        site_dir: Family site directory
+        min_bytes: Tile scans at least this large...
+        min_pixels: ...or with at least this many pixels
+        force: Rebuild every pyramid
+        dry_run: Report what would be tiled without writing
+        workers: Process pool size (defaults to CPU count)
+
+    Returns:
+        The tile index that was written: pyramid entries by scan name plus totals
+    """
+    out_dir = site_dir / TILES_DIR
+    selected = {}
+    for image in iter_images(site_dir):
+        pyramid = needs_tiles(image, min_bytes, min_pixels)
+        if pyramid:
+            selected[image.name] = (image, pyramid)
+
+    stale = []
+    for image, pyramid in selected.values():
+        # The descriptor carries the tile layout, so changing TILE_SIZE or the format rebuilds too
+        descriptor = out_dir / f"{image.stem}.dzi"
+        if (force or not descriptor.exists() or descriptor.stat().st_mtime < image.stat().st_mtime
+                or descriptor.read_text(encoding="utf-8") != dzi_descriptor(pyramid)):
+            stale.append(image)
+    if dry_run:
+        return {"images": {name: {"width": p.width, "height": p.height} for name, (_, p) in selected.items()},
+                "built": len(stale), "pages_rewritten": 0}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        built = list(pool.map(build_pyramid, [str(image) for image in stale], [str(out_dir)] * len(stale)))
+    for leftover in out_dir.iterdir():
+        stem = leftover.name.removesuffix("_files").removesuffix(".dzi")
+        if leftover.name != "index.json" and leftover.name != "deepzoom.js" and f"{stem}.png" not in selected:
+            shutil.rmtree(leftover) if leftover.is_dir() else leftover.unlink()
+    shutil.copyfile(VIEWER_SCRIPT, out_dir / "deepzoom.js")
+
+    entries = {}
+    for name, (image, pyramid) in selected.items():
+        entries[name] = {
+            "dzi": f"{TILES_DIR}/{image.stem}.dzi",
+            "overview": overview_tile(image.stem, pyramid),
+            "width": pyramid.width,
+            "height": pyramid.height,
+            "bytes": image.stat().st_size,
+        }
+    aliases = {}
+    try:
+        store = json.loads((site_dir / STORE_INDEX).read_text(encoding="utf-8"))
+        aliases = {path: name for name, path in store.get("canonical", {}).items() if name in entries}
+    except (FileNotFoundError, ValueError):
+        pass
+    # openLightbox receives whatever src the page used, so store paths resolve to scans too
+    index = {"version": 1, "tile_size": TILE_SIZE, "images": entries, "aliases": aliases}
+    (site_dir / INDEX_PATH).write_text(json.dumps(index, separators=(",", ":"), sort_keys=True),
+                                      encoding="utf-8")
+
+    pages_rewritten = 0
+    for page in iter_pages(site_dir):
+        original = page.read_text(encoding="utf-8")
+        html = rewrite_viewers(original, entries, aliases)
+        # Pages with the inline lightbox get the script too, it opens tiled scans in the viewer
+        wanted = bool(entries) and ('data-dzi="' in html or "function openLightbox(" in html)
+        html = toggle_viewer_script(html, wanted)
+        if html != original:
+            page.write_text(html, encoding="utf-8")
+            pages_rewritten += 1
+
+    logger.info(f"Built {len(stale)} pyramids, {len(selected) - len(stale)} up to date")
+    return {**index, "built": len(stale), "tiles": sum(b["tiles"] for b in built),
+            "tile_bytes": sum(b["tile_bytes"] for b in built), "pages_rewritten": pages_rewritten}
+
+
+def first_paint_bytes(site_dir: Path, entry: Dict) -> int:
+    """Bytes before a tiled scan shows: its overview tile (the full file without tiles)"""
+    return (site_dir / entry["overview"]).stat().st_size
+
+
+def main():
+    parser = family_argument_parser("Cut large scans into deep-zoom tile pyramids")
+    parser.add_argument("--min-bytes", type=int, default=MIN_BYTES,
+                        help=f"Tile scans of at least this many bytes (default: {MIN_BYTES})")
+    parser.add_argument("--min-pixels", type=int, default=MIN_PIXELS,
+                        help=f"...or at least this many pixels (default: {MIN_PIXELS})")
+    parser.add_argument("--force", action="store_true", help="Rebuild every pyramid")
+    parser.add_argument("--dry-run", action="store_true", help="List the scans that would be tiled")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    site_dir = resolve_site(args)
+    start = time.perf_counter()
+    result = build_tiles(site_dir, args.min_bytes, args.min_pixels, force=args.force,
+                         dry_run=args.dry_run, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    images = result["images"]
+    if args.dry_run:
+        print(f"Would tile {len(images)} scans ({result['built']} new or stale)")
+        return
+
+    print(f"✓ {len(images)} scans tiled ({elapsed:.1f}s, {result['built']} rebuilt, {result['tiles']} tiles, "
+          f"{result['tile_bytes'] / 1024 / 1024:.1f} MB); {result['pages_rewritten']} pages rewritten")
+    largest = sorted(images.values(), key=lambda entry: -entry["bytes"])[:5]
+    for entry in largest:
+        print(f"  {entry['dzi'].rsplit('/', 1)[-1]:<24} {entry['width']}x{entry['height']}: first paint "
+              f"{first_paint_bytes(site_dir, entry) / 1024:.0f} KB instead of {entry['bytes'] / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
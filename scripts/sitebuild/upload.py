@@ -0,0 +1,335 @@
+"""
+Incremental uploader for the family sites
+Compares the local deploy manifest with the one left on the static host by
+the previous deploy and uploads only new or changed files over a pool of
+parallel FTP connections. Interrupted deploys resume where they stopped.
+"""
+
+import argparse
+import ftplib
+import json
+import logging
+import os
+import posixpath
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from dotenv import load_dotenv
+
+from sitebuild.compress import MANIFEST_NAME, load_manifest
+from sitebuild.site import REPO_ROOT, SITES_ROOT, family_dir
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_NAME = ".deploy-journal"
+PART_SUFFIX = ".part"
+BLOCK_SIZE = 64 * 1024
+
+
+@dataclass
+class FtpTarget:
+    """Static host connection settings (same .env keys as upload-root.ps1)"""
+    host: str
+    user: str
+    password: str
+    port: int = 21
+    tls: bool = False
+    remote_root: str = "/"
+    timeout: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "FtpTarget":
+        """Load settings from the environment / repo-root .env"""
+        load_dotenv(REPO_ROOT / ".env")
+        host = os.getenv("static_host_name", "")
+        if not host:
+            raise ValueError("static_host_name is not configured")
+        return cls(
+            host=host,
+            user=os.getenv("static_host_username", ""),
+            password=os.getenv("static_host_password", ""),
+            port=int(os.getenv("static_host_port", "21")),
+            tls=os.getenv("static_host_tls", "false").lower() == "true",
+            remote_root=os.getenv("static_host_root", "/"),
+        )
+
+    def connect(self) -> ftplib.FTP:
+        """Open a logged-in binary-mode connection"""
+        ftp = ftplib.FTP_TLS() if self.tls else ftplib.FTP()
+        ftp.connect(self.host, self.port, timeout=self.timeout)
+        ftp.login(self.user, self.password)
+        if self.tls:
+            ftp.prot_p()
+        ftp.voidcmd("TYPE I")
+        return ftp
+
+
+@dataclass
+class UploadReport:
+    """Outcome of an incremental deploy"""
+    files_uploaded: int = 0
+    bytes_uploaded: int = 0
+    bytes_resumed: int = 0  # already on the host from an interrupted deploy
+    files_skipped: int = 0
+    bytes_skipped: int = 0
+    orphans: List[str] = field(default_factory=list)
+    orphans_deleted: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Upload throughput in bytes per second"""
+        return self.bytes_uploaded / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def skipped_ratio(self) -> float:
+        """Share of deployable bytes that did not need to be sent"""
+        total = self.bytes_uploaded + self.bytes_resumed + self.bytes_skipped
+        return (self.bytes_skipped + self.bytes_resumed) / total if total else 1.0
+
+
+def transfer_units(key: str, entry: Dict) -> List[str]:
+    """Remote files for one manifest entry: the file plus its precompressed siblings"""
+    units = [key]
+    if entry.get("br") is not None:
+        units.append(key + ".br")
+    if entry.get("gz") is not None:
+        units.append(key + ".gz")
+    return units
+
+
+def plan_upload(local: Dict, remote: Dict, done: Dict[str, str]) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Decide what to send
+
+    Args:
+        local: Local manifest files
+        remote: Last-deployed manifest files
+        done: Units already completed by an interrupted deploy (unit -> sha256)
+
+    Returns:
+        (units to upload, units skipped, orphaned manifest keys)
+    """
+    upload, skipped = [], []
+    for key, entry in local.items():
+        unchanged = remote.get(key, {}).get("sha256") == entry["sha256"]
+        for unit in transfer_units(key, entry):
+            if unchanged or done.get(unit) == entry["sha256"]:
+                skipped.append(unit)
+            else:
+                upload.append(unit)
+    orphans = sorted(set(remote) - set(local))
+    return upload, skipped, orphans
+
+
+class IncrementalUploader:
+    """Parallel manifest-driven uploader with per-file resume"""
+
+    def __init__(self, root: Path, target: FtpTarget, workers: int = 4):
+        self.root = root
+        self.target = target
+        self.workers = workers
+        self._local = threading.local()
+        self._connections: List[ftplib.FTP] = []
+        self._lock = threading.Lock()
+        self._made_dirs: Set[str] = set()
+
+    def _ftp(self) -> ftplib.FTP:
+        """Connection owned by the current worker thread"""
+        ftp = getattr(self._local, "ftp", None)
+        if ftp is None:
+            ftp = self.target.connect()
+            self._local.ftp = ftp
+            with self._lock:
+                self._connections.append(ftp)
+        return ftp
+
+    def _remote(self, key: str) -> str:
+        return posixpath.join(self.target.remote_root, key)
+
+    def _ensure_dir(self, ftp: ftplib.FTP, remote_dir: str):
+        """Create remote directories once per deploy"""
+        missing = []
+        while remote_dir not in ("", "/") and remote_dir not in self._made_dirs:
+            missing.append(remote_dir)
+            remote_dir = posixpath.dirname(remote_dir)
+        for path in reversed(missing):
+            try:
+                ftp.mkd(path)
+            except ftplib.error_perm:
+                pass  # Already exists
+            with self._lock:
+                self._made_dirs.add(path)
+
+    def _journal(self, line: str):
+        with self._lock, open(self.root / JOURNAL_NAME, "a", encoding="utf-8") as journal:
+            journal.write(line + "\n")
+
+    def read_journal(self) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """Units started and completed by an interrupted deploy (unit -> sha256)"""
+        started, done = {}, {}
+        journal = self.root / JOURNAL_NAME
+        if journal.exists():
+            for line in journal.read_text(encoding="utf-8").splitlines():
+                state, sha, unit = line.split(" ", 2)
+                (done if state == "done" else started)[unit] = sha
+        return started, done
+
+    def fetch_remote_manifest(self) -> Dict:
+        """Manifest of the last completed deploy, or an empty one"""
+        buffer = BytesIO()
+        try:
+            self._ftp().retrbinary(f"RETR {self._remote(MANIFEST_NAME)}", buffer.write)
+        except ftplib.error_perm:
+            return {"version": 1, "files": {}}
+        return json.loads(buffer.getvalue().decode("utf-8"))
+
+    def upload_unit(self, unit: str, sha: str, resumable: bool) -> Tuple[int, int]:
+        """
+        Upload one file via a .part name, resuming a partial transfer if one exists
+
+        Returns:
+            (bytes sent, bytes resumed)
+        """
+        ftp = self._ftp()
+        local_path = self.root / unit
+        remote_path = self._remote(unit)
+        part = remote_path + PART_SUFFIX
+        size = local_path.stat().st_size
+        self._ensure_dir(ftp, posixpath.dirname(remote_path))
+
+        offset = 0
+        if resumable:
+            try:
+                offset = ftp.size(part) or 0
+            except ftplib.error_perm:
+                offset = 0
+            if offset > size:
+                offset = 0
+        self._journal(f"start {sha} {unit}")
+
+        with open(local_path, "rb") as f:
+            f.seek(offset)
+            ftp.storbinary(f"STOR {part}", f, blocksize=BLOCK_SIZE, rest=offset or None)
+        try:
+            ftp.delete(remote_path)
+        except ftplib.error_perm:
+            pass  # New file
+        ftp.rename(part, remote_path)
+
+        self._journal(f"done {sha} {unit}")
+        return size - offset, offset
+
+    def delete_orphan(self, key: str) -> int:
+        """Remove a file the local tree no longer has, with its siblings"""
+        ftp = self._ftp()
+        deleted = 0
+        for unit in (key, key + ".br", key + ".gz"):
+            try:
+                ftp.delete(self._remote(unit))
+                deleted += 1
+            except ftplib.error_perm:
+                pass
+        return deleted
+
+    def run(self, delete_orphans: bool = False, dry_run: bool = False) -> UploadReport:
+        """
+        Deploy the local manifest
+
+        Args:
+            delete_orphans: Delete remote files missing from the local manifest
+            dry_run: Plan and report without transferring
+
+        Returns:
+            UploadReport with counts, throughput and skipped-bytes ratio
+        """
+        start = time.perf_counter()
+        local = load_manifest(self.root)["files"]
+        if not local:
+            raise FileNotFoundError(f"No {MANIFEST_NAME} in {self.root}; run sitebuild.compress first")
+
+        remote = self.fetch_remote_manifest()["files"]
+        started, done = self.read_journal()
+        upload, skipped, orphans = plan_upload(local, remote, done)
+        sha_of = {unit: entry["sha256"] for key, entry in local.items() for unit in transfer_units(key, entry)}
+
+        report = UploadReport(files_skipped=len(skipped), orphans=orphans)
+        report.bytes_skipped = sum((self.root / unit).stat().st_size for unit in skipped)
+
+        if not dry_run:
+            try:
+                with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                    results = pool.map(
+                        lambda unit: self.upload_unit(unit, sha_of[unit], started.get(unit) == sha_of[unit]),
+                        upload,
+                    )
+                    for sent, resumed in results:
+                        report.files_uploaded += 1
+                        report.bytes_uploaded += sent
+                        report.bytes_resumed += resumed
+
+                    if delete_orphans and orphans:
+                        report.orphans_deleted = sum(pool.map(self.delete_orphan, orphans))
+
+                # Publishing the manifest last marks the deploy complete
+                deployed = dict(local)
+                if not delete_orphans:
+                    deployed.update({key: remote[key] for key in orphans})
+                payload = json.dumps({"version": 1, "files": deployed}, indent=1, sort_keys=True).encode("utf-8")
+                self._ftp().storbinary(f"STOR {self._remote(MANIFEST_NAME)}", BytesIO(payload))
+                (self.root / JOURNAL_NAME).unlink(missing_ok=True)
+            finally:
+                self.close()
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def close(self):
+        """Close every worker connection"""
+        for ftp in self._connections:
+            try:
+                ftp.quit()
+            except ftplib.all_errors:
+                ftp.close()
+        self._connections.clear()
+        self._local = threading.local()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload changed family site files to the static host")
+    parser.add_argument("--family", help="Deploy one family site to <remote root>/<family>")
+    parser.add_argument("--site", type=Path, help="Explicit local directory to deploy")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel FTP connections (default: 4)")
+    parser.add_argument("--delete", action="store_true", help="Delete remote files missing locally")
+    parser.add_argument("--dry-run", action="store_true", help="Show the plan without uploading")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    target = FtpTarget.from_env()
+    if args.site:
+        root = args.site.resolve()
+    elif args.family:
+        root = family_dir(args.family)
+        target.remote_root = posixpath.join(target.remote_root, args.family)
+    else:
+        root = SITES_ROOT
+
+    report = IncrementalUploader(root, target, workers=args.workers).run(
+        delete_orphans=args.delete, dry_run=args.dry_run)
+
+    print(f"✓ {report.files_uploaded} files uploaded ({report.bytes_uploaded / 1024 / 1024:.1f} MB) "
+          f"in {report.elapsed:.1f}s, {report.throughput / 1024 / 1024:.2f} MB/s")
+    print(f"  {report.files_skipped} unchanged files skipped, "
+          f"{report.skipped_ratio * 100:.1f}% of bytes not sent")
+    if report.orphans:
+        action = "deleted" if args.delete else "left in place (use --delete)"
+        print(f"  {len(report.orphans)} orphaned remote files {action}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Wiki link resolution stage for the family sites
+Rewrites [[target|label]] markup into real <a> tags at build time and strips
+the DOMContentLoaded pass that used to do it in the browser on every load
+"""
+
+import logging
+import re
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Tuple
+
+from sitebuild.site import family_argument_parser, iter_pages, resolve_site
+
+logger = logging.getLogger(__name__)
+
+WIKI_LINK_RE = re.compile(r"\[\[([^\]]+)\]\]")
+CONTENT_START = '<div class="content">'
+CONTENT_END = '<footer class="nav-footer">'
+
+# The inline DOMContentLoaded block every generated page carried to rewrite links client-side
+RUNTIME_REWRITE_RE = re.compile(
+    r"[ \t]*// Handle wiki links\n[ \t]*document\.addEventListener\('DOMContentLoaded'.*?"
+    r"content\.innerHTML = html;\n[ \t]*\}\n[ \t]*\}\);\n[ \t]*\n",
+    re.S,
+)
+
+
+@dataclass
+class WikiLinkReport:
+    """Outcome of a wiki link pass over a site"""
+    pages_rewritten: int = 0
+    links_resolved: int = 0
+    runtime_passes_removed: int = 0
+    broken: List[Tuple[str, str]] = field(default_factory=list)  # (page, target filename)
+
+
+def target_filename(target: str) -> str:
+    """Map a wiki link target to its page filename, following the old client-side rules"""
+    if target.endswith(".html"):
+        target = target[:-len(".html")]
+    return re.sub(r"[^a-zA-Z0-9_-]", "_", target).lower() + ".html"
+
+
+def resolve_links(html: str, site_dir: Path, page_name: str, report: WikiLinkReport) -> str:
+    """Replace wiki links inside the content area of one page"""
+    start = html.find(CONTENT_START)
+    end = html.find(CONTENT_END, start)
+    if start < 0 or end < 0:
+        return html
+
+    def replace(match):
+        parts = match.group(1).split("|")
+        target = parts[0].strip()
+        display = parts[1].strip() if len(parts) > 1 else target
+        filename = target_filename(target)
+        if not (site_dir / filename).exists():
+            report.broken.append((page_name, filename))
+        report.links_resolved += 1
+        return f'<a href="{filename}" class="wiki-link">{display}</a>'
+
+    return html[:start] + WIKI_LINK_RE.sub(replace, html[start:end]) + html[end:]
+
+
+def resolve_wiki_links(site_dir: Path, dry_run: bool = False) -> WikiLinkReport:
+    """
+    Resolve wiki links on every page of a site in place
+
+    Args:
+        site_dir: Family site directory
+        dry_run: Report what would change without writing files
+
+    Returns:
+        WikiLinkReport with counts and broken targets
+    """
+    report = WikiLinkReport()
+    for page in iter_pages(site_dir):
+        original = page.read_text(encoding="utf-8")
+        html = resolve_links(original, site_dir, page.name, report)
+        html, removed = RUNTIME_REWRITE_RE.subn("", html)
+        report.runtime_passes_removed += removed
+        if html != original:
+            report.pages_rewritten += 1
+            if not dry_run:
+                page.write_text(html, encoding="utf-8")
+
+    for page_name, filename in report.broken:
+        logger.warning(f"Broken wiki link in {page_name}: {filename}")
+    return report
+
+
+def main():
+    parser = family_argument_parser("Resolve [[wiki links]] into static <a> tags")
+    parser.add_argument("--dry-run", action="store_true", help="Report without writing")
+    parser.add_argument("--strict", action="store_true", help="Exit non-zero on broken targets")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    report = resolve_wiki_links(resolve_site(args), dry_run=args.dry_run)
+    print(f"✓ {report.links_resolved} wiki links resolved, {report.pages_rewritten} pages rewritten, "
+          f"{report.runtime_passes_removed} runtime passes removed")
+    if report.broken:
+        print(f"⚠️ {len(report.broken)} broken wiki link targets")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()